@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the NeoDepends core binary, for running the export pipeline in tests.
+
+Ignores the input tree and writes the core DB of the synthetic project
+``ProjectSpec(files=$STUB_NEODEPENDS_FILES)`` (default 6) to ``--output``; tests
+write the same project's sources with ``write_sources`` as the input.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+
+from synthetic_project import ProjectSpec, generate_project
+
+
+def main() -> int:
+    if "--version" in sys.argv:
+        print("neodepends 0.0.0 (test stub)")
+        return 0
+    output = next(arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--output="))
+    spec = ProjectSpec(files=int(os.environ.get("STUB_NEODEPENDS_FILES", "6")))
+    generate_project(spec).write_core_db(Path(output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/analysis_cache.py."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from analysis_cache import AnalysisCache, source_fingerprint, stage_key
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.cache = AnalysisCache(self.tmp / "cache")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _outputs(self, out: Path):
+        return {"db": out / "deps.db", "dv8_deps": out / "dv8_deps"}
+
+    def test_store_and_restore_files_and_directories(self):
+        src = self._outputs(self.tmp / "run1")
+        src["dv8_deps"].mkdir(parents=True)
+        src["db"].write_bytes(b"db-bytes")
+        (src["dv8_deps"] / "a.dv8-dependency.json").write_text("{}", encoding="utf-8")
+        key = stage_key("neodepends", "content:abc", {"resolver": "depends"})
+
+        self.assertFalse(self.cache.restore(key, src))
+        self.cache.store(key, src)
+        self.assertTrue(self.cache.contains(key))
+
+        dest = self._outputs(self.tmp / "run2")
+        dest["db"].parent.mkdir(parents=True)
+        Path(str(dest["db"]) + "-wal").write_bytes(b"stale")
+        self.assertTrue(self.cache.restore(key, dest))
+        self.assertEqual(dest["db"].read_bytes(), b"db-bytes")
+        self.assertFalse(Path(str(dest["db"]) + "-wal").exists())
+        self.assertEqual((dest["dv8_deps"] / "a.dv8-dependency.json").read_text(encoding="utf-8"), "{}")
+        # An entry stored under other output names is a miss, not a partial restore.
+        self.assertFalse(self.cache.restore(key, {"db": dest["db"]}))
+
+    def test_evicts_least_recently_used_entries(self):
+        keys = [stage_key("dv8", i) for i in range(3)]
+        for i, key in enumerate(keys):
+            out = self.tmp / f"out{i}.json"
+            out.write_bytes(b"x" * 1000)
+            self.cache.store(key, {"out": out})
+            entry = self.cache.root / key[:2] / key / "entry.json"
+            os.utime(entry, (1000 + i, 1000 + i))
+        # Touch the oldest entry, then shrink the budget to two entries' worth.
+        self.assertTrue(self.cache.restore(keys[0], {"out": self.tmp / "restored.json"}))
+        self.cache.max_bytes = 2 * 1000 + 600
+        self.assertEqual(self.cache.evict(), [keys[1]])
+        self.assertEqual([self.cache.contains(k) for k in keys], [True, False, True])
+
+    def test_content_fingerprint_tracks_source_files_only(self):
+        root = self.tmp / "proj"
+        (root / "pkg").mkdir(parents=True)
+        (root / "pkg" / "a.py").write_text("x = 1\n", encoding="utf-8")
+        (root / "README.md").write_text("docs\n", encoding="utf-8")
+        before = source_fingerprint(root, ["python"])
+        self.assertTrue(before.startswith("content:"))
+        (root / "README.md").write_text("more docs\n", encoding="utf-8")
+        self.assertEqual(source_fingerprint(root, ["python"]), before)
+        (root / "pkg" / "a.py").write_text("x = 2\n", encoding="utf-8")
+        self.assertNotEqual(source_fingerprint(root, ["python"]), before)
+
+    def test_stage_key_is_order_insensitive_for_mappings(self):
+        self.assertEqual(stage_key("s", {"a": 1, "b": 2}), stage_key("s", {"b": 2, "a": 1}))
+        self.assertNotEqual(stage_key("s", {"a": 1}), stage_key("t", {"a": 1}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Unit tests for ast_cache.py.
+
+Covers:
+  1. blob_id — must match git blob hashes (NeoDepends `contents.id`)
+  2. AstCache.method_tree — subtree-by-span equivalent to parsing the dedented slice
+  3. The optional on-disk pickle layer (and that it refuses untrusted entries)
+"""
+
+import ast
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+# Add tools/ to path so we can import the module under test.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from ast_cache import AstCache, blob_id
+
+SOURCE = textwrap.dedent(
+    """\
+    import functools
+
+
+    class Flight:
+        @property
+        def code(self):
+            return self._code
+
+        @functools.lru_cache()
+        @staticmethod
+        def lookup(key):
+            if isinstance(key, Flight):
+                return key
+            return None
+
+
+    def helper(x):
+        return x
+    """
+)
+
+
+def _db_with(source: str) -> tuple:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE contents (id BLOB NOT NULL PRIMARY KEY, content TEXT NOT NULL)")
+    cid = blob_id(source)
+    conn.execute("INSERT INTO contents VALUES (?, ?)", (cid, source))
+    return conn, cid
+
+
+def _slice_tree(source: str, start_row: int, end_row: int) -> ast.Module:
+    lines = source.split("\n")
+    tree = ast.parse(textwrap.dedent("\n".join(lines[start_row:end_row + 1])))
+    ast.increment_lineno(tree, start_row)
+    return tree
+
+
+class TestBlobId(unittest.TestCase):
+    def test_matches_git_empty_blob(self):
+        self.assertEqual(blob_id("").hex(), "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391")
+
+    def test_matches_git_hello_blob(self):
+        # `printf 'hello\n' | git hash-object --stdin`
+        self.assertEqual(blob_id("hello\n").hex(), "ce013625030ba8dba906f756967f9e9ca394464a")
+
+
+class TestMethodTree(unittest.TestCase):
+    def setUp(self):
+        self.conn, self.cid = _db_with(SOURCE)
+        self.cache = AstCache()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _assert_same_as_slice(self, start_row: int, end_row: int, name: str) -> ast.Module:
+        got = self.cache.method_tree(self.conn, self.cid, start_row, end_row, name)
+        self.assertIsNotNone(got)
+        expected = _slice_tree(SOURCE, start_row, end_row)
+        # Dedenting shifts columns, so compare structure and line numbers only.
+        self.assertEqual(ast.dump(got), ast.dump(expected))
+        got_lines = sorted({n.lineno for n in ast.walk(got) if hasattr(n, "lineno")})
+        exp_lines = sorted({n.lineno for n in ast.walk(expected) if hasattr(n, "lineno")})
+        self.assertEqual(got_lines, exp_lines)
+        return got
+
+    def test_span_starting_at_def_line_drops_decorators(self):
+        # `def code` is on row 5 (0-based); its decorator sits on row 4.
+        tree = self._assert_same_as_slice(5, 6, "code")
+        self.assertEqual(tree.body[0].decorator_list, [])
+
+    def test_span_starting_at_decorator_keeps_decorators(self):
+        tree = self._assert_same_as_slice(8, 13, "lookup")
+        self.assertEqual(len(tree.body[0].decorator_list), 2)
+
+    def test_module_function(self):
+        self._assert_same_as_slice(16, 17, "helper")
+
+    def test_subtree_comes_from_file_tree(self):
+        self.cache.method_tree(self.conn, self.cid, 16, 17, "helper")
+        file_tree = self.cache.tree(self.conn, self.cid)
+        got = self.cache.method_tree(self.conn, self.cid, 16, 17, "helper")
+        self.assertIs(got.body[0], file_tree.body[-1])
+
+    def test_unparsable_file_falls_back_to_slice(self):
+        broken = "def ok(a):\n    return a\n\nprint \"py2 only\"\n"
+        conn, cid = _db_with(broken)
+        try:
+            cache = AstCache()
+            self.assertIsNone(cache.tree(conn, cid))
+            got = cache.method_tree(conn, cid, 0, 1, "ok")
+            self.assertIsNotNone(got)
+            self.assertEqual(got.body[0].name, "ok")
+            self.assertEqual(got.body[0].lineno, 1)
+            self.assertIsNone(cache.method_tree(conn, cid, 3, 3, "nope"))
+        finally:
+            conn.close()
+
+
+class TestDiskLayer(unittest.TestCase):
+    def test_round_trip_skips_parsing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cid = blob_id(SOURCE)
+            first = AstCache(Path(tmp))
+            tree = first.parse(cid, SOURCE)
+            self.assertTrue(any(Path(tmp).rglob(f"{cid.hex()}.pickle")))
+
+            second = AstCache(Path(tmp))
+            # The source is ignored when the tree is already on disk.
+            loaded = second.parse(cid, "")
+            self.assertIsNotNone(loaded)
+            self.assertEqual(ast.dump(loaded), ast.dump(tree))
+
+    def test_syntax_errors_are_not_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AstCache(Path(tmp))
+            self.assertIsNone(cache.parse(b"\x01" * 20, "def (:"))
+            self.assertFalse(any(Path(tmp).rglob("*.pickle")))
+
+    def _entry(self, tmp: str, cid: bytes) -> Path:
+        return next(Path(tmp).rglob(f"{cid.hex()}.pickle"))
+
+    def test_entries_may_not_reference_other_globals(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cid = blob_id(SOURCE)
+            AstCache(Path(tmp)).parse(cid, SOURCE)
+            marker = Path(tmp) / "ran"
+
+            class Payload:
+                def __reduce__(self):
+                    return (os.mkdir, (str(marker),))
+
+            self._entry(tmp, cid).write_bytes(pickle.dumps(Payload()))
+            tree = AstCache(Path(tmp)).parse(cid, SOURCE)
+            self.assertFalse(marker.exists())
+            # The entry is rejected and the source is parsed instead.
+            self.assertEqual(ast.dump(tree), ast.dump(ast.parse(SOURCE)))
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX permissions")
+    def test_dir_writable_by_others_is_not_used(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cid = blob_id(SOURCE)
+            AstCache(Path(tmp)).parse(cid, SOURCE)
+            entry = self._entry(tmp, cid)
+            self.assertEqual(entry.parent.stat().st_mode & 0o777, 0o700)
+            self.assertEqual(entry.stat().st_mode & 0o777, 0o600)
+            entry.parent.chmod(0o777)
+            self.assertIsNone(AstCache(Path(tmp)).parse(cid, ""))
+            entry.parent.chmod(0o700)
+            entry.chmod(0o666)
+            self.assertIsNone(AstCache(Path(tmp)).parse(cid, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/synthetic_project.py and tools/bench_pipeline.py."""
+
+import ast
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+sys.path.insert(0, str(TOOLS))
+
+from ast_cache import blob_id
+from bench_pipeline import DEFAULT_BASELINE, DEFAULT_REFERENCE_SCALE, check_against_baseline
+from synthetic_project import ProjectSpec, generate_project
+
+
+class TestSyntheticProject(unittest.TestCase):
+    def test_generation_is_deterministic(self):
+        spec = ProjectSpec(files=12, seed=3)
+        for lang in ("python", "java"):
+            a, b = generate_project(spec, lang), generate_project(spec, lang)
+            self.assertEqual(a.sources, b.sources)
+            self.assertEqual(a.entities, b.entities)
+            self.assertEqual(a.deps, b.deps)
+        self.assertNotEqual(generate_project(spec).deps, generate_project(ProjectSpec(files=12, seed=4)).deps)
+
+    def test_python_sources_parse_and_methods_sit_on_their_def_lines(self):
+        project = generate_project(ProjectSpec(files=8))
+        for text in project.sources.values():
+            ast.parse(text)
+        contents = {blob_id(text): text.split("\n") for text in project.sources.values()}
+        methods = [e for e in project.entities if e[3] == "Method"]
+        self.assertEqual(len(methods), 8 * 2 * 5)
+        for e in methods:
+            self.assertTrue(contents[e[16]][e[5]].lstrip().startswith(f"def {e[2]}("))
+
+
+class TestCheckAgainstBaseline(unittest.TestCase):
+    BASE = {"spec": {"files": 20}, "files_per_sec": {"export": {"1": 100.0, "10": 100.0, "100": 100.0}}}
+
+    def _run(self, fps):
+        return {"spec": {"files": 20}, "files_per_sec": {"export": fps}}
+
+    def test_flags_super_linear_drop_only(self):
+        # Uniformly slower hardware keeps the efficiency and passes.
+        slower = self._run({"1": 40.0, "10": 40.0, "100": 40.0})
+        self.assertEqual(check_against_baseline(slower, self.BASE, tolerance=0.2), [])
+        self.assertEqual(len(check_against_baseline(slower, self.BASE, tolerance=0.2, absolute=True)), 3)
+        quadratic = self._run({"1": 100.0, "10": 100.0, "100": 10.0})
+        problems = check_against_baseline(quadratic, self.BASE, tolerance=0.2)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("export @ 100x", problems[0])
+        self.assertIn("relative to 10x", problems[0])
+
+    def test_default_tolerance_catches_a_third_slower(self):
+        slower = self._run({"1": 100.0, "10": 100.0, "100": 70.0})
+        self.assertEqual(len(check_against_baseline(slower, self.BASE, tolerance=0.2)), 1)
+        self.assertEqual(check_against_baseline(self._run({"1": 100.0, "10": 100.0, "100": 85.0}), self.BASE, tolerance=0.2), [])
+
+    def test_noisy_smallest_scale_is_not_the_reference(self):
+        # A 1x run that happened to be fast must not make 10x/100x look like a regression.
+        noisy = self._run({"1": 300.0, "10": 100.0, "100": 100.0})
+        self.assertEqual(check_against_baseline(noisy, self.BASE, tolerance=0.2), [])
+        # Without the reference scale the smallest common scale is used.
+        two_scales = {"spec": {"files": 20}, "files_per_sec": {"export": {"1": 100.0, "100": 50.0}}}
+        problems = check_against_baseline(two_scales, self.BASE, tolerance=0.2)
+        self.assertIn("relative to 1x", problems[0])
+
+    def test_spec_mismatch(self):
+        other = {"spec": {"files": 40}, "files_per_sec": {}}
+        self.assertIn("re-record", check_against_baseline(other, self.BASE, tolerance=0.2)[0])
+
+
+class TestBaselineFile(unittest.TestCase):
+    def test_missing_baseline_fails(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, str(TOOLS / "bench_pipeline.py"), "--baseline", str(Path(tmp) / "none.json")],
+                capture_output=True,
+                text=True,
+            )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("--write-baseline", result.stdout)
+
+    def test_committed_baseline_scales_linearly(self):
+        # A baseline that already contains a super-linear stage would hide it for good.
+        baseline = json.loads(DEFAULT_BASELINE.read_text(encoding="utf-8"))
+        for lang, result in baseline.items():
+            for stage, fps in result["files_per_sec"].items():
+                top = str(max(result["scales"]))
+                ref = str(DEFAULT_REFERENCE_SCALE)
+                self.assertGreater(fps[top] / fps[ref], 0.7, f"{lang} {stage}: {fps}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/commit_batch.py."""
+
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from commit_batch import CommitIndexWriter, CommitSlicer, commit_files, commit_tags, resolve_commits
+from pipeline_errors import PreflightError
+
+SCHEMA = """
+CREATE TABLE entities (id BLOB NOT NULL PRIMARY KEY, parent_id BLOB, name TEXT NOT NULL, kind TEXT NOT NULL,
+                       content_id BLOB NOT NULL);
+CREATE TABLE deps (src BLOB NOT NULL, tgt BLOB NOT NULL, kind TEXT NOT NULL, row INT NOT NULL, commit_id BLOB);
+CREATE TABLE contents (id BLOB NOT NULL PRIMARY KEY, content TEXT NOT NULL);
+"""
+
+A1, A2, B1 = b"\xa1" * 20, b"\xa2" * 20, b"\xb1" * 20
+C1, C2 = "c1" * 20, "c2" * 20
+
+
+class TestCommitSlicer(unittest.TestCase):
+    """Two commits: a.py changes between them, b.py is shared."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.batch = self.tmp / "batch.db"
+        conn = sqlite3.connect(str(self.batch))
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO entities VALUES (?, ?, ?, ?, ?)",
+            [
+                (b"fa1", None, "a.py", "File", A1),
+                (b"ka1", b"fa1", "A", "Class", A1),
+                (b"fa2", None, "a.py", "File", A2),
+                (b"ka2", b"fa2", "A", "Class", A2),
+                (b"mb", b"kb", "run", "Method", B1),  # child before its parent
+                (b"kb", b"fb", "B", "Class", B1),
+                (b"fb", None, "b.py", "File", B1),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO deps VALUES (?, ?, ?, ?, ?)",
+            [
+                (b"mb", b"ka1", "Call", 3, bytes.fromhex(C1)),
+                (b"mb", b"ka2", "Call", 3, bytes.fromhex(C2)),
+                (b"ka2", b"kb", "Extend", 1, bytes.fromhex(C2)),
+            ],
+        )
+        conn.executemany("INSERT INTO contents VALUES (?, ?)", [(A1, "a1"), (A2, "a2"), (B1, "b1")])
+        conn.commit()
+        conn.close()
+        self.trees = {C1: {"a.py": A1, "b.py": B1}, C2: {"a.py": A2, "b.py": B1, "README": b"\x00" * 20}}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _rows(self, db, sql):
+        conn = sqlite3.connect(str(db))
+        try:
+            return sorted(conn.execute(sql).fetchall())
+        finally:
+            conn.close()
+
+    def test_slices_hold_one_commit_each(self):
+        slicer = CommitSlicer(self.batch)
+        try:
+            self.assertEqual(slicer.write(C1, self.trees[C1], self.tmp / "c1.db"), (5, 1))
+            self.assertEqual(slicer.write(C2, self.trees[C2], self.tmp / "c2.db"), (5, 2))
+        finally:
+            slicer.close()
+        self.assertEqual(
+            self._rows(self.tmp / "c1.db", "SELECT id FROM entities"),
+            [(b"fa1",), (b"fb",), (b"ka1",), (b"kb",), (b"mb",)],
+        )
+        self.assertEqual(self._rows(self.tmp / "c1.db", "SELECT tgt FROM deps"), [(b"ka1",)])
+        self.assertEqual(self._rows(self.tmp / "c2.db", "SELECT content FROM contents"), [("a2",), ("b1",)])
+
+    def test_index_db_unions_entities_and_stamps_deps(self):
+        slicer = CommitSlicer(self.batch)
+        index = CommitIndexWriter(self.tmp / "index.db", slicer.schema)
+        try:
+            for seq, sha in enumerate((C1, C2)):
+                db = self.tmp / f"{seq}.db"
+                slicer.write(sha, self.trees[sha], db)
+                conn = sqlite3.connect(str(db))
+                # Enhancement inserts deps without a commit id.
+                conn.execute("INSERT INTO deps VALUES (?, ?, 'Use', 2, NULL)", (b"mb", b"kb"))
+                conn.commit()
+                conn.close()
+                index.add(seq, sha, db)
+        finally:
+            index.close()
+            slicer.close()
+        index_db = self.tmp / "index.db"
+        self.assertEqual(len(self._rows(index_db, "SELECT id FROM entities")), 7)
+        self.assertEqual(
+            self._rows(index_db, "SELECT seq, sha, entities, deps FROM commits"), [(0, C1, 5, 2), (1, C2, 5, 3)]
+        )
+        self.assertEqual(self._rows(index_db, "SELECT COUNT(*) FROM deps WHERE commit_id IS NULL"), [(0,)])
+        self.assertEqual(
+            self._rows(index_db, "SELECT COUNT(*) FROM deps WHERE commit_id = x'" + C2 + "'"), [(3,)]
+        )
+
+    def test_commit_tags_sort_in_commit_order(self):
+        tags = commit_tags([f"{i:040x}" for i in range(12)])
+        self.assertEqual(tags[0], "0000_000000000000")
+        self.assertEqual(sorted(tags), tags)
+
+
+@unittest.skipIf(shutil.which("git") is None, "git not available")
+class TestResolveCommits(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.repo = Path(self._tmp.name)
+        self._git("init", "-q")
+        self.shas = []
+        for i in range(3):
+            (self.repo / "m.py").write_text(f"x = {i}\n", encoding="utf-8")
+            self._git("add", "m.py")
+            self._git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", f"c{i}")
+            self.shas.append(self._git("rev-parse", "HEAD").strip())
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _git(self, *args):
+        return subprocess.run(
+            ["git", "-C", str(self.repo), *args], stdout=subprocess.PIPE, check=True, text=True
+        ).stdout
+
+    def test_specs(self):
+        first, second, third = self.shas
+        self.assertEqual(resolve_commits(self.repo, f"{first}..HEAD"), [second, third])
+        self.assertEqual(resolve_commits(self.repo, f"HEAD, {first[:8]},HEAD~0"), [third, first])
+        listing = self.repo / "commits.txt"
+        listing.write_text(f"# oldest first\n{first}\n\nHEAD~1\n", encoding="utf-8")
+        self.assertEqual(resolve_commits(self.repo, f"@{listing}"), [first, second])
+        with self.assertRaises(PreflightError):
+            resolve_commits(self.repo, "no-such-branch")
+        with self.assertRaises(PreflightError):
+            resolve_commits(self.repo, "HEAD..HEAD")
+
+    def test_commit_files(self):
+        files = commit_files(self.repo, self.shas[0])
+        self.assertEqual(list(files), ["m.py"])
+        blob = self._git("rev-parse", f"{self.shas[0]}:m.py").strip()
+        self.assertEqual(files["m.py"], bytes.fromhex(blob))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/db_indexes.py, including the query-plan check of the tool lookups."""
+
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import db_indexes
+from db_indexes import PIPELINE_INDEXES, TOOL_QUERIES, bulk_mutation, create_indexes, existing_indexes, query_plan
+
+SCHEMA = """
+CREATE TABLE entities (id BLOB NOT NULL PRIMARY KEY, parent_id BLOB, name TEXT NOT NULL, kind TEXT NOT NULL,
+                       content_id BLOB NOT NULL);
+CREATE TABLE deps (src BLOB NOT NULL, tgt BLOB NOT NULL, kind TEXT NOT NULL, row INT NOT NULL, commit_id BLOB);
+"""
+
+
+class TestDbIndexes(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany(
+            "INSERT INTO entities VALUES (?, ?, ?, ?, ?)",
+            [(bytes([i]), bytes([i // 4]) if i else None, f"e{i}", ("File", "Class", "Method")[i % 3], b"c")
+             for i in range(64)],
+        )
+        self.conn.executemany(
+            "INSERT INTO deps VALUES (?, ?, ?, ?, NULL)",
+            [(bytes([i % 64]), bytes([(i * 7) % 64]), ("Use", "Call", "Import")[i % 3], i) for i in range(500)],
+        )
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_tool_lookups_search_an_index(self):
+        for label, sql, params in TOOL_QUERIES:
+            plan = " | ".join(query_plan(self.conn, sql, params))
+            if label != "entity by id":
+                self.assertIn("SCAN", plan, label)
+        self.assertEqual(create_indexes(self.conn), list(PIPELINE_INDEXES))
+        for label, sql, params in TOOL_QUERIES:
+            plan = " | ".join(query_plan(self.conn, sql, params))
+            self.assertNotIn("SCAN", plan, f"{label}: {plan}")
+            self.assertIn("USING INDEX", plan, label)
+        self.assertEqual(create_indexes(self.conn), [])
+
+    def test_bulk_mutation_rebuilds_indexes(self):
+        create_indexes(self.conn)
+        with mock.patch.object(db_indexes, "BULK_MIN_ROWS", 100), bulk_mutation(self.conn, 333) as dropped:
+            self.assertEqual(dropped, ["deps_kind", "deps_src", "deps_tgt"])
+            self.assertEqual(existing_indexes(self.conn), {"entities_parent_kind", "entities_kind"})
+            self.conn.execute("DELETE FROM deps WHERE kind = 'Use'")
+            self.conn.execute("UPDATE deps SET kind = 'UseTransitive' WHERE kind = 'Call'")
+        self.assertEqual(existing_indexes(self.conn), set(PIPELINE_INDEXES))
+        indexed = self.conn.execute("SELECT COUNT(*) FROM deps INDEXED BY deps_kind WHERE kind = 'UseTransitive'")
+        self.assertEqual(indexed.fetchone()[0], 167)
+        self.assertEqual(self.conn.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+
+    def test_bulk_mutation_leaves_unindexed_db_alone(self):
+        with mock.patch.object(db_indexes, "BULK_MIN_ROWS", 100), bulk_mutation(self.conn, 500):
+            self.conn.execute("DELETE FROM deps")
+        self.assertEqual(existing_indexes(self.conn), set())
+
+    def test_small_batches_keep_their_indexes(self):
+        create_indexes(self.conn)
+        with mock.patch.object(db_indexes, "BULK_MIN_ROWS", 100):
+            with bulk_mutation(self.conn, 10) as dropped:
+                self.assertEqual(dropped, [])
+                self.conn.execute("DELETE FROM deps WHERE rowid <= 10")
+            # Enough rows, but too small a share of the table.
+            with bulk_mutation(self.conn, 50) as dropped:
+                self.assertEqual(dropped, [])
+        self.assertEqual(existing_indexes(self.conn), set(PIPELINE_INDEXES))
+
+    def test_bulk_mutation_stays_in_the_callers_transaction(self):
+        create_indexes(self.conn)
+        self.conn.execute("DELETE FROM deps WHERE rowid = 1")
+        with mock.patch.object(db_indexes, "BULK_MIN_ROWS", 100), bulk_mutation(self.conn, 500) as dropped:
+            self.assertTrue(dropped)
+            self.assertTrue(self.conn.in_transaction)
+            self.conn.execute("DELETE FROM deps")
+        self.assertTrue(self.conn.in_transaction)
+        self.conn.rollback()
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM deps").fetchone()[0], 500)
+        self.assertEqual(existing_indexes(self.conn), set(PIPELINE_INDEXES))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Unit tests for detect_overrides on small in-memory databases (Python and Java paths)."""
+
+import contextlib
+import io
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from detect_overrides import detect_java_overrides, detect_python_overrides
+
+PY_SOURCE = """\
+from abc import ABC, abstractmethod
+
+class Base(ABC):
+    @abstractmethod
+    def run(self): ...
+
+    def stop(self):
+        raise NotImplementedError
+
+class Middle(Base):
+    def helper(self): ...
+
+class Leaf(Middle):
+    def run(self): ...
+    def stop(self): ...
+"""
+
+JAVA_SOURCE = """\
+class Leaf extends Left implements Right {
+    @Override
+    public void run() {}
+    @Override
+    protected String name() { return ""; }
+}
+"""
+
+
+def _make_db(entities, deps, contents):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE entities (id BLOB, parent_id BLOB, name TEXT, kind TEXT, content_id BLOB)")
+    conn.execute("CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB)")
+    conn.execute("CREATE TABLE contents (id BLOB, content TEXT)")
+    conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?)", entities)
+    conn.executemany("INSERT INTO deps VALUES (?, ?, ?, 0, NULL)", deps)
+    conn.executemany("INSERT INTO contents VALUES (?, ?)", contents)
+    conn.commit()
+    return conn
+
+
+def _overrides(conn):
+    return conn.execute("SELECT src, tgt FROM deps WHERE kind = 'Override' ORDER BY rowid").fetchall()
+
+
+class TestDetectOverrides(unittest.TestCase):
+    def test_python_extends_from_ast_and_transitive_overrides(self):
+        cid = b"py-content"
+        conn = _make_db(
+            [
+                (b"F", None, "m.py", "File", cid),
+                (b"B", b"F", "Base", "Class", cid),
+                (b"B.run", b"B", "run", "Method", cid),
+                (b"B.stop", b"B", "stop", "Method", cid),
+                (b"M", b"F", "Middle", "Class", cid),
+                (b"M.helper", b"M", "helper", "Method", cid),
+                (b"L", b"F", "Leaf", "Class", cid),
+                (b"L.run", b"L", "run", "Method", cid),
+                (b"L.stop", b"L", "stop", "Method", cid),
+            ],
+            [],
+            [(cid, PY_SOURCE)],
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = detect_python_overrides(conn, ".")
+        extends = conn.execute("SELECT src, tgt FROM deps WHERE kind = 'Extend' ORDER BY rowid").fetchall()
+        self.assertEqual(extends, [(b"M", b"B"), (b"L", b"M")])
+        self.assertEqual(added, 2)
+        self.assertEqual(sorted(_overrides(conn)), [(b"L.run", b"B.run"), (b"L.stop", b"B.stop")])
+
+    def test_java_links_first_ancestor_defining_the_method(self):
+        cid = b"java-content"
+        conn = _make_db(
+            [
+                (b"L", None, "Leaf", "Class", cid),
+                (b"L.run", b"L", "run", "Method", cid),
+                (b"L.name", b"L", "name", "Method", cid),
+                (b"A", None, "Left", "Class", b"other"),
+                (b"A.run", b"A", "run", "Method", b"other"),
+                (b"R", None, "Right", "Class", b"other"),
+                (b"R.run", b"R", "run", "Method", b"other"),
+                (b"R.name", b"R", "name", "Method", b"other"),
+                (b"T", None, "Top", "Class", b"other"),
+                (b"T.name", b"T", "name", "Method", b"other"),
+            ],
+            [(b"L", b"A", "Extend"), (b"L", b"R", "Extend"), (b"A", b"T", "Extend"), (b"R", b"T", "Extend")],
+            [(cid, JAVA_SOURCE), (b"other", "")],
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = detect_java_overrides(conn, ".")
+        # Ancestor order is Left, Top, Right: run -> Left, name -> Top (reached through Left).
+        self.assertEqual(added, 2)
+        self.assertEqual(_overrides(conn), [(b"L.run", b"A.run"), (b"L.name", b"T.name")])
+
+
+if __name__ == "__main__":
+    unittest.main()
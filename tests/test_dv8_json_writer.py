@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""The streaming DV8 JSON writer must match json.dumps(indent=2) byte for byte."""
+
+import gzip
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from neodepends_python_export import _dv8_write_dependency_json
+
+EDGES = [
+    ("pkg/b.py/B/run", "pkg/a.py/A", "Call"),
+    ("pkg/b.py/B/run", "pkg/a.py/A", "Call"),
+    ("pkg/b.py/B/run", "pkg/a.py/A", "Use"),
+    ("pkg/a.py/A", "pkg/été.py/\"Q\"", "Extend"),
+]
+ENTITIES = ["pkg/c.py", "pkg/b.py/B/run"]
+
+
+def _expected(edges, entities, sort):
+    variables = []
+    for name in entities + [n for e in edges for n in e[:2]]:
+        if name not in variables:
+            variables.append(name)
+    order = sorted(range(len(variables)), key=lambda i: variables[i]) if sort else list(range(len(variables)))
+    new_index = {old: new for new, old in enumerate(order)}
+    cells = {}
+    for src, tgt, kind in edges:
+        key = (new_index[variables.index(src)], new_index[variables.index(tgt)])
+        cells.setdefault(key, {})
+        cells[key][kind] = cells[key].get(kind, 0.0) + 1.0
+    return {
+        "@schemaVersion": "1.0",
+        "name": "demo",
+        "variables": [variables[i] for i in order],
+        "cells": [{"src": s, "dest": t, "values": v} for (s, t), v in sorted(cells.items())],
+    }
+
+
+class TestStreamingDv8Writer(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, name, *, edges=EDGES, entities=ENTITIES, sort=True, compact=False):
+        path = self.root / name
+        _dv8_write_dependency_json(
+            name="demo",
+            edges=edges,
+            output_path=path,
+            sort_key=(lambda v: v) if sort else None,
+            all_entities=entities,
+            compact_json=compact,
+        )
+        return path
+
+    def test_indented_output_matches_json_dumps(self):
+        for sort in (False, True):
+            path = self._write(f"sort{sort}.json", sort=sort)
+            expected = json.dumps(_expected(EDGES, ENTITIES, sort), indent=2)
+            self.assertEqual(path.read_text(encoding="utf-8"), expected)
+
+    def test_empty_matrix(self):
+        path = self._write("empty.json", edges=[], entities=[])
+        self.assertEqual(path.read_text(encoding="utf-8"), json.dumps(_expected([], [], True), indent=2))
+
+    def test_compact_and_gzip(self):
+        expected = _expected(EDGES, ENTITIES, True)
+        compact = self._write("compact.json", compact=True)
+        self.assertEqual(compact.read_text(encoding="utf-8"), json.dumps(expected, separators=(",", ":")))
+        gz = self._write("matrix.json.gz")
+        with gzip.open(gz, "rt", encoding="utf-8") as fh:
+            self.assertEqual(fh.read(), json.dumps(expected, indent=2))
+
+    def test_gzip_bytes_are_reproducible(self):
+        first = self._write("a.json.gz").read_bytes()
+        second = self._write("b.json.gz").read_bytes()
+        self.assertEqual(first, second)
+        # No FNAME flag and a zero mtime, so neither the path nor the clock reaches the bytes.
+        self.assertEqual(first[3], 0)
+        self.assertEqual(first[4:8], b"\0\0\0\0")
+
+
+if __name__ == "__main__":
+    unittest.main()
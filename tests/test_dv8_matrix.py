@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/dv8_matrix.py."""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from dv8_matrix import CellMatrix
+
+EDGES = [
+    ("b", "a", "Use"),
+    ("b", "a", "Call"),
+    ("b", "a", "Use"),
+    ("a", "c", "Extend"),
+    ("c", "c", "Call"),
+]
+
+
+class TestCellMatrix(unittest.TestCase):
+    def test_cells_are_sorted_and_keep_kind_insertion_order(self):
+        matrix = CellMatrix(["z"])
+        matrix.add_edges(EDGES)
+        self.assertEqual(matrix.variables, ["z", "b", "a", "c"])
+        cells = list(matrix.cells())
+        self.assertEqual(cells, [(1, 2, {"Use": 2.0, "Call": 1.0}), (2, 3, {"Extend": 1.0}), (3, 3, {"Call": 1.0})])
+        self.assertEqual(list(cells[0][2]), ["Use", "Call"])
+
+    def test_collapse_and_reorder(self):
+        matrix = CellMatrix()
+        matrix.add_edges(EDGES, collapse=True)
+        ordered = matrix.sorted_by(lambda v: v)
+        self.assertEqual(ordered.variables, ["a", "b", "c"])
+        self.assertEqual(ordered.index, {"a": 0, "b": 1, "c": 2})
+        self.assertEqual(
+            list(ordered.cells()), [(0, 2, {"Extend": 1.0}), (1, 0, {"Use": 1.0, "Call": 1.0}), (2, 2, {"Call": 1.0})]
+        )
+        # The source matrix is left as it was.
+        self.assertEqual(next(matrix.cells())[:2], (0, 1))
+
+    def test_from_cells_merges_duplicates_and_drops_out_of_range(self):
+        cells = [
+            {"src": 0, "dest": 1, "values": {"Call": 2}},
+            {"src": 0, "dest": 1, "values": {"Call": 1, "Use": 1}},
+            {"src": 0, "dest": 5, "values": {"Call": 1}},
+            {"src": 1, "dest": 0, "values": {}},
+        ]
+        matrix = CellMatrix.from_cells(["a", "b"], cells)
+        self.assertEqual(list(matrix.cells()), [(0, 1, {"Call": 3, "Use": 1})])
+
+    def test_from_cells_keeps_repeated_variable_positions(self):
+        cells = [
+            {"src": 0, "dest": 2, "values": {"Call": 1}},
+            {"src": 3, "dest": 1, "values": {"Use": 1}},
+        ]
+        matrix = CellMatrix.from_cells(["a", "b", "a", "c"], cells)
+        self.assertEqual(matrix.variables, ["a", "b", "a", "c"])
+        self.assertEqual(matrix.index, {"a": 0, "b": 1, "c": 3})
+        self.assertEqual(list(matrix.cells()), [(0, 2, {"Call": 1}), (3, 1, {"Use": 1})])
+        ordered = matrix.sorted_by(lambda v: v)
+        self.assertEqual(ordered.variables, ["a", "a", "b", "c"])
+        self.assertEqual(ordered.index, {"a": 0, "b": 2, "c": 3})
+        self.assertEqual(list(ordered.cells()), [(0, 1, {"Call": 1}), (3, 2, {"Use": 1})])
+
+
+if __name__ == "__main__":
+    unittest.main()
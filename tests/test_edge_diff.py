@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/edge_diff.py."""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from edge_diff import EXTERNAL, EdgeDiff, TableStage, file_key
+
+GT = [
+    ("pkg/a.py/A (Class)", "pkg/b.py/B (Class)", "Extend"),
+    ("pkg/a.py/A/f (Method)", "pkg/b.py/B/g (Method)", "Call"),
+    ("pkg/b.py/B/g (Method)", "os (Module)", "Use"),
+    ("pkg/vendored/x.py (File)", "pkg/a.py (File)", "Import"),
+]
+ND = [
+    ("src/pkg/a.py/A (Class)", "src/pkg/b.py/B (Class)", "Extend"),
+    ("src/pkg/a.py/A/f (Method)", "src/pkg/b.py/B/h (Method)", "Call"),
+    ("src/pkg/b.py/B/g (Method)", "os (Module)", "Use"),
+    ("os (Module)", "sys (Module)", "Use"),
+]
+
+
+class TestEdgeDiff(unittest.TestCase):
+    def test_file_key(self):
+        self.assertEqual(file_key("pkg/a.py/A/f (Method)"), "pkg/a.py")
+        self.assertEqual(file_key("pkg/a.py (File)"), "pkg/a.py")
+        self.assertEqual(file_key("os (Module)"), EXTERNAL)
+
+    def test_build_normalises_excludes_and_partitions(self):
+        diff = EdgeDiff.build(
+            GT,
+            ND,
+            nd_stages=[lambda n: n[len("src/"):] if n.startswith("src/") else n],
+            exclude=lambda n: n.startswith("pkg/vendored/"),
+        )
+        self.assertEqual(diff.edges("missing"), [("pkg/a.py/A/f (Method)", "pkg/b.py/B/g (Method)", "Call")])
+        self.assertEqual(
+            diff.edges("extra"),
+            [("os (Module)", "sys (Module)", "Use"), ("pkg/a.py/A/f (Method)", "pkg/b.py/B/h (Method)", "Call")],
+        )
+        self.assertEqual((diff.count("gt"), diff.count("nd")), (3, 4))
+        self.assertEqual(diff.kind_counts("nd"), {"Call": 1, "Extend": 1, "Use": 2})
+        self.assertEqual(diff.files(), [EXTERNAL, "pkg/a.py", "pkg/b.py"])
+        self.assertEqual(set(diff.partitions), {
+            ("pkg/a.py", "Extend"), ("pkg/a.py", "Call"), ("pkg/b.py", "Use"), (EXTERNAL, "Use"),
+        })
+        self.assertEqual(diff.file_edges(EXTERNAL, "extra"), [("os (Module)", "sys (Module)", "Use")])
+
+    def test_name_stages_compose_and_table_stages_see_prior_names(self):
+        calls = []
+
+        def count(name):
+            calls.append(name)
+            return name.replace("src/", "")
+
+        seen = []
+
+        def table(view):
+            seen.append(sorted(set(view.names)))
+            return (lambda n: n.upper()) if any(k == "Extend" for _s, _t, k in view.edges()) else None
+
+        diff = EdgeDiff.build([], ND, nd_stages=[count, str.strip, TableStage(table), TableStage(lambda v: None)])
+        # One call per distinct name, not per edge endpoint.
+        self.assertEqual(len(calls), 7)
+        self.assertNotIn("src/pkg/a.py/A (Class)", seen[0])
+        self.assertIn("PKG/A.PY/A (CLASS)", [s for s, _t, _k in diff.edges("nd")])
+
+    def test_from_lists_keeps_given_missing_and_extra(self):
+        missing = [GT[1]]
+        extra = [("pkg/a.py/A/f (Method)", "pkg/b.py/B/h (Method)", "Call")]
+        diff = EdgeDiff.from_lists(GT, missing, extra)
+        self.assertEqual(diff.edges("missing"), missing)
+        self.assertEqual(diff.edges("extra"), extra)
+        self.assertEqual(diff.file_edges("pkg/a.py", "nd"), [GT[0]] + extra)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/edge_sink.py."""
+
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from edge_sink import EdgeSink
+
+
+class TestEdgeSink(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "deps.db"
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB)")
+        self.conn.execute("INSERT INTO deps VALUES (x'00', x'01', 'Import', 0, NULL)")
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def _rows(self, conn=None):
+        conn = conn or self.conn
+        return conn.execute("SELECT src, tgt, kind, row, commit_id FROM deps ORDER BY rowid").fetchall()
+
+    def test_buffers_until_flush_and_keeps_order(self):
+        sink = EdgeSink(self.conn, batch_size=3)
+        sink.add(b"a", b"b", "Use", 4)
+        sink.add(b"a", b"c", "Call")
+        self.assertEqual(len(self._rows()), 1)
+        self.assertEqual(len(sink), 2)
+        sink.add(b"b", b"c", "Create", 7)  # reaches batch_size -> written
+        self.assertEqual(len(sink), 0)
+        sink.add(b"c", b"a", "Extend")
+        self.assertEqual(sink.flush(), 1)
+        sink.close()
+        self.assertEqual(
+            self._rows(),
+            [
+                (b"\x00", b"\x01", "Import", 0, None),
+                (b"a", b"b", "Use", 4, None),
+                (b"a", b"c", "Call", 0, None),
+                (b"b", b"c", "Create", 7, None),
+                (b"c", b"a", "Extend", 0, None),
+            ],
+        )
+        self.assertEqual(sink.written, 4)
+
+    def test_close_restores_rollback_journal(self):
+        sink = EdgeSink(self.conn)
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        sink.add(b"a", b"b", "Use")
+        sink.close()
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertFalse(Path(str(self.db_path) + "-wal").exists())
+        # Everything is in the main file, so an immutable reader sees the new row.
+        reader = sqlite3.connect(f"file:{self.db_path}?immutable=1", uri=True)
+        try:
+            self.assertEqual(len(self._rows(reader)), 2)
+        finally:
+            reader.close()
+
+    def test_exception_in_block_restores_rollback_journal(self):
+        with self.assertRaises(RuntimeError):
+            with EdgeSink(self.conn) as sink:
+                sink.add(b"a", b"b", "Use")
+                sink.flush()
+                sink.add(b"a", b"c", "Call")
+                raise RuntimeError("enhancement failed")
+        self.assertEqual(self.conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertFalse(Path(str(self.db_path) + "-wal").exists())
+        self.assertFalse(Path(str(self.db_path) + "-shm").exists())
+        # The failed pass's rows are rolled back, flushed or not.
+        self.assertEqual(self._rows(), [(b"\x00", b"\x01", "Import", 0, None)])
+
+    def test_enhancer_failure_leaves_no_wal(self):
+        import enhance_python_deps
+        from synthetic_project import ProjectSpec, generate_project
+
+        def boom(*_args, **_kwargs):
+            raise RuntimeError("method facts failed")
+
+        root = Path(self._tmp.name)
+        project = generate_project(ProjectSpec(files=3))
+        project.write_sources(root / "src")
+        db_path = root / "core.db"
+        project.write_core_db(db_path)
+        original = enhance_python_deps.collect_method_facts
+        enhance_python_deps.collect_method_facts = boom
+        try:
+            with self.assertRaises(RuntimeError):
+                enhance_python_deps.enhance_python_dependencies(str(db_path), str(root / "src"))
+        finally:
+            enhance_python_deps.collect_method_facts = original
+        self.assertFalse(Path(str(db_path) + "-wal").exists())
+        conn = sqlite3.connect(str(db_path))
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Unit tests for the incremental-enhancement planner in enhance_python_deps.py.
+
+Covers:
+  1. Unchanged DB -> nothing re-analysed, every file carried over
+  2. Changed file -> re-analysed together with reverse dependents and subclasses
+  3. Option changes and new files fall back to a full run
+  4. A run maps entities to files once, and the manifest's tool version is the
+     explicit ENHANCE_VERSION rather than a hash of the script
+"""
+
+import contextlib
+import io
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import enhance_python_deps
+from enhance_python_deps import ENHANCE_VERSION, plan_incremental_enhancement, write_enhance_manifest
+from synthetic_project import ProjectSpec, generate_project
+
+META = {"profile": "depends", "tool_version": "test"}
+
+
+def _eid(name: str) -> bytes:
+    return name.encode("utf-8").ljust(20, b"\0")
+
+
+def _make_db(contents: dict) -> sqlite3.Connection:
+    """Files: a.py (class A), b.py (class B(A)), c.py (class C uses A), d.py (class D(C))."""
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE entities (id BLOB PRIMARY KEY, parent_id BLOB, name TEXT, kind TEXT, content_id BLOB);
+        CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB);
+        """
+    )
+    for stem, cls in (("a", "A"), ("b", "B"), ("c", "C"), ("d", "D"), ("e", "E")):
+        if stem not in contents:
+            continue
+        cid = contents[stem]
+        conn.execute("INSERT INTO entities VALUES (?, NULL, ?, 'File', ?)", (_eid(stem), f"{stem}.py", cid))
+        conn.execute("INSERT INTO entities VALUES (?, ?, ?, 'Class', ?)", (_eid(cls), _eid(stem), cls, cid))
+    conn.executemany(
+        "INSERT INTO deps VALUES (?, ?, ?, ?, NULL)",
+        [
+            (_eid("b"), _eid("a"), "Import", 0),
+            (_eid("B"), _eid("A"), "Extend", 1),
+            (_eid("D"), _eid("C"), "Extend", 1),
+        ],
+    )
+    return conn
+
+
+class TestPlanIncrementalEnhancement(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.manifest = Path(self._tmp.name) / "enhance_manifest.db"
+        self.v1 = {"a": b"a1", "b": b"b1", "c": b"c1", "d": b"d1"}
+        conn = _make_db(self.v1)
+        plan = plan_incremental_enhancement(conn, self.manifest, META)
+        self.assertIsNone(plan.scope_file_ids)
+        # Simulate what enhancement adds for c.py: a Use edge into a.py.
+        conn.execute("INSERT INTO deps VALUES (?, ?, 'Use', 3, NULL)", (_eid("C"), _eid("A")))
+        write_enhance_manifest(conn, self.manifest, META, plan.files)
+        conn.close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_unchanged_db_carries_everything(self):
+        conn = _make_db(self.v1)
+        plan = plan_incremental_enhancement(conn, self.manifest, META)
+        self.assertEqual(plan.scope_file_ids, set())
+        self.assertEqual(sorted(plan.carried), ["a.py", "b.py", "c.py", "d.py"])
+        self.assertIn((_eid("C"), _eid("A"), "Use", 3, 0), plan.carried["c.py"])
+
+    def test_changed_file_pulls_in_dependents_and_subclasses(self):
+        conn = _make_db(dict(self.v1, a=b"a2"))
+        plan = plan_incremental_enhancement(conn, self.manifest, META)
+        # b.py imports/extends a.py, c.py used A last time, d.py subclasses C.
+        self.assertEqual(plan.scope_file_ids, {_eid("a"), _eid("b"), _eid("c"), _eid("d")})
+
+        conn = _make_db(dict(self.v1, d=b"d2"))
+        plan = plan_incremental_enhancement(conn, self.manifest, META)
+        self.assertEqual(plan.scope_file_ids, {_eid("d")})
+
+    def test_option_change_or_new_file_forces_full_run(self):
+        conn = _make_db(self.v1)
+        plan = plan_incremental_enhancement(conn, self.manifest, dict(META, profile="stackgraphs"))
+        self.assertIsNone(plan.scope_file_ids)
+
+        conn = _make_db(dict(self.v1, e=b"e1"))
+        plan = plan_incremental_enhancement(conn, self.manifest, META)
+        self.assertIsNone(plan.scope_file_ids)
+
+class TestIncrementalRun(unittest.TestCase):
+    def test_entity_file_map_is_built_once_per_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            project = generate_project(ProjectSpec(files=6))
+            project.write_sources(root)
+            db = root / "dependencies.db"
+            manifest = root / "enhance_manifest.db"
+            for expected in ("full run", "0 of 6 files re-analysed"):
+                # Each run starts from the raw core output, as in the pipeline.
+                project.write_core_db(db)
+                with mock.patch.object(
+                    enhance_python_deps, "_entity_file_map", wraps=enhance_python_deps._entity_file_map
+                ) as mapped, contextlib.redirect_stdout(io.StringIO()) as out:
+                    enhance_python_deps.run_enhancement(
+                        str(db), str(root), profile="stackgraphs", incremental_manifest=str(manifest)
+                    )
+                self.assertEqual(mapped.call_count, 1)
+                self.assertIn(expected, out.getvalue())
+
+    def test_manifest_records_explicit_version(self):
+        meta = enhance_python_deps._manifest_meta("depends", False, False, False)
+        self.assertEqual(meta["tool_version"], ENHANCE_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Unit tests for the per-method fact extraction in enhance_python_deps.py."""
+
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from ast_cache import blob_id
+from enhance_python_deps import collect_method_facts
+
+STATION = '''\
+class Station:
+    def __init__(self, route, trains):
+        self.route = route
+        self.trains.append(trains)
+        self.clock = Clock()
+
+    def get_route(self) -> Route:
+        return self.route
+
+    def broken(self:
+'''
+
+ROUTE = '''\
+class Route:
+    def stops(self, station: Station):
+        if isinstance(station, Station):
+            station.get_route()
+'''
+
+KNOWN = {"Station", "Route", "Clock", "Train"}
+
+
+class TestCollectMethodFacts(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE contents (id BLOB PRIMARY KEY, content TEXT)")
+        self.rows = []
+        for text, methods in (
+            (STATION, [(b"init", "__init__", 1, 4), (b"get", "get_route", 6, 7), (b"bad", "broken", 9, 9)]),
+            (ROUTE, [(b"stops", "stops", 1, 3)]),
+        ):
+            cid = blob_id(text)
+            self.conn.execute("INSERT INTO contents VALUES (?, ?)", (cid, text))
+            for mid, name, start, end in methods:
+                self.rows.append((mid, None, name, start, end, cid, "Method"))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_facts(self):
+        facts = collect_method_facts(self.conn, self.rows, KNOWN)
+        init, get, stops = facts[b"init"], facts[b"get"], facts[b"stops"]
+        self.assertIsNone(facts[b"bad"])
+        self.assertEqual(init.param_field_binds, [("route", "route"), ("trains", "trains")])
+        self.assertEqual(init.body.field_type_assigns, {"clock": "Clock"})
+        self.assertEqual((get.return_annotation, get.return_self_fields), ("Route", {"route"}))
+        self.assertEqual(stops.anno_env, {"station": "Station"})
+        self.assertEqual(stops.body.var_calls, [("station", "get_route")])
+
+    def test_worker_pool_matches_in_process(self):
+        local = collect_method_facts(self.conn, self.rows, KNOWN)
+        pooled = collect_method_facts(self.conn, self.rows, KNOWN, jobs=2)
+        self.assertEqual(list(pooled), list(local))
+        for mid, facts in local.items():
+            if facts is None:
+                self.assertIsNone(pooled[mid])
+                continue
+            self.assertEqual(
+                {k: v for k, v in vars(facts.body).items() if k != "known_classes"}, vars(pooled[mid].body)
+            )
+            self.assertEqual(facts.param_field_binds, pooled[mid].param_field_binds)
+            self.assertEqual(facts.anno_env, pooled[mid].anno_env)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Per-file exports on a file larger than SQLite's bound-variable limit.
+
+export_per_file_dbs / export_dv8_per_file used to build `IN (?,?,...)` lists
+with one placeholder per entity of the file, which fails once a file has more
+entities than SQLITE_MAX_VARIABLE_NUMBER (32766 by default; some distro builds
+raise it, so the tests lower the limit on the exporter's connections instead of
+generating hundreds of thousands of entities).
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import neodepends_python_export
+from neodepends_python_export import export_dv8_per_file, export_per_file_dbs
+
+N_METHODS = 3000
+VARIABLE_LIMIT = 999
+
+_ORIGINAL_CONNECT_RO = neodepends_python_export._connect_ro
+
+
+def _connect_ro_with_low_limit(db_path: Path) -> sqlite3.Connection:
+    conn = _ORIGINAL_CONNECT_RO(db_path)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, VARIABLE_LIMIT)
+    return conn
+
+
+SCHEMA = """
+CREATE TABLE contents (id BLOB NOT NULL PRIMARY KEY, content TEXT NOT NULL);
+CREATE TABLE deps (src BLOB NOT NULL, tgt BLOB NOT NULL, kind TEXT NOT NULL, row INT NOT NULL, commit_id BLOB);
+CREATE TABLE entities (
+    id BLOB NOT NULL PRIMARY KEY, parent_id BLOB, name TEXT NOT NULL, kind TEXT NOT NULL,
+    start_byte INT NOT NULL, start_row INT NOT NULL, start_column INT NOT NULL,
+    end_byte INT NOT NULL, end_row INT NOT NULL, end_column INT NOT NULL,
+    comment_start_byte INT, comment_start_row INT, comment_start_column INT,
+    comment_end_byte INT, comment_end_row INT, comment_end_column INT,
+    content_id BLOB NOT NULL, simple_id BLOB NOT NULL
+);
+"""
+
+
+def _entity(eid: bytes, parent, name: str, kind: str, cid: bytes) -> tuple:
+    return (eid, parent, name, kind, 0, 0, 0, 0, 0, 0, None, None, None, None, None, None, cid, eid)
+
+
+def _make_db(path: Path) -> None:
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO contents VALUES (?, ?)", [(b"big", "# big"), (b"small", "# small")])
+    rows = [
+        _entity(b"F-big", None, "pkg/big.py", "File", b"big"),
+        _entity(b"C-big", b"F-big", "Big", "Class", b"big"),
+        _entity(b"F-small", None, "pkg/small.py", "File", b"small"),
+        _entity(b"M-small", b"F-small", "helper", "Function", b"small"),
+    ]
+    rows += [_entity(b"M%06d" % i, b"C-big", f"m{i}", "Method", b"big") for i in range(N_METHODS)]
+    conn.executemany("INSERT INTO entities VALUES (%s)" % ",".join("?" * 18), rows)
+    deps = [(b"M%06d" % i, b"M%06d" % (i + 1), "Call", i, None) for i in range(N_METHODS - 1)]
+    deps.append((b"M000000", b"M-small", "Call", 0, None))
+    deps.append((b"M-small", b"C-big", "Use", 1, None))
+    conn.executemany("INSERT INTO deps VALUES (?, ?, ?, ?, ?)", deps)
+    conn.commit()
+    conn.close()
+
+
+@unittest.skipUnless(hasattr(sqlite3.Connection, "setlimit"), "needs Connection.setlimit (Python 3.11+)")
+class TestLargeFilePerFileExport(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(neodepends_python_export, "_connect_ro", _connect_ro_with_low_limit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.root = Path(cls._tmp.name)
+        cls.db_path = cls.root / "deps.db"
+        _make_db(cls.db_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_per_file_dbs(self):
+        out_dir = self.root / "per_file"
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_per_file_dbs(
+                db_path=self.db_path,
+                out_dir=out_dir,
+                include_incoming_edges=True,
+                only_py=True,
+                focus_prefix=None,
+                include_root_py=False,
+            )
+        conn = sqlite3.connect(str(out_dir / "per_file_dbs" / "big.neodepends.db"))
+        try:
+            n_entities = conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+            n_deps = conn.execute("SELECT COUNT(*) FROM deps").fetchone()[0]
+        finally:
+            conn.close()
+        # File + Class + methods, plus small.py's helper and its File via ancestors.
+        self.assertEqual(n_entities, N_METHODS + 4)
+        self.assertEqual(n_deps, N_METHODS + 1)
+
+    def test_dv8_per_file(self):
+        out_dir = self.root / "dv8"
+        export_dv8_per_file(
+            db_path=self.db_path,
+            out_dir=out_dir,
+            include_external_targets=False,
+            include_incoming_edges=False,
+            only_py=True,
+            focus_prefix=None,
+            include_root_py=False,
+            write_clustering=False,
+            align_handcount=False,
+            dv8_hierarchy="structured",
+        )
+        big = json.loads((out_dir / "dv8_deps" / "big.dv8-dependency.json").read_text(encoding="utf-8"))
+        self.assertEqual(len(big["cells"]), N_METHODS - 1)
+        small = json.loads((out_dir / "dv8_deps" / "small.dv8-dependency.json").read_text(encoding="utf-8"))
+        self.assertEqual(small["cells"], [])
+
+
+_EXPORT_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from pathlib import Path
+from neodepends_python_export import export_dv8_per_file
+for align in (False, True):
+    export_dv8_per_file(
+        db_path=Path(sys.argv[2]),
+        out_dir=Path(sys.argv[3]) / f"align{int(align)}",
+        include_external_targets=True,
+        include_incoming_edges=True,
+        only_py=True,
+        focus_prefix=None,
+        include_root_py=False,
+        write_clustering=not align,
+        align_handcount=align,
+        dv8_hierarchy="structured",
+    )
+"""
+
+
+class TestPerFileExportDeterminism(unittest.TestCase):
+    def test_output_does_not_depend_on_the_hash_seed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            db_path = root / "deps.db"
+            _make_db(db_path)
+            tools = Path(__file__).resolve().parent.parent / "tools"
+            outputs = []
+            for seed in ("1", "2"):
+                out_dir = root / f"seed{seed}"
+                subprocess.run(
+                    [sys.executable, "-c", _EXPORT_SCRIPT, str(tools), str(db_path), str(out_dir)],
+                    env=dict(os.environ, PYTHONHASHSEED=seed),
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                outputs.append({p.relative_to(out_dir): p.read_bytes() for p in sorted(out_dir.rglob("*.json"))})
+            self.assertTrue(outputs[0])
+            self.assertEqual(sorted(outputs[0]), sorted(outputs[1]))
+            for name, data in outputs[0].items():
+                self.assertEqual(data, outputs[1][name], name)
+
+
+class TestParallelPerFileExport(unittest.TestCase):
+    """--jobs N must write exactly what a sequential run writes."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db_path = self.root / "deps.db"
+        _make_db(self.db_path)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _export(self, jobs: int) -> Path:
+        out_dir = self.root / f"jobs{jobs}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_dv8_per_file(
+                db_path=self.db_path,
+                out_dir=out_dir,
+                include_external_targets=True,
+                include_incoming_edges=True,
+                only_py=True,
+                focus_prefix=None,
+                include_root_py=False,
+                write_clustering=True,
+                align_handcount=False,
+                dv8_hierarchy="structured",
+                jobs=jobs,
+            )
+            export_per_file_dbs(
+                db_path=self.db_path,
+                out_dir=out_dir,
+                include_incoming_edges=True,
+                only_py=True,
+                focus_prefix=None,
+                include_root_py=False,
+                jobs=jobs,
+            )
+        return out_dir
+
+    def test_jobs_match_sequential(self):
+        sequential = self._export(1)
+        parallel = self._export(2)
+        names = sorted(p.relative_to(sequential) for p in sequential.rglob("*.json"))
+        self.assertEqual(names, sorted(p.relative_to(parallel) for p in parallel.rglob("*.json")))
+        for name in names:
+            self.assertEqual((sequential / name).read_bytes(), (parallel / name).read_bytes(), name)
+        for stem in ("big", "small"):
+            rows = []
+            for root in (sequential, parallel):
+                conn = sqlite3.connect(str(root / "per_file_dbs" / f"{stem}.neodepends.db"))
+                try:
+                    rows.append(conn.execute("SELECT * FROM deps ORDER BY rowid").fetchall())
+                finally:
+                    conn.close()
+            self.assertEqual(rows[0], rows[1])
+
+    def test_progress_goes_to_the_dev_logger(self):
+        lines = []
+        logger = mock.Mock(line=lines.append)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            export_per_file_dbs(
+                db_path=self.db_path,
+                out_dir=self.root / "logged",
+                include_incoming_edges=True,
+                only_py=True,
+                focus_prefix=None,
+                include_root_py=False,
+                jobs=2,
+                logger=logger,
+            )
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue(lines)
+        self.assertEqual(lines[-1], "[PER-FILE] Per-file databases: 2/2 files")
+
+    def test_evicted_worker_slicer_is_closed(self):
+        other = self.root / "other.db"
+        _make_db(other)
+        first = neodepends_python_export._worker_snapshot("db", self.db_path)
+        try:
+            neodepends_python_export._worker_snapshot("db", other)
+            with self.assertRaises(sqlite3.ProgrammingError):
+                first.con.execute("SELECT 1")
+        finally:
+            for slicer in neodepends_python_export._WORKER_SNAPSHOTS.values():
+                slicer.close()
+            neodepends_python_export._WORKER_SNAPSHOTS.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
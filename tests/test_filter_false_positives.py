@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Unit tests for filter_false_positives.filter_dependencies.
+
+The batched pass must remove exactly the deps the per-row predicates flag,
+including duplicate rows, and leave every other row untouched.
+"""
+
+import contextlib
+import io
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from filter_false_positives import (
+    filter_dependencies,
+    is_false_positive_field_sibling,
+    is_false_positive_parent_class,
+    is_false_positive_sibling_method,
+)
+
+ENTITIES = [
+    # id, parent_id, name, kind, start_row, end_row
+    (b"K", None, "Klass", "Class", 0, 40),
+    (b"m1", b"K", "small", "Method", 2, 3),
+    (b"m2", b"K", "large", "Method", 5, 20),
+    (b"f1", b"K", "field", "Field", 22, 22),
+    (b"g", None, "helper", "Function", 42, 44),
+    (b"t1", None, "top_a", "Method", 50, 51),
+    (b"t2", None, "top_b", "Method", 53, 54),
+]
+
+DEPS = [
+    (b"m1", b"m2", "Call", 2),   # sibling, start row -> removed
+    (b"m1", b"m2", "Call", 2),   # duplicate -> removed
+    (b"m2", b"m1", "Call", 12),  # sibling, body row -> kept
+    (b"m2", b"K", "Use", 20),    # parent class, end row -> removed
+    (b"m2", b"K", "Use", 9),     # parent class, body row -> kept
+    (b"f1", b"m1", "Use", 22),   # field -> sibling method -> removed
+    (b"g", b"m1", "Call", 42),   # Function source -> kept
+    (b"t1", b"t2", "Call", 50),  # parentless "siblings" -> removed
+    (b"m1", b"missing", "Use", 2),
+]
+
+
+class TestFilterDependencies(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.input_db = str(Path(self._tmp.name) / "in.db")
+        self.output_db = str(Path(self._tmp.name) / "out.db")
+        conn = sqlite3.connect(self.input_db)
+        conn.executescript(
+            """
+            CREATE TABLE entities (id BLOB PRIMARY KEY, parent_id BLOB, name TEXT, kind TEXT,
+                                   start_row INT, end_row INT);
+            CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB);
+            """
+        )
+        conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?)", ENTITIES)
+        conn.executemany("INSERT INTO deps VALUES (?, ?, ?, ?, NULL)", DEPS)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_matches_per_row_predicates(self):
+        conn = sqlite3.connect(self.input_db)
+        cursor = conn.cursor()
+        expected = [
+            dep for dep in DEPS
+            if not (
+                is_false_positive_sibling_method(cursor, dep[0], dep[1], dep[3])
+                or is_false_positive_parent_class(cursor, dep[0], dep[1], dep[3])
+                or is_false_positive_field_sibling(cursor, dep[0], dep[1], dep[3])
+            )
+        ]
+        conn.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            filter_dependencies(self.input_db, self.output_db)
+
+        conn = sqlite3.connect(self.output_db)
+        kept = conn.execute("SELECT src, tgt, kind, row FROM deps ORDER BY rowid").fetchall()
+        conn.close()
+        self.assertEqual(kept, expected)
+        self.assertEqual(
+            kept,
+            [DEPS[2], DEPS[4], DEPS[6], DEPS[8]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/graph_model.py."""
+
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from graph_model import ANCESTRY_TABLE, SCAN_ROWS_ENV, GraphModel, RowColumns, iter_rows, scan_rows, write_ancestry_table
+
+ENTITIES = [
+    # id, parent_id, kind, name, content_id, start_row, end_row
+    (b"m", b"C", "Method", "run", b"c1", 3, 5),  # child before its parents
+    (b"C", b"F", "Class", "Klass", b"c1", 1, 9),
+    (b"F", None, "File", "pkg/a.py", b"c1", 0, 20),
+    (b"inner", b"m", "Function", "helper", b"c1", 4, 4),
+    (b"orphan", b"missing", "Method", "lost", None, None, None),
+    (b"x", b"y", "Class", "X", None, 0, 0),  # parent cycle without a File
+    (b"y", b"x", "Method", "Y", None, 0, 0),
+]
+
+DEPS = [
+    (1, b"m", b"C", "Use", 4),
+    (2, b"inner", b"nope", "Call", 4),
+    (3, b"m", b"x", "Call", 5),
+    (4, b"C", b"F", "Contain", None),
+]
+
+
+class TestGraphModel(unittest.TestCase):
+    def setUp(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "CREATE TABLE entities (id BLOB, parent_id BLOB, kind TEXT, name TEXT, content_id BLOB, start_row INT, end_row INT)"
+        )
+        conn.execute("CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB)")
+        conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?, ?)", ENTITIES)
+        conn.executemany("INSERT INTO deps (rowid, src, tgt, kind, row) VALUES (?, ?, ?, ?, ?)", DEPS)
+        self.graph = GraphModel.from_db(conn)
+        conn.close()
+
+    def test_nearest_columns(self):
+        g = self.graph
+        ids = lambda col: {g.ids[i]: (g.ids[j] if j >= 0 else None) for i, j in enumerate(col)}
+        self.assertEqual(
+            ids(g.nearest("File")),
+            {b"m": b"F", b"C": b"F", b"F": b"F", b"inner": b"F", b"orphan": None, b"x": None, b"y": None},
+        )
+        self.assertEqual(ids(g.nearest("Class"))[b"inner"], b"C")
+        self.assertEqual(ids(g.nearest("Class"))[b"x"], b"x")
+        strict = ids(g.nearest("Class", include_self=False))
+        # Parent-cycle members are treated as roots, so y has no strict ancestor.
+        self.assertEqual((strict[b"C"], strict[b"m"], strict[b"y"]), (None, b"C", None))
+        self.assertEqual(g.nearest_id(b"inner", "File"), b"F")
+        self.assertIsNone(g.nearest_id(b"unknown", "File"))
+        self.assertEqual((g.start_row[g.index[b"m"]], g.end_row[g.index[b"orphan"]]), (3, 0))
+
+    def test_deps_and_adjacency(self):
+        g = self.graph
+        self.assertEqual(g.dep_count, 4)
+        self.assertEqual(list(g.dep_rowid), [1, 2, 3, 4])
+        self.assertEqual(g.dep_tgt[1], -1)  # target is not an entity
+        self.assertEqual([g.kinds[k] for k in g.dep_kind], ["Use", "Call", "Call", "Contain"])
+        self.assertEqual(list(g.out_dep_indices(g.index[b"m"])), [0, 2])
+        self.assertEqual(list(g.out_dep_indices(g.index[b"F"])), [])
+
+    def test_nearest_map_behaves_like_a_memo_dict(self):
+        file_of = self.graph.nearest_map("File")
+        self.assertIn(b"orphan", file_of)
+        self.assertIsNone(file_of[b"orphan"])
+        self.assertEqual(file_of[b"inner"], b"F")
+        self.assertNotIn(b"ghost", file_of)
+        file_of[b"ghost"] = None
+        self.assertIn(b"ghost", file_of)
+        self.assertEqual(file_of.get(b"nope", b"?"), b"?")
+        self.assertEqual(len(file_of), len(ENTITIES) + 1)
+
+
+class TestAncestry(unittest.TestCase):
+    ROWS = [
+        (b"F", None, "File", "pkg/a.py"),
+        (b"C", b"F", "Class", "Outer"),
+        (b"C2", b"C", "Class", "Outer"),  # duplicate tagging: same-name class nested in itself
+        (b"I", b"C2", "Class", "Inner"),
+        (b"m", b"I", "Method", "run"),
+        (b"m2", b"m", "Method", "run"),  # same-name duplicate, not a nested helper
+        (b"h", b"m2", "Function", "helper"),
+        (b"v", b"h", "Variable", "tmp"),
+        (b"top", b"F", "Method", "main"),
+        (b"fld", b"C", "Field", "x"),
+    ]
+
+    def setUp(self):
+        self.graph = GraphModel()
+        self.graph.add_entities(reversed(self.ROWS))
+        self.anc = self.graph.ancestry()
+
+    def _at(self, col, eid):
+        j = col[self.graph.index[eid]]
+        return self.graph.ids[j] if j >= 0 else None
+
+    def test_owner_tables(self):
+        anc, at = self.anc, self._at
+        self.assertEqual({eid: at(anc.file, eid) for eid, *_ in self.ROWS}, {eid: b"F" for eid, *_ in self.ROWS})
+        self.assertEqual(
+            [at(anc.owner_class, e) for e in (b"F", b"C", b"m", b"h", b"top", b"fld")],
+            [None, None, b"I", b"I", None, b"C"],
+        )
+        chain = lambda eid: anc.class_chain[self.graph.index[eid]]
+        self.assertEqual(
+            (chain(b"F"), chain(b"C2"), chain(b"I"), chain(b"v")),
+            ((), ("Outer",), ("Outer", "Inner"), ("Outer", "Inner")),
+        )
+        self.assertEqual(anc.depth[self.graph.index[b"v"]], 7)
+        nested = {eid for eid, *_ in self.ROWS if anc.nested_function[self.graph.index[eid]]}
+        self.assertEqual(nested, {b"h"})
+
+    def test_write_ancestry_table(self):
+        conn = sqlite3.connect(":memory:")
+        self.assertEqual(write_ancestry_table(conn, self.graph), len(self.ROWS))
+        row = conn.execute(
+            f"SELECT file_id, owner_class_id, class_chain, depth, nested_function FROM {ANCESTRY_TABLE} WHERE id = ?",
+            (b"h",),
+        ).fetchone()
+        self.assertEqual(row, (b"F", b"I", "Outer.Inner", 6, 1))
+        conn.close()
+
+
+
+class TestChunkedScans(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT)")
+        self.conn.executemany("INSERT INTO deps VALUES (?, ?, ?, ?)", [r[1:] for r in DEPS])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_iter_rows_streams_in_chunks(self):
+        cur = self.conn.execute("SELECT src, tgt, kind, row FROM deps")
+        fetchmany = mock.Mock(wraps=cur.fetchmany)
+        rows = list(iter_rows(mock.Mock(fetchmany=fetchmany), 3))
+        self.assertEqual(rows, [r[1:] for r in DEPS])
+        self.assertEqual([c.args for c in fetchmany.call_args_list], [(3,), (3,), (3,)])
+
+    def test_scan_rows_env(self):
+        with mock.patch.dict(os.environ, {SCAN_ROWS_ENV: "250"}):
+            self.assertEqual(scan_rows(), 250)
+        for bad in ("0", "many"):
+            with mock.patch.dict(os.environ, {SCAN_ROWS_ENV: bad}):
+                self.assertGreater(scan_rows(), 0)
+
+    def test_row_columns(self):
+        table = RowColumns.from_cursor(self.conn.execute("SELECT src, tgt, kind, row FROM deps"), chunk_rows=2)
+        expected = [r[1:] for r in DEPS]
+        self.assertEqual(len(table), 4)
+        self.assertEqual(list(table), expected)
+        self.assertEqual([table[i] for i in range(-1, 3)], [expected[-1]] + expected[:3])
+        self.assertEqual(list(table.head(3)), [r[:3] for r in expected])
+        # b"m" and "Call" are stored once however many rows carry them.
+        self.assertEqual(len(table.values), len({v for r in expected for v in r}))
+
+
+if __name__ == "__main__":
+    unittest.main()
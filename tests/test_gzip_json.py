@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""--gzip-json: the pipeline writes analysis-result.json.gz and the readers take it."""
+
+import gzip
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+sys.path.insert(0, str(TOOLS))
+
+from compare_dv8_to_ground_truth import compare_files
+from mypy_oracle import load_neo_edges
+from run_handcount_regression import _analysis_result
+from synthetic_project import ProjectSpec, generate_project
+
+STUB_CORE = Path(__file__).resolve().parent / "fixtures" / "stub_neodepends.py"
+
+
+def _export(src: Path, out_dir: Path, *extra: str) -> None:
+    subprocess.run(
+        [
+            sys.executable, str(TOOLS / "neodepends_python_export.py"),
+            "--neodepends-bin", str(STUB_CORE),
+            "--input", str(src),
+            "--output-dir", str(out_dir),
+            "--resolver", "stackgraphs",
+            "--no-terminal-output",
+            "--no-viz",
+            "--no-dynamism",
+            *extra,
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+class TestGzipJsonPipeline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        root = Path(cls._tmp.name)
+        src = root / "src"
+        generate_project(ProjectSpec(files=6)).write_sources(src)
+        cls.plain_dir = root / "plain"
+        cls.gz_dir = root / "gz"
+        _export(src, cls.plain_dir)
+        _export(src, cls.gz_dir, "--gzip-json")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_full_matrix_is_gzipped(self):
+        gz_path = self.gz_dir / "analysis-result.json.gz"
+        self.assertFalse((self.gz_dir / "analysis-result.json").exists())
+        with gzip.open(gz_path, "rt", encoding="utf-8") as fh:
+            doc = json.load(fh)
+        plain = json.loads((self.plain_dir / "analysis-result.json").read_text(encoding="utf-8"))
+        self.assertEqual(doc["variables"], plain["variables"])
+        self.assertEqual(doc["cells"], plain["cells"])
+        self.assertTrue(doc["cells"])
+        summary = json.loads((self.gz_dir / "data" / "run_summary.json").read_text(encoding="utf-8"))
+        self.assertIn("stage_profile", summary)
+
+    def test_readers_take_gz(self):
+        gz_path = _analysis_result(self.gz_dir)
+        self.assertEqual(gz_path.name, "analysis-result.json.gz")
+        plain_path = _analysis_result(self.plain_dir)
+        self.assertEqual(plain_path.name, "analysis-result.json")
+
+        diff = compare_files(plain_path, gz_path)
+        self.assertGreater(diff.count("gt"), 0)
+        self.assertEqual((diff.count("missing"), diff.count("extra")), (0, 0))
+        self.assertEqual(load_neo_edges(gz_path), load_neo_edges(plain_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""_InProcessSession must turn a failing tool into CalledProcessError, not end the pipeline."""
+
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from neodepends_python_export import _InProcessSession
+
+TOOL = '''
+import argparse
+import sys
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="tool")
+    parser.add_argument("--n", type=int, required=True)
+    args = parser.parse_args(argv)
+    print(f"n={args.n}")
+    if args.n == 0:
+        sys.exit(0)
+    if args.n < 0:
+        sys.exit("negative n")
+    if args.n > 9:
+        raise ValueError("too big")
+    sys.exit(args.n)
+'''
+
+
+class _ListLogger:
+    def __init__(self):
+        self.lines = []
+
+    def line(self, msg=""):
+        self.lines.append(msg)
+
+
+class TestInProcessSession(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.script = Path(self._tmp.name) / "exit_tool.py"
+        self.script.write_text(TOOL, encoding="utf-8")
+        self.logger = _ListLogger()
+        self.session = _InProcessSession(Path(self._tmp.name) / "unused.db", logger=self.logger)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, *argv):
+        return self.session.run(self.script, lambda mod: mod.main(list(argv)))
+
+    def test_exit_zero_is_success(self):
+        self.assertGreaterEqual(self._run("--n", "0"), 0.0)
+        self.assertIn("n=0", self.logger.lines)
+
+    def test_nonzero_exit_and_parser_error_fail_the_step(self):
+        for argv, code in ((("--n", "3"), 3), (("--n", "-1"), 1), ((), 2)):
+            with self.assertRaises(subprocess.CalledProcessError) as ctx:
+                self._run(*argv)
+            self.assertEqual(ctx.exception.returncode, code)
+        self.assertIn("negative n", self.logger.lines)
+        self.assertTrue(any("the following arguments are required" in line for line in self.logger.lines))
+
+    def test_exception_fails_the_step(self):
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            self._run("--n", "10")
+        self.assertEqual(ctx.exception.returncode, 1)
+        self.assertTrue(any("ValueError: too big" in line for line in self.logger.lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/module_index.py."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from generate_ground_truth_generic import _iter_project_py, _project_module_index
+from module_index import ModuleIndex, module_name
+
+
+def _scan(names, module):
+    """The first-match ``endswith`` scan the index replaces."""
+    as_file = module.replace(".", "/") + ".py"
+    as_init = module.replace(".", "/") + "/__init__.py"
+    for candidate in (as_file, as_init):
+        if candidate in names:
+            return candidate
+    for candidate in (as_file, as_init):
+        for name in names:
+            if name.endswith("/" + candidate):
+                return name
+    return None
+
+
+FILES = [
+    "src/survey.py",
+    "lib/survey.py",
+    "pkg/__init__.py",
+    "pkg/io/__init__.py",
+    "src/pkg/io/reader.py",
+    "pkg/io.py",
+    "tools/pkg/io/__init__.py",
+    "app.py",
+]
+
+
+class TestModuleIndex(unittest.TestCase):
+    def test_matches_linear_scan(self):
+        index = ModuleIndex(FILES)
+        modules = ["survey", "pkg", "pkg.io", "io", "io.reader", "reader", "pkg.io.reader", "app", "nope", "src.survey"]
+        for module in modules:
+            self.assertEqual(index.resolve(module), _scan(FILES, module), module)
+        self.assertEqual(index.resolve("survey"), "src/survey.py")  # first of two suffix matches
+        self.assertEqual(index.resolve("pkg.io"), "pkg/io.py")  # file beats package __init__
+        self.assertIsNone(index.resolve(""))
+
+    def test_exact_lookup_under_package(self):
+        index = ModuleIndex(FILES)
+        self.assertEqual(index.lookup("reader", package="src/pkg/io"), "src/pkg/io/reader.py")
+        self.assertEqual(index.lookup("io", package="pkg"), "pkg/io.py")
+        self.assertIsNone(index.lookup("survey"))  # no suffix fallback
+        self.assertIn("app.py", index)
+        self.assertEqual(len(index), len(FILES))
+
+    def test_module_name(self):
+        self.assertEqual(module_name("pkg/io/__init__.py"), "pkg.io")
+        self.assertEqual(module_name("src/survey.py"), "src.survey")
+
+
+class TestProjectModuleIndex(unittest.TestCase):
+    def test_skips_junk_directories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for rel in (
+                "pkg/__init__.py",
+                "pkg/a.py",
+                ".venv/lib/site.py",
+                "myenv/lib/os.py",
+                "build/lib/pkg/a.py",
+                "node_modules/x/y.py",
+                "dependencies_files_handcount_v2/a.py",
+                "pkg/.hidden.py",
+            ):
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("", encoding="utf-8")
+            (root / "myenv" / "pyvenv.cfg").write_text("", encoding="utf-8")
+
+            index = _project_module_index(root)
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.resolve("pkg.a"), "pkg/a.py")
+            self.assertEqual(index.resolve("pkg"), "pkg/__init__.py")
+            self.assertIsNone(index.resolve("site"))
+            self.assertEqual(
+                [p.relative_to(root).as_posix() for p in _iter_project_py(root, exclude_init=True)], ["pkg/a.py"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
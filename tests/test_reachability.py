@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/reachability.py and its scaling benchmark."""
+
+import contextlib
+import io
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from bench_reachability import naive_anchor_pairs, naive_closure, run_benchmark
+from enhance_python_deps import enhance_python_dependencies
+from neodepends_python_export import export_dv8_file_level
+from reachability import EXTEND_ANCHOR_HOPS, Reachability
+from synthetic_project import CORE_SCHEMA
+
+# d.py's D extends c.py's C extends b.py's B extends a.py's A (A <- B <- C <- D),
+# with no imports between the files.
+HIERARCHY = ["a", "b", "c", "d"]
+USES = [("d", "a"), ("d", "b"), ("c", "a")]
+
+
+def _write_hierarchy_db(db_path: Path) -> None:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.executescript(CORE_SCHEMA)
+        for name in HIERARCHY:
+            text = f"class {name.upper()}:\n    pass\n"
+            content_id = f"content-{name}".encode()
+            conn.execute("INSERT INTO contents VALUES (?, ?)", (content_id, text))
+            for eid, parent, ename, kind in (
+                (f"file-{name}".encode(), None, f"{name}.py", "File"),
+                (f"class-{name}".encode(), f"file-{name}".encode(), name.upper(), "Class"),
+            ):
+                conn.execute(
+                    "INSERT INTO entities VALUES (?, ?, ?, ?, 0, 0, 0, ?, 2, 0, "
+                    "NULL, NULL, NULL, NULL, NULL, NULL, ?, ?)",
+                    (eid, parent, ename, kind, len(text), content_id, eid),
+                )
+        deps = [(child, parent, "Extend") for parent, child in zip(HIERARCHY, HIERARCHY[1:])]
+        deps += [(src, tgt, "Use") for src, tgt in USES]
+        conn.executemany(
+            "INSERT INTO deps VALUES (?, ?, ?, 0, NULL)",
+            [(f"class-{s}".encode(), f"class-{t}".encode(), kind) for s, t, kind in deps],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestReachability(unittest.TestCase):
+    def test_chain_and_cycle(self):
+        reach = Reachability([("a", "b"), ("b", "c"), ("c", "d"), ("x", "y"), ("y", "x"), ("a", "b")])
+        self.assertTrue(reach.reaches("a", "d"))  # unbounded: three hops, beyond grandparents
+        self.assertFalse(reach.reaches("d", "a"))
+        self.assertFalse(reach.reaches("a", "a"))
+        self.assertTrue(reach.reaches("x", "x"))  # only nodes on a cycle reach themselves
+        self.assertFalse(reach.reaches("zzz", "a"))
+        self.assertEqual(reach.reachable_from("b"), frozenset({"c", "d"}))
+
+    def test_matches_naive_closure_on_random_graphs(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            edges = [(rng.randrange(12), rng.randrange(12)) for _ in range(rng.randrange(30))]
+            reach = Reachability(edges)
+            # Query order must not matter even though results are memoized.
+            for a in rng.sample(range(12), 12):
+                for b in range(12):
+                    self.assertEqual(reach.reaches(a, b), (a, b) in naive_closure(edges))
+            self.assertEqual(set(reach.pairs()), naive_closure(edges))
+
+    def test_bounded_matches_old_anchor_loop(self):
+        rng = random.Random(11)
+        for _ in range(50):
+            edges = [(rng.randrange(12), rng.randrange(12)) for _ in range(rng.randrange(30))]
+            reach = Reachability(edges, max_hops=EXTEND_ANCHOR_HOPS)
+            anchors = naive_anchor_pairs(edges)
+            for a in rng.sample(range(12), 12):
+                for b in range(12):
+                    self.assertEqual(reach.reaches(a, b), (a, b) in anchors, (edges, a, b))
+
+    def test_extend_anchor_stops_at_grandparent(self):
+        reach = Reachability([("d", "c"), ("c", "b"), ("b", "a")], max_hops=EXTEND_ANCHOR_HOPS)
+        self.assertTrue(reach.reaches("d", "c"))
+        self.assertTrue(reach.reaches("d", "b"))
+        self.assertFalse(reach.reaches("d", "a"))
+        self.assertTrue(reach.reaches("c", "a"))
+
+    def test_anchors_in_enhancement_and_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            db_path = root / "deps.db"
+            _write_hierarchy_db(db_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                enhance_python_dependencies(str(db_path), str(root), profile="stackgraphs")
+            conn = sqlite3.connect(str(db_path))
+            try:
+                kinds = {
+                    (src.decode()[-1], tgt.decode()[-1]): kind
+                    for src, tgt, kind in conn.execute("SELECT src, tgt, kind FROM deps WHERE kind != 'Extend'")
+                }
+            finally:
+                conn.close()
+            # STEP 0c: D -> A is three Extend hops away, so it is not anchored.
+            self.assertEqual(kinds, {("d", "a"): "UseTransitive", ("d", "b"): "Use", ("c", "a"): "Use"})
+
+            # Import-scoped export gate, on the core DB as written.
+            core_db = root / "core.db"
+            _write_hierarchy_db(core_db)
+            out = root / "file.json"
+            export_dv8_file_level(
+                db_path=core_db,
+                out_dir=root,
+                output_path=out,
+                focus_prefix=None,
+                include_root_py=True,
+                include_external_target_files=False,
+                include_self_edges=False,
+                align_handcount=False,
+                dv8_hierarchy="flat",
+            )
+            doc = json.loads(out.read_text(encoding="utf-8"))
+            names = [v.split("/")[0] for v in doc["variables"]]
+            uses = {
+                (names[c["src"]], names[c["dest"]]) for c in doc["cells"] if "Use" in c["values"]
+            }
+            self.assertEqual(uses, {("d.py", "b.py"), ("c.py", "a.py")})
+
+    def test_benchmark_smoke(self):
+        rows = run_benchmark([200, 400], depth=4, naive=True)
+        self.assertEqual([r["files"] for r in rows], [200, 400])
+
+
+if __name__ == "__main__":
+    unittest.main()
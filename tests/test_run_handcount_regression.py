@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/run_handcount_regression.py, with a stub core binary."""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+from run_handcount_regression import Case, run_cases, status_for
+from synthetic_project import ProjectSpec, generate_project
+
+STUB_CORE = REPO_ROOT / "tests" / "fixtures" / "stub_neodepends.py"
+
+
+class TestRunCases(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.src = self.root / "src"
+        generate_project(ProjectSpec(files=4)).write_sources(self.src)
+        self.out_base = self.root / "out"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, cases, *, jobs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_cases(
+                cases,
+                repo_root=REPO_ROOT,
+                neodepends_bin=STUB_CORE,
+                depends_jar=self.root / "depends.jar",
+                out_base=self.out_base,
+                analysis_cache_dir=None,
+                jobs=jobs,
+            )
+
+    def test_concurrent_cases_compare_in_process(self):
+        handcount = self.root / "handcount_edges.json"
+        handcount.write_text(json.dumps([["nowhere.py/module", "synth.py/module", "Import"]]), encoding="utf-8")
+        cases = [
+            Case(name="first", input_path=self.src, lang="python", handcount=handcount),
+            Case(name="second", input_path=self.src, lang="python"),
+            Case(name="third", input_path=self.src, lang="python", handcount=handcount),
+        ]
+        summary = self._run(cases, jobs=3)
+
+        self.assertEqual([entry["case"] for entry in summary], ["first", "second", "third"])
+        for entry in summary:
+            self.assertNotIn("error", entry)
+            self.assertGreater(entry["wall_sec"], 0)
+            self.assertIn("max_process_rss_mb", entry)
+            self.assertTrue((self.out_base / entry["case"] / "analysis-result.json").exists())
+        first = summary[0]
+        self.assertEqual((first["ground_truth_count"], first["missing"]), (1, 1))
+        self.assertGreater(first["neodepends_count"], 0)
+        self.assertEqual(first["extra"], first["neodepends_count"])
+        self.assertTrue(Path(first["diff_json"]).exists())
+        self.assertTrue((self.out_base / "first.diff.md").exists())
+        merged = (self.out_base / "example_comparison_diffs.md").read_text(encoding="utf-8")
+        self.assertEqual([line for line in merged.splitlines() if line.startswith("## ")], ["## first", "## third"])
+        self.assertIn("- `Import`: `nowhere.py/module` -> `synth.py/module`", merged)
+        self.assertEqual(summary[2]["neodepends_count"], first["neodepends_count"])
+        self.assertIsNone(summary[1]["missing"])
+        self.assertEqual(status_for(first, None), "OK")
+        self.assertEqual(status_for(first, 0.5), "FAIL")
+        self.assertEqual(status_for(summary[1], None), "SKIP")
+        # No cache unless --analysis-cache-dir is given.
+        self.assertFalse((self.out_base / "analysis_cache").exists())
+
+    def test_failed_export_is_an_error(self):
+        cases = [
+            Case(name="missing_input", input_path=self.root / "does_not_exist", lang="python"),
+            Case(name="ok", input_path=self.src, lang="python"),
+        ]
+        summary = self._run(cases, jobs=2)
+
+        failed, ok = summary
+        self.assertIn("run.log", failed["error"])
+        self.assertTrue((self.out_base / "missing_input" / "run.log").exists())
+        self.assertEqual(status_for(failed, None), "ERROR")
+        self.assertNotIn("error", ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
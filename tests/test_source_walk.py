@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/source_walk.py."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from source_walk import HEAD_BYTES, SourceInventory, source_inventory
+
+
+class TestSourceInventory(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "tts"
+        files = {
+            "__init__.py": "",
+            "core/station.py": "class Station:\n    pass\n",
+            "core/route.py": "from tts.core.station import Station\n",
+            "core/Train.java": "class Train {}\n",
+            "big/late.py": "x = 1\n" * 20000 + "import tts\n",
+            ".git/hooks/pre.py": "import tts\n",
+            "node_modules/pkg/index.py": "",
+            "env/pyvenv.cfg": "home = /usr\n",
+            "env/lib/mod.py": "",
+        }
+        for rel, text in files.items():
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_walk_skips_vcs_vendored_and_venv_trees(self):
+        inv = source_inventory(self.root, refresh=True, threads=3)
+        rel = [p.relative_to(self.root).as_posix() for p in inv.files(".py")]
+        self.assertEqual(rel, ["__init__.py", "big/late.py", "core/route.py", "core/station.py"])
+        self.assertEqual(inv.count(".java"), 1)
+        self.assertEqual(inv.count(".cfg"), 0)
+
+    def test_inventory_is_cached_per_root(self):
+        first = source_inventory(self.root, refresh=True)
+        (self.root / "new.py").write_text("", encoding="utf-8")
+        self.assertIs(source_inventory(self.root), first)
+        self.assertEqual(source_inventory(self.root, refresh=True).count(".py"), first.count(".py") + 1)
+
+    def test_first_containing_searches_heads(self):
+        inv = source_inventory(self.root, refresh=True)
+        # big/late.py also matches, but only past its head: a head hit wins.
+        hit = inv.first_containing(".py", ["from tts.", "import tts"], threads=2)
+        self.assertEqual(hit, self.root / "core" / "route.py")
+        self.assertIsNone(inv.first_containing(".py", ["import nothing"]))
+
+    def test_first_containing_falls_back_to_whole_files(self):
+        late = self.root / "big" / "late.py"
+        self.assertGreater(late.stat().st_size, HEAD_BYTES)
+        inv = SourceInventory(self.root, [str(self.root / "__init__.py"), str(late)])
+        self.assertEqual(inv.first_containing(".py", ["import tts"]), late)
+        self.assertEqual(inv.first_containing(".py", ["import tts"], head_bytes=16), late)
+        self.assertIsNone(inv.first_containing(".py", ["import nothing"], head_bytes=16))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Unit tests for tools/stage_profile.py (stage records, laps, cProfile dumps)."""
+
+import os
+import pstats
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from edge_sink import EdgeSink
+from graph_model import iter_rows
+from stage_profile import StageProfiler, child_row_counts, read_stage_profile
+
+
+def _busy_stage_a() -> int:
+    return sum(range(20000))
+
+
+def _busy_stage_b() -> int:
+    return sum(range(20000))
+
+
+class TestStageProfiler(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db_path = self.root / "deps.db"
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("CREATE TABLE deps (src BLOB, tgt BLOB, kind TEXT, row INT, commit_id BLOB)")
+        conn.executemany("INSERT INTO deps VALUES (?, ?, 'Use', 0, NULL)", [(b"a", b"b"), (b"b", b"c")])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_laps_record_row_counts(self):
+        conn = sqlite3.connect(str(self.db_path))
+        stages = StageProfiler()
+        stages.lap("insert", db=conn)
+        conn.execute("INSERT INTO deps VALUES (x'01', x'02', 'Call', 1, NULL)")
+        stages.lap("delete", db=conn)
+        conn.execute("DELETE FROM deps WHERE kind = 'Use'")
+        stages.lap(None)
+        conn.close()
+
+        self.assertEqual([r.name for r in stages.records], ["insert", "delete"])
+        self.assertEqual([(r.deps_before, r.deps_after) for r in stages.records], [(2, 3), (3, 1)])
+        for record in stages.records:
+            self.assertGreaterEqual(record.wall_sec, 0.0)
+            self.assertIsNone(record.profile_path)
+
+    def test_read_only_stage_and_missing_db(self):
+        stages = StageProfiler()
+        with stages.stage("export", db_in=self.db_path):
+            pass
+        with stages.stage("scan", db_out=self.root / "missing.db"):
+            pass
+        self.assertEqual((stages.records[0].deps_before, stages.records[0].deps_after), (2, None))
+        self.assertEqual((stages.records[1].deps_before, stages.records[1].deps_after), (None, None))
+
+    def test_stages_count_rows_read_and_written(self):
+        conn = sqlite3.connect(str(self.db_path))
+        stages = StageProfiler()
+        with stages.stage("scan"):
+            list(iter_rows(conn.execute("SELECT src, tgt FROM deps"), chunk_rows=1))
+        with stages.stage("write"):
+            with EdgeSink(conn) as sink:
+                for i in range(3):
+                    sink.add(bytes([i]), b"z", "Call", i)
+        conn.close()
+        self.assertEqual([(r.rows_read, r.rows_written) for r in stages.records], [(2, 0), (0, 3)])
+
+    def test_child_tool_row_counts_are_credited(self):
+        tools = Path(__file__).resolve().parent.parent / "tools"
+        script = (
+            f"import sqlite3, sys; sys.path.insert(0, {str(tools)!r}); from graph_model import iter_rows; "
+            f"list(iter_rows(sqlite3.connect({str(self.db_path)!r}).execute('SELECT * FROM deps')))"
+        )
+        stages = StageProfiler()
+        with stages.stage("child"):
+            with child_row_counts() as env:
+                subprocess.run([sys.executable, "-c", script], env=env, check=True)
+        self.assertEqual(stages.records[0].rows_read, 2)
+
+    def test_rss_is_sampled_per_stage(self):
+        stages = StageProfiler(sample_interval=0.01)
+        with stages.stage("alloc"):
+            block = bytearray(64 * 1024 * 1024)
+            block[::4096] = b"x" * len(block[::4096])
+            del block
+        with stages.stage("idle"):
+            pass
+        alloc, idle = stages.records
+        if alloc.peak_rss_mb is None:
+            self.skipTest("no /proc on this platform")
+        self.assertGreater(alloc.peak_rss_mb, idle.peak_rss_mb + 32)
+        self.assertIsNotNone(idle.rss_delta_mb)
+
+    def test_counting_a_db_leaves_no_sidecar_files(self):
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+        stages = StageProfiler()
+        with stages.stage("export", db_in=self.db_path):
+            pass
+        self.assertEqual(stages.records[0].deps_before, 2)
+        self.assertEqual(sorted(os.listdir(self.root)), ["deps.db"])
+
+    def test_nested_dumps_attribute_calls_once(self):
+        stages = StageProfiler(dump_dir=self.root / "prof", prefix="t_")
+        with stages.stage("outer"):
+            _busy_stage_a()
+            with stages.stage("inner"):
+                _busy_stage_b()
+        inner, outer = stages.records
+        self.assertEqual((inner.name, outer.name), ("inner", "outer"))
+
+        def functions(record):
+            return {name for (_file, _line, name) in pstats.Stats(record.profile_path).stats}
+
+        self.assertIn("_busy_stage_a", functions(outer))
+        self.assertNotIn("_busy_stage_b", functions(outer))
+        self.assertIn("_busy_stage_b", functions(inner))
+
+        out = self.root / "stages.json"
+        stages.write(out)
+        self.assertEqual([r["name"] for r in read_stage_profile(out)], ["inner", "outer"])
+        self.assertEqual(read_stage_profile(self.root / "nope.json"), [])
+
+    def test_failing_stage_is_closed_and_worker_records_are_adopted(self):
+        stages = StageProfiler()
+        with self.assertRaises(RuntimeError):
+            with stages.stage("boom"):
+                raise RuntimeError("stage failed")
+        with stages.stage("after"):
+            pass
+        self.assertEqual([r.name for r in stages.records], ["boom", "after"])
+
+        worker = StageProfiler()
+        with worker.stage("raw_dv8_export", db_in=self.db_path):
+            _busy_stage_a()
+        stages.adopt(worker.to_json())
+        adopted = stages.records[-1]
+        self.assertEqual((adopted.name, adopted.deps_before), ("raw_dv8_export", 2))
+        self.assertIn("max_child_rss_mb", stages.to_json()[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
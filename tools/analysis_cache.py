@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of pipeline stage outputs for neodepends_python_export.py.
+
+Every stage of the export pipeline is a pure function of the analysed source
+tree, the options that reach the stage and the tools that run it.  With
+``--analysis-cache-dir`` the pipeline keys each stage by exactly that and skips
+it when the cache already holds its outputs:
+
+- raw DB (NeoDepends run): source fingerprint, tool fingerprint, resolver,
+  StackGraphs mode, languages and Depends options
+- filtered DB (StackGraphs false-positive filter): raw key
+- enhanced DB (enhancement, override detection, Java enhancement, shadow-import
+  resolution): filtered-or-raw key plus the post-processing flags
+- DV8 snapshot exports (per-file matrices, file-level and full DSMs): key of
+  the DB they were exported from plus the export options
+
+Keys chain, so re-running the same commit reuses every stage and re-exporting
+with, say, another ``--dv8-hierarchy`` reuses the DBs and only redoes the DV8
+exports.
+
+The source fingerprint is the git tree hash of ``HEAD`` when the project root is
+a clean git checkout (NeoDepends scans ``HEAD`` there), and otherwise a content
+hash over every source file of the analysed languages.  The tool fingerprint
+covers ``neodepends --version``, the binary's size and mtime, and the bytes of
+the post-processing scripts, so a rebuilt binary or an edited script never
+serves stale results.
+
+Layout: ``<root>/<key[:2]>/<key>/`` holds one file or directory per named
+output plus ``entry.json``.  Entries are assembled in a temporary directory and
+renamed into place, so readers never see half-written entries.  ``restore``
+refreshes the entry's mtime and ``store`` evicts least-recently-used entries
+until the cache fits in ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+ENTRY_FILE = "entry.json"
+
+# Source files that can change what the analysis extracts, per --langs value.
+_LANG_SUFFIXES: Dict[str, Tuple[str, ...]] = {
+    "python": (".py", ".pyi"),
+    "java": (".java",),
+}
+
+
+def stage_key(stage: str, *parts: Any) -> str:
+    """Hex key for *stage* over JSON-serialisable *parts* (``Path`` values are stringified)."""
+    payload = json.dumps([stage, *parts], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _git(project_root: Path, *args: str) -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(project_root), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout
+
+
+def _content_manifest_hash(project_root: Path, suffixes: Optional[Tuple[str, ...]]) -> str:
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(project_root):
+        dirnames[:] = sorted(d for d in dirnames if d != ".git")
+        for name in sorted(filenames):
+            if suffixes is not None and not name.endswith(suffixes):
+                continue
+            path = Path(dirpath) / name
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            rel = path.relative_to(project_root).as_posix()
+            digest.update(rel.encode("utf-8") + b"\0" + hashlib.sha1(data).digest())
+    return digest.hexdigest()
+
+
+def source_fingerprint(project_root: Path, langs: Iterable[str]) -> str:
+    """
+    Identify the analysed source tree: ``git-tree:<hash>`` for a clean git
+    checkout, else ``content:<hash>`` over the source files of *langs*.
+    """
+    if (project_root / ".git").exists():
+        tree = _git(project_root, "rev-parse", "HEAD^{tree}")
+        status = _git(project_root, "status", "--porcelain")
+        if tree and status is not None and not status.strip():
+            return f"git-tree:{tree.strip()}"
+    suffixes: Optional[Tuple[str, ...]] = ()
+    for lang in langs:
+        lang_suffixes = _LANG_SUFFIXES.get(lang.lower())
+        if lang_suffixes is None:
+            # Unknown language: fingerprint every file rather than guess.
+            suffixes = None
+            break
+        suffixes += lang_suffixes
+    return f"content:{_content_manifest_hash(project_root, suffixes)}"
+
+
+def tool_fingerprint(neodepends_bin: Path, scripts: Iterable[Optional[Path]]) -> str:
+    """Identify the NeoDepends binary and the post-processing scripts that produce the outputs."""
+    digest = hashlib.sha256()
+    try:
+        proc = subprocess.run(
+            [str(neodepends_bin), "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        digest.update(proc.stdout.encode("utf-8"))
+        st = neodepends_bin.stat()
+        digest.update(f"{st.st_size}:{st.st_mtime_ns}".encode("ascii"))
+    except OSError:
+        digest.update(b"<no binary>")
+    for script in sorted({Path(s).resolve() for s in scripts if s is not None}):
+        try:
+            digest.update(script.name.encode("utf-8") + b"\0" + script.read_bytes())
+        except OSError:
+            digest.update(script.name.encode("utf-8") + b"\0<missing>")
+    return digest.hexdigest()
+
+
+# SQLite sidecars of a DB file; stale ones next to a replaced DB would be replayed into it.
+_SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+
+
+def _copy(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if src.is_dir():
+        shutil.copytree(src, dest, dirs_exist_ok=True)
+        return
+    for suffix in _SQLITE_SIDECARS:
+        sidecar = dest.with_name(dest.name + suffix)
+        if sidecar.exists():
+            sidecar.unlink()
+    shutil.copyfile(src, dest)
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class AnalysisCache:
+    """Content-addressed store of stage outputs under *root*, bounded to *max_bytes* (LRU)."""
+
+    def __init__(self, root: Path, *, max_bytes: Optional[int] = None) -> None:
+        self.root = Path(root).expanduser()
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def contains(self, key: str) -> bool:
+        return (self._entry_dir(key) / ENTRY_FILE).is_file()
+
+    def restore(self, key: str, outputs: Mapping[str, Path]) -> bool:
+        """
+        Copy the cached outputs of *key* to their *outputs* paths.
+
+        Returns False (and copies nothing) on a miss or when the entry was stored
+        with different output names.  Directory outputs are merged into the
+        destination, like re-running the stage into an existing directory.
+        """
+        entry = self._entry_dir(key)
+        try:
+            meta = json.loads((entry / ENTRY_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        stored = meta.get("outputs", [])
+        if set(stored) - set(outputs) or any(not (entry / name).exists() for name in stored):
+            return False
+        try:
+            for name in stored:
+                _copy(entry / name, outputs[name])
+            os.utime(entry / ENTRY_FILE)
+        except OSError:
+            # Evicted while we were copying: treat as a miss, the stage reruns and overwrites.
+            return False
+        return True
+
+    def store(self, key: str, outputs: Mapping[str, Path]) -> None:
+        """Save the existing *outputs* under *key* (best-effort), then evict down to ``max_bytes``."""
+        entry = self._entry_dir(key)
+        if entry.exists():
+            return
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            stored: List[str] = []
+            for name, path in sorted(outputs.items()):
+                if path.exists():
+                    _copy(path, tmp / name)
+                    stored.append(name)
+            meta = {"key": key, "outputs": stored, "created": time.time()}
+            (tmp / ENTRY_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+            os.replace(tmp, entry)
+        except OSError:
+            # Another process stored the same entry first, or the cache dir is read-only;
+            # either way the cache only costs speed.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict(keep=key)
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """``(last_used, size_bytes, key)`` for every complete entry, least recently used first."""
+        out: List[Tuple[float, int, str]] = []
+        if not self.root.is_dir():
+            return out
+        for bucket in self.root.iterdir():
+            if not bucket.is_dir():
+                continue
+            for entry in bucket.iterdir():
+                meta = entry / ENTRY_FILE
+                try:
+                    last_used = meta.stat().st_mtime
+                except OSError:
+                    continue
+                out.append((last_used, _tree_size(entry), entry.name))
+        out.sort()
+        return out
+
+    def evict(self, *, keep: Optional[str] = None) -> List[str]:
+        """Remove least-recently-used entries until the cache fits ``max_bytes``; returns the removed keys."""
+        if self.max_bytes is None:
+            return []
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed: List[str] = []
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
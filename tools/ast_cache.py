@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Shared parsed-AST cache for the Python post-processing tools.
+
+enhance_python_deps.py, detect_overrides.py, resolve_shadow_imports.py and
+generate_ground_truth_generic.py all parse the same project files.  This module
+keeps one ``ast.Module`` per content id so every file is parsed at most once per
+process.  Content ids are NeoDepends ``contents.id`` values, i.e. the git blob
+hash of the file text (see ``blob_id``), so trees are valid across DBs and runs.
+
+Method-level analysis takes the ``FunctionDef`` subtree for an entity's line span
+from the file-level tree (``method_tree``) instead of re-parsing dedented source
+slices.  Line numbers in the returned trees are always file-absolute (1-based).
+
+Optional on-disk layer: when a cache directory is configured (``set_cache_dir``
+or the ``NEODEPENDS_AST_CACHE_DIR`` environment variable, which the exporter also
+forwards to its subprocess stages), parsed trees are pickled under
+``<dir>/ast-py<major><minor>/<content-id-hex>.pickle`` so repeated runs skip
+parsing files whose contents did not change.
+
+Loading a pickle can call any importable callable, so the disk layer never
+trusts the files blindly: entries are read with an unpickler that only
+resolves ``ast`` node classes (plus ``complex`` and ``Ellipsis`` for
+constants), and the ``ast-py<XY>`` directory is created with mode 0700 and
+used only while it is owned by the current user and not writable by group or
+others.  Data-only formats were measured and rejected: decoding a tree from
+JSON or marshal and rebuilding the nodes is slower than ``ast.parse`` itself.
+"""
+
+from __future__ import annotations
+
+import ast
+import copy
+import hashlib
+import os
+import pickle
+import sqlite3
+import stat
+import sys
+import textwrap
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+
+CACHE_DIR_ENV = "NEODEPENDS_AST_CACHE_DIR"
+
+_FuncNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+# Non-``ast`` globals that pickled trees legitimately reference (constant values).
+_SAFE_BUILTINS = {"complex": complex, "Ellipsis": Ellipsis}
+
+
+class _AstUnpickler(pickle.Unpickler):
+    """Unpickler that resolves ``ast`` node classes and constant types only."""
+
+    def find_class(self, module: str, name: str) -> object:
+        if module in ("ast", "_ast"):
+            obj = getattr(ast, name, None)
+            if isinstance(obj, type) and issubclass(obj, ast.AST):
+                return obj
+        elif module == "builtins" and name in _SAFE_BUILTINS:
+            return _SAFE_BUILTINS[name]
+        raise pickle.UnpicklingError(f"global {module}.{name} is not allowed in an AST cache entry")
+
+
+def _owned_private(path: Path) -> bool:
+    """True if *path* belongs to the current user and no one else may write to it."""
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    getuid = getattr(os, "getuid", None)
+    if getuid is None:
+        # No POSIX ownership (Windows): rely on the profile directory ACLs.
+        return True
+    return st.st_uid == getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def blob_id(text: str) -> bytes:
+    """Return the git blob hash of ``text`` — the same id NeoDepends stores in ``contents.id``."""
+    data = text.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).digest()
+
+
+class AstCache:
+    """Per-process cache of file sources, parsed trees and def-by-row indexes."""
+
+    def __init__(self, cache_dir: Optional[Path] = None) -> None:
+        self._sources: Dict[bytes, str] = {}
+        self._trees: Dict[bytes, Optional[ast.Module]] = {}
+        self._def_index: Dict[bytes, Dict[int, List[_FuncNode]]] = {}
+        self._slice_trees: Dict[Tuple[bytes, int, int], Optional[ast.Module]] = {}
+        self._disk_dir: Optional[Path] = None
+        self._disk_trusted: Optional[bool] = None
+        self.set_cache_dir(cache_dir)
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    def set_cache_dir(self, cache_dir: Optional[Path]) -> None:
+        """Enable (or disable with ``None``) the on-disk pickle layer."""
+        self._disk_trusted = None
+        if cache_dir is None:
+            self._disk_dir = None
+            return
+        tag = f"ast-py{sys.version_info[0]}{sys.version_info[1]}"
+        self._disk_dir = Path(cache_dir).expanduser() / tag
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (the on-disk layer is left untouched)."""
+        self._sources.clear()
+        self._trees.clear()
+        self._def_index.clear()
+        self._slice_trees.clear()
+
+    # ------------------------------------------------------------------
+    # Sources and file-level trees
+    # ------------------------------------------------------------------
+
+    def source(self, conn: sqlite3.Connection, content_id: bytes) -> str:
+        """Return the text for ``content_id`` from the ``contents`` table ("" if absent)."""
+        text = self._sources.get(content_id)
+        if text is None:
+            row = conn.execute("SELECT content FROM contents WHERE id = ?", (content_id,)).fetchone()
+            text = row[0] if row else ""
+            self._sources[content_id] = text
+        return text
+
+    def seed_source(self, content_id: bytes, text: str) -> None:
+        """Register ``text`` as the source of ``content_id`` (worker processes have no DB connection)."""
+        self._sources.setdefault(content_id, text)
+
+    def parse(self, content_id: bytes, source: str) -> Optional[ast.Module]:
+        """Parse ``source`` once per ``content_id``; ``None`` for blank or unparsable files."""
+        if content_id in self._trees:
+            return self._trees[content_id]
+        tree = self._disk_load(content_id)
+        if tree is None:
+            tree = self._parse_source(source)
+            self._disk_store(content_id, tree)
+        self._trees[content_id] = tree
+        return tree
+
+    def tree(self, conn: sqlite3.Connection, content_id: bytes) -> Optional[ast.Module]:
+        """Return the parsed file-level tree for a ``contents.id``."""
+        if content_id in self._trees:
+            return self._trees[content_id]
+        return self.parse(content_id, self.source(conn, content_id))
+
+    @staticmethod
+    def _parse_source(source: str) -> Optional[ast.Module]:
+        if not source.strip():
+            return None
+        try:
+            return ast.parse(source)
+        except (SyntaxError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Method subtrees
+    # ------------------------------------------------------------------
+
+    def method_tree(
+        self,
+        conn: sqlite3.Connection,
+        content_id: bytes,
+        start_row: int,
+        end_row: int,
+        name: str,
+    ) -> Optional[ast.Module]:
+        """
+        Return a module wrapping the def that the entity span ``start_row..end_row``
+        (0-based, inclusive) covers, equivalent to parsing the dedented source slice.
+
+        The def node comes from the cached file-level tree; decorators above
+        ``start_row`` are dropped because the slice would not have contained them.
+        When the file does not parse or no def starts at the span, the dedented
+        slice is parsed instead and its line numbers are shifted to be file-absolute.
+        Returns ``None`` when neither yields a tree.
+        """
+        node = self._find_def(conn, content_id, start_row, name)
+        if node is not None:
+            decorators = [d for d in node.decorator_list if d.lineno - 1 >= start_row]
+            if len(decorators) != len(node.decorator_list):
+                node = copy.copy(node)
+                node.decorator_list = decorators
+            return ast.Module(body=[node], type_ignores=[])
+
+        key = (content_id, start_row, end_row)
+        if key not in self._slice_trees:
+            lines = self.source(conn, content_id).split("\n")
+            tree: Optional[ast.Module] = None
+            if start_row < len(lines) and end_row < len(lines):
+                snippet = "\n".join(lines[start_row:end_row + 1])
+                if snippet.strip():
+                    try:
+                        tree = ast.parse(textwrap.dedent(snippet))
+                        ast.increment_lineno(tree, start_row)
+                    except (SyntaxError, ValueError):
+                        tree = None
+            self._slice_trees[key] = tree
+        return self._slice_trees[key]
+
+    def _find_def(
+        self, conn: sqlite3.Connection, content_id: bytes, start_row: int, name: str
+    ) -> Optional[_FuncNode]:
+        index = self._def_index.get(content_id)
+        if index is None:
+            index = {}
+            tree = self.tree(conn, content_id)
+            if tree is not None:
+                for node in ast.walk(tree):
+                    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        continue
+                    # Entity spans start either at the `def` line or at a decorator line.
+                    rows = {node.lineno - 1} | {d.lineno - 1 for d in node.decorator_list}
+                    for row in rows:
+                        index.setdefault(row, []).append(node)
+            self._def_index[content_id] = index
+        for node in index.get(start_row, ()):
+            if node.name == name:
+                return node
+        return None
+
+    # ------------------------------------------------------------------
+    # On-disk layer
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, content_id: bytes) -> Optional[Path]:
+        if self._disk_dir is None:
+            return None
+        if self._disk_trusted is None:
+            try:
+                self._disk_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            except OSError:
+                pass
+            self._disk_trusted = _owned_private(self._disk_dir)
+            if not self._disk_trusted:
+                sys.stderr.write(
+                    f"[WARN] AST cache dir {self._disk_dir} is missing, not owned by this user or writable by "
+                    "others; not using it\n"
+                )
+        if not self._disk_trusted:
+            return None
+        return self._disk_dir / f"{content_id.hex()}.pickle"
+
+    def _disk_load(self, content_id: bytes) -> Optional[ast.Module]:
+        path = self._disk_path(content_id)
+        if path is None or not path.exists() or not _owned_private(path):
+            return None
+        try:
+            with path.open("rb") as fp:
+                tree = _AstUnpickler(fp).load()
+        except Exception:
+            return None
+        return tree if isinstance(tree, ast.Module) else None
+
+    def _disk_store(self, content_id: bytes, tree: Optional[ast.Module]) -> None:
+        path = self._disk_path(content_id)
+        if path is None or tree is None:
+            return
+        try:
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as fp:
+                pickle.dump(tree, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk layer is best-effort; a read-only cache dir only costs speed.
+            return
+
+
+_SHARED: Optional[AstCache] = None
+
+
+def shared_ast_cache() -> AstCache:
+    """Return the process-wide cache, honouring ``NEODEPENDS_AST_CACHE_DIR`` on first use."""
+    global _SHARED
+    if _SHARED is None:
+        env_dir = os.environ.get(CACHE_DIR_ENV)
+        _SHARED = AstCache(Path(env_dir) if env_dir else None)
+    return _SHARED
+
+
+def set_cache_dir(cache_dir: Optional[Path]) -> None:
+    """Configure the on-disk layer of the shared cache (``None`` disables it)."""
+    shared_ast_cache().set_cache_dir(cache_dir)
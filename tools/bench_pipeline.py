@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the post-processing stages of the export pipeline.
+
+For each scale (1x, 10x and 100x the base ``ProjectSpec`` file count by
+default) a synthetic project is generated (see synthetic_project.py), its
+sources and core DB are written to a work directory, and the stages run on it
+in-process, the way neodepends_python_export.py runs them:
+
+- Python: ``filter_dependencies``, ``enhance_python_dependencies`` (the full
+  ``run_enhancement`` sequence), ``detect_overrides``
+- Java: ``enhance_java_dependencies``, ``detect_overrides``
+- both: the per-file, file-level and full DV8 exports (each including its DB
+  load) and ``make_visualizations`` (DSM + graph views of the file-level DSM)
+
+Every scale runs in a fresh process, so no AST or snapshot cache carries over
+from a smaller scale.  Stages are recorded with ``StageProfiler`` (so
+``NEODEPENDS_PROFILE_DIR`` gives per-stage cProfile dumps) and reported as
+files per second.
+
+``--baseline`` compares each stage against a stored run.  Scaling efficiency
+is throughput at a scale divided by throughput at ``--reference-scale``
+(default 10x: the 1x run takes milliseconds per stage and is mostly noise);
+a stage regresses when its efficiency drops more than ``--tolerance`` below
+the baseline's.  That is the check for super-linear behaviour, and it holds
+across machines.  Every scale runs ``--repeat`` times (default 3) and the
+fastest run of each stage counts.  ``--absolute`` also compares raw files/sec,
+which is only meaningful on the machine that recorded the baseline.
+``--write-baseline`` records the current run; without it a missing baseline
+is an error.
+
+Usage:
+    python3 tools/bench_pipeline.py [--lang python|java|both] [--scales 1,10,100] [--files 20 ...]
+        [--baseline tests/fixtures/bench_pipeline_baseline.json] [--write-baseline] [--absolute]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from synthetic_project import LANGS, ProjectSpec, generate_project
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "bench_pipeline_baseline.json"
+
+DEFAULT_REFERENCE_SCALE = 10
+
+# Stage -> scale -> files per second.
+Throughput = Dict[str, Dict[str, float]]
+
+
+def _export_options(out_dir: Path) -> Dict[str, Any]:
+    return dict(
+        out_dir=out_dir,
+        focus_prefix=None,
+        include_root_py=True,
+        align_handcount=False,
+        dv8_hierarchy="structured",
+    )
+
+
+def run_scale(spec_json: Dict[str, int], lang: str, work_dir: str) -> Dict[str, Any]:
+    """Generate one project and time every stage on it; module-level so it runs in a worker process."""
+    # Imported here so the parent process never warms their caches.
+    from db_indexes import ensure_db_indexes
+    from detect_overrides import detect_overrides
+    from enhance_java_deps import enhance_java_dependencies
+    from enhance_python_deps import run_enhancement
+    from filter_false_positives import filter_dependencies
+    from make_visualizations import generate_dsm_html, generate_graph_html, load_dep_matrix
+    from neodepends_python_export import export_dv8_snapshot
+    from stage_profile import StageProfiler
+
+    spec = ProjectSpec(**spec_json)
+    root = Path(work_dir) / f"{lang}_{spec.files}"
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    project = generate_project(spec, lang)
+    project.write_sources(root)
+    raw_db = root / "dependencies.raw.db"
+    db = root / "dependencies.db"
+    project.write_core_db(raw_db)
+    ensure_db_indexes(raw_db)
+    out_dir = root / "out"
+    file_level = out_dir / "file-level.dv8-dependency.json"
+    options = _export_options(out_dir)
+
+    stages = StageProfiler(prefix=f"{lang}_{spec.files}_")
+    # The tools report progress on stdout; at 100x that is a lot of text.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if lang == "python":
+            with stages.stage("filter_dependencies", db_in=raw_db, db_out=db):
+                filter_dependencies(str(raw_db), str(db))
+            with stages.stage("enhance_python_dependencies", db_in=db, db_out=db):
+                run_enhancement(str(db), str(root), profile="stackgraphs")
+        else:
+            shutil.copyfile(raw_db, db)
+            with stages.stage("enhance_java_dependencies", db_in=db, db_out=db):
+                enhance_java_dependencies(db, root)
+        with stages.stage("detect_overrides", db_in=db, db_out=db):
+            detect_overrides(str(db), str(root))
+        with stages.stage("dv8_per_file", db_in=db):
+            export_dv8_snapshot(
+                db_path=db,
+                per_file=dict(
+                    options,
+                    include_external_targets=False,
+                    include_incoming_edges=False,
+                    only_py=False,
+                    write_clustering=True,
+                ),
+            )
+        with stages.stage("dv8_file_level", db_in=db):
+            export_dv8_snapshot(
+                db_path=db,
+                file_level=dict(
+                    options, output_path=file_level, include_external_target_files=False, include_self_edges=False
+                ),
+            )
+        with stages.stage("dv8_full", db_in=db):
+            export_dv8_snapshot(
+                db_path=db,
+                full=dict(
+                    options,
+                    output_path=out_dir / "full.dv8-dependency.json",
+                    include_external_targets=False,
+                    include_external_target_files=False,
+                    include_self_edges=False,
+                ),
+            )
+        with stages.stage("make_visualizations"):
+            matrix = load_dep_matrix(file_level)
+            generate_dsm_html(matrix.variables, matrix, out_dir / "dsm_view.html", title="DSM: synthetic")
+            generate_graph_html(matrix.variables, matrix, out_dir / "graph_view.html", title="Graph: synthetic")
+
+    return {
+        "files": spec.files,
+        "entities": len(project.entities),
+        "deps": len(project.deps),
+        "stages": stages.to_json(),
+    }
+
+
+def run_benchmark(
+    spec: ProjectSpec, lang: str, scales: List[int], work_dir: Path, *, repeat: int = 1
+) -> Dict[str, Any]:
+    """``{"spec", "scales", "runs", "files_per_sec"}`` for *lang*, best of *repeat* runs per scale."""
+    ctx = multiprocessing.get_context("spawn")
+    runs: List[Dict[str, Any]] = []
+    throughput: Throughput = {}
+    for scale in scales:
+        best: Optional[Dict[str, Any]] = None
+        for _ in range(max(1, repeat)):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                run = pool.submit(run_scale, spec.scaled(scale).to_json(), lang, str(work_dir)).result()
+            if best is None:
+                best = run
+            else:
+                for kept, new in zip(best["stages"], run["stages"]):
+                    if new["wall_sec"] < kept["wall_sec"]:
+                        kept.update(new)
+        assert best is not None
+        best["scale"] = scale
+        runs.append(best)
+        for record in best["stages"]:
+            throughput.setdefault(record["name"], {})[str(scale)] = round(
+                best["files"] / max(record["wall_sec"], 1e-6), 2
+            )
+    return {"spec": spec.to_json(), "scales": scales, "runs": runs, "files_per_sec": throughput}
+
+
+def check_against_baseline(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    tolerance: float,
+    absolute: bool = False,
+    reference_scale: int = DEFAULT_REFERENCE_SCALE,
+) -> List[str]:
+    """
+    Regressions of *current* against *baseline* (both from ``run_benchmark``), as messages.
+
+    Efficiency is measured against *reference_scale*, or the smallest scale
+    both runs have when they lack it.
+    """
+    if current["spec"] != baseline["spec"]:
+        return [f"baseline spec {baseline['spec']} differs from this run's {current['spec']}; re-record it"]
+    problems: List[str] = []
+    floor = 1.0 - tolerance
+    for stage, base_fps in baseline["files_per_sec"].items():
+        fps = current["files_per_sec"].get(stage)
+        if fps is None:
+            continue
+        scales = [s for s in base_fps if s in fps]
+        if not scales:
+            continue
+        ref = str(reference_scale) if str(reference_scale) in scales else min(scales, key=int)
+        for scale in scales:
+            if absolute and fps[scale] < base_fps[scale] * floor:
+                problems.append(
+                    f"{stage} @ {scale}x: {fps[scale]:.1f} files/s vs baseline {base_fps[scale]:.1f}"
+                )
+            if int(scale) <= int(ref):
+                continue
+            efficiency = fps[scale] / fps[ref]
+            base_efficiency = base_fps[scale] / base_fps[ref]
+            if efficiency < base_efficiency * floor:
+                problems.append(
+                    f"{stage} @ {scale}x: scaling efficiency {efficiency:.2f} vs baseline {base_efficiency:.2f} "
+                    f"(throughput relative to {ref}x)"
+                )
+    return problems
+
+
+def _print_table(lang: str, result: Dict[str, Any]) -> None:
+    print(f"\n[{lang}] files/sec per stage (entities, deps per scale: "
+          + ", ".join(f"{r['scale']}x={r['entities']}/{r['deps']}" for r in result["runs"]) + ")")
+    scales = [str(s) for s in result["scales"]]
+    print(f"{'stage':<30}" + "".join(f"{s + 'x':>12}" for s in scales) + f"{'peak MiB':>10}")
+    peaks: Dict[str, Optional[float]] = {}
+    for run in result["runs"]:
+        for record in run["stages"]:
+            peaks[record["name"]] = record["peak_rss_mb"]
+    for stage, fps in result["files_per_sec"].items():
+        cells = "".join(f"{fps[s]:>12.1f}" if s in fps else f"{'-':>12}" for s in scales)
+        print(f"{stage:<30}{cells}{peaks.get(stage) or '-':>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = ProjectSpec()
+    parser.add_argument("--lang", choices=[*LANGS, "both"], default="python")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated multiples of --files (default: 1,10,100)")
+    parser.add_argument("--files", type=int, default=defaults.files, help="Files at 1x")
+    parser.add_argument("--classes-per-file", type=int, default=defaults.classes_per_file)
+    parser.add_argument("--inheritance-depth", type=int, default=defaults.inheritance_depth)
+    parser.add_argument("--imports-per-file", type=int, default=defaults.imports_per_file)
+    parser.add_argument("--methods-per-class", type=int, default=defaults.methods_per_class)
+    parser.add_argument("--field-accesses", type=int, default=defaults.field_accesses, help="Fields per class, each read once per method")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scale; the fastest run of each stage counts (default: 3)")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Keep the generated projects and outputs here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true", help="Store this run as the baseline instead of checking")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed drop below the baseline (default: 0.2)")
+    parser.add_argument(
+        "--reference-scale",
+        type=int,
+        default=DEFAULT_REFERENCE_SCALE,
+        help=f"Scale that efficiency is measured against (default: {DEFAULT_REFERENCE_SCALE})",
+    )
+    parser.add_argument("--absolute", action="store_true", help="Also check raw files/sec (same machine only)")
+    parser.add_argument("--json-out", type=Path, default=None, help="Write the full results (stage records per scale) here")
+    args = parser.parse_args()
+
+    spec = ProjectSpec(
+        files=args.files,
+        classes_per_file=args.classes_per_file,
+        inheritance_depth=args.inheritance_depth,
+        imports_per_file=args.imports_per_file,
+        methods_per_class=args.methods_per_class,
+        field_accesses=args.field_accesses,
+        seed=args.seed,
+    )
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    langs = list(LANGS) if args.lang == "both" else [args.lang]
+
+    if not args.write_baseline and not args.baseline.exists():
+        print(f"[FAIL] No baseline at {args.baseline}; record one with --write-baseline")
+        return 1
+
+    tmp: Optional[tempfile.TemporaryDirectory] = None
+    if args.work_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_pipeline_")
+        work_dir = Path(tmp.name)
+    else:
+        work_dir = args.work_dir.expanduser().resolve()
+        work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        results = {lang: run_benchmark(spec, lang, scales, work_dir, repeat=args.repeat) for lang in langs}
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    for lang, result in results.items():
+        _print_table(lang, result)
+    if args.json_out is not None:
+        args.json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    stored: Dict[str, Any] = {}
+    if args.baseline.exists():
+        stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if args.write_baseline:
+        for lang, result in results.items():
+            stored[lang] = {k: result[k] for k in ("spec", "scales", "files_per_sec")}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(stored, indent=2) + "\n", encoding="utf-8")
+        print(f"\n[OK] Baseline written: {args.baseline}")
+        return 0
+
+    problems: List[str] = []
+    for lang, result in results.items():
+        if lang not in stored:
+            problems.append(f"{lang}: no baseline in {args.baseline}; record one with --write-baseline")
+            continue
+        problems += [f"{lang}: {p}" for p in check_against_baseline(
+            result,
+            stored[lang],
+            tolerance=args.tolerance,
+            absolute=args.absolute,
+            reference_scale=args.reference_scale,
+        )]
+    if problems:
+        print("\n[FAIL] Baseline check failed:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\n[OK] Within baseline tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
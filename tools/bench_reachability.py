@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the Extend-chain anchor check (``reachability.Reachability``).
+
+Generates synthetic class hierarchies -- files laid out in inheritance levels of
+bounded depth, each file extending one or two files of the level above (mixins)
+-- and times what the UseTransitive relabel and the import-scoped export gate do
+with them: build the reachability index over the Extend file pairs, then test
+one Use/Call file pair per file against it.
+
+The index is bounded to ``EXTEND_ANCHOR_HOPS`` like the two callers; the work
+per file is constant, so ``us/file`` should stay flat as the hierarchy grows.
+``--naive`` also times the pair-joining loop the gate used before (quadratic in
+the number of pairs per round) and checks both anchor the same pairs; use it
+with small sizes only.
+
+Usage:
+    python3 tools/bench_reachability.py [--sizes 1000,4000,16000,64000] [--depth 8] [--naive]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Dict, List, Set, Tuple
+
+from reachability import EXTEND_ANCHOR_HOPS, Reachability
+
+Pair = Tuple[int, int]
+
+
+def generate_hierarchy(n_files: int, *, depth: int, seed: int = 0) -> Tuple[List[Pair], List[Pair]]:
+    """
+    ``(extend_pairs, query_pairs)`` for *n_files* files spread over *depth* levels.
+
+    Every file below the top level extends one random file of the level above,
+    and every fourth file also extends a second one.  Queries pair each file
+    with a random file of any level (mostly unanchored, as in real projects).
+    """
+    rng = random.Random(seed)
+    per_level = max(1, n_files // depth)
+    levels = [list(range(i * per_level, min(n_files, (i + 1) * per_level))) for i in range(depth)]
+    levels = [lvl for lvl in levels if lvl]
+    extend: List[Pair] = []
+    for upper, lower in zip(levels, levels[1:]):
+        for f in lower:
+            extend.append((f, rng.choice(upper)))
+            if f % 4 == 0:
+                extend.append((f, rng.choice(upper)))
+    queries = [(f, rng.randrange(n_files)) for f in range(n_files)]
+    return extend, queries
+
+
+def naive_closure(extend: List[Pair]) -> Set[Pair]:
+    """Full transitive closure by joining every pair with every pair until nothing changes."""
+    closure = set(extend)
+    changed = True
+    while changed:
+        changed = False
+        new_pairs: Set[Pair] = set()
+        for a, b in closure:
+            for c, d in closure:
+                if b == c and (a, d) not in closure:
+                    new_pairs.add((a, d))
+        if new_pairs:
+            closure |= new_pairs
+            changed = True
+    return closure
+
+
+def naive_anchor_pairs(extend: List[Pair]) -> Set[Pair]:
+    """
+    The gate's old anchor loop: join Extend pairs with each other until no new
+    anchor appears.  The joined set never grows, so it anchors two-hop chains.
+    """
+    pairs = set(extend)
+    anchors = set(extend)
+    changed = True
+    while changed:
+        changed = False
+        new_pairs: Set[Pair] = set()
+        for a, b in pairs:
+            for c, d in pairs:
+                if b == c and (a, d) not in anchors:
+                    new_pairs.add((a, d))
+        if new_pairs:
+            anchors |= new_pairs
+            changed = True
+    return anchors
+
+
+def run_benchmark(sizes: List[int], *, depth: int, naive: bool = False) -> List[Dict[str, float]]:
+    rows: List[Dict[str, float]] = []
+    for n in sizes:
+        extend, queries = generate_hierarchy(n, depth=depth)
+        t0 = time.perf_counter()
+        reach = Reachability(extend, max_hops=EXTEND_ANCHOR_HOPS)
+        anchored = sum(1 for a, b in queries if reach.reaches(a, b))
+        elapsed = time.perf_counter() - t0
+        row: Dict[str, float] = {
+            "files": n,
+            "extend_pairs": len(extend),
+            "anchored": anchored,
+            "sec": round(elapsed, 4),
+            "us_per_file": round(elapsed / n * 1e6, 2),
+        }
+        if naive:
+            t0 = time.perf_counter()
+            anchors = naive_anchor_pairs(extend)
+            row["naive_sec"] = round(time.perf_counter() - t0, 4)
+            if sum(1 for q in queries if q in anchors) != anchored:
+                raise AssertionError(f"reachability disagrees with the naive anchor loop at {n} files")
+        rows.append(row)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,4000,16000,64000", help="Comma-separated file counts")
+    parser.add_argument("--depth", type=int, default=8, help="Inheritance levels (default: 8)")
+    parser.add_argument("--naive", action="store_true", help="Also time the old pairwise anchor loop (slow)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    rows = run_benchmark(sizes, depth=args.depth, naive=args.naive)
+    header = f"{'files':>8} {'extend':>8} {'anchored':>9} {'sec':>9} {'us/file':>9}"
+    if args.naive:
+        header += f" {'naive sec':>10}"
+    print(header)
+    for row in rows:
+        line = (
+            f"{row['files']:>8} {row['extend_pairs']:>8} {row['anchored']:>9} "
+            f"{row['sec']:>9.4f} {row['us_per_file']:>9.2f}"
+        )
+        if args.naive:
+            line += f" {row['naive_sec']:>10.4f}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Multi-commit batch mode for neodepends_python_export.py (``--commits``).
+
+One NeoDepends run with ``--structure=<commit>`` per commit extracts every
+commit into a single DB: the core tags each file once per distinct
+(path, blob), so entities and contents of files that did not change are shared
+by all the commits that contain them, and each dep carries the ``commit_id`` it
+was resolved in.
+
+``CommitSlicer`` cuts that DB into one ordinary single-commit DB per commit
+(the entities of the files at that commit's paths and blobs, the deps stamped
+with that commit and the contents they reference), so the usual
+post-processing and DV8 export run unchanged on each.  The batch driver enhances
+the commits oldest first through one ``--incremental-enhance`` manifest, so
+every commit only re-analyses the files that changed since the previous one
+(plus their reverse dependents).
+
+``CommitIndexWriter`` collects the post-processed commits into one
+commit-indexed DB: the union of entities and contents, every dep stamped with
+its commit, and a ``commits`` table giving the order.  Both the slices and the
+index DB carry the pipeline indexes (``db_indexes``).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from db_indexes import create_indexes
+from graph_model import GraphModel
+from pipeline_errors import PreflightError
+
+# Tables a single-commit DB carries over from the batch DB.
+_SLICE_TABLES = ("entities", "deps", "contents")
+
+
+def _git(repo: Path, *args: str) -> str:
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(repo), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        detail = getattr(exc, "stderr", None) or str(exc)
+        raise PreflightError(
+            f"git {' '.join(args)} failed in {repo}.\n       Detail: {detail.strip()}"
+        ) from exc
+    return proc.stdout
+
+
+def resolve_commits(repo: Path, spec: str) -> List[str]:
+    """
+    Full commit hashes for *spec*, oldest first.
+
+    *spec* is a range (``A..B``, as ``git rev-list --reverse``), ``@<file>`` with
+    one revision per line (``#`` comments allowed), or a comma-separated list of
+    revisions kept in the given order.  Duplicates are dropped.
+    """
+    spec = spec.strip()
+    if spec.startswith("@"):
+        path = Path(spec[1:]).expanduser()
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError as exc:
+            raise PreflightError(f"Cannot read the commit list {path}.\n       Detail: {exc}") from exc
+        revs = [ln.split("#", 1)[0].strip() for ln in text.splitlines()]
+    elif ".." in spec:
+        revs = _git(repo, "rev-list", "--reverse", spec).split()
+    else:
+        revs = [r.strip() for r in spec.split(",")]
+    out: List[str] = []
+    seen = set()
+    for rev in revs:
+        if not rev:
+            continue
+        sha = _git(repo, "rev-parse", "--verify", "--end-of-options", f"{rev}^{{commit}}").strip()
+        if sha not in seen:
+            seen.add(sha)
+            out.append(sha)
+    if not out:
+        raise PreflightError(
+            f"--commits {spec!r} selects no commits in {repo}.\n"
+            "       Pass a range (A..B), a comma-separated list or @file with one commit per line."
+        )
+    return out
+
+
+def commit_files(repo: Path, sha: str) -> Dict[str, bytes]:
+    """``path -> blob id`` (20 raw bytes, as NeoDepends stores ``content_id``) of every file at *sha*."""
+    files: Dict[str, bytes] = {}
+    for record in _git(repo, "ls-tree", "-r", "-z", "--full-tree", sha).split("\0"):
+        if not record:
+            continue
+        info, path = record.split("\t", 1)
+        _mode, kind, obj = info.split()
+        if kind == "blob":
+            files[path] = bytes.fromhex(obj)
+    return files
+
+
+class CommitSlicer:
+    """Writes single-commit DBs out of a multi-commit NeoDepends DB."""
+
+    def __init__(self, batch_db: Path) -> None:
+        self.conn = sqlite3.connect(str(batch_db))
+        self.schema: Dict[str, str] = {
+            name: sql
+            for name, sql in self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+            if name in _SLICE_TABLES
+        }
+        # Deps are read once per commit; without an index every commit would scan them all.
+        self.conn.execute("CREATE INDEX IF NOT EXISTS deps_commit_id ON deps(commit_id)")
+        self.conn.commit()
+
+        cur = self.conn.execute("SELECT * FROM entities")
+        self.entity_columns = [d[0] for d in cur.description]
+        self.entity_rows = cur.fetchall()
+        col = {name: i for i, name in enumerate(self.entity_columns)}
+        graph = GraphModel()
+        graph.add_entities(
+            (r[col["id"]], r[col["parent_id"]], r[col["kind"]], r[col["name"]], r[col["content_id"]])
+            for r in self.entity_rows
+        )
+        file_of = graph.nearest("File")
+        row_of = {r[col["id"]]: r for r in self.entity_rows}
+        # (file name, content id) -> entity rows of that file version.
+        self._members: Dict[Tuple[str, Optional[bytes]], List[tuple]] = {}
+        for i, f in enumerate(file_of):
+            if f < 0:
+                continue
+            key = (graph.name[f], graph.contents[graph.content[f]])
+            self._members.setdefault(key, []).append(row_of[graph.ids[i]])
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def write(self, sha: str, files: Dict[str, bytes], out_db: Path) -> Tuple[int, int]:
+        """Write the slice for commit *sha* (whose tree is *files*) to *out_db*; returns ``(entities, deps)``."""
+        rows: List[tuple] = []
+        for path, blob in files.items():
+            rows.extend(self._members.get((path, blob), ()))
+        out_db.parent.mkdir(parents=True, exist_ok=True)
+        if out_db.exists():
+            out_db.unlink()
+        out = sqlite3.connect(str(out_db))
+        try:
+            for name in _SLICE_TABLES:
+                out.execute(self.schema[name])
+            marks = ", ".join("?" * len(self.entity_columns))
+            out.executemany(f"INSERT OR IGNORE INTO entities VALUES ({marks})", rows)
+            deps = self.conn.execute(
+                "SELECT src, tgt, kind, row, commit_id FROM deps WHERE commit_id = ? ORDER BY rowid",
+                (bytes.fromhex(sha),),
+            ).fetchall()
+            out.executemany("INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, ?, ?, ?)", deps)
+            blobs = sorted({blob for blob in files.values()})
+            for i in range(0, len(blobs), 500):
+                chunk = blobs[i : i + 500]
+                out.executemany(
+                    "INSERT OR IGNORE INTO contents (id, content) VALUES (?, ?)",
+                    self.conn.execute(
+                        f"SELECT id, content FROM contents WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                    ),
+                )
+            create_indexes(out)
+        finally:
+            out.close()
+        return len(rows), len(deps)
+
+
+class CommitIndexWriter:
+    """Accumulates post-processed single-commit DBs into one commit-indexed DB."""
+
+    def __init__(self, path: Path, schema: Dict[str, str]) -> None:
+        if path.exists():
+            path.unlink()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        for name in _SLICE_TABLES:
+            self.conn.execute(schema[name])
+        self.conn.execute(
+            "CREATE TABLE commits (seq INTEGER PRIMARY KEY, commit_id BLOB NOT NULL, sha TEXT NOT NULL, "
+            "entities INTEGER NOT NULL, deps INTEGER NOT NULL)"
+        )
+
+    def add(self, seq: int, sha: str, commit_db: Path) -> None:
+        commit_id = bytes.fromhex(sha)
+        conn = self.conn
+        conn.execute("ATTACH DATABASE ? AS c", (str(commit_db),))
+        try:
+            conn.execute("INSERT OR IGNORE INTO entities SELECT * FROM c.entities")
+            conn.execute("INSERT OR IGNORE INTO contents SELECT * FROM c.contents")
+            # Enhancement-added deps may not carry a commit id; in the index every dep does.
+            conn.execute(
+                "INSERT INTO deps (src, tgt, kind, row, commit_id) SELECT src, tgt, kind, row, ? FROM c.deps",
+                (commit_id,),
+            )
+            n_entities = conn.execute("SELECT COUNT(*) FROM c.entities").fetchone()[0]
+            n_deps = conn.execute("SELECT COUNT(*) FROM c.deps").fetchone()[0]
+            conn.execute("INSERT INTO commits VALUES (?, ?, ?, ?, ?)", (seq, commit_id, sha, n_entities, n_deps))
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE c")
+
+    def close(self) -> None:
+        self.conn.execute("CREATE INDEX IF NOT EXISTS deps_commit_id ON deps(commit_id)")
+        create_indexes(self.conn)
+        self.conn.close()
+
+
+def commit_tags(commits: Sequence[str]) -> List[str]:
+    """Directory names for *commits*: ``<seq>_<short sha>``, zero-padded so they sort in commit order."""
+    width = max(4, len(str(max(len(commits) - 1, 0))))
+    return [f"{i:0{width}d}_{sha[:12]}" for i, sha in enumerate(commits)]
+
+
+def structure_args(commits: Iterable[str]) -> List[str]:
+    """NeoDepends arguments that extract entities, deps and contents from every commit."""
+    return [f"--structure={sha}" for sha in commits]
@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 import argparse
+import gzip
 import json
-from collections import Counter, defaultdict
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Set
 
+from edge_diff import Edge, EdgeDiff, NameFn, NameView, Stage, TableStage
+from per_file_diff_report import write_reports
 
-Edge = Tuple[str, str, str]
 
 def _normalize_to_handcount_name(name: str) -> str:
     """
@@ -171,26 +173,6 @@ def _strip_prefixes(name: str, prefixes: Sequence[str]) -> str:
     return name
 
 
-def _maybe_strip_prefixes(edges: Set[Edge], prefixes: Sequence[str]) -> Set[Edge]:
-    if not prefixes:
-        return edges
-    out: Set[Edge] = set()
-    for s, t, k in edges:
-        out.add((_strip_prefixes(s, prefixes), _strip_prefixes(t, prefixes), k))
-    return out
-
-
-def _exclude_prefixes(edges: Set[Edge], prefixes: Sequence[str]) -> Set[Edge]:
-    if not prefixes:
-        return edges
-    out: Set[Edge] = set()
-    for s, t, k in edges:
-        if any(s.startswith(p) or t.startswith(p) for p in prefixes):
-            continue
-        out.add((s, t, k))
-    return out
-
-
 def _expand_prefixes(raw: Sequence[str] | None) -> List[str]:
     if not raw:
         return []
@@ -203,16 +185,12 @@ def _expand_prefixes(raw: Sequence[str] | None) -> List[str]:
     return out
 
 
-def _maybe_normalize_java(edges: Set[Edge], *, normalize_java: bool) -> Set[Edge]:
-    if not normalize_java:
-        return edges
-    looks_java = any(".java/" in s or ".java/" in t for s, t, _k in edges)
-    if not looks_java:
-        return edges
-    out: Set[Edge] = set()
-    for s, t, k in edges:
-        out.add((_normalize_java_name(s), _normalize_java_name(t), k))
-    return out
+def _looks_java(view: NameView) -> bool:
+    return any(".java/" in name for name in view.names)
+
+
+def _java_naming_stage(view: NameView) -> Optional[NameFn]:
+    return _normalize_java_name if _looks_java(view) else None
 
 
 def _java_parse_entity(name: str) -> Optional[Dict[str, str]]:
@@ -255,9 +233,8 @@ def _java_parse_entity(name: str) -> Optional[Dict[str, str]]:
     }
 
 
-def _normalize_java_declaration_site(edges: Set[Edge]) -> Set[Edge]:
-    if not edges:
-        return edges
+def _java_declaration_site_renamer(edges: Iterable[Edge]) -> NameFn:
+    """Maps a Java method/field name to the class declaring it, following Extend edges."""
 
     # Build inheritance map from Extend edges
     bases_by_class: Dict[str, List[str]] = defaultdict(list)
@@ -322,44 +299,27 @@ def _normalize_java_declaration_site(edges: Set[Edge]) -> Set[Edge]:
             return f"{file_part}/{decl_cls}/fields/{info['member']} (Field)"
         return f"{file_part}/{decl_cls} (Class)"
 
-    out: Set[Edge] = set()
-    for s, t, k in edges:
-        s_info = _java_parse_entity(s)
-        t_info = _java_parse_entity(t)
-        new_s = s
-        new_t = t
-        if s_info and s_info["kind"] in {"Method", "Field"}:
-            decl = resolve_decl_class(s_info["class"], s_info["kind"], s_info["member"])
-            if decl != s_info["class"]:
-                new_s = rebuild(s_info, decl)
-        if t_info and t_info["kind"] in {"Method", "Field"}:
-            decl = resolve_decl_class(t_info["class"], t_info["kind"], t_info["member"])
-            if decl != t_info["class"]:
-                new_t = rebuild(t_info, decl)
-        out.add((new_s, new_t, k))
-    return out
-
+    def rename(name: str) -> str:
+        info = _java_parse_entity(name)
+        if info and info["kind"] in {"Method", "Field"}:
+            decl = resolve_decl_class(info["class"], info["kind"], info["member"])
+            if decl != info["class"]:
+                return rebuild(info, decl)
+        return name
 
-def _maybe_normalize_java_decl_site(edges: Set[Edge], *, normalize_decl_site: bool) -> Set[Edge]:
-    if not normalize_decl_site:
-        return edges
-    looks_java = any(".java/" in s or ".java/" in t for s, t, _k in edges)
-    if not looks_java:
-        return edges
-    return _normalize_java_declaration_site(edges)
+    return rename
 
 
-def _maybe_normalize_neodepends(edges: Set[Edge], *, normalize_professor: bool) -> Set[Edge]:
-    if not normalize_professor:
-        return edges
-    out: Set[Edge] = set()
-    for s, t, k in edges:
-        out.add((_normalize_to_handcount_name(s), _normalize_to_handcount_name(t), k))
-    return out
+def _java_declaration_site_stage(view: NameView) -> Optional[NameFn]:
+    # Sorted edges, so the inheritance tables do not depend on set order.
+    return _java_declaration_site_renamer(view.edges()) if _looks_java(view) else None
 
 
 def _read_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
+    # The exporter's --gzip-json writes analysis-result.json.gz.
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="ignore") as fh:
+        return fh.read()
 
 
 def _edges_from_dv8(dv8: dict) -> Set[Edge]:
@@ -393,11 +353,116 @@ def _edges_from_json(path: Path) -> Set[Edge]:
     raise ValueError(f"Unsupported ground truth format: {path}")
 
 
-def _kind_counts(edges: Iterable[Edge]) -> Dict[str, int]:
-    c = Counter()
-    for _s, _t, k in edges:
-        c[k] += 1
-    return dict(c)
+def _stages(
+    *,
+    neodepends: bool,
+    normalize_professor: bool,
+    normalize_java: bool,
+    normalize_java_decl_site: bool,
+    strip_prefixes: Sequence[str],
+) -> List[Stage]:
+    """Normalisation stages of one side, in the order they apply."""
+    stages: List[Stage] = []
+    if neodepends and normalize_professor:
+        stages.append(_normalize_to_handcount_name)
+    if normalize_java:
+        stages.append(TableStage(_java_naming_stage))
+    if normalize_java_decl_site:
+        stages.append(TableStage(_java_declaration_site_stage))
+    if strip_prefixes:
+        stages.append(lambda name: _strip_prefixes(name, strip_prefixes))
+    return stages
+
+
+def compare_files(
+    ground_truth: Path,
+    neodepends_dv8: Path,
+    *,
+    normalize_professor: bool = False,
+    normalize_java: bool = False,
+    normalize_java_decl_site: bool = False,
+    strip_prefixes: Sequence[str] | None = None,
+    exclude_prefixes: Sequence[str] | None = None,
+) -> EdgeDiff:
+    """
+    Diff a ground truth edge list (or DV8 json) against a NeoDepends DV8 json.
+
+    The keyword options are those of the CLI flags; prefixes may be
+    comma-separated like on the command line.
+    """
+    strip = _expand_prefixes(strip_prefixes)
+    exclude = tuple(_expand_prefixes(exclude_prefixes))
+    options = dict(
+        normalize_professor=normalize_professor,
+        normalize_java=normalize_java,
+        normalize_java_decl_site=normalize_java_decl_site,
+        strip_prefixes=strip,
+    )
+    return EdgeDiff.build(
+        _edges_from_json(ground_truth.expanduser().resolve()),
+        _edges_from_json(neodepends_dv8.expanduser().resolve()),
+        gt_stages=_stages(neodepends=False, **options),
+        nd_stages=_stages(neodepends=True, **options),
+        exclude=(lambda name: name.startswith(exclude)) if exclude else None,
+    )
+
+
+def write_diff_json(diff: EdgeDiff, out_path: Path, *, ground_truth: Path, neodepends_dv8: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(
+        json.dumps(
+            {
+                "ground_truth": str(ground_truth),
+                "neodepends_dv8": str(neodepends_dv8),
+                "ground_truth_count": diff.count("gt"),
+                "neodepends_count": diff.count("nd"),
+                "ground_truth_kinds": diff.kind_counts("gt"),
+                "neodepends_kinds": diff.kind_counts("nd"),
+                "missing": diff.edges("missing"),
+                "extra": diff.edges("extra"),
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+
+def write_diff_markdown(diff: EdgeDiff, out_md: Path, *, ground_truth: Path, neodepends_dv8: Path) -> None:
+    missing = diff.edges("missing")
+    extra = diff.edges("extra")
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    lines: List[str] = []
+    lines.append("# DV8 vs Ground Truth Diff")
+    lines.append("")
+    lines.append(f"- Ground truth: `{ground_truth}`")
+    lines.append(f"- NeoDepends DV8: `{neodepends_dv8}`")
+    lines.append(f"- Ground truth edges: `{diff.count('gt')}`")
+    lines.append(f"- NeoDepends edges: `{diff.count('nd')}`")
+    lines.append(f"- Missing: `{len(missing)}`")
+    lines.append(f"- Extra: `{len(extra)}`")
+    lines.append("")
+    lines.append("## Kind Counts")
+    lines.append("")
+    lines.append(f"- Ground truth: `{diff.kind_counts('gt')}`")
+    lines.append(f"- NeoDepends: `{diff.kind_counts('nd')}`")
+    lines.append("")
+    lines.append(f"## Missing ({len(missing)})")
+    lines.append("")
+    if missing:
+        for src, tgt, k in missing:
+            lines.append(f"- `{k}`: `{src}` -> `{tgt}`")
+    else:
+        lines.append("- (none)")
+    lines.append("")
+    lines.append(f"## Extra ({len(extra)})")
+    lines.append("")
+    if extra:
+        for src, tgt, k in extra:
+            lines.append(f"- `{k}`: `{src}` -> `{tgt}`")
+    else:
+        lines.append("- (none)")
+    lines.append("")
+    out_md.write_text("\n".join(lines), encoding="utf-8")
 
 
 def main() -> int:
@@ -407,6 +472,12 @@ def main() -> int:
     parser.add_argument("--show", type=int, default=30)
     parser.add_argument("--out", type=Path, default=None, help="Optional JSON diff output path")
     parser.add_argument("--out-md", type=Path, default=None, help="Optional Markdown diff output path (writes full Missing/Extra lists)")
+    parser.add_argument(
+        "--per-file-out-dir",
+        type=Path,
+        default=None,
+        help="Optional directory for per-file Missing/Extra reports (as per_file_diff_report.py writes them)",
+    )
     parser.add_argument(
         "--normalize-neodepends-professor",
         action="store_true",
@@ -439,28 +510,21 @@ def main() -> int:
     )
     args = parser.parse_args()
 
-    gt = _edges_from_json(args.ground_truth.expanduser().resolve())
-    nd = _edges_from_json(args.neodepends_dv8.expanduser().resolve())
-    nd = _maybe_normalize_neodepends(nd, normalize_professor=bool(args.normalize_neodepends_professor))
-    gt = _maybe_normalize_java(gt, normalize_java=bool(args.normalize_java_handcount))
-    nd = _maybe_normalize_java(nd, normalize_java=bool(args.normalize_java_handcount))
-    gt = _maybe_normalize_java_decl_site(gt, normalize_decl_site=bool(args.normalize_java_declaration_site))
-    nd = _maybe_normalize_java_decl_site(nd, normalize_decl_site=bool(args.normalize_java_declaration_site))
-    prefixes = _expand_prefixes(args.strip_prefix)
-    if prefixes:
-        gt = _maybe_strip_prefixes(gt, prefixes)
-        nd = _maybe_strip_prefixes(nd, prefixes)
-    exclude_prefixes = _expand_prefixes(args.exclude_prefix)
-    if exclude_prefixes:
-        gt = _exclude_prefixes(gt, exclude_prefixes)
-        nd = _exclude_prefixes(nd, exclude_prefixes)
-
-    missing = sorted(gt - nd)
-    extra = sorted(nd - gt)
+    diff = compare_files(
+        args.ground_truth,
+        args.neodepends_dv8,
+        normalize_professor=bool(args.normalize_neodepends_professor),
+        normalize_java=bool(args.normalize_java_handcount),
+        normalize_java_decl_site=bool(args.normalize_java_declaration_site),
+        strip_prefixes=args.strip_prefix,
+        exclude_prefixes=args.exclude_prefix,
+    )
+    missing = diff.edges("missing")
+    extra = diff.edges("extra")
 
     print("=== DV8 vs Ground Truth ===")
-    print(f"Ground truth edges: {len(gt)}  kinds={_kind_counts(gt)}")
-    print(f"NeoDepends edges:   {len(nd)}  kinds={_kind_counts(nd)}")
+    print(f"Ground truth edges: {diff.count('gt')}  kinds={diff.kind_counts('gt')}")
+    print(f"NeoDepends edges:   {diff.count('nd')}  kinds={diff.kind_counts('nd')}")
     print(f"Missing: {len(missing)}  Extra: {len(extra)}")
 
     if missing:
@@ -474,62 +538,23 @@ def main() -> int:
 
     if args.out is not None:
         out_path = args.out.expanduser().resolve()
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(
-            json.dumps(
-                {
-                    "ground_truth": str(args.ground_truth),
-                    "neodepends_dv8": str(args.neodepends_dv8),
-                    "ground_truth_count": len(gt),
-                    "neodepends_count": len(nd),
-                    "ground_truth_kinds": _kind_counts(gt),
-                    "neodepends_kinds": _kind_counts(nd),
-                    "missing": missing,
-                    "extra": extra,
-                },
-                indent=2,
-            ),
-            encoding="utf-8",
-        )
+        write_diff_json(diff, out_path, ground_truth=args.ground_truth, neodepends_dv8=args.neodepends_dv8)
         print(f"\n[OK] Wrote diff: {out_path}")
 
     if args.out_md is not None:
         out_md = args.out_md.expanduser().resolve()
-        out_md.parent.mkdir(parents=True, exist_ok=True)
-        lines: List[str] = []
-        lines.append("# DV8 vs Ground Truth Diff")
-        lines.append("")
-        lines.append(f"- Ground truth: `{args.ground_truth}`")
-        lines.append(f"- NeoDepends DV8: `{args.neodepends_dv8}`")
-        lines.append(f"- Ground truth edges: `{len(gt)}`")
-        lines.append(f"- NeoDepends edges: `{len(nd)}`")
-        lines.append(f"- Missing: `{len(missing)}`")
-        lines.append(f"- Extra: `{len(extra)}`")
-        lines.append("")
-        lines.append("## Kind Counts")
-        lines.append("")
-        lines.append(f"- Ground truth: `{_kind_counts(gt)}`")
-        lines.append(f"- NeoDepends: `{_kind_counts(nd)}`")
-        lines.append("")
-        lines.append(f"## Missing ({len(missing)})")
-        lines.append("")
-        if missing:
-            for src, tgt, k in missing:
-                lines.append(f"- `{k}`: `{src}` -> `{tgt}`")
-        else:
-            lines.append("- (none)")
-        lines.append("")
-        lines.append(f"## Extra ({len(extra)})")
-        lines.append("")
-        if extra:
-            for src, tgt, k in extra:
-                lines.append(f"- `{k}`: `{src}` -> `{tgt}`")
-        else:
-            lines.append("- (none)")
-        lines.append("")
-        out_md.write_text("\n".join(lines), encoding="utf-8")
+        write_diff_markdown(diff, out_md, ground_truth=args.ground_truth, neodepends_dv8=args.neodepends_dv8)
         print(f"[OK] Wrote diff markdown: {out_md}")
 
+    if args.per_file_out_dir is not None:
+        out_dir = args.per_file_out_dir.expanduser().resolve()
+        write_reports(
+            diff,
+            out_dir,
+            sources=[("Ground truth", str(args.ground_truth)), ("NeoDepends DV8", str(args.neodepends_dv8))],
+        )
+        print(f"[OK] Wrote per-file diff reports to: {out_dir}")
+
     return 0
 
 
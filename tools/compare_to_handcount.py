@@ -21,8 +21,9 @@ import re
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set
 
+from graph_model import GraphModel, iter_rows
 
 KINDS = ("Import", "Extend", "Create", "Call", "Use", "Parameter", "Cast")
 
@@ -71,22 +72,6 @@ def _connect_ro(db_path: Path) -> sqlite3.Connection:
     return sqlite3.connect(f"file:{db_path.resolve()}?immutable=1", uri=True)
 
 
-def _fetch_file_of_entity(cur: sqlite3.Cursor, entity_id: bytes) -> Optional[str]:
-    # Walk parent pointers until we hit a File.
-    seen: Set[bytes] = set()
-    current = entity_id
-    while current and current not in seen:
-        seen.add(current)
-        row = cur.execute("SELECT parent_id, kind, name FROM entities WHERE id = ?", (current,)).fetchone()
-        if not row:
-            return None
-        parent_id, kind, name = row
-        if kind == "File":
-            return name
-        current = parent_id
-    return None
-
-
 def compute_db_counts(
     db_path: Path,
     *,
@@ -99,27 +84,24 @@ def compute_db_counts(
     con = _connect_ro(db_path)
     cur = con.cursor()
 
-    # Preload entity kinds for quick filtering.
-    kind_by_id: Dict[bytes, str] = {}
-    file_by_id: Dict[bytes, Optional[str]] = {}
-
-    for entity_id, kind in cur.execute("SELECT id, kind FROM entities").fetchall():
-        kind_by_id[entity_id] = kind
+    # Preload entity kinds and owning File names (one pass over the parent pointers).
+    graph = GraphModel.from_db(con, deps=False)
+    kind_by_id: Dict[bytes, str] = {eid: graph.kinds[graph.kind[i]] for i, eid in enumerate(graph.ids)}
+    file_by_id: Dict[bytes, Optional[str]] = {
+        eid: (graph.name[j] if j >= 0 else None) for eid, j in zip(graph.ids, graph.ancestry().file)
+    }
 
     def file_of(entity_id: bytes) -> Optional[str]:
-        if entity_id in file_by_id:
-            return file_by_id[entity_id]
-        name = _fetch_file_of_entity(cur, entity_id)
-        file_by_id[entity_id] = name
-        return name
+        return file_by_id.get(entity_id)
 
-    edges_seen: Set[Tuple[bytes, bytes, str]] = set()
     out: Dict[str, Dict[str, int]] = {f: {k: 0 for k in KINDS} for f in scope_files}
 
-    for src, tgt, dep_kind in cur.execute("SELECT src, tgt, kind FROM deps").fetchall():
-        if dep_kind not in KINDS:
-            continue
-
+    # SQLite drops the uncounted kinds and the duplicate (src, tgt, kind) triples;
+    # the rest is streamed in chunks instead of being held in a list and a seen-set.
+    rows = cur.execute(
+        f"SELECT DISTINCT src, tgt, kind FROM deps WHERE kind IN ({', '.join('?' * len(KINDS))})", KINDS
+    )
+    for src, tgt, dep_kind in iter_rows(rows):
         src_kind = kind_by_id.get(src)
         tgt_kind = kind_by_id.get(tgt)
         if not src_kind or not tgt_kind:
@@ -150,11 +132,6 @@ def compute_db_counts(
             if not (src_kind == "Method" and tgt_kind == "Field"):
                 continue
 
-        key = (src, tgt, dep_kind)
-        if key in edges_seen:
-            continue
-        edges_seen.add(key)
-
         out.setdefault(src_file, {k: 0 for k in KINDS})
         out[src_file][dep_kind] += 1
 
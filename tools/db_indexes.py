@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Secondary indexes for the NeoDepends DBs the pipeline works on.
+
+The core writes ``entities`` and ``deps`` with no index beyond the
+``entities.id`` primary key, while the post-processing tools keep asking for
+``deps WHERE src / tgt IN (...)``, ``deps WHERE kind = ...``,
+``entities WHERE parent_id = ?`` and ``entities WHERE kind = 'File'``.  The
+exporter creates ``PIPELINE_INDEXES`` right after the core step, and on every
+per-file and per-commit DB it writes, so those lookups are index searches
+instead of table scans.
+
+Indexes make bulk rewrites slower (every deleted, updated or inserted row also
+updates each index), so phases that rewrite ``deps`` run inside
+``bulk_mutation(conn, rows)``.  When the block changes at least
+``BULK_MIN_ROWS`` rows and ``BULK_MIN_SHARE`` of the table, the pipeline
+indexes on that table are dropped, the block runs against the bare table and
+the indexes are rebuilt afterwards in one sorted pass each; a rebuild costs a
+sort of the whole table, so smaller batches keep their indexes and pay the
+per-row updates instead.  The drop and the rebuild run in the caller's
+transaction (SQLite DDL is transactional), so a caller that rolls back gets
+its indexes back as well.  On a DB without the indexes it does nothing.
+
+``TOOL_QUERIES`` lists the lookup shapes the tools issue; the CLI prints their
+``EXPLAIN QUERY PLAN`` so the effect of the indexes can be checked on any DB:
+
+    python3 tools/db_indexes.py <dependencies.db> [--explain] [--drop]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+# name -> indexed columns.  Created with IF NOT EXISTS, so re-running is cheap.
+PIPELINE_INDEXES: Dict[str, str] = {
+    "deps_src": "deps(src, tgt)",
+    "deps_tgt": "deps(tgt)",
+    "deps_kind": "deps(kind)",
+    "entities_parent_kind": "entities(parent_id, kind)",
+    "entities_kind": "entities(kind)",
+}
+
+# bulk_mutation() drops and rebuilds a table's indexes only for blocks that
+# change at least this many rows and this share of the table.
+BULK_MIN_ROWS = 10_000
+BULK_MIN_SHARE = 0.2
+
+# (label, query, params) for the lookups the post-processing tools repeat.
+TOOL_QUERIES: List[Tuple[str, str, Sequence[object]]] = [
+    ("deps by kind", "SELECT src, tgt FROM deps WHERE kind = ?", ("Import",)),
+    ("deps by src set", "SELECT src, tgt, kind FROM deps WHERE src IN (?, ?)", (b"", b"")),
+    ("deps by tgt set", "SELECT src, tgt, kind, rowid FROM deps WHERE kind IN (?, ?) AND tgt IN (?)", ("Import", "ImportLazy", b"")),
+    ("dep exists", "SELECT 1 FROM deps WHERE src = ? AND tgt = ? AND kind = ? AND row = ? LIMIT 1", (b"", b"", "Use", 0)),
+    ("children", "SELECT id, name, kind FROM entities WHERE parent_id = ?", (b"",)),
+    ("children of kind", "SELECT id, name FROM entities WHERE parent_id = ? AND kind = ?", (b"", "Method")),
+    ("entities by kind", "SELECT id, name, content_id FROM entities WHERE kind = ?", ("File",)),
+    ("entity by id", "SELECT name, kind FROM entities WHERE id = ?", (b"",)),
+]
+
+
+def existing_indexes(conn: sqlite3.Connection) -> Set[str]:
+    """Names of the ``PIPELINE_INDEXES`` present in *conn*."""
+    return {
+        name
+        for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        if name in PIPELINE_INDEXES
+    }
+
+
+def _indexed_table(name: str) -> str:
+    return PIPELINE_INDEXES[name].split("(", 1)[0]
+
+
+def _create(conn: sqlite3.Connection, names: Sequence[str]) -> List[str]:
+    present = existing_indexes(conn)
+    created = [name for name in names if name not in present]
+    for name in created:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {PIPELINE_INDEXES[name]}")
+    return created
+
+
+def _drop(conn: sqlite3.Connection, table: Optional[str] = None) -> List[str]:
+    dropped = sorted(name for name in existing_indexes(conn) if table is None or _indexed_table(name) == table)
+    for name in dropped:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    return dropped
+
+
+def create_indexes(conn: sqlite3.Connection, names: Sequence[str] = tuple(PIPELINE_INDEXES)) -> List[str]:
+    """Create the missing indexes among *names* and commit; returns the ones created."""
+    created = _create(conn, names)
+    conn.commit()
+    return created
+
+
+def drop_indexes(conn: sqlite3.Connection) -> List[str]:
+    """Drop the pipeline indexes present in *conn* and commit; returns the ones dropped."""
+    dropped = _drop(conn)
+    conn.commit()
+    return dropped
+
+
+@contextlib.contextmanager
+def bulk_mutation(conn: sqlite3.Connection, rows: int, table: str = "deps") -> Iterator[List[str]]:
+    """
+    Run a block that changes about *rows* rows of *table*.
+
+    Large rewrites (see ``BULK_MIN_ROWS`` / ``BULK_MIN_SHARE``) run without the
+    pipeline indexes on *table*, which are rebuilt afterwards.  Nothing is
+    committed here.  Yields the names of the indexes dropped for the block.
+    """
+    # MAX(rowid) is a size estimate that does not scan the table.
+    size = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    dropped: List[str] = []
+    if rows >= BULK_MIN_ROWS and rows >= size * BULK_MIN_SHARE:
+        dropped = _drop(conn, table)
+    try:
+        yield dropped
+    finally:
+        _create(conn, dropped)
+
+
+def ensure_db_indexes(db_path: Path) -> List[str]:
+    """``create_indexes`` on the DB at *db_path*."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return create_indexes(conn)
+    finally:
+        conn.close()
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()) -> List[str]:
+    """The ``detail`` lines of ``EXPLAIN QUERY PLAN`` for *sql*."""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Create (or drop) the pipeline indexes of a NeoDepends DB.")
+    parser.add_argument("database_path", type=Path)
+    parser.add_argument("--drop", action="store_true", help="Drop the pipeline indexes instead of creating them")
+    parser.add_argument("--explain", action="store_true", help="Print the query plan of each tool lookup afterwards")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(str(args.database_path))
+    try:
+        if args.drop:
+            print(f"Dropped: {', '.join(drop_indexes(conn)) or 'none'}")
+        else:
+            print(f"Created: {', '.join(create_indexes(conn)) or 'none (all present)'}")
+        if args.explain:
+            for label, sql, params in TOOL_QUERIES:
+                print(f"{label}: {' | '.join(query_plan(conn, sql, params))}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -30,17 +30,18 @@ from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
 from collections import defaultdict
 
+from ast_cache import shared_ast_cache
+from edge_sink import EdgeSink
+from graph_model import fetch_all
+
 
 # =============================================================================
 # Common Database Functions
 # =============================================================================
 
 def get_file_content(content_id: bytes, conn: sqlite3.Connection) -> str:
-    """Fetch file content from the contents table."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT content FROM contents WHERE id = ?", (content_id,))
-    result = cursor.fetchone()
-    return result[0] if result else ""
+    """Fetch file content from the contents table (memoized in the shared AST cache)."""
+    return shared_ast_cache().source(conn, content_id)
 
 
 def get_all_classes(conn: sqlite3.Connection) -> Dict[bytes, Tuple[str, bytes]]:
@@ -58,39 +59,29 @@ def get_all_classes(conn: sqlite3.Connection) -> Dict[bytes, Tuple[str, bytes]]:
     """)
 
     result = {}
-    for class_id, class_name, content_id in cursor.fetchall():
+    for class_id, class_name, content_id in fetch_all(cursor):
         result[class_id] = (class_name, content_id)
     return result
 
 
-def get_class_by_name(conn: sqlite3.Connection, class_name: str, content_id: bytes) -> Optional[bytes]:
-    """Find class ID by name and content_id (file)."""
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id
-        FROM entities
-        WHERE kind = 'Class' AND name = ? AND content_id = ?
-    """, (class_name, content_id))
-
-    result = cursor.fetchone()
-    return result[0] if result else None
-
-
-def get_class_methods(conn: sqlite3.Connection, class_id: bytes) -> Dict[str, bytes]:
+def get_all_class_methods(conn: sqlite3.Connection) -> Dict[bytes, Dict[str, bytes]]:
     """
-    Get all methods belonging to a class.
+    Get the methods of every class in one scan.
 
     Returns:
-        Dict mapping method_name -> method_id
+        Dict mapping class_id -> {method_name -> method_id}
     """
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT id, name
+        SELECT parent_id, id, name
         FROM entities
-        WHERE parent_id = ? AND kind = 'Method'
-    """, (class_id,))
+        WHERE kind = 'Method'
+    """)
 
-    return {name: method_id for method_id, name in cursor.fetchall()}
+    result: Dict[bytes, Dict[str, bytes]] = defaultdict(dict)
+    for class_id, method_id, name in fetch_all(cursor):
+        result[class_id][name] = method_id
+    return result
 
 
 def build_all_ancestors(class_id: bytes, inheritance: Dict[bytes, List[bytes]],
@@ -131,13 +122,26 @@ def build_all_ancestors(class_id: bytes, inheritance: Dict[bytes, List[bytes]],
     return ancestors
 
 
+class AncestorTable(dict):
+    """Memoised ``build_all_ancestors``: ``table[class_id]`` is computed on first use."""
+
+    def __init__(self, inheritance: Dict[bytes, List[bytes]]):
+        super().__init__()
+        self.inheritance = inheritance
+
+    def __missing__(self, class_id: bytes) -> List[bytes]:
+        ancestors = build_all_ancestors(class_id, self.inheritance)
+        self[class_id] = ancestors
+        return ancestors
+
+
 def build_inheritance_map(conn: sqlite3.Connection) -> Dict[bytes, List[bytes]]:
     """Build inheritance map from Extend dependencies in database."""
     cursor = conn.cursor()
     cursor.execute("SELECT src, tgt FROM deps WHERE kind = 'Extend'")
 
     inheritance: Dict[bytes, List[bytes]] = defaultdict(list)
-    for child_id, parent_id in cursor.fetchall():
+    for child_id, parent_id in fetch_all(cursor):
         inheritance[child_id].append(parent_id)
 
     return inheritance
@@ -156,7 +160,7 @@ def detect_language(conn: sqlite3.Connection) -> str:
     """
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM entities WHERE kind = 'File' LIMIT 20")
-    files = [row[0] for row in cursor.fetchall()]
+    files = [row[0] for row in fetch_all(cursor)]
 
     python_count = sum(1 for f in files if f.endswith('.py'))
     java_count = sum(1 for f in files if f.endswith('.java'))
@@ -236,15 +240,42 @@ class PythonClassAnalyzer(ast.NodeVisitor):
         self.generic_visit(node)
 
 
-def analyze_python_file(file_content: str) -> Dict[str, Dict]:
-    """Parse Python file and analyze all classes."""
-    try:
-        tree = ast.parse(file_content)
-        analyzer = PythonClassAnalyzer()
-        analyzer.visit(tree)
-        return analyzer.classes
-    except SyntaxError:
-        return {}
+def analyze_python_file(file_content: str, content_id: Optional[bytes] = None) -> Dict[str, Dict]:
+    """Parse Python file and analyze all classes.
+
+    With ``content_id`` the tree comes from the shared AST cache instead of a fresh parse.
+    """
+    if content_id is not None:
+        tree = shared_ast_cache().parse(content_id, file_content)
+        if tree is None:
+            return {}
+    else:
+        try:
+            tree = ast.parse(file_content)
+        except SyntaxError:
+            return {}
+    analyzer = PythonClassAnalyzer()
+    analyzer.visit(tree)
+    return analyzer.classes
+
+
+def analyze_python_classes(
+    conn: sqlite3.Connection, all_classes: Dict[bytes, Tuple[str, bytes]]
+) -> Dict[bytes, Dict[str, Dict]]:
+    """
+    ``analyze_python_file`` once per distinct file content of *all_classes*.
+
+    Returns:
+        Dict mapping content_id -> {class_name -> class_info} (empty for files
+        without content or that fail to parse)
+    """
+    result: Dict[bytes, Dict[str, Dict]] = {}
+    for _class_name, content_id in all_classes.values():
+        if content_id in result:
+            continue
+        file_content = get_file_content(content_id, conn)
+        result[content_id] = analyze_python_file(file_content, content_id) if file_content else {}
+    return result
 
 
 def add_python_extend_dependencies(conn: sqlite3.Connection) -> int:
@@ -266,14 +297,18 @@ def add_python_extend_dependencies(conn: sqlite3.Connection) -> int:
     print("    No Extend dependencies found, extracting from Python AST...")
 
     all_classes = get_all_classes(conn)
+    class_info_by_content = analyze_python_classes(conn, all_classes)
     extends_to_add: List[Tuple[bytes, bytes]] = []
 
+    # First class per (name, file) and per name, as the per-base lookups returned.
+    class_by_name_and_content: Dict[Tuple[str, bytes], bytes] = {}
+    class_by_name: Dict[str, bytes] = {}
     for class_id, (class_name, content_id) in all_classes.items():
-        file_content = get_file_content(content_id, conn)
-        if not file_content:
-            continue
+        class_by_name_and_content.setdefault((class_name, content_id), class_id)
+        class_by_name.setdefault(class_name, class_id)
 
-        class_info = analyze_python_file(file_content)
+    for class_id, (class_name, content_id) in all_classes.items():
+        class_info = class_info_by_content[content_id]
         if class_name not in class_info:
             continue
 
@@ -281,25 +316,16 @@ def add_python_extend_dependencies(conn: sqlite3.Connection) -> int:
             if base_name == 'ABC':
                 continue
 
-            parent_id = get_class_by_name(conn, base_name, content_id)
-            if not parent_id:
-                for pid, (pname, _) in all_classes.items():
-                    if pname == base_name:
-                        parent_id = pid
-                        break
+            parent_id = class_by_name_and_content.get((base_name, content_id)) or class_by_name.get(base_name)
 
             if parent_id:
                 extends_to_add.append((class_id, parent_id))
                 print(f"    Found: {class_name} extends {base_name}")
 
     print(f"  Inserting {len(extends_to_add)} Extend dependencies...")
-    for child_id, parent_id in extends_to_add:
-        cursor.execute("""
-            INSERT INTO deps (src, tgt, kind, row, commit_id)
-            VALUES (?, ?, 'Extend', 0, NULL)
-        """, (child_id, parent_id))
-
-    conn.commit()
+    with EdgeSink(conn) as sink:
+        for child_id, parent_id in extends_to_add:
+            sink.add(child_id, parent_id, "Extend")
     return len(extends_to_add)
 
 
@@ -319,19 +345,17 @@ def detect_python_overrides(conn: sqlite3.Connection, source_root: str) -> int:
 
     print("\nStep 2: Detecting @abstractmethod overrides (direct + transitive)...")
 
-    cursor = conn.cursor()
     inheritance = build_inheritance_map(conn)
     print(f"  Found {len(inheritance)} classes with inheritance")
 
     all_classes = get_all_classes(conn)
+    class_info_by_content = analyze_python_classes(conn, all_classes)
+    methods_by_class = get_all_class_methods(conn)
+    ancestors_of = AncestorTable(inheritance)
     abstract_methods: Dict[bytes, Set[str]] = {}
 
     for class_id, (class_name, content_id) in all_classes.items():
-        file_content = get_file_content(content_id, conn)
-        if not file_content:
-            continue
-
-        class_info = analyze_python_file(file_content)
+        class_info = class_info_by_content[content_id]
         if class_name in class_info and class_info[class_name]['abstract_methods']:
             abstract_methods[class_id] = class_info[class_name]['abstract_methods']
             print(f"    Class {class_name} has abstract methods: {class_info[class_name]['abstract_methods']}")
@@ -344,19 +368,17 @@ def detect_python_overrides(conn: sqlite3.Connection, source_root: str) -> int:
 
     for child_class_id in all_classes.keys():
         child_class_name = all_classes[child_class_id][0]
-        child_methods = get_class_methods(conn, child_class_id)
+        child_methods = methods_by_class.get(child_class_id)
 
         if not child_methods:
             continue
 
-        all_ancestors = build_all_ancestors(child_class_id, inheritance)
-
-        for ancestor_id in all_ancestors:
+        for ancestor_id in ancestors_of[child_class_id]:
             if ancestor_id not in abstract_methods:
                 continue
 
             ancestor_class_name = all_classes[ancestor_id][0]
-            ancestor_methods = get_class_methods(conn, ancestor_id)
+            ancestor_methods = methods_by_class.get(ancestor_id, {})
 
             for abstract_method_name in abstract_methods[ancestor_id]:
                 if abstract_method_name in child_methods and abstract_method_name in ancestor_methods:
@@ -373,13 +395,9 @@ def detect_python_overrides(conn: sqlite3.Connection, source_root: str) -> int:
                         print(f"    Override ({override_type}): {child_class_name}.{abstract_method_name} -> {ancestor_class_name}.{abstract_method_name}")
 
     print(f"  Inserting {len(overrides_to_add)} Override dependencies...")
-    for child_method_id, parent_method_id in overrides_to_add:
-        cursor.execute("""
-            INSERT INTO deps (src, tgt, kind, row, commit_id)
-            VALUES (?, ?, 'Override', 0, NULL)
-        """, (child_method_id, parent_method_id))
-
-    conn.commit()
+    with EdgeSink(conn) as sink:
+        for child_method_id, parent_method_id in overrides_to_add:
+            sink.add(child_method_id, parent_method_id, "Override")
     return len(overrides_to_add)
 
 
@@ -415,7 +433,6 @@ def detect_java_overrides(conn: sqlite3.Connection, source_root: str) -> int:
     """
     print("\nStep 1: Building Java inheritance tree...")
 
-    cursor = conn.cursor()
     inheritance = build_inheritance_map(conn)
     print(f"  Found {len(inheritance)} classes with inheritance")
 
@@ -426,25 +443,28 @@ def detect_java_overrides(conn: sqlite3.Connection, source_root: str) -> int:
     print("\nStep 2: Detecting @Override annotations...")
 
     all_classes = get_all_classes(conn)
+    methods_by_class = get_all_class_methods(conn)
+    ancestors_of = AncestorTable(inheritance)
+    override_names_by_content: Dict[bytes, List[str]] = {}
     overrides_to_add: List[Tuple[bytes, bytes]] = []
     seen_overrides: Set[Tuple[bytes, bytes]] = set()
 
     for class_id, (class_name, content_id) in all_classes.items():
-        file_content = get_file_content(content_id, conn)
-        if not file_content:
-            continue
-
-        # Find methods with @Override annotation
-        override_method_names = find_java_override_methods(file_content)
+        # Find methods with @Override annotation (once per file)
+        override_method_names = override_names_by_content.get(content_id)
+        if override_method_names is None:
+            file_content = get_file_content(content_id, conn)
+            override_method_names = find_java_override_methods(file_content) if file_content else []
+            override_names_by_content[content_id] = override_method_names
         if not override_method_names:
             continue
 
-        child_methods = get_class_methods(conn, class_id)
+        child_methods = methods_by_class.get(class_id)
         if not child_methods:
             continue
 
         # Get all ancestors
-        all_ancestors = build_all_ancestors(class_id, inheritance)
+        all_ancestors = ancestors_of[class_id]
         if not all_ancestors:
             continue
 
@@ -460,7 +480,7 @@ def detect_java_overrides(conn: sqlite3.Connection, source_root: str) -> int:
                     continue
 
                 ancestor_class_name = all_classes[ancestor_id][0]
-                ancestor_methods = get_class_methods(conn, ancestor_id)
+                ancestor_methods = methods_by_class.get(ancestor_id, {})
 
                 if method_name in ancestor_methods:
                     ancestor_method_id = ancestor_methods[method_name]
@@ -476,13 +496,9 @@ def detect_java_overrides(conn: sqlite3.Connection, source_root: str) -> int:
                     break  # Only link to first ancestor with this method
 
     print(f"  Inserting {len(overrides_to_add)} Override dependencies...")
-    for child_method_id, parent_method_id in overrides_to_add:
-        cursor.execute("""
-            INSERT INTO deps (src, tgt, kind, row, commit_id)
-            VALUES (?, ?, 'Override', 0, NULL)
-        """, (child_method_id, parent_method_id))
-
-    conn.commit()
+    with EdgeSink(conn) as sink:
+        for child_method_id, parent_method_id in overrides_to_add:
+            sink.add(child_method_id, parent_method_id, "Override")
     return len(overrides_to_add)
 
 
@@ -490,14 +506,19 @@ def detect_java_overrides(conn: sqlite3.Connection, source_root: str) -> int:
 # Main Entry Point
 # =============================================================================
 
-def detect_overrides(db_path: str, source_root: str) -> int:
+def detect_overrides(db_path: str, source_root: str, conn: Optional[sqlite3.Connection] = None) -> int:
     """
     Main entry point - detects language and dispatches to appropriate handler.
 
+    An already-open ``conn`` (in-process pipeline mode) is used as-is and left
+    open for the caller.
+
     Returns:
         Number of Override dependencies added
     """
-    conn = sqlite3.Connection(db_path)
+    owns_conn = conn is None
+    if conn is None:
+        conn = sqlite3.Connection(db_path)
 
     print(f"Analyzing database: {db_path}")
     print(f"Source root: {source_root}")
@@ -514,7 +535,8 @@ def detect_overrides(db_path: str, source_root: str) -> int:
         print(f"Override detection not supported for language: {lang}")
         override_count = 0
 
-    conn.close()
+    if owns_conn:
+        conn.close()
     return override_count
 
 
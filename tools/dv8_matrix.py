@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Sparse DV8 dependency matrix with integer-packed cells.
+
+The exporter used to build a matrix as ``Dict[(src, dest), Dict[kind, float]]``
+(one small dict per cell), rebuild the keys when reordering the variables, and
+make_visualizations.py then re-aggregated the cells it loaded into yet another
+dict per view.  ``CellMatrix`` keeps one ``Counter`` keyed by a single int per
+(src, dest, kind) -- ``src << 48 | dest << 16 | kind_id`` -- so adding an edge
+is one dict update, ``reordered`` remaps each key with two shifts, and
+``cells()`` sorts the keys once, under the final variable order, for whichever
+consumer walks them (the streaming JSON writer, the DSM and graph views).
+
+Within a cell, kinds keep the order in which they were first added, so the
+written JSON is the same as with the dict-of-dicts builder.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+_KIND_BITS = 16
+_INDEX_BITS = 32
+_KIND_MASK = (1 << _KIND_BITS) - 1
+_INDEX_MASK = (1 << _INDEX_BITS) - 1
+_SRC_SHIFT = _INDEX_BITS + _KIND_BITS
+
+Cell = Tuple[int, int, Dict[str, float]]
+
+
+class CellMatrix:
+    """Variables plus ``packed (src, dest, kind) -> weight`` counts."""
+
+    def __init__(self, variables: Optional[Iterable[str]] = None) -> None:
+        self.variables: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.kinds: List[str] = []
+        self._kind_ids: Dict[str, int] = {}
+        self.counts: Counter = Counter()
+        for name in variables or ():
+            self.variable(name)
+
+    def variable(self, name: str) -> int:
+        """Index of *name*, appending it to the variables if it is new."""
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.variables)
+            self.variables.append(name)
+        return i
+
+    def _key(self, src: int, dest: int, kind: str) -> int:
+        k = self._kind_ids.get(kind)
+        if k is None:
+            k = self._kind_ids[kind] = len(self.kinds)
+            if k > _KIND_MASK:
+                raise ValueError(f"More than {_KIND_MASK + 1} dependency kinds")
+            self.kinds.append(kind)
+        return (src << _SRC_SHIFT) | (dest << _KIND_BITS) | k
+
+    def add(self, src: int, dest: int, kind: str, weight: float = 1.0, *, collapse: bool = False) -> None:
+        """Count one *kind* edge between two variable indices (*collapse*: weight stays 1)."""
+        key = self._key(src, dest, kind)
+        if collapse:
+            self.counts[key] = 1.0
+        else:
+            self.counts[key] += weight
+
+    def add_edges(self, edges: Iterable[Tuple[str, str, str]], *, collapse: bool = False) -> None:
+        variable, add = self.variable, self.add
+        for src, tgt, kind in edges:
+            add(variable(src), variable(tgt), kind, collapse=collapse)
+
+    @classmethod
+    def from_cells(cls, variables: List[str], cells: Iterable[Mapping[str, Any]]) -> "CellMatrix":
+        """
+        Matrix of DV8 JSON *cells*; cells pointing outside *variables* are dropped.
+
+        Variables keep their file positions, repeated names included, so every
+        cell index still points at the variable it was written against;
+        ``index`` maps a repeated name to its first position.
+        """
+        matrix = cls()
+        matrix.variables = list(variables)
+        for i, name in enumerate(matrix.variables):
+            matrix.index.setdefault(name, i)
+        n = len(matrix.variables)
+        for cell in cells:
+            s, d = cell.get("src", -1), cell.get("dest", -1)
+            if s < 0 or s >= n or d < 0 or d >= n:
+                continue
+            for kind, value in (cell.get("values") or {}).items():
+                matrix.add(s, d, kind, value)
+        return matrix
+
+    def reordered(self, order: List[int]) -> "CellMatrix":
+        """The matrix with ``variables[order[i]]`` moved to position ``i``."""
+        out = CellMatrix()
+        out.variables = [self.variables[i] for i in order]
+        for i, name in enumerate(out.variables):
+            out.index.setdefault(name, i)
+        out.kinds, out._kind_ids = self.kinds, self._kind_ids
+        old_to_new = [0] * len(self.variables)
+        for new, old in enumerate(order):
+            old_to_new[old] = new
+        out.counts = Counter({
+            (old_to_new[key >> _SRC_SHIFT] << _SRC_SHIFT)
+            | (old_to_new[(key >> _KIND_BITS) & _INDEX_MASK] << _KIND_BITS)
+            | (key & _KIND_MASK): weight
+            for key, weight in self.counts.items()
+        })
+        return out
+
+    def sorted_by(self, sort_key: Callable[[str], Any]) -> "CellMatrix":
+        if not self.variables:
+            return self
+        variables = self.variables
+        return self.reordered(sorted(range(len(variables)), key=lambda i: sort_key(variables[i])))
+
+    def cells(self) -> Iterator[Cell]:
+        """``(src, dest, {kind: weight})`` in (src, dest) order."""
+        kinds = self.kinds
+        # The sort is stable, so kinds stay in insertion order within a cell.
+        keys = sorted(self.counts, key=lambda key: key >> _KIND_BITS)
+        counts = self.counts
+        i, n = 0, len(keys)
+        while i < n:
+            cell = keys[i] >> _KIND_BITS
+            values: Dict[str, float] = {}
+            while i < n and keys[i] >> _KIND_BITS == cell:
+                values[kinds[keys[i] & _KIND_MASK]] = counts[keys[i]]
+                i += 1
+            yield cell >> _INDEX_BITS, cell & _INDEX_MASK, values
+
@@ -19,6 +19,7 @@ v0.3.10 development — NeoDepends (FreeworkEarth fork)
 """
 
 import argparse
+import gzip
 import json
 import sys
 from collections import Counter
@@ -119,8 +120,9 @@ def compute_dynamism_score(edges: List[Tuple[str, str, str]]) -> Dict[str, Any]:
 
 
 def load_edges_from_dv8_dep(path: Path) -> List[Tuple[str, str, str]]:
-    """Load edges from a dv8-dependency JSON (the handcount format)."""
-    with open(path) as f:
+    """Load edges from a dv8-dependency JSON (the handcount format; ``.json.gz`` too)."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
         data = json.load(f)
 
     # Format: list of [src, tgt, kind] triples
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Partitioned set-diff of two edge lists (ground truth vs NeoDepends).
+
+compare_dv8_to_ground_truth.py used to hold each side as a set of
+``(src, tgt, kind)`` strings, rebuild the whole set once per normalisation
+pass (professor naming, Java naming, declaration site, prefix strip, prefix
+exclude) and diff the two sets at the end.  ``EdgeDiff.build`` instead:
+
+- interns node names and kinds to ints, so every edge is an int triple;
+- runs a side's normalisation stages once per distinct *name*, with
+  consecutive name-level stages composed into one function.  A
+  ``TableStage`` (e.g. declaration-site resolution) first sees the names and
+  edges normalised so far and returns the name map to apply, or ``None`` to
+  skip;
+- maps each edge to its final names once, drops excluded edges and buckets the
+  rest by (source file, kind), so Missing/Extra are set differences per
+  partition.
+
+per_file_diff_report.py writes its reports straight from the partitions.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+Edge = Tuple[str, str, str]
+NameFn = Callable[[str], str]
+
+EXTERNAL = "__external__"
+
+_PY_FILE_RE = re.compile(r"^(.*?\.py)(?:/|\b|$)")
+
+
+def file_key(node_name: str) -> str:
+    """Source file of a node name (the prefix up to ``.py``), or ``__external__``."""
+    match = _PY_FILE_RE.match(node_name)
+    if match:
+        return match.group(1)
+    return EXTERNAL
+
+
+class NameView:
+    """The names and edges of one side as normalised by the stages so far."""
+
+    def __init__(self, names: List[str], edges: Set[Tuple[int, int, int]], kinds: List[str]) -> None:
+        self._names = names
+        self._edges = edges
+        self._kinds = kinds
+        self._edge_list: Optional[List[Edge]] = None
+
+    @property
+    def names(self) -> List[str]:
+        """Current name of every distinct input name (may repeat)."""
+        return self._names
+
+    def edges(self) -> List[Edge]:
+        """Distinct current edges, sorted."""
+        if self._edge_list is None:
+            names, kinds = self._names, self._kinds
+            self._edge_list = sorted({(names[s], names[t], kinds[k]) for s, t, k in self._edges})
+        return self._edge_list
+
+
+@dataclass(frozen=True)
+class TableStage:
+    """A stage built from the whole side: ``build(view)`` returns a name map or ``None``."""
+
+    build: Callable[[NameView], Optional[NameFn]]
+
+
+Stage = Union[NameFn, TableStage]
+
+
+def _compose(fns: Sequence[NameFn]) -> NameFn:
+    if len(fns) == 1:
+        return fns[0]
+
+    def composed(name: str) -> str:
+        for fn in fns:
+            name = fn(name)
+        return name
+
+    return composed
+
+
+class _Interner:
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+def _normalised_names(
+    edges: Iterable[Edge], stages: Sequence[Stage], kinds: _Interner
+) -> Tuple[List[str], Set[Tuple[int, int, int]]]:
+    """``(final name per local id, distinct local edges)`` for one side."""
+    local = _Interner()
+    raw: Set[Tuple[int, int, int]] = {(local(s), local(t), kinds(k)) for s, t, k in edges}
+    names = list(local.values)
+    pending: List[NameFn] = []
+
+    def flush() -> None:
+        if pending:
+            fn = _compose(pending)
+            names[:] = [fn(n) for n in names]
+            pending.clear()
+
+    for stage in stages:
+        if isinstance(stage, TableStage):
+            flush()
+            fn = stage.build(NameView(names, raw, kinds.values))
+            if fn is not None:
+                pending.append(fn)
+        else:
+            pending.append(stage)
+    flush()
+    return names, raw
+
+
+@dataclass
+class Partition:
+    """Edges of one (source file, kind) bucket as ``(src, tgt)`` name ids."""
+
+    gt: Set[Tuple[int, int]] = field(default_factory=set)
+    nd: Set[Tuple[int, int]] = field(default_factory=set)
+    missing: Set[Tuple[int, int]] = field(default_factory=set)
+    extra: Set[Tuple[int, int]] = field(default_factory=set)
+
+
+SIDES = ("gt", "nd", "missing", "extra")
+
+
+class EdgeDiff:
+    """Ground truth vs NeoDepends edges, interned and partitioned by (source file, kind)."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.partitions: Dict[Tuple[str, str], Partition] = {}
+        self._by_file: Optional[Dict[str, List[Tuple[str, Partition]]]] = None
+
+    def _partition(self, key: Tuple[str, str]) -> Partition:
+        part = self.partitions.get(key)
+        if part is None:
+            part = self.partitions[key] = Partition()
+        return part
+
+    @classmethod
+    def build(
+        cls,
+        gt_edges: Iterable[Edge],
+        nd_edges: Iterable[Edge],
+        *,
+        gt_stages: Sequence[Stage] = (),
+        nd_stages: Sequence[Stage] = (),
+        exclude: Optional[Callable[[str], bool]] = None,
+    ) -> "EdgeDiff":
+        """
+        Normalise each side with its stages, drop edges with an endpoint for
+        which *exclude* is true, and partition what is left.
+        """
+        diff = cls()
+        final = _Interner()
+        kinds = _Interner()
+        excluded: Dict[int, bool] = {}
+
+        def keep(name_id: int) -> bool:
+            hit = excluded.get(name_id)
+            if hit is None:
+                hit = excluded[name_id] = bool(exclude(final.values[name_id])) if exclude else False
+            return not hit
+
+        for side, edges, stages in (("gt", gt_edges, gt_stages), ("nd", nd_edges, nd_stages)):
+            names, raw = _normalised_names(edges, stages, kinds)
+            ids = [final(n) for n in names]
+            for s, t, k in raw:
+                src, tgt = ids[s], ids[t]
+                if not (keep(src) and keep(tgt)):
+                    continue
+                getattr(diff._partition((file_key(final.values[src]), kinds.values[k])), side).add((src, tgt))
+        for part in diff.partitions.values():
+            part.missing = part.gt - part.nd
+            part.extra = part.nd - part.gt
+        diff.names = final.values
+        return diff
+
+    @classmethod
+    def from_lists(cls, gt_edges: Iterable[Edge], missing: Iterable[Edge], extra: Iterable[Edge]) -> "EdgeDiff":
+        """
+        A diff from a ground truth and the Missing/Extra lists of an earlier
+        comparison, taken as given; NeoDepends is ``(GT - missing) | extra``.
+        """
+        diff = cls()
+        names = _Interner()
+        sets: Dict[str, Set[Edge]] = {"gt": set(gt_edges), "missing": set(missing), "extra": set(extra)}
+        sets["nd"] = (sets["gt"] - sets["missing"]) | sets["extra"]
+        for side, edges in sets.items():
+            for src, tgt, kind in edges:
+                getattr(diff._partition((file_key(src), kind)), side).add((names(src), names(tgt)))
+        diff.names = names.values
+        return diff
+
+    def _strings(self, part: Partition, side: str, kind: str) -> List[Edge]:
+        names = self.names
+        return [(names[s], names[t], kind) for s, t in getattr(part, side)]
+
+    def _file_index(self) -> Dict[str, List[Tuple[str, Partition]]]:
+        if self._by_file is None:
+            self._by_file = {}
+            for (f, kind), part in self.partitions.items():
+                self._by_file.setdefault(f, []).append((kind, part))
+        return self._by_file
+
+    def files(self) -> List[str]:
+        return sorted(self._file_index())
+
+    def file_edges(self, file: str, side: str) -> List[Edge]:
+        """Sorted *side* edges (one of ``SIDES``) whose source is in *file*."""
+        out: List[Edge] = []
+        for kind, part in self._file_index().get(file, ()):
+            out.extend(self._strings(part, side, kind))
+        return sorted(out)
+
+    def edges(self, side: str) -> List[Edge]:
+        """All *side* edges, sorted."""
+        out: List[Edge] = []
+        for (_f, kind), part in self.partitions.items():
+            out.extend(self._strings(part, side, kind))
+        return sorted(out)
+
+    def count(self, side: str) -> int:
+        return sum(len(getattr(part, side)) for part in self.partitions.values())
+
+    def kind_counts(self, side: str) -> Dict[str, int]:
+        """``kind -> number of *side* edges``, kinds in sorted order, zero counts left out."""
+        counts: Counter = Counter()
+        for (_f, kind), part in self.partitions.items():
+            n = len(getattr(part, side))
+            if n:
+                counts[kind] += n
+        return dict(sorted(counts.items()))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Buffered ``deps`` writer for the post-processing tools.
+
+enhance_python_deps.py, detect_overrides.py and enhance_java_deps.py add edges
+one at a time while they walk the project.  ``EdgeSink`` collects those rows and
+writes them with one ``executemany`` per batch, so the cost of a run grows with
+the number of edges instead of with the number of INSERT statements issued.
+
+Callers keep their own in-memory "already present" sets for deduplication (the
+key differs per edge family: ``(src, tgt)`` for file imports, ``(src, tgt, kind)``
+for method edges); the sink only buffers.  Rows are written in the order they
+were added.  A caller that reads, updates or deletes ``deps`` rows must
+``flush()`` first -- the DB then holds exactly what unbuffered inserts would
+have produced, including rowid order.
+
+While a sink is open the connection also runs with scratch-DB pragmas
+(``journal_mode=WAL``, ``synchronous=OFF``, ``temp_store=MEMORY``): the
+pipeline's working DB is rebuilt from the NeoDepends output on every run, so
+durability per statement buys nothing.  ``close()`` flushes, commits and puts
+the connection back into rollback-journal mode, which checkpoints the WAL into
+the main file -- the exporter reads the DB with ``immutable=1`` and would not
+see pages left in a ``-wal`` file.
+
+Use the sink as a context manager (``with EdgeSink(conn) as sink:``) so the
+journal mode is restored on errors too: leaving the block normally closes the
+sink; an exception drops the buffered rows, rolls back the open transaction
+and restores the pragmas before it propagates.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, List, Optional, Tuple
+
+from stage_profile import note_rows_written
+
+
+_INSERT = "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, ?, ?, ?)"
+
+DepRow = Tuple[bytes, bytes, str, int, Optional[bytes]]
+
+
+class EdgeSink:
+    """Buffers new ``deps`` rows for one connection and writes them in batches."""
+
+    def __init__(self, conn: sqlite3.Connection, *, batch_size: int = 10000, scratch_pragmas: bool = True) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self.written = 0
+        self._pending: List[DepRow] = []
+        self._restore: Optional[Tuple[str, int, int]] = None
+        if scratch_pragmas:
+            self._apply_scratch_pragmas()
+
+    def add(self, src: bytes, tgt: bytes, kind: str, row: int = 0, commit_id: Optional[bytes] = None) -> None:
+        self._pending.append((src, tgt, kind, row, commit_id))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write all buffered rows; returns how many were written."""
+        if not self._pending:
+            return 0
+        n = len(self._pending)
+        self.conn.executemany(_INSERT, self._pending)
+        self._pending = []
+        self.written += n
+        note_rows_written(n)
+        return n
+
+    def __enter__(self) -> "EdgeSink":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        self._pending = []
+        self.conn.rollback()
+        self._restore_pragmas()
+
+    def close(self) -> None:
+        """Flush, commit and restore the connection's journal/sync settings."""
+        self.flush()
+        self.conn.commit()
+        self._restore_pragmas()
+
+    def _restore_pragmas(self) -> None:
+        if self._restore is not None:
+            journal_mode, synchronous, temp_store = self._restore
+            self._restore = None
+            self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+            self.conn.execute(f"PRAGMA temp_store={temp_store}")
+
+    def _apply_scratch_pragmas(self) -> None:
+        conn = self.conn
+        # journal_mode cannot change inside a transaction.
+        conn.commit()
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        temp_store = conn.execute("PRAGMA temp_store").fetchone()[0]
+        if str(journal_mode).lower() in ("memory", "off"):
+            # In-memory / journal-less DBs (tests, :memory:) have nothing to speed up.
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if str(journal_mode).lower() == "wal":
+            journal_mode = "DELETE"
+        self._restore = (journal_mode, synchronous, temp_store)
@@ -14,20 +14,28 @@ Example:
 """
 
 import argparse
+import hashlib
 import sqlite3
 import re
 import sys
 import ast
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 
+from ast_cache import shared_ast_cache
+from edge_sink import EdgeSink
+from db_indexes import bulk_mutation
+from graph_model import GraphModel, fetch_all, iter_rows
+from module_index import ModuleIndex
+from reachability import EXTEND_ANCHOR_HOPS, Reachability
+from stage_profile import StageProfiler, note_rows_written
+
 def get_file_content(content_id: bytes, conn: sqlite3.Connection) -> str:
-    """Fetch file content from the contents table."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT content FROM contents WHERE id = ?", (content_id,))
-    result = cursor.fetchone()
-    return result[0] if result else ""
+    """Fetch file content from the contents table (memoized in the shared AST cache)."""
+    return shared_ast_cache().source(conn, content_id)
 
 def extract_method_lines(content: str, start_row: int, end_row: int) -> str:
     """Extract method source code by line range."""
@@ -181,6 +189,12 @@ class _MethodBodyFacts(ast.NodeVisitor):
         self.cls_create: bool = False
         self.env: Dict[str, str] = {}
 
+    def __getstate__(self) -> Dict[str, object]:
+        # Facts travel back from worker processes; the known-class set stays behind.
+        state = dict(self.__dict__)
+        state.pop("known_classes", None)
+        return state
+
     @staticmethod
     def _collect_self_attrs(node: ast.AST) -> Set[str]:
         attrs: Set[str] = set()
@@ -391,6 +405,179 @@ class _MethodBodyFacts(ast.NodeVisitor):
 
         self.generic_visit(node)
 
+class _ReturnTypeVisitor(ast.NodeVisitor):
+    """Extract `return self.<field>` occurrences from a method body."""
+    def __init__(self) -> None:
+        self.return_self_fields: Set[str] = set()
+
+    def visit_Return(self, node: ast.Return) -> None:  # type: ignore[override]
+        if node.value is None:
+            return
+        val = node.value
+        # `return self.<field>`
+        if (
+            isinstance(val, ast.Attribute)
+            and isinstance(val.value, ast.Name)
+            and val.value.id == "self"
+        ):
+            self.return_self_fields.add(val.attr)
+        self.generic_visit(node)
+
+
+def _extract_return_annotation(fdef: ast.FunctionDef, known_class_names: Set[str]) -> Optional[str]:
+    """Return the class name from `-> ClassName` annotation, or None."""
+    ann = getattr(fdef, "returns", None)
+    if ann is None:
+        return None
+    if isinstance(ann, ast.Name) and ann.id in known_class_names:
+        return ann.id
+    if isinstance(ann, ast.Constant) and isinstance(ann.value, str) and ann.value in known_class_names:
+        return ann.value
+    return None
+
+
+@dataclass
+class _MethodFacts:
+    """
+    Everything STEP 1 reads from one method's AST.
+
+    Extraction only needs the method subtree and the known class names, so it can
+    run in worker processes; resolving the facts against the project-wide maps
+    stays in the main process.
+    """
+
+    body: _MethodBodyFacts
+    # First def in the subtree (`ast.walk` order), as the type-inference pre-passes use it.
+    has_def: bool
+    # (field, param) for `self.field = param` / `self.field.append(param)`, in walk order.
+    param_field_binds: List[Tuple[str, str]]
+    return_annotation: Optional[str]
+    return_self_fields: Set[str]
+    # Parameter annotations of the top-level def: def f(x: Passenger, ...).
+    anno_env: Dict[str, str]
+
+
+def _method_facts(tree: Optional[ast.Module], known_class_names: Set[str]) -> Optional[_MethodFacts]:
+    if tree is None:
+        return None
+    body = _MethodBodyFacts(known_classes=known_class_names)
+    body.visit(tree)
+
+    fdef = next(
+        (n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))),
+        None,
+    )
+    binds: List[Tuple[str, str]] = []
+    return_annotation: Optional[str] = None
+    return_self_fields: Set[str] = set()
+    if fdef is not None:
+        param_names: Set[str] = {a.arg for a in fdef.args.args if a.arg not in ("self", "cls")}
+        for node in ast.walk(tree):
+            # Pattern A: self.field = param  (direct assignment)
+            if (
+                isinstance(node, ast.Assign)
+                and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Attribute)
+                and isinstance(node.targets[0].value, ast.Name)
+                and node.targets[0].value.id == "self"
+                and isinstance(node.value, ast.Name)
+                and node.value.id in param_names
+            ):
+                binds.append((node.targets[0].attr, node.value.id))
+            # Pattern B: self.field.append(param)  (list-accumulator)
+            elif (
+                isinstance(node, ast.Expr)
+                and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Attribute)
+                and node.value.func.attr == "append"
+                and isinstance(node.value.func.value, ast.Attribute)
+                and isinstance(node.value.func.value.value, ast.Name)
+                and node.value.func.value.value.id == "self"
+                and len(node.value.args) == 1
+                and isinstance(node.value.args[0], ast.Name)
+                and node.value.args[0].id in param_names
+            ):
+                binds.append((node.value.func.value.attr, node.value.args[0].id))
+        return_annotation = _extract_return_annotation(fdef, known_class_names)  # type: ignore[arg-type]
+        rv = _ReturnTypeVisitor()
+        rv.visit(tree)
+        return_self_fields = rv.return_self_fields
+
+    anno_env: Dict[str, str] = {}
+    top = next((n for n in tree.body if isinstance(n, ast.FunctionDef)), None)
+    if top is not None:
+        for a in top.args.args:
+            if a.arg in {"self", "cls"}:
+                continue
+            if isinstance(a.annotation, ast.Name) and a.annotation.id in known_class_names:
+                anno_env[a.arg] = a.annotation.id
+
+    return _MethodFacts(
+        body=body,
+        has_def=fdef is not None,
+        param_field_binds=binds,
+        return_annotation=return_annotation,
+        return_self_fields=return_self_fields,
+        anno_env=anno_env,
+    )
+
+
+# (content_id, file source, [(method_id, start_row, end_row, name)]) per file.
+_FactTask = Tuple[bytes, str, List[Tuple[bytes, int, int, str]]]
+
+
+def _method_facts_worker(
+    tasks: List[_FactTask], known_class_names: Set[str]
+) -> List[Tuple[bytes, Optional[_MethodFacts]]]:
+    ast_cache = shared_ast_cache()
+    out: List[Tuple[bytes, Optional[_MethodFacts]]] = []
+    for content_id, source, methods in tasks:
+        ast_cache.seed_source(content_id, source)
+        for method_id, start, end, name in methods:
+            tree = ast_cache.method_tree(None, content_id, start, end, name)  # type: ignore[arg-type]
+            out.append((method_id, _method_facts(tree, known_class_names)))
+    return out
+
+
+def collect_method_facts(
+    conn: sqlite3.Connection,
+    method_rows: List[tuple],
+    known_class_names: Set[str],
+    *,
+    jobs: int = 1,
+) -> Dict[bytes, Optional[_MethodFacts]]:
+    """
+    ``method_id -> _MethodFacts`` (``None`` when the method does not parse) for
+    ``(id, parent_id, name, start_row, end_row, content_id, kind)`` rows.
+
+    With ``jobs > 1`` files are spread over a process pool; results are merged
+    in submission order, so the outcome does not depend on worker scheduling.
+    """
+    by_content: Dict[bytes, List[Tuple[bytes, int, int, str]]] = {}
+    for method_id, _parent_id, name, start, end, content_id, _kind in method_rows:
+        by_content.setdefault(content_id, []).append((method_id, start, end, name))
+
+    facts: Dict[bytes, Optional[_MethodFacts]] = {}
+    if jobs <= 1 or len(by_content) < 2:
+        ast_cache = shared_ast_cache()
+        for content_id, methods in by_content.items():
+            for method_id, start, end, name in methods:
+                tree = ast_cache.method_tree(conn, content_id, start, end, name)
+                facts[method_id] = _method_facts(tree, known_class_names)
+        return facts
+
+    tasks: List[_FactTask] = [
+        (content_id, get_file_content(content_id, conn), methods) for content_id, methods in by_content.items()
+    ]
+    # A few batches per worker balances uneven file sizes without one task per file.
+    batch_size = max(1, len(tasks) // (jobs * 4))
+    batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for part in pool.map(_method_facts_worker, batches, [known_class_names] * len(batches)):
+            facts.update(part)
+    return facts
+
+
 def _compress_field_hits(field_names: List[str]) -> str:
     counts: Dict[str, int] = {}
     for name in field_names:
@@ -409,6 +596,11 @@ def enhance_python_dependencies(
     allow_ambiguous_types: bool = False,
     include_transitive_inheritance: bool = False,
     type_annotated_params: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    scope_file_ids: Optional[Set[bytes]] = None,
+    entity_files: Optional[Dict[bytes, bytes]] = None,
+    stages: Optional[StageProfiler] = None,
+    jobs: int = 1,
 ) -> Tuple[int, int, int]:
     """
     Enhance Python dependencies in a NeoDepends database.
@@ -422,14 +614,80 @@ def enhance_python_dependencies(
 
     Returns:
         Tuple of (new_dependencies_added, methods_analyzed, override_deps_count)
+
+    When ``conn`` is given (in-process pipeline mode) it is used instead of
+    opening ``db_path`` and is left open for the caller.
+
+    ``scope_file_ids`` (incremental mode, see ``run_enhancement``) limits the
+    per-file and per-method edge derivation to entities of those File ids
+    (*entity_files*, the plan's entity -> File map, saves recomputing it). The
+    project-wide indexes (classes, fields, inferred types, Extend) are still built
+    from every file so scoped methods resolve exactly as in a full run.
+
+    ``stages`` records each STEP below as a lap (see stage_profile.py).
+
+    ``jobs > 1`` extracts the per-method AST facts in that many worker processes
+    (see ``collect_method_facts``); the resulting edges are identical.
     """
-    conn = sqlite3.Connection(db_path)
+    owns_conn = conn is None
+    if conn is None:
+        conn = sqlite3.Connection(db_path)
+    try:
+        # New edges are buffered and written in batches; flush before any other
+        # statement that reads or modifies deps (see edge_sink.py).
+        with EdgeSink(conn) as sink:
+            return _enhance_with_sink(
+                conn,
+                sink,
+                source_root,
+                profile=profile,
+                allow_ambiguous_types=allow_ambiguous_types,
+                include_transitive_inheritance=include_transitive_inheritance,
+                type_annotated_params=type_annotated_params,
+                scope_file_ids=scope_file_ids,
+                entity_files=entity_files,
+                stages=stages,
+                jobs=jobs,
+            )
+    finally:
+        if owns_conn:
+            conn.close()
+
+
+def _enhance_with_sink(
+    conn: sqlite3.Connection,
+    sink: EdgeSink,
+    source_root: str,
+    *,
+    profile: str,
+    allow_ambiguous_types: bool,
+    include_transitive_inheritance: bool,
+    type_annotated_params: bool,
+    scope_file_ids: Optional[Set[bytes]],
+    entity_files: Optional[Dict[bytes, bytes]],
+    stages: Optional[StageProfiler],
+    jobs: int,
+) -> Tuple[int, int, int]:
+    """The body of ``enhance_python_dependencies``; *sink* is closed by the caller."""
     cursor = conn.cursor()
     is_stackgraphs = profile == "stackgraphs"
+    ast_cache = shared_ast_cache()
+
+    def _lap(name: Optional[str]) -> None:
+        if stages is not None:
+            sink.flush()
+            stages.lap(name, db=conn)
+
+    scope_entities: Optional[Set[bytes]] = None
+    if scope_file_ids is not None:
+        if entity_files is None:
+            entity_files = _entity_file_map(conn)
+        scope_entities = {eid for eid, fid in entity_files.items() if fid in scope_file_ids}
 
     # STEP 0: Add File -> File Import deps (internal-only, AST-based).
+    _lap("step0_file_imports")
     cursor.execute("SELECT id, name, content_id FROM entities WHERE kind = 'File'")
-    file_rows = cursor.fetchall()
+    file_rows = fetch_all(cursor)
     file_id_by_name: Dict[str, bytes] = {name: fid for fid, name, _cid in file_rows}
 
     # Precompute file descendants: for each File entity, collect all entity IDs
@@ -439,7 +697,7 @@ def enhance_python_dependencies(
     if is_stackgraphs:
         _children_of: Dict[bytes, List[bytes]] = {}
         cursor.execute("SELECT id, parent_id, kind FROM entities")
-        for _eid, _pid, _ekind in cursor.fetchall():
+        for _eid, _pid, _ekind in fetch_all(cursor):
             if _pid is not None:
                 _children_of.setdefault(_pid, []).append(_eid)
         for _fid, _fname, _ in file_rows:
@@ -454,28 +712,10 @@ def enhance_python_dependencies(
         del _children_of
 
     cursor.execute("SELECT src, tgt FROM deps WHERE kind = 'Import'")
-    existing_imports: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in cursor.fetchall()}
+    existing_imports: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in iter_rows(cursor)}
 
-    def _module_to_file(module: str) -> Optional[str]:
-        if not module:
-            return None
-        as_file = module.replace(".", "/") + ".py"
-        if as_file in file_id_by_name:
-            return as_file
-        as_init = module.replace(".", "/") + "/__init__.py"
-        if as_init in file_id_by_name:
-            return as_init
-        # Module may live in a subdirectory (e.g. entity name is "src/survey.py" but
-        # the import says `from survey import Survey`). Search by suffix match.
-        suffix_file = "/" + as_file
-        for name in file_id_by_name:
-            if name.endswith(suffix_file):
-                return name
-        suffix_init = "/" + as_init
-        for name in file_id_by_name:
-            if name.endswith(suffix_init):
-                return name
-        return None
+    # Import string -> file entity name (exact, then package __init__, then suffix).
+    _module_to_file = ModuleIndex(file_id_by_name).resolve
 
     def _resolve_relative(module: Optional[str], level: int, src_file_name: str) -> Optional[str]:
         if level <= 0:
@@ -509,12 +749,10 @@ def enhance_python_dependencies(
     for src_file_id, src_file_name, src_content_id in file_rows:
         if not src_file_name.endswith(".py"):
             continue
-        content = get_file_content(src_content_id, conn)
-        if not content.strip():
+        if scope_entities is not None and src_file_id not in scope_entities:
             continue
-        try:
-            tree = ast.parse(content)
-        except SyntaxError:
+        tree = ast_cache.tree(conn, src_content_id)
+        if tree is None:
             continue
 
         # --- Edge-schema v2: scope-aware import classification ---
@@ -653,10 +891,7 @@ def enhance_python_dependencies(
             key = (src_file_id, tgt_file_id)
             if key in existing_imports:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Import', 0, NULL)",
-                (src_file_id, tgt_file_id),
-            )
+            sink.add(src_file_id, tgt_file_id, "Import")
             existing_imports.add(key)
             import_added += 1
             step0_changed = True
@@ -669,10 +904,7 @@ def enhance_python_dependencies(
             key = (src_file_id, tgt_file_id)
             if key in existing_imports:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'ImportLazy', 0, NULL)",
-                (src_file_id, tgt_file_id),
-            )
+            sink.add(src_file_id, tgt_file_id, "ImportLazy")
             existing_imports.add(key)
             import_lazy_added += 1
             step0_changed = True
@@ -685,10 +917,7 @@ def enhance_python_dependencies(
             key = (src_file_id, tgt_file_id)
             if key in existing_imports:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'ImportType', 0, NULL)",
-                (src_file_id, tgt_file_id),
-            )
+            sink.add(src_file_id, tgt_file_id, "ImportType")
             existing_imports.add(key)
             import_type_added += 1
             step0_changed = True
@@ -721,12 +950,14 @@ def enhance_python_dependencies(
                     tgt_ids = file_descendants.get(tgt_file_id, [tgt_file_id])
                     src_ph = ",".join("?" for _ in src_ids)
                     tgt_ph = ",".join("?" for _ in tgt_ids)
+                    sink.flush()
                     cursor.execute(
                         f"UPDATE deps SET kind = 'ImportLazy' "
                         f"WHERE kind = 'Import' "
                         f"AND src IN ({src_ph}) AND tgt IN ({tgt_ph})",
                         list(src_ids) + list(tgt_ids),
                     )
+                    note_rows_written(cursor.rowcount)
                     if cursor.rowcount > 0:
                         reclass_count += cursor.rowcount
 
@@ -743,12 +974,14 @@ def enhance_python_dependencies(
                     tgt_ids = file_descendants.get(tgt_file_id, [tgt_file_id])
                     src_ph = ",".join("?" for _ in src_ids)
                     tgt_ph = ",".join("?" for _ in tgt_ids)
+                    sink.flush()
                     cursor.execute(
                         f"UPDATE deps SET kind = 'ImportType' "
                         f"WHERE kind = 'Import' "
                         f"AND src IN ({src_ph}) AND tgt IN ({tgt_ph})",
                         list(src_ids) + list(tgt_ids),
                     )
+                    note_rows_written(cursor.rowcount)
                     if cursor.rowcount > 0:
                         reclass_type_count += cursor.rowcount
 
@@ -761,7 +994,9 @@ def enhance_python_dependencies(
     #   some_module.py -> pkg/sub.py
     #
     # Remove File->File Import AND ImportLazy edges that target any __init__.py (except self-import).
+    _lap("step0b_init_import_prune")
     if is_stackgraphs:
+        sink.flush()
         cursor.execute(
             """
             DELETE FROM deps
@@ -776,6 +1011,7 @@ def enhance_python_dependencies(
             """
         )
         removed_init_imports = int(cursor.execute("SELECT changes()").fetchone()[0])
+        note_rows_written(removed_init_imports)
         if removed_init_imports:
             step0_changed = True
 
@@ -784,6 +1020,7 @@ def enhance_python_dependencies(
         #
         # Our handcount/architecture-DSM rules intentionally treat Use as *self.field* access
         # within class methods/constructors only, so remove these module-level Method -> ClassField uses.
+        sink.flush()
         cursor.execute(
             """
             DELETE FROM deps
@@ -802,6 +1039,7 @@ def enhance_python_dependencies(
             """
         )
         removed_module_field_uses = int(cursor.execute("SELECT changes()").fetchone()[0])
+        note_rows_written(removed_module_field_uses)
         if removed_module_field_uses:
             step0_changed = True
 
@@ -824,90 +1062,70 @@ def enhance_python_dependencies(
     # has no import line to the target file.  Edge count is preserved (relabel
     # only, no edges added or removed).
     #
-    # Anchor set: {Import, ImportLazy, Extend} with transitive closure on
-    # Extend chains — matching the import-scoped gate in
+    # Anchor set: {Import, ImportLazy, Extend} plus two-hop Extend chains
+    # (grandparent files) — matching the import-scoped gate in
     # neodepends_python_export.py (A1: continuity by construction).
+    _lap("step0c_use_transitive")
     _UT_ANCHOR_KINDS = {"Import", "ImportLazy", "Extend"}
     _UT_RELABEL_KINDS = {"Use", "Call"}
 
-    # Build entity -> owning File mapping
-    _ut_ent_parent: Dict[bytes, Optional[bytes]] = {}
-    _ut_ent_kind: Dict[bytes, str] = {}
-    for _eid, _pid, _ek in cursor.execute("SELECT id, parent_id, kind FROM entities").fetchall():
-        _ut_ent_parent[_eid] = _pid
-        _ut_ent_kind[_eid] = _ek
-
-    _ut_file_memo: Dict[bytes, Optional[bytes]] = {}
+    # Entities and deps as interned int columns; the owning File of every
+    # entity is one precomputed column instead of a memoized parent walk.
+    sink.flush()
+    ut_graph = GraphModel.from_db(conn)
+    ut_file_of = ut_graph.nearest("File")
+    ut_total_before = ut_graph.dep_count
+    _ut_anchor_codes = {ut_graph.kind_code(k) for k in _UT_ANCHOR_KINDS}
+    _ut_extend_code = ut_graph.kind_code("Extend")
+    _ut_use_code = ut_graph.kind_code("Use")
+    _ut_relabel_codes = {ut_graph.kind_code(k) for k in _UT_RELABEL_KINDS}
 
-    def _ut_file_of(eid: bytes) -> Optional[bytes]:
-        if eid in _ut_file_memo:
-            return _ut_file_memo[eid]
-        seen: Set[bytes] = set()
-        cur_eid = eid
-        while cur_eid and cur_eid not in seen:
-            seen.add(cur_eid)
-            if _ut_ent_kind.get(cur_eid) == "File":
-                _ut_file_memo[eid] = cur_eid
-                return cur_eid
-            cur_eid = _ut_ent_parent.get(cur_eid)
-        _ut_file_memo[eid] = None
-        return None
+    def _ut_files(src: int, tgt: int) -> Tuple[int, int]:
+        return (ut_file_of[src] if src >= 0 else -1), (ut_file_of[tgt] if tgt >= 0 else -1)
 
     # Pass 1: build anchor file pairs from Import/ImportLazy/Extend edges
-    ut_dep_rows = cursor.execute("SELECT rowid, src, tgt, kind FROM deps").fetchall()
-    ut_total_before = len(ut_dep_rows)
-    ut_anchor_pairs: Set[Tuple[bytes, bytes]] = set()
-    ut_extend_pairs: Set[Tuple[bytes, bytes]] = set()
+    ut_anchor_pairs: Set[Tuple[int, int]] = set()
+    ut_extend_pairs: Set[Tuple[int, int]] = set()
 
-    for _rowid, _src, _tgt, _kind in ut_dep_rows:
-        if _kind not in _UT_ANCHOR_KINDS:
+    for _i, _src, _tgt, _kind in ut_graph.iter_deps():
+        if _kind not in _ut_anchor_codes:
             continue
-        _sf = _ut_file_of(_src)
-        _tf = _ut_file_of(_tgt)
-        if _sf and _tf and _sf != _tf:
+        _sf, _tf = _ut_files(_src, _tgt)
+        if _sf >= 0 and _tf >= 0 and _sf != _tf:
             ut_anchor_pairs.add((_sf, _tf))
-            if _kind == "Extend":
+            if _kind == _ut_extend_code:
                 ut_extend_pairs.add((_sf, _tf))
 
-    # Transitive closure on Extend chains only (same logic as export gate):
-    # if A->B (Extend) and B->C (Extend), add A->C as anchor.
-    _ut_changed = True
-    while _ut_changed:
-        _ut_changed = False
-        _ut_new: Set[Tuple[bytes, bytes]] = set()
-        for _a, _b in ut_extend_pairs:
-            for _c, _d in ut_extend_pairs:
-                if _b == _c and (_a, _d) not in ut_anchor_pairs:
-                    _ut_new.add((_a, _d))
-        if _ut_new:
-            ut_anchor_pairs |= _ut_new
-            _ut_changed = True
+    # Two-hop Extend chains only (same component as the export gate): if
+    # A->B (Extend) and B->C (Extend), A->C is anchored; C's own base is not.
+    ut_extend_reach = Reachability(ut_extend_pairs, max_hops=EXTEND_ANCHOR_HOPS)
 
     # Pass 2: collect rowids of unanchored Use/Call edges for relabeling
     ut_use_count = 0
     ut_call_count = 0
     ut_rowids: List[int] = []
 
-    for _rowid, _src, _tgt, _kind in ut_dep_rows:
-        if _kind not in _UT_RELABEL_KINDS:
+    for _i, _src, _tgt, _kind in ut_graph.iter_deps():
+        if _kind not in _ut_relabel_codes:
             continue
-        _sf = _ut_file_of(_src)
-        _tf = _ut_file_of(_tgt)
-        if _sf is None or _tf is None or _sf == _tf:
+        _sf, _tf = _ut_files(_src, _tgt)
+        if _sf < 0 or _tf < 0 or _sf == _tf:
             continue
-        if (_sf, _tf) not in ut_anchor_pairs:
-            ut_rowids.append(_rowid)
-            if _kind == "Use":
+        if (_sf, _tf) not in ut_anchor_pairs and not ut_extend_reach.reaches(_sf, _tf):
+            ut_rowids.append(ut_graph.dep_rowid[_i])
+            if _kind == _ut_use_code:
                 ut_use_count += 1
             else:
                 ut_call_count += 1
 
     if ut_rowids:
-        cursor.executemany(
-            "UPDATE deps SET kind = 'UseTransitive' WHERE rowid = ?",
-            [(_r,) for _r in ut_rowids],
-        )
-        conn.commit()
+        with bulk_mutation(conn, len(ut_rowids)):
+            cursor.executemany(
+                "UPDATE deps SET kind = 'UseTransitive' WHERE rowid = ?",
+                [(_r,) for _r in ut_rowids],
+            )
+            note_rows_written(cursor.rowcount)
+            conn.commit()
 
     ut_total_after = cursor.execute("SELECT COUNT(*) FROM deps").fetchone()[0]
 
@@ -919,9 +1137,10 @@ def enhance_python_dependencies(
         print(f"  ** ERROR: edge count mismatch! relabel must be count-preserving **")
 
     # Cleanup temporaries
-    del _ut_ent_parent, _ut_ent_kind, _ut_file_memo, ut_dep_rows
-    del ut_anchor_pairs, ut_extend_pairs, ut_rowids
+    del ut_graph, ut_file_of
+    del ut_anchor_pairs, ut_extend_pairs, ut_extend_reach, ut_rowids
 
+    _lap("step1_indexes")
     new_deps_count = 0
     field_field_deps_added = 0
     methods_analyzed = 0
@@ -939,7 +1158,7 @@ def enhance_python_dependencies(
     # - resolve inherited fields
     # which shows up as systematic "missing Use" edges.
     cursor.execute("SELECT id, name, start_row, end_row, content_id FROM entities WHERE kind = 'Class'")
-    class_rows = cursor.fetchall()
+    class_rows = fetch_all(cursor)
 
     class_ids: Set[bytes] = {cid for cid, _name, _sr, _er, _content_id in class_rows}
     class_ids_by_name: Dict[str, List[bytes]] = {}
@@ -953,7 +1172,6 @@ def enhance_python_dependencies(
     # Detect dataclasses and their field order (for field-field coupling heuristics).
     dataclass_fields_by_class: Dict[bytes, List[str]] = {}
     dataclass_field_types_by_class: Dict[bytes, Dict[str, str]] = {}
-    parsed_trees_by_content: Dict[bytes, Optional[ast.AST]] = {}
 
     def _is_dataclass_decorator(dec: ast.expr) -> bool:
         if isinstance(dec, ast.Name) and dec.id == "dataclass":
@@ -975,13 +1193,7 @@ def enhance_python_dependencies(
         return None
 
     for class_id, class_name, class_start, class_end, content_id in class_rows:
-        if content_id not in parsed_trees_by_content:
-            content = get_file_content(content_id, conn)
-            try:
-                parsed_trees_by_content[content_id] = ast.parse(content) if content.strip() else None
-            except SyntaxError:
-                parsed_trees_by_content[content_id] = None
-        tree = parsed_trees_by_content.get(content_id)
+        tree = ast_cache.tree(conn, content_id)
         if tree is None:
             continue
         class_node = _find_class_node(tree, class_name, class_start, class_end)
@@ -1049,20 +1261,17 @@ def enhance_python_dependencies(
     extend_added = 0
     if is_stackgraphs:
         # STEP 0.5: Add missing Extend edges from AST (useful for StackGraphs resolver).
+        sink.flush()
         cursor.execute("SELECT src, tgt FROM deps WHERE kind = 'Extend'")
-        existing_extends: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in cursor.fetchall()}
+        existing_extends: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in iter_rows(cursor)}
 
         cursor.execute("SELECT id, name, content_id FROM entities WHERE kind = 'File'")
-        file_rows = cursor.fetchall()
+        file_rows = fetch_all(cursor)
         for file_id, file_name, content_id in file_rows:
             if not file_name.endswith(".py"):
                 continue
-            content = get_file_content(content_id, conn)
-            if not content.strip():
-                continue
-            try:
-                tree = ast.parse(content)
-            except SyntaxError:
+            tree = ast_cache.tree(conn, content_id)
+            if tree is None:
                 continue
             for node in ast.walk(tree):
                 if not isinstance(node, ast.ClassDef):
@@ -1085,10 +1294,7 @@ def enhance_python_dependencies(
                     key = (src_cid, tgt_cid)
                     if key in existing_extends:
                         continue
-                    cursor.execute(
-                        "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Extend', 0, NULL)",
-                        (src_cid, tgt_cid),
-                    )
+                    sink.add(src_cid, tgt_cid, "Extend")
                     existing_extends.add(key)
                     extend_added += 1
 
@@ -1096,6 +1302,7 @@ def enhance_python_dependencies(
             conn.commit()
 
     # Index direct base classes using Extend deps (if present)
+    sink.flush()
     cursor.execute(
         """
         SELECT d.src, d.tgt
@@ -1107,7 +1314,7 @@ def enhance_python_dependencies(
         """
     )
     bases_by_class: Dict[bytes, List[bytes]] = {}
-    for src, tgt in cursor.fetchall():
+    for src, tgt in fetch_all(cursor):
         bases_by_class.setdefault(src, []).append(tgt)
 
     # Reverse map: base class -> subclasses
@@ -1121,7 +1328,7 @@ def enhance_python_dependencies(
         "SELECT id, parent_id, name, start_row, end_row, content_id, kind "
         "FROM entities WHERE kind IN ('Method', 'Function')"
     )
-    method_rows = cursor.fetchall()
+    method_rows = fetch_all(cursor)
     method_owner_class: Dict[bytes, bytes] = {}
     methods_by_class: Dict[bytes, Dict[str, bytes]] = {}
     for mid, parent_id, name, sr, er, cid, _kind in method_rows:
@@ -1138,7 +1345,7 @@ def enhance_python_dependencies(
 
     # Index functions for resolving function call edges.
     cursor.execute("SELECT id, name, content_id FROM entities WHERE kind = 'Function'")
-    func_rows = cursor.fetchall()
+    func_rows = fetch_all(cursor)
     function_ids_by_name: Dict[str, List[bytes]] = {}
     function_content_id: Dict[bytes, bytes] = {}
     for fid, fname, fcid in func_rows:
@@ -1159,7 +1366,7 @@ def enhance_python_dependencies(
 
     # Index fields: class -> {name: id}. Include fields parented by the class and fields parented by a method under a class.
     cursor.execute("SELECT id, parent_id, name FROM entities WHERE kind = 'Field'")
-    field_rows = cursor.fetchall()
+    field_rows = fetch_all(cursor)
     fields_by_class: Dict[bytes, Dict[str, bytes]] = {}
     for fid, parent_id, name in field_rows:
         owner: Optional[bytes] = None
@@ -1243,14 +1450,21 @@ def enhance_python_dependencies(
                 unique_method_owner[mname] = cid
 
     # Cache existing deps to avoid repeated SQL lookups.
+    sink.flush()
     cursor.execute("SELECT src, tgt, kind FROM deps WHERE kind IN ('Use','Call','Create')")
-    existing: Set[Tuple[bytes, bytes, str]] = {(s, t, k) for s, t, k in cursor.fetchall()}
+    existing: Set[Tuple[bytes, bytes, str]] = {(s, t, k) for s, t, k in iter_rows(cursor)}
 
     print(f"Found {len(class_rows)} classes to analyze...")
     print(f"Found {len(method_rows)} methods/functions to analyze...")
     if extend_added:
         print(f"Extend deps added (AST): {extend_added}")
 
+    # Per-method AST facts, extracted once (in worker processes with jobs > 1) and
+    # shared by the type-inference pre-passes and the per-method edge derivation below.
+    _lap("step1_method_facts")
+    method_facts = collect_method_facts(conn, method_rows, known_class_names, jobs=jobs)
+    _lap("step1_type_inference")
+
     # Pre-pass: infer field types (self.field = ClassName(...)) to resolve self.field.method calls.
     field_types_by_class: Dict[bytes, Dict[str, Set[str]]] = {}
     for cls_id, field_types in dataclass_field_types_by_class.items():
@@ -1310,70 +1524,26 @@ def enhance_python_dependencies(
         method_content = extract_method_lines(file_content, method_start, method_end)
         if not method_content.strip():
             continue
-        try:
-            tree = ast.parse(textwrap.dedent(method_content))
-        except SyntaxError:
+        mfacts = method_facts[method_id]
+        if mfacts is None:
             continue
-        facts = _MethodBodyFacts(known_classes=known_class_names)
-        facts.visit(tree)
-        for field_name, cls_name in facts.field_type_assigns.items():
+        for field_name, cls_name in mfacts.body.field_type_assigns.items():
             field_types_by_class.setdefault(owner_cls_id, {}).setdefault(field_name, set()).add(cls_name)
 
         # Name-convention inference: self.field = param where param name matches a known
         # class (snake_case -> CamelCase). Applied to ALL methods, not just __init__,
-        # to catch setter patterns like set_route(self, route): self.route = route.
+        # to catch setter patterns like set_route(self, route): self.route = route
+        # (pattern A) and list accumulators like self.field.append(param) (pattern B).
         # Does not override explicit inferences already in field_types_by_class.
-        fdef = next(
-            (n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))),
-            None,
-        )
-        if fdef is not None:
-            param_names: Set[str] = {a.arg for a in fdef.args.args if a.arg not in ("self", "cls")}
-            for node in ast.walk(tree):
-                # Pattern A: self.field = param  (direct assignment)
-                if (
-                    isinstance(node, ast.Assign)
-                    and len(node.targets) == 1
-                    and isinstance(node.targets[0], ast.Attribute)
-                    and isinstance(node.targets[0].value, ast.Name)
-                    and node.targets[0].value.id == "self"
-                    and isinstance(node.value, ast.Name)
-                    and node.value.id in param_names
-                ):
-                    f_name = node.targets[0].attr
-                    p_name = node.value.id
-                    # Skip if we already have an inferred type for this field.
-                    if f_name in field_types_by_class.get(owner_cls_id, {}):
-                        continue
-                    matched_cls = _match_param_to_class(p_name, known_class_names)
-                    if matched_cls:
-                        field_types_by_class.setdefault(owner_cls_id, {}).setdefault(
-                            f_name, set()
-                        ).add(matched_cls)
-
-                # Pattern B: self.field.append(param)  (list-accumulator)
-                # Infers that self.field is a list of param's class type.
-                elif (
-                    isinstance(node, ast.Expr)
-                    and isinstance(node.value, ast.Call)
-                    and isinstance(node.value.func, ast.Attribute)
-                    and node.value.func.attr == "append"
-                    and isinstance(node.value.func.value, ast.Attribute)
-                    and isinstance(node.value.func.value.value, ast.Name)
-                    and node.value.func.value.value.id == "self"
-                    and len(node.value.args) == 1
-                    and isinstance(node.value.args[0], ast.Name)
-                    and node.value.args[0].id in param_names
-                ):
-                    f_name = node.value.func.value.attr
-                    p_name = node.value.args[0].id
-                    if f_name in field_types_by_class.get(owner_cls_id, {}):
-                        continue
-                    matched_cls = _match_param_to_class(p_name, known_class_names)
-                    if matched_cls:
-                        field_types_by_class.setdefault(owner_cls_id, {}).setdefault(
-                            f_name, set()
-                        ).add(matched_cls)
+        for f_name, p_name in mfacts.param_field_binds:
+            # Skip if we already have an inferred type for this field.
+            if f_name in field_types_by_class.get(owner_cls_id, {}):
+                continue
+            matched_cls = _match_param_to_class(p_name, known_class_names)
+            if matched_cls:
+                field_types_by_class.setdefault(owner_cls_id, {}).setdefault(
+                    f_name, set()
+                ).add(matched_cls)
 
     # Stage 2 pre-pass: infer method return types.
     #
@@ -1387,35 +1557,6 @@ def enhance_python_dependencies(
     # -> emit Method->Route Use edge -> creates the file-pair train_station.py -> route.py.
     method_return_types: Dict[bytes, Set[str]] = {}
 
-    class _ReturnTypeVisitor(ast.NodeVisitor):
-        """Extract `return self.<field>` occurrences from a method body."""
-        def __init__(self) -> None:
-            self.return_self_fields: Set[str] = set()
-
-        def visit_Return(self, node: ast.Return) -> None:  # type: ignore[override]
-            if node.value is None:
-                return
-            val = node.value
-            # `return self.<field>`
-            if (
-                isinstance(val, ast.Attribute)
-                and isinstance(val.value, ast.Name)
-                and val.value.id == "self"
-            ):
-                self.return_self_fields.add(val.attr)
-            self.generic_visit(node)
-
-    def _extract_return_annotation(fdef: ast.FunctionDef) -> Optional[str]:
-        """Return the class name from `-> ClassName` annotation, or None."""
-        ann = getattr(fdef, "returns", None)
-        if ann is None:
-            return None
-        if isinstance(ann, ast.Name) and ann.id in known_class_names:
-            return ann.id
-        if isinstance(ann, ast.Constant) and isinstance(ann.value, str) and ann.value in known_class_names:
-            return ann.value
-        return None
-
     for method_id, parent_id, method_name, method_start, method_end, content_id, _kind in method_rows:
         owner_cls_id_s2: Optional[bytes] = None
         if parent_id in class_ids:
@@ -1428,28 +1569,17 @@ def enhance_python_dependencies(
         method_content_s2 = extract_method_lines(file_content_s2, method_start, method_end)
         if not method_content_s2.strip():
             continue
-        try:
-            tree_s2 = ast.parse(textwrap.dedent(method_content_s2))
-        except SyntaxError:
-            continue
-
-        fdef_s2 = next(
-            (n for n in ast.walk(tree_s2) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))),
-            None,
-        )
-        if fdef_s2 is None:
+        mfacts_s2 = method_facts[method_id]
+        if mfacts_s2 is None or not mfacts_s2.has_def:
             continue
 
         # Source (1): explicit annotation
-        ret_cls = _extract_return_annotation(fdef_s2)  # type: ignore[arg-type]
-        if ret_cls:
-            method_return_types.setdefault(method_id, set()).add(ret_cls)
+        if mfacts_s2.return_annotation:
+            method_return_types.setdefault(method_id, set()).add(mfacts_s2.return_annotation)
 
         # Source (2): `return self.<field>` where field has a known type
         if owner_cls_id_s2 is not None:
-            rv = _ReturnTypeVisitor()
-            rv.visit(tree_s2)
-            for field_name_s2 in rv.return_self_fields:
+            for field_name_s2 in mfacts_s2.return_self_fields:
                 cls_names_s2 = field_types_by_class.get(owner_cls_id_s2, {}).get(field_name_s2)
                 if cls_names_s2 and len(cls_names_s2) == 1:
                     method_return_types.setdefault(method_id, set()).add(next(iter(cls_names_s2)))
@@ -1457,6 +1587,7 @@ def enhance_python_dependencies(
     existing_create_by_src: Dict[bytes, Set[bytes]] = {}
     if is_stackgraphs:
         # Create edges can be noisy from StackGraphs; prune them to actual constructor calls.
+        sink.flush()
         cursor.execute(
             """
             SELECT d.src, d.tgt
@@ -1465,11 +1596,14 @@ def enhance_python_dependencies(
             WHERE d.kind = 'Create' AND e_tgt.kind = 'Class'
             """
         )
-        for src_id, tgt_id in cursor.fetchall():
+        for src_id, tgt_id in fetch_all(cursor):
             existing_create_by_src.setdefault(src_id, set()).add(tgt_id)
 
     # Analyze each method/function independently using AST.
+    _lap("step1_methods")
     for method_id, parent_id, method_name, method_start, method_end, content_id, _method_kind in method_rows:
+        if scope_entities is not None and method_id not in scope_entities:
+            continue
         methods_analyzed += 1
         file_content = get_file_content(content_id, conn)
         method_content = extract_method_lines(file_content, method_start, method_end)
@@ -1482,9 +1616,8 @@ def enhance_python_dependencies(
         else:
             owner_cls_id = method_owner_class.get(method_id) or infer_owner_class_from_span(content_id, method_start, method_end)
 
-        try:
-            tree = ast.parse(textwrap.dedent(method_content))
-        except SyntaxError:
+        mfacts = method_facts[method_id]
+        if mfacts is None:
             # Regex fallback: only within the owning class (no inherited resolution).
             if owner_cls_id is None:
                 continue
@@ -1496,10 +1629,7 @@ def enhance_python_dependencies(
                 if find_field_usages(method_content, fname):
                     key = (method_id, fid, "Use")
                     if key not in existing:
-                        cursor.execute(
-                            "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                            (method_id, fid, method_start),
-                        )
+                        sink.add(method_id, fid, "Use", method_start)
                         existing.add(key)
                         new_deps_count += 1
                     hits.append(fname)
@@ -1507,20 +1637,10 @@ def enhance_python_dependencies(
                 print(f"  {method_name} -> {_compress_field_hits(hits)} (Use)")
             continue
 
-        facts = _MethodBodyFacts(known_classes=known_class_names)
-        facts.visit(tree)
+        facts = mfacts.body
 
         # Minimal annotation env from signature: def f(x: Passenger, ...)
-        anno_env: Dict[str, str] = {}
-        fdef = next((n for n in tree.body if isinstance(n, ast.FunctionDef)), None)
-        if fdef is not None:
-            for a in fdef.args.args:
-                if a.arg in {"self", "cls"}:
-                    continue
-                if isinstance(a.annotation, ast.Name) and a.annotation.id in known_class_names:
-                    anno_env[a.arg] = a.annotation.id
-
-        env: Dict[str, str] = dict(anno_env)
+        env: Dict[str, str] = dict(mfacts.anno_env)
         env.update(facts.env)
         ambiguous_types_by_var: Dict[str, Set[str]] = {}
         for var, types in facts.isinstance_types_by_var.items():
@@ -1551,10 +1671,7 @@ def enhance_python_dependencies(
                 continue
             key = (method_id, fid, "Use")
             if key not in existing:
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                    (method_id, fid, method_start),
-                )
+                sink.add(method_id, fid, "Use", method_start)
                 existing.add(key)
                 new_deps_count += 1
 
@@ -1562,26 +1679,24 @@ def enhance_python_dependencies(
         # Emit one dep per isinstance call site (not collapsed) to match Java behavior.
         # Each isinstance(x, Type) at a different line produces a separate dep.
         isinstance_seen_rows: Set[Tuple[bytes, int]] = set()  # (cls_id, row) dedup
-        for cls_name, rel_lineno in facts.isinstance_type_lines:
+        for cls_name, lineno in facts.isinstance_type_lines:
             cls_id = resolve_class_id_by_name(cls_name, content_id)
             if cls_id is None:
                 continue
-            actual_row = method_start + rel_lineno - 1
+            actual_row = lineno - 1  # method trees carry file-absolute line numbers
             row_key = (cls_id, actual_row)
             if row_key in isinstance_seen_rows:
                 continue
             isinstance_seen_rows.add(row_key)
             # Skip if core already emitted this exact dep (same src/tgt/kind/row)
+            sink.flush()
             cursor.execute(
                 "SELECT 1 FROM deps WHERE src=? AND tgt=? AND kind='Use' AND row=? LIMIT 1",
                 (method_id, cls_id, actual_row),
             )
             if cursor.fetchone():
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                (method_id, cls_id, actual_row),
-            )
+            sink.add(method_id, cls_id, "Use", actual_row)
             new_deps_count += 1
 
         # (A) Method -> Field Use edges for self.<field>, including inherited fields.
@@ -1594,10 +1709,7 @@ def enhance_python_dependencies(
                 key = (method_id, fid, "Use")
                 if key in existing:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                    (method_id, fid, method_start),
-                )
+                sink.add(method_id, fid, "Use", method_start)
                 existing.add(key)
                 new_deps_count += 1
                 used_fields.append(fname)
@@ -1614,10 +1726,7 @@ def enhance_python_dependencies(
                 key = (tgt_fid, src_fid, "Use")
                 if key in existing:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                    (tgt_fid, src_fid, method_start),
-                )
+                sink.add(tgt_fid, src_fid, "Use", method_start)
                 existing.add(key)
                 new_deps_count += 1
                 field_field_deps_added += 1
@@ -1632,10 +1741,7 @@ def enhance_python_dependencies(
                 key = (method_id, tgt_mid, "Call")
                 if key in existing:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                    (method_id, tgt_mid, method_start),
-                )
+                sink.add(method_id, tgt_mid, "Call", method_start)
                 existing.add(key)
                 new_deps_count += 1
 
@@ -1654,10 +1760,7 @@ def enhance_python_dependencies(
                 key = (method_id, tgt_mid, "Call")
                 if key in existing:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                    (method_id, tgt_mid, method_start),
-                )
+                sink.add(method_id, tgt_mid, "Call", method_start)
                 existing.add(key)
                 new_deps_count += 1
 
@@ -1674,10 +1777,7 @@ def enhance_python_dependencies(
             key = (method_id, tgt_mid, "Call")
             if key in existing:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                (method_id, tgt_mid, method_start),
-            )
+            sink.add(method_id, tgt_mid, "Call", method_start)
             existing.add(key)
             new_deps_count += 1
 
@@ -1708,10 +1808,7 @@ def enhance_python_dependencies(
                 if key in existing:
                     pass  # still propagate return types even if Call edge already exists
                 else:
-                    cursor.execute(
-                        "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                        (method_id, tgt_mid, method_start),
-                    )
+                    sink.add(method_id, tgt_mid, "Call", method_start)
                     existing.add(key)
                     new_deps_count += 1
                 # Stage 2: propagate return types of the called method.
@@ -1727,10 +1824,7 @@ def enhance_python_dependencies(
                     ret_key = (method_id, ret_cls_id, "Use")
                     if ret_key in existing:
                         continue
-                    cursor.execute(
-                        "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', ?, NULL)",
-                        (method_id, ret_cls_id, method_start),
-                    )
+                    sink.add(method_id, ret_cls_id, "Use", method_start)
                     existing.add(ret_key)
                     new_deps_count += 1
 
@@ -1784,10 +1878,7 @@ def enhance_python_dependencies(
                 key = (method_id, tgt_mid, "Call")
                 if key in existing:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                    (method_id, tgt_mid, method_start),
-                )
+                sink.add(method_id, tgt_mid, "Call", method_start)
                 existing.add(key)
                 new_deps_count += 1
 
@@ -1797,12 +1888,12 @@ def enhance_python_dependencies(
         # distinct lines, replace the single method_start dep with per-line deps.
         # Collect lines per (var, callee) pair.
         poly_lines_by_pair: Dict[Tuple[str, str], List[int]] = {}
-        for var, callee, rel_lineno in facts.isinstance_var_call_lines:
+        for var, callee, lineno in facts.isinstance_var_call_lines:
             pair = (var, callee)
-            poly_lines_by_pair.setdefault(pair, []).append(rel_lineno)
+            poly_lines_by_pair.setdefault(pair, []).append(lineno)
         # Only uncollapse pairs that appear at multiple distinct lines.
-        for (var, callee), rel_lines in poly_lines_by_pair.items():
-            distinct_lines = sorted(set(rel_lines))
+        for (var, callee), call_lines in poly_lines_by_pair.items():
+            distinct_lines = sorted(set(call_lines))
             if len(distinct_lines) < 2:
                 continue
             # Find the target method id that (D) already resolved.
@@ -1847,26 +1938,25 @@ def enhance_python_dependencies(
                 if tgt_mid is None:
                     continue
                 # Delete the collapsed method_start dep inserted by (D).
+                sink.flush()
                 cursor.execute(
                     "DELETE FROM deps WHERE src=? AND tgt=? AND kind='Call' AND row=?",
                     (method_id, tgt_mid, method_start),
                 )
                 deleted = cursor.rowcount
+                note_rows_written(deleted)
                 if deleted:
                     new_deps_count -= deleted
                 # Insert per-line deps for each distinct call site.
-                for rel_ln in distinct_lines:
-                    actual_row = method_start + rel_ln - 1
+                for ln in distinct_lines:
+                    actual_row = ln - 1
                     cursor.execute(
                         "SELECT 1 FROM deps WHERE src=? AND tgt=? AND kind='Call' AND row=? LIMIT 1",
                         (method_id, tgt_mid, actual_row),
                     )
                     if cursor.fetchone():
                         continue
-                    cursor.execute(
-                        "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                        (method_id, tgt_mid, actual_row),
-                    )
+                    sink.add(method_id, tgt_mid, "Call", actual_row)
                     new_deps_count += 1
 
         # (D3) function calls: foo(...) -> Call to local function entity.
@@ -1879,10 +1969,7 @@ def enhance_python_dependencies(
             key = (method_id, tgt_fid, "Call")
             if key in existing:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Call', ?, NULL)",
-                (method_id, tgt_fid, method_start),
-            )
+            sink.add(method_id, tgt_fid, "Call", method_start)
             existing.add(key)
             new_deps_count += 1
 
@@ -1891,6 +1978,7 @@ def enhance_python_dependencies(
             # Keep call edges only if:
             # - the target method name appears in called_names, AND
             # - if we resolved at least one target for that name, keep only those targets.
+            sink.flush()
             cursor.execute(
                 """
                 SELECT d.tgt, e_tgt.name
@@ -1900,14 +1988,16 @@ def enhance_python_dependencies(
                 """,
                 (method_id,),
             )
-            for tgt_mid, tgt_name in cursor.fetchall():
+            for tgt_mid, tgt_name in fetch_all(cursor):
                 if tgt_name not in called_names:
                     cursor.execute("DELETE FROM deps WHERE kind = 'Call' AND src = ? AND tgt = ?", (method_id, tgt_mid))
+                    note_rows_written(cursor.rowcount)
                     existing.discard((method_id, tgt_mid, "Call"))
                     continue
                 resolved = resolved_call_targets_by_name.get(tgt_name)
                 if resolved and tgt_mid not in resolved:
                     cursor.execute("DELETE FROM deps WHERE kind = 'Call' AND src = ? AND tgt = ?", (method_id, tgt_mid))
+                    note_rows_written(cursor.rowcount)
                     existing.discard((method_id, tgt_mid, "Call"))
 
         # (E) ClassName(...) -> Create
@@ -1920,10 +2010,7 @@ def enhance_python_dependencies(
             key = (method_id, cls_id, "Create")
             if key in existing:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Create', ?, NULL)",
-                (method_id, cls_id, method_start),
-            )
+            sink.add(method_id, cls_id, "Create", method_start)
             existing.add(key)
             new_deps_count += 1
 
@@ -1937,13 +2024,16 @@ def enhance_python_dependencies(
             for tgt_id in sorted(existing_create_by_src.get(method_id, set())):
                 if tgt_id in allowed_create_targets:
                     continue
+                sink.flush()
                 cursor.execute("DELETE FROM deps WHERE kind = 'Create' AND src = ? AND tgt = ?", (method_id, tgt_id))
+                note_rows_written(cursor.rowcount)
             existing_create_by_src[method_id] = set(allowed_create_targets)
 
     # (F) Field->Class Use edges from inferred field types.
     # For each field whose type was inferred (via constructor, annotation, setter, or append),
     # insert a Use edge from the Field entity to the Class entity of the inferred type.
     # This captures structural coupling like Ticket.passenger -> Passenger.
+    _lap("step1_field_types")
     for cls_id, field_map in field_types_by_class.items():
         for field_name, cls_names in field_map.items():
             if len(cls_names) != 1:
@@ -1952,6 +2042,8 @@ def enhance_python_dependencies(
             field_id = resolve_inherited_field(cls_id, field_name)
             if field_id is None:
                 continue
+            if scope_entities is not None and field_id not in scope_entities:
+                continue
             # Get content_id for the field (to filter out same-file edges)
             cursor.execute("SELECT content_id FROM entities WHERE id = ?", (field_id,))
             row = cursor.fetchone()
@@ -1968,16 +2060,14 @@ def enhance_python_dependencies(
             key = (field_id, tgt_cls_id, "Use")
             if key in existing:
                 continue
-            cursor.execute(
-                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Use', 0, NULL)",
-                (field_id, tgt_cls_id),
-            )
+            sink.add(field_id, tgt_cls_id, "Use")
             existing.add(key)
             new_deps_count += 1
 
     conn.commit()
 
     # STEP 4: Add abstract method Override dependencies
+    _lap("step4_overrides")
     print(f"\n{'='*70}")
     print("STEP 4: Detecting abstract method overrides...")
     print("="*70)
@@ -1989,13 +2079,8 @@ def enhance_python_dependencies(
     abstract_methods_by_class: Dict[bytes, Dict[str, bytes]] = {}
 
     for class_id, class_name, class_start, class_end, content_id in class_rows:
-        content = get_file_content(content_id, conn)
-        if not content.strip():
-            continue
-
-        try:
-            tree = ast.parse(content)
-        except SyntaxError:
+        tree = ast_cache.tree(conn, content_id)
+        if tree is None:
             continue
 
         # Find the matching class node in the AST
@@ -2048,14 +2133,13 @@ def enhance_python_dependencies(
             for abstract_method_name, abstract_method_id in abstract_methods.items():
                 if abstract_method_name in child_methods:
                     impl_method_id = child_methods[abstract_method_name]
+                    if scope_entities is not None and impl_method_id not in scope_entities:
+                        continue
 
                     # Insert Override dependency: child_method -> parent_abstract_method
                     key = (impl_method_id, abstract_method_id, "Override")
                     if key not in existing:
-                        cursor.execute(
-                            "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Override', 0, NULL)",
-                            (impl_method_id, abstract_method_id),
-                        )
+                        sink.add(impl_method_id, abstract_method_id, "Override")
                         existing.add(key)
                         override_deps_count += 1
 
@@ -2080,6 +2164,7 @@ def enhance_python_dependencies(
     # and Import(B_file -> A_file) but NOT Import(C_file -> A_file).
     # With --include-transitive-inheritance we materialise the full transitive closure
     # so that architecture tools see the coupling to all ancestor files.
+    _lap("transitive_inheritance" if include_transitive_inheritance else None)
     transitive_inherit_added = 0
     if include_transitive_inheritance and bases_by_class:
         # Build content_id -> file_id (File entities share content_id with their Classes)
@@ -2103,8 +2188,9 @@ def enhance_python_dependencies(
                     _all_ancestors(base, visited)
             return visited
 
+        sink.flush()
         cursor.execute("SELECT src, tgt FROM deps WHERE kind = 'Import'")
-        existing_file_imports: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in cursor.fetchall()}
+        existing_file_imports: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in iter_rows(cursor)}
 
         for child_class_id in bases_by_class:
             child_file_id = _class_file_id(child_class_id)
@@ -2118,10 +2204,7 @@ def enhance_python_dependencies(
                 key = (child_file_id, ancestor_file_id)
                 if key in existing_file_imports:
                     continue
-                cursor.execute(
-                    "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Import', 0, NULL)",
-                    (child_file_id, ancestor_file_id),
-                )
+                sink.add(child_file_id, ancestor_file_id, "Import")
                 existing_file_imports.add(key)
                 transitive_inherit_added += 1
 
@@ -2137,6 +2220,7 @@ def enhance_python_dependencies(
     # from the method's file to the class's file (if not already present).
     # This captures structural coupling that exists even when no explicit import statement
     # is written (duck-typed params, forward-declared types, injected dependencies).
+    _lap("type_annotated_params" if type_annotated_params else None)
     type_annot_added = 0
     if type_annotated_params:
         # Build content_id -> file_id if not already done above
@@ -2151,8 +2235,9 @@ def enhance_python_dependencies(
                     return None
                 return file_id_by_content.get(cid_content)
 
+        sink.flush()
         cursor.execute("SELECT src, tgt FROM deps WHERE kind = 'Import'")
-        existing_file_imports_annot: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in cursor.fetchall()}
+        existing_file_imports_annot: Set[Tuple[bytes, bytes]] = {(s, t) for s, t in iter_rows(cursor)}
 
         def _extract_annotation_class_names(annotation: ast.expr) -> List[str]:
             """Return simple class names referenced in an annotation node."""
@@ -2178,12 +2263,10 @@ def enhance_python_dependencies(
         for src_file_id, src_file_name, src_content_id in file_rows:
             if not src_file_name.endswith(".py"):
                 continue
-            content = get_file_content(src_content_id, conn)
-            if not content.strip():
+            if scope_entities is not None and src_file_id not in scope_entities:
                 continue
-            try:
-                tree = ast.parse(content)
-            except SyntaxError:
+            tree = ast_cache.tree(conn, src_content_id)
+            if tree is None:
                 continue
 
             for node in ast.walk(tree):
@@ -2204,10 +2287,7 @@ def enhance_python_dependencies(
                             key = (src_file_id, tgt_file_id)
                             if key in existing_file_imports_annot:
                                 continue
-                            cursor.execute(
-                                "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, 'Import', 0, NULL)",
-                                (src_file_id, tgt_file_id),
-                            )
+                            sink.add(src_file_id, tgt_file_id, "Import")
                             existing_file_imports_annot.add(key)
                             type_annot_added += 1
 
@@ -2215,12 +2295,10 @@ def enhance_python_dependencies(
             conn.commit()
             print(f"[OK] Added {type_annot_added} type-annotation-derived Import file->file edges")
 
-    conn.commit()
-    conn.close()
-
+    _lap(None)
     return new_deps_count, methods_analyzed, override_deps_count
 
-def fix_field_parent_ids(db_path: str) -> int:
+def fix_field_parent_ids(db_path: str, conn: Optional[sqlite3.Connection] = None) -> int:
     """
     Fix Field entity parent_ids to be children of their Class instead of a Method.
 
@@ -2234,7 +2312,9 @@ def fix_field_parent_ids(db_path: str) -> int:
     Returns:
         Number of fields updated
     """
-    conn = sqlite3.Connection(db_path)
+    owns_conn = conn is None
+    if conn is None:
+        conn = sqlite3.Connection(db_path)
     cursor = conn.cursor()
 
     print("\n" + "="*70)
@@ -2255,11 +2335,12 @@ def fix_field_parent_ids(db_path: str) -> int:
           AND m.kind = 'Method'
           AND c.kind = 'Class'
     """)
-    rows = cursor.fetchall()
+    rows = fetch_all(cursor)
 
     if not rows:
         print("[OK] No fields need fixing - all fields already have Class as parent_id")
-        conn.close()
+        if owns_conn:
+            conn.close()
         return 0
 
     print(f"Found {len(rows)} fields parented by Methods")
@@ -2287,10 +2368,14 @@ def fix_field_parent_ids(db_path: str) -> int:
             canonical_id = canonical[0]
             cursor.execute("UPDATE deps SET src = ? WHERE src = ?", (canonical_id, field_id))
             merged_deps_repointed += cursor.rowcount
+            note_rows_written(cursor.rowcount)
             cursor.execute("UPDATE deps SET tgt = ? WHERE tgt = ?", (canonical_id, field_id))
             merged_deps_repointed += cursor.rowcount
+            note_rows_written(cursor.rowcount)
             cursor.execute("DELETE FROM deps WHERE src = ? OR tgt = ?", (field_id, field_id))
+            note_rows_written(cursor.rowcount)
             cursor.execute("DELETE FROM entities WHERE id = ?", (field_id,))
+            note_rows_written(cursor.rowcount)
             merged_count += 1
             if len(merged_examples) < 25:
                 merged_examples.append(
@@ -2298,6 +2383,7 @@ def fix_field_parent_ids(db_path: str) -> int:
                 )
         else:
             cursor.execute("UPDATE entities SET parent_id = ? WHERE id = ?", (class_id, field_id))
+            note_rows_written(cursor.rowcount)
             moved_count += 1
             if len(moved_examples) < 25:
                 moved_examples.append(
@@ -2324,6 +2410,7 @@ def fix_field_parent_ids(db_path: str) -> int:
           )
     """)
     deduped_use = cursor.rowcount
+    note_rows_written(deduped_use)
     if deduped_use:
         print(f"[INFO] Deduped {deduped_use} duplicate Use deps after field merge")
         conn.commit()
@@ -2383,12 +2470,15 @@ def fix_field_parent_ids(db_path: str) -> int:
     except Exception as exc:
         print(f"[WARN] Failed to write report file: {exc}")
 
-    conn.close()
+    if owns_conn:
+        conn.close()
     return updated_count
 
-def verify_enhancement(db_path: str) -> Tuple[int, int]:
+def verify_enhancement(db_path: str, conn: Optional[sqlite3.Connection] = None) -> Tuple[int, int]:
     """Verify that Method->Field and Field->Field dependencies were added."""
-    conn = sqlite3.Connection(db_path)
+    owns_conn = conn is None
+    if conn is None:
+        conn = sqlite3.Connection(db_path)
     cursor = conn.cursor()
 
     # Count Method->Field dependencies
@@ -2429,14 +2519,440 @@ def verify_enhancement(db_path: str) -> Tuple[int, int]:
     print(f"{'Source':<15} {'Target':<15} {'Type':<10} {'Count':<10}")
     print("-" * 70)
 
-    for row in cursor.fetchall():
+    for row in fetch_all(cursor):
         src_kind, tgt_kind, dep_kind, count = row
         print(f"{src_kind:<15} {tgt_kind:<15} {dep_kind:<10} {count:<10}")
 
-    conn.close()
+    if owns_conn:
+        conn.close()
 
     return method_field_count, field_field_count
 
+# ---------------------------------------------------------------------------
+# Incremental enhancement
+# ---------------------------------------------------------------------------
+
+_MANIFEST_VERSION = "1"
+
+# Version of the edge derivation recorded in incremental manifests.  Bump it
+# whenever a change to this script alters the edges it produces; manifests
+# written by another version trigger a full run.
+ENHANCE_VERSION = "2"
+
+
+def _entity_file_map(conn: sqlite3.Connection) -> Dict[bytes, bytes]:
+    """Map every entity id to the id of its enclosing File entity (Files map to themselves)."""
+    parent_of: Dict[bytes, Optional[bytes]] = {}
+    file_ids: Set[bytes] = set()
+    for eid, pid, kind in iter_rows(conn.execute("SELECT id, parent_id, kind FROM entities")):
+        parent_of[eid] = pid
+        if kind == "File":
+            file_ids.add(eid)
+
+    owner: Dict[bytes, bytes] = {fid: fid for fid in file_ids}
+    for eid in parent_of:
+        if eid in owner:
+            continue
+        chain: List[bytes] = []
+        cur: Optional[bytes] = eid
+        found: Optional[bytes] = None
+        while cur is not None and cur not in chain:
+            if cur in owner:
+                found = owner[cur]
+                break
+            chain.append(cur)
+            cur = parent_of.get(cur)
+        if found is None:
+            continue
+        for e in chain:
+            owner[e] = found
+    return owner
+
+
+def _current_commit_id(conn: sqlite3.Connection) -> Optional[bytes]:
+    """Return the commit id NeoDepends stamped on this DB's raw deps (most common non-null)."""
+    row = conn.execute(
+        """
+        SELECT commit_id FROM deps
+        WHERE commit_id IS NOT NULL
+        GROUP BY commit_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+        """
+    ).fetchone()
+    return row[0] if row else None
+
+
+@dataclass
+class IncrementalPlan:
+    """What an incremental enhancement run re-analyses and what it carries over."""
+
+    # File name -> (content id, digest of the file's raw outgoing deps), as of this run.
+    files: Dict[str, Tuple[bytes, str]]
+    # File entity ids to re-analyse; None means a full run.
+    scope_file_ids: Optional[Set[bytes]]
+    # Final deps of the clean files from the previous run: (src, tgt, kind, row, has_commit).
+    carried: Dict[str, List[Tuple[bytes, bytes, str, Optional[int], int]]] = field(default_factory=dict)
+    reason: str = ""
+    # Entity id -> enclosing File id (``_entity_file_map``).  Enhancement adds deps
+    # and re-parents Fields within their class, so this holds for the whole run.
+    owner: Dict[bytes, bytes] = field(default_factory=dict)
+
+
+def _manifest_meta(
+    profile: str,
+    allow_ambiguous_types: bool,
+    include_transitive_inheritance: bool,
+    type_annotated_params: bool,
+) -> Dict[str, str]:
+    return {
+        "manifest_version": _MANIFEST_VERSION,
+        "tool_version": ENHANCE_VERSION,
+        "profile": profile,
+        "allow_ambiguous_types": str(bool(allow_ambiguous_types)),
+        "include_transitive_inheritance": str(bool(include_transitive_inheritance)),
+        "type_annotated_params": str(bool(type_annotated_params)),
+    }
+
+
+def _file_digests(
+    conn: sqlite3.Connection, owner: Dict[bytes, bytes]
+) -> Tuple[Dict[str, Tuple[bytes, str]], Dict[str, bytes]]:
+    """Return name -> (content_id, raw dep digest) and name -> File id for the current DB."""
+    file_rows = fetch_all(conn.execute("SELECT id, name, content_id FROM entities WHERE kind = 'File'"))
+    edges_by_file: Dict[bytes, List[Tuple[str, str, str, str]]] = {}
+    for src, tgt, kind, row in iter_rows(conn.execute("SELECT src, tgt, kind, row FROM deps")):
+        fid = owner.get(src)
+        if fid is None:
+            continue
+        edges_by_file.setdefault(fid, []).append(
+            (src.hex(), tgt.hex() if tgt is not None else "", kind, "" if row is None else str(row))
+        )
+
+    files: Dict[str, Tuple[bytes, str]] = {}
+    ids: Dict[str, bytes] = {}
+    for fid, name, cid in file_rows:
+        h = hashlib.sha1()
+        for edge in sorted(edges_by_file.get(fid, ())):
+            h.update("\t".join(edge).encode("utf-8"))
+            h.update(b"\n")
+        files[name] = (cid, h.hexdigest())
+        ids[name] = fid
+    return files, ids
+
+
+def plan_incremental_enhancement(
+    conn: sqlite3.Connection,
+    manifest_path: Path,
+    meta: Dict[str, str],
+) -> IncrementalPlan:
+    """
+    Compare the un-enhanced DB against the sidecar manifest of the previous run.
+
+    A file is re-analysed ("dirty") when its content id or raw dependency digest
+    changed, or when it is a reverse dependent of such a file: any of its previous
+    enhanced edges, or current raw edges, point at an entity that no longer exists
+    or lives in a changed file.  Subclasses of classes in dirty files are pulled in
+    until a fixpoint so inherited members are re-resolved.  Everything else is
+    carried over from the manifest.
+
+    Falls back to a full run when the manifest is missing, was written with other
+    options or another ``ENHANCE_VERSION``, or when files were added (a new
+    module can change how unchanged files resolve their imports).
+    """
+    owner = _entity_file_map(conn)
+    files, file_ids = _file_digests(conn, owner)
+
+    def full_run(reason: str) -> IncrementalPlan:
+        return IncrementalPlan(files=files, scope_file_ids=None, reason=reason, owner=owner)
+
+    if not manifest_path.exists():
+        return full_run("no manifest")
+    try:
+        mconn = sqlite3.connect(str(manifest_path))
+    except sqlite3.Error as exc:
+        return full_run(f"unreadable manifest ({exc})")
+    try:
+        try:
+            prev_meta = dict(mconn.execute("SELECT key, value FROM meta").fetchall())
+            prev_files = {
+                name: (cid, digest)
+                for name, cid, digest in mconn.execute("SELECT name, content_id, raw_digest FROM files")
+            }
+            prev_edges: Dict[str, List[Tuple[bytes, bytes, str, Optional[int], int]]] = {}
+            for fname, src, tgt, kind, row, has_commit in mconn.execute(
+                "SELECT file, src, tgt, kind, row, has_commit FROM edges"
+            ):
+                prev_edges.setdefault(fname, []).append((src, tgt, kind, row, has_commit))
+        except sqlite3.Error as exc:
+            return full_run(f"unreadable manifest ({exc})")
+    finally:
+        mconn.close()
+
+    if prev_meta != meta:
+        return full_run("options or tool version changed")
+    added = sorted(set(files) - set(prev_files))
+    if added:
+        return full_run(f"{len(added)} new file(s)")
+
+    changed: Set[str] = {name for name, state in files.items() if prev_files.get(name) != state}
+    name_by_file_id = {fid: name for name, fid in file_ids.items()}
+
+    def _target_dirty(tgt: Optional[bytes], dirty: Set[str]) -> bool:
+        if tgt is None:
+            return False
+        fid = owner.get(tgt)
+        if fid is None:
+            return True
+        return name_by_file_id.get(fid) in dirty
+
+    dirty = set(changed)
+    for name in files:
+        if name in dirty:
+            continue
+        if any(_target_dirty(tgt, changed) for _src, tgt, _k, _r, _c in prev_edges.get(name, ())):
+            dirty.add(name)
+    for src, tgt in iter_rows(conn.execute("SELECT src, tgt FROM deps")):
+        fid = owner.get(src)
+        name = name_by_file_id.get(fid) if fid is not None else None
+        if name is not None and name not in dirty and _target_dirty(tgt, changed):
+            dirty.add(name)
+
+    # Subclasses of dirty classes inherit whatever changed there.
+    extends: List[Tuple[str, bytes]] = []
+    for name, edges in prev_edges.items():
+        for _src, tgt, kind, _r, _c in edges:
+            if kind == "Extend" and name in files:
+                extends.append((name, tgt))
+    grew = True
+    while grew:
+        grew = False
+        for name, tgt in extends:
+            if name not in dirty and _target_dirty(tgt, dirty):
+                dirty.add(name)
+                grew = True
+
+    carried = {name: prev_edges.get(name, []) for name in files if name not in dirty}
+    return IncrementalPlan(
+        files=files,
+        scope_file_ids={file_ids[name] for name in dirty},
+        carried=carried,
+        reason=f"{len(changed)} changed, {len(dirty) - len(changed)} dependent",
+        owner=owner,
+    )
+
+
+def apply_carried_edges(conn: sqlite3.Connection, plan: IncrementalPlan, commit_id: Optional[bytes]) -> int:
+    """Replace the deps of clean files with the enhanced edges recorded by the previous run."""
+    if plan.scope_file_ids is None or not plan.carried:
+        return 0
+    owner = plan.owner or _entity_file_map(conn)
+    clean_file_ids = {
+        fid for fid, in iter_rows(conn.execute("SELECT id FROM entities WHERE kind = 'File'"))
+        if fid not in plan.scope_file_ids
+    }
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _carry_src (id BLOB PRIMARY KEY)")
+    cursor.execute("DELETE FROM _carry_src")
+    cursor.executemany(
+        "INSERT INTO _carry_src (id) VALUES (?)",
+        ((eid,) for eid, fid in owner.items() if fid in clean_file_ids),
+    )
+    rows = [
+        (src, tgt, kind, row, commit_id if has_commit else None)
+        for edges in plan.carried.values()
+        for src, tgt, kind, row, has_commit in edges
+    ]
+    # Clean files are usually most of the project, so this usually rewrites the
+    # deps unindexed: their old rows are deleted and about as many reinserted.
+    with bulk_mutation(conn, 2 * len(rows)):
+        cursor.execute("DELETE FROM deps WHERE src IN (SELECT id FROM _carry_src)")
+        note_rows_written(cursor.rowcount)
+        cursor.execute("DROP TABLE _carry_src")
+        cursor.executemany(
+            "INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        note_rows_written(len(rows))
+        conn.commit()
+    return len(rows)
+
+
+def write_enhance_manifest(
+    conn: sqlite3.Connection,
+    manifest_path: Path,
+    meta: Dict[str, str],
+    files: Dict[str, Tuple[bytes, str]],
+    owner: Optional[Dict[bytes, bytes]] = None,
+) -> None:
+    """
+    Record the inputs (content ids, raw digests) and final deps of this run.
+
+    *owner* is the entity -> File map of the plan, recomputed when not given.
+    """
+    if owner is None:
+        owner = _entity_file_map(conn)
+    name_by_file_id = {
+        fid: name for fid, name in iter_rows(conn.execute("SELECT id, name FROM entities WHERE kind = 'File'"))
+    }
+    edges = []
+    for src, tgt, kind, row, commit_id in iter_rows(
+        conn.execute("SELECT src, tgt, kind, row, commit_id FROM deps ORDER BY rowid")
+    ):
+        fid = owner.get(src)
+        name = name_by_file_id.get(fid) if fid is not None else None
+        if name is None:
+            continue
+        edges.append((name, src, tgt, kind, row, 0 if commit_id is None else 1))
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    mconn = sqlite3.connect(str(tmp_path))
+    try:
+        mconn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE files (name TEXT PRIMARY KEY, content_id BLOB, raw_digest TEXT NOT NULL);
+            CREATE TABLE edges (file TEXT NOT NULL, src BLOB, tgt BLOB, kind TEXT, row INTEGER, has_commit INTEGER);
+            """
+        )
+        mconn.executemany("INSERT INTO meta VALUES (?, ?)", sorted(meta.items()))
+        mconn.executemany(
+            "INSERT INTO files VALUES (?, ?, ?)",
+            ((name, cid, digest) for name, (cid, digest) in sorted(files.items())),
+        )
+        mconn.executemany("INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?)", edges)
+        mconn.commit()
+    finally:
+        mconn.close()
+    tmp_path.replace(manifest_path)
+
+def run_enhancement(
+    db_path: str,
+    source_root: str,
+    *,
+    profile: str = "depends",
+    allow_ambiguous_types: bool = False,
+    include_transitive_inheritance: bool = False,
+    type_annotated_params: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    incremental_manifest: Optional[str] = None,
+    stage_profile: Optional[str] = None,
+    jobs: int = 1,
+) -> None:
+    """Run the full enhancement sequence (steps 1-4) that the CLI performs.
+
+    Shared by ``main()`` and the in-process mode of neodepends_python_export.py,
+    which passes its own ``conn`` so all post-processing stages reuse one
+    connection.
+
+    With ``incremental_manifest``, only files whose contents (or raw deps) changed
+    since the run that wrote the manifest, plus their reverse dependents, are
+    re-analysed; the enhanced edges of all other files are carried over from the
+    manifest (see ``plan_incremental_enhancement``). The manifest is rewritten at
+    the end of every run.
+
+    With ``stage_profile``, per-STEP timing, memory and row counts are written to
+    that JSON file (the exporter folds them into ``run_summary.json``).
+    """
+    print("="*70)
+    print("Python Dependency Enhancement Tool")
+    print("="*70)
+    print(f"Database: {db_path}")
+    print(f"Source root: {source_root}")
+    print()
+
+    owns_conn = False
+    plan: Optional[IncrementalPlan] = None
+    commit_id: Optional[bytes] = None
+    meta: Dict[str, str] = {}
+    stages: Optional[StageProfiler] = None
+    if stage_profile is not None:
+        stages = StageProfiler(prefix="enhance_")
+    if conn is None and (incremental_manifest is not None or stages is not None):
+        conn = sqlite3.Connection(db_path)
+        owns_conn = True
+    if incremental_manifest is not None:
+        if stages is not None:
+            stages.lap("incremental_plan", db=conn)
+        meta = _manifest_meta(
+            profile, allow_ambiguous_types, include_transitive_inheritance, type_annotated_params
+        )
+        plan = plan_incremental_enhancement(conn, Path(incremental_manifest), meta)
+        commit_id = _current_commit_id(conn)
+        if plan.scope_file_ids is None:
+            print(f"Incremental enhancement: full run ({plan.reason})")
+        else:
+            print(
+                f"Incremental enhancement: {len(plan.scope_file_ids)} of {len(plan.files)} "
+                f"files re-analysed ({plan.reason})"
+            )
+        print()
+
+    # Steps 1-4: Add Method->Field dependencies, fix parents, detect overrides
+    print("STEP 1: Adding Method->Field dependencies...")
+    print("="*70)
+    new_deps, methods, override_count = enhance_python_dependencies(
+        db_path,
+        source_root,
+        profile=profile,
+        allow_ambiguous_types=allow_ambiguous_types,
+        include_transitive_inheritance=include_transitive_inheritance,
+        type_annotated_params=type_annotated_params,
+        conn=conn,
+        scope_file_ids=plan.scope_file_ids if plan is not None else None,
+        entity_files=plan.owner if plan is not None else None,
+        stages=stages,
+        jobs=jobs,
+    )
+
+    print(f"\n{'='*70}")
+    print(f"Steps 1 & 4 complete!")
+    print(f"  Methods analyzed: {methods}")
+    print(f"  New dependencies added: {new_deps}")
+    print(f"  Override dependencies added: {override_count}")
+
+    # Step 2: Fix Field parent_ids (CRITICAL for Deicide!)
+    print("\n" + "="*70)
+    print("STEP 2: Fixing Field parent_ids for clustering...")
+    print("="*70)
+    if stages is not None:
+        stages.lap("step2_fix_field_parents", db=conn)
+    fields_fixed = fix_field_parent_ids(db_path, conn=conn)
+
+    if plan is not None and plan.scope_file_ids is not None:
+        if stages is not None:
+            stages.lap("incremental_carry_over", db=conn)
+        carried = apply_carried_edges(conn, plan, commit_id)
+        print(f"[INFO] Carried over {carried} deps from {len(plan.carried)} unchanged files")
+
+    # Step 3: Verify
+    if stages is not None:
+        stages.lap("step3_verify", db=conn)
+    method_field_count, field_field_count = verify_enhancement(db_path, conn=conn)
+
+    if plan is not None:
+        if stages is not None:
+            stages.lap("incremental_manifest", db=conn)
+        write_enhance_manifest(conn, Path(incremental_manifest), meta, plan.files, plan.owner)
+        print(f"[INFO] Wrote incremental manifest: {incremental_manifest}")
+
+    if stages is not None:
+        stages.lap(None)
+        stages.write(Path(stage_profile))
+    if owns_conn:
+        conn.close()
+
+    print(f"\n{'='*70}")
+    print("COMPLETE SUCCESS!")
+    print(f"  - {method_field_count} Method->Field dependencies created")
+    print(f"  - {field_field_count} Field->Field dependencies created")
+    print(f"  - {override_count} Override dependencies created")
+    print(f"  - {fields_fixed} fields now siblings with methods")
+    print(f"  - Database ready for Deicide hierarchical clustering!")
+    print(f"{'='*70}\n")
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("database_path", type=str)
@@ -2465,6 +2981,29 @@ def main() -> int:
             "even if no explicit import statement exists. Captures duck-typed structural coupling."
         ),
     )
+    parser.add_argument(
+        "--incremental-manifest",
+        default=None,
+        help=(
+            "Sidecar manifest of the previous run. Only files whose content changed, and "
+            "their reverse dependents, are re-analysed; other edges are carried over. "
+            "The manifest is (re)written after every run."
+        ),
+    )
+    parser.add_argument(
+        "--stage-profile",
+        default=None,
+        help=(
+            "Write per-STEP wall/CPU time, peak RSS and deps row counts to this JSON file. "
+            "cProfile dumps per STEP are added when NEODEPENDS_PROFILE_DIR is set."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for the per-method AST fact extraction (default: 1, in-process).",
+    )
     args = parser.parse_args()
 
     db_path = args.database_path
@@ -2475,48 +3014,17 @@ def main() -> int:
         print(f"Error: Database not found at {db_path}")
         return 2
 
-    print("="*70)
-    print("Python Dependency Enhancement Tool")
-    print("="*70)
-    print(f"Database: {db_path}")
-    print(f"Source root: {source_root}")
-    print()
-
-    # Steps 1-4: Add Method->Field dependencies, fix parents, detect overrides
-    print("STEP 1: Adding Method->Field dependencies...")
-    print("="*70)
-    new_deps, methods, override_count = enhance_python_dependencies(
+    run_enhancement(
         db_path,
         source_root,
         profile=profile,
         allow_ambiguous_types=bool(args.allow_ambiguous_types),
         include_transitive_inheritance=bool(args.include_transitive_inheritance),
         type_annotated_params=bool(args.type_annotated_params),
+        incremental_manifest=args.incremental_manifest,
+        stage_profile=args.stage_profile,
+        jobs=max(1, int(args.jobs)),
     )
 
-    print(f"\n{'='*70}")
-    print(f"Steps 1 & 4 complete!")
-    print(f"  Methods analyzed: {methods}")
-    print(f"  New dependencies added: {new_deps}")
-    print(f"  Override dependencies added: {override_count}")
-
-    # Step 2: Fix Field parent_ids (CRITICAL for Deicide!)
-    print("\n" + "="*70)
-    print("STEP 2: Fixing Field parent_ids for clustering...")
-    print("="*70)
-    fields_fixed = fix_field_parent_ids(db_path)
-
-    # Step 3: Verify
-    method_field_count, field_field_count = verify_enhancement(db_path)
-
-    print(f"\n{'='*70}")
-    print("COMPLETE SUCCESS!")
-    print(f"  - {method_field_count} Method->Field dependencies created")
-    print(f"  - {field_field_count} Field->Field dependencies created")
-    print(f"  - {override_count} Override dependencies created")
-    print(f"  - {fields_fixed} fields now siblings with methods")
-    print(f"  - Database ready for Deicide hierarchical clustering!")
-    print(f"{'='*70}\n")
-
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -4,119 +4,71 @@ from __future__ import annotations
 import argparse
 import json
 import sqlite3
-from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-
-DV8_SCHEMA_VERSION = "1.0"
+from graph_model import GraphModel
 
 
-@dataclass(frozen=True)
-class Entity:
-    id: bytes
-    parent_id: Optional[bytes]
-    name: str
-    kind: str
+DV8_SCHEMA_VERSION = "1.0"
 
 
 Edge = Tuple[str, str, str]  # (src, tgt, kind)
 
 
-def _read_entities(con: sqlite3.Connection) -> Dict[bytes, Entity]:
-    cur = con.cursor()
-    rows = cur.execute("SELECT id, parent_id, name, kind FROM entities").fetchall()
-    entities: Dict[bytes, Entity] = {}
-    for entity_id, parent_id, name, kind in rows:
-        entities[entity_id] = Entity(id=entity_id, parent_id=parent_id, name=str(name), kind=str(kind))
-    return entities
-
-
-def _find_ancestor(
-    entities: Dict[bytes, Entity], entity_id: bytes, *, kind: str
-) -> Optional[Entity]:
-    cur_id: Optional[bytes] = entity_id
-    while cur_id is not None:
-        e = entities.get(cur_id)
-        if e is None:
-            return None
-        if e.kind == kind:
-            return e
-        cur_id = e.parent_id
-    return None
-
-
-def _file_name_for_entity(entities: Dict[bytes, Entity], entity_id: bytes) -> str:
-    f = _find_ancestor(entities, entity_id, kind="File")
-    return f.name if f else "(Unknown File)"
-
-
-def _class_name_for_entity(entities: Dict[bytes, Entity], entity_id: bytes) -> Optional[str]:
-    c = _find_ancestor(entities, entity_id, kind="Class")
-    return c.name if c else None
-
-
-def _var_name(
-    entities: Dict[bytes, Entity], entity_id: bytes, *, dv8_hierarchy: str
-) -> Optional[str]:
-    e = entities.get(entity_id)
-    if e is None:
+def _var_name(graph: GraphModel, entity: int, *, dv8_hierarchy: str) -> Optional[str]:
+    if entity < 0:
         return None
+    kind = graph.kinds[graph.kind[entity]]
+    name = str(graph.name[entity])
 
-    file_name = _file_name_for_entity(entities, entity_id)
+    file_idx = graph.nearest("File")[entity]
+    file_name = str(graph.name[file_idx]) if file_idx >= 0 else "(Unknown File)"
 
-    if e.kind == "File":
-        return f"{e.name}/self (File)"
+    if kind == "File":
+        return f"{name}/self (File)"
 
-    class_name = _class_name_for_entity(entities, entity_id)
+    class_idx = graph.nearest("Class")[entity]
+    class_name = str(graph.name[class_idx]) if class_idx >= 0 else None
 
-    if e.kind == "Class":
-        return f"{file_name}/{e.name}/self (Class)"
+    if kind == "Class":
+        return f"{file_name}/{name}/self (Class)"
 
-    if e.kind in {"Method", "Constructor", "Field", "Function"}:
+    if kind in {"Method", "Constructor", "Field", "Function"}:
         if not class_name:
             # Module-level function or field (no class parent)
-            if e.kind == "Function":
-                return f"{file_name}/functions/{e.name} (Function)"
-            if e.kind == "Field":
-                return f"{file_name}/fields/{e.name} (Field)"
+            if kind == "Function":
+                return f"{file_name}/functions/{name} (Function)"
+            if kind == "Field":
+                return f"{file_name}/fields/{name} (Field)"
             # Fallback for other kinds without class
-            return f"{file_name}/{e.name} ({e.kind})"
+            return f"{file_name}/{name} ({kind})"
         # Class member
-        if e.kind == "Method":
-            return f"{file_name}/{class_name}/methods/{e.name} (Method)"
-        if e.kind == "Constructor":
-            return f"{file_name}/{class_name}/constructors/{e.name} (Constructor)"
-        if e.kind == "Field":
-            return f"{file_name}/{class_name}/fields/{e.name} (Field)"
-        if e.kind == "Function":
+        if kind == "Method":
+            return f"{file_name}/{class_name}/methods/{name} (Method)"
+        if kind == "Constructor":
+            return f"{file_name}/{class_name}/constructors/{name} (Constructor)"
+        if kind == "Field":
+            return f"{file_name}/{class_name}/fields/{name} (Field)"
+        if kind == "Function":
             # Should not happen: Function inside a class should be Method
-            return f"{file_name}/{class_name}/methods/{e.name} (Function)"
+            return f"{file_name}/{class_name}/methods/{name} (Function)"
 
     # Fallback: keep it addressable in the matrix.
-    return f"{file_name}/{e.name} ({e.kind})"
-
-
-def _read_edges(
-    con: sqlite3.Connection,
-    *,
-    entities: Dict[bytes, Entity],
-    kinds: Sequence[str],
-    dv8_hierarchy: str,
-) -> List[Edge]:
-    cur = con.cursor()
-    wanted = set(kinds)
-    rows = cur.execute("SELECT src, tgt, kind FROM deps").fetchall()
+    return f"{file_name}/{name} ({kind})"
+
+
+def _read_edges(graph: GraphModel, *, kinds: Sequence[str], dv8_hierarchy: str) -> List[Edge]:
+    wanted = {graph.kind_code(k) for k in kinds}
     out: List[Edge] = []
-    for src_id, tgt_id, kind in rows:
-        kind = str(kind)
+    for _i, src_idx, tgt_idx, kind in graph.iter_deps():
         if kind not in wanted:
             continue
-        src = _var_name(entities, src_id, dv8_hierarchy=dv8_hierarchy)
-        tgt = _var_name(entities, tgt_id, dv8_hierarchy=dv8_hierarchy)
+        src = _var_name(graph, src_idx, dv8_hierarchy=dv8_hierarchy)
+        tgt = _var_name(graph, tgt_idx, dv8_hierarchy=dv8_hierarchy)
         if not src or not tgt:
             continue
-        out.append((src, tgt, kind))
+        out.append((src, tgt, str(graph.kinds[kind])))
     return out
 
 
@@ -171,8 +123,8 @@ def main() -> int:
 
     con = sqlite3.connect(str(db))
     try:
-        entities = _read_entities(con)
-        edges = _read_edges(con, entities=entities, kinds=kinds, dv8_hierarchy=args.dv8_hierarchy)
+        graph = GraphModel.from_db(con)
+        edges = _read_edges(graph, kinds=kinds, dv8_hierarchy=args.dv8_hierarchy)
     finally:
         con.close()
 
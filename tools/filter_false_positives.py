@@ -13,55 +13,33 @@ Example: python3 filter_false_positives.py output.db output_cleaned.db
 import sqlite3
 import sys
 import shutil
+from array import array
+from collections import Counter
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+from db_indexes import bulk_mutation
+from graph_model import iter_rows
+from stage_profile import note_rows_written
 
-def is_false_positive_sibling_method(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
-    """
-    Detect false positive: Method depending on sibling method at definition area.
-
-    This occurs when stack-graphs processes type annotations or method signatures
-    and incorrectly creates dependencies to all methods in the same class.
-
-    For simple methods (def + single statement), false positives can appear at either:
-    - start_row (the def line with type annotations)
-    - end_row (which tree-sitter may attribute to the signature)
-    """
-    # Get source entity info
-    cursor.execute("""
-        SELECT kind, parent_id, start_row, end_row
-        FROM entities
-        WHERE id = ?
-    """, (src_id,))
-    src_result = cursor.fetchone()
 
-    if not src_result:
-        return False
+# Entity facts used by the rules: (kind, parent_id, start_row, end_row).
+_EntityInfo = Tuple[str, Optional[bytes], int, int]
 
-    src_kind, src_parent_id, src_start_row, src_end_row = src_result
 
-    # Source must be a Method
-    if src_kind != 'Method':
-        return False
+def _at_definition_lines(src_info: _EntityInfo, dep_row: int) -> bool:
+    """True when ``dep_row`` is the first or last line of the source entity."""
+    _kind, _parent_id, start_row, end_row = src_info
+    return dep_row == start_row or dep_row == end_row
 
-    # Get target entity info
-    cursor.execute("""
-        SELECT kind, parent_id
-        FROM entities
-        WHERE id = ?
-    """, (tgt_id,))
-    tgt_result = cursor.fetchone()
 
-    if not tgt_result:
-        return False
-
-    tgt_kind, tgt_parent_id = tgt_result
+def _sibling_method_rule(src_info: _EntityInfo, tgt_info: _EntityInfo, dep_row: int) -> bool:
+    src_kind, src_parent_id, src_start_row, src_end_row = src_info
+    tgt_kind, tgt_parent_id = tgt_info[0], tgt_info[1]
 
-    # Target must be a Method
-    if tgt_kind != 'Method':
+    # Source and target must be sibling Methods (same parent)
+    if src_kind != 'Method' or tgt_kind != 'Method':
         return False
-
-    # Must be siblings (same parent)
     if src_parent_id != tgt_parent_id:
         return False
 
@@ -69,144 +47,131 @@ def is_false_positive_sibling_method(cursor: sqlite3.Cursor, src_id: bytes, tgt_
     # - start_row: type annotations in signature
     # - end_row: closing of method definition (tree-sitter artifact)
     #
-    # For very small methods (1-3 lines), both start and end are suspect
-    # For larger methods, end_row is where tree-sitter often places spurious deps
-    method_size = src_end_row - src_start_row + 1
-
-    if method_size <= 3:
-        # Small methods: check both start and end
-        if dep_row == src_start_row or dep_row == src_end_row:
-            return True
-    else:
-        # Larger methods: end_row is more suspicious (method closing)
-        # start_row can have legitimate dependencies (e.g., decorators, multi-line signatures)
-        # But sibling method dependencies at end_row are almost certainly false positives
-        if dep_row == src_end_row:
-            return True
-        # Also check start_row for very suspicious patterns
-        if dep_row == src_start_row:
-            return True
-
-    return False
-
+    # For very small methods (1-3 lines), both start and end are suspect.
+    # For larger methods, end_row is where tree-sitter often places spurious deps,
+    # and start_row is also checked for very suspicious patterns, so both size
+    # classes flag the same two rows.
+    return _at_definition_lines(src_info, dep_row)
 
-def is_false_positive_parent_class(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
-    """
-    Detect false positive: Method depending on its parent class at definition area.
 
-    This occurs when stack-graphs processes method signatures and creates spurious
-    dependencies to the parent class.
-    """
-    # Get source entity info
-    cursor.execute("""
-        SELECT kind, parent_id, start_row, end_row
-        FROM entities
-        WHERE id = ?
-    """, (src_id,))
-    src_result = cursor.fetchone()
+def _parent_class_rule(src_info: _EntityInfo, tgt_id: bytes, tgt_info: _EntityInfo, dep_row: int) -> bool:
+    src_kind, src_parent_id = src_info[0], src_info[1]
 
-    if not src_result:
+    # Source must be a Method, target its parent Class
+    if src_kind != 'Method' or tgt_info[0] != 'Class':
         return False
+    if src_parent_id != tgt_id:
+        return False
+
+    # Method-to-parent-class dependencies at definition lines
+    # These occur from stack-graphs class scope lookups
+    return _at_definition_lines(src_info, dep_row)
 
-    src_kind, src_parent_id, src_start_row, src_end_row = src_result
 
-    # Source must be a Method
-    if src_kind != 'Method':
+def _field_sibling_rule(src_info: _EntityInfo, tgt_info: _EntityInfo, dep_row: int) -> bool:
+    # Source must be a Field, target a Method in the same parent
+    if src_info[0] != 'Field' or tgt_info[0] != 'Method':
+        return False
+    if src_info[1] != tgt_info[1]:
         return False
 
-    # Get target entity info
+    # Dependency at field definition line or nearby
+    return _at_definition_lines(src_info, dep_row)
+
+
+def _false_positive_reason(
+    src_id: bytes,
+    tgt_id: bytes,
+    dep_row: int,
+    src_info: Optional[_EntityInfo],
+    tgt_info: Optional[_EntityInfo],
+) -> Optional[str]:
+    """Apply the three rules in order; return the first matching reason or None."""
+    if src_info is None or tgt_info is None:
+        return None
+    if _sibling_method_rule(src_info, tgt_info, dep_row):
+        return "sibling_method"
+    if _parent_class_rule(src_info, tgt_id, tgt_info, dep_row):
+        return "parent_class"
+    if _field_sibling_rule(src_info, tgt_info, dep_row):
+        return "field_to_method"
+    return None
+
+
+def _entity_info(cursor: sqlite3.Cursor, entity_id: bytes) -> Optional[_EntityInfo]:
     cursor.execute("""
-        SELECT kind
+        SELECT kind, parent_id, start_row, end_row
         FROM entities
         WHERE id = ?
-    """, (tgt_id,))
-    tgt_result = cursor.fetchone()
+    """, (entity_id,))
+    return cursor.fetchone()
 
-    if not tgt_result:
-        return False
 
-    tgt_kind = tgt_result[0]
+def _load_entity_infos(cursor: sqlite3.Cursor) -> Dict[bytes, _EntityInfo]:
+    """Load the rule inputs for every entity in one scan."""
+    cursor.execute("SELECT id, kind, parent_id, start_row, end_row FROM entities")
+    return {eid: (kind, parent_id, start_row, end_row) for eid, kind, parent_id, start_row, end_row in cursor}
 
-    # Target must be a Class
-    if tgt_kind != 'Class':
-        return False
 
-    # Target must be the parent of source
-    if src_parent_id != tgt_id:
-        return False
-
-    # Method-to-parent-class dependencies at definition lines
-    # These occur from stack-graphs class scope lookups
-    method_size = src_end_row - src_start_row + 1
+def is_false_positive_sibling_method(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
+    """
+    Detect false positive: Method depending on sibling method at definition area.
 
-    if method_size <= 3:
-        # Small methods: both start and end are suspect
-        if dep_row == src_start_row or dep_row == src_end_row:
-            return True
-    else:
-        # Larger methods: end_row is more common for spurious parent deps
-        if dep_row == src_end_row:
-            return True
-        # Also check start_row
-        if dep_row == src_start_row:
-            return True
+    This occurs when stack-graphs processes type annotations or method signatures
+    and incorrectly creates dependencies to all methods in the same class.
 
-    return False
+    For simple methods (def + single statement), false positives can appear at either:
+    - start_row (the def line with type annotations)
+    - end_row (which tree-sitter may attribute to the signature)
+    """
+    src_info = _entity_info(cursor, src_id)
+    if not src_info or src_info[0] != 'Method':
+        return False
+    tgt_info = _entity_info(cursor, tgt_id)
+    if not tgt_info:
+        return False
+    return _sibling_method_rule(src_info, tgt_info, dep_row)
 
 
-def is_false_positive_field_sibling(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
+def is_false_positive_parent_class(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
     """
-    Detect false positive: Field depending on sibling method at definition area.
+    Detect false positive: Method depending on its parent class at definition area.
 
-    Similar to method-to-method false positives, but for fields.
+    This occurs when stack-graphs processes method signatures and creates spurious
+    dependencies to the parent class.
     """
-    # Get source entity info
-    cursor.execute("""
-        SELECT kind, parent_id, start_row, end_row
-        FROM entities
-        WHERE id = ?
-    """, (src_id,))
-    src_result = cursor.fetchone()
-
-    if not src_result:
+    src_info = _entity_info(cursor, src_id)
+    if not src_info or src_info[0] != 'Method':
         return False
-
-    src_kind, src_parent_id, src_start_row, src_end_row = src_result
-
-    # Source must be a Field
-    if src_kind != 'Field':
+    tgt_info = _entity_info(cursor, tgt_id)
+    if not tgt_info:
         return False
+    return _parent_class_rule(src_info, tgt_id, tgt_info, dep_row)
 
-    # Get target entity info
-    cursor.execute("""
-        SELECT kind, parent_id
-        FROM entities
-        WHERE id = ?
-    """, (tgt_id,))
-    tgt_result = cursor.fetchone()
-
-    if not tgt_result:
-        return False
 
-    tgt_kind, tgt_parent_id = tgt_result
+def is_false_positive_field_sibling(cursor: sqlite3.Cursor, src_id: bytes, tgt_id: bytes, dep_row: int) -> bool:
+    """
+    Detect false positive: Field depending on sibling method at definition area.
 
-    # Target must be a Method in the same parent
-    if tgt_kind != 'Method':
+    Similar to method-to-method false positives, but for fields.
+    """
+    src_info = _entity_info(cursor, src_id)
+    if not src_info or src_info[0] != 'Field':
         return False
-
-    if src_parent_id != tgt_parent_id:
+    tgt_info = _entity_info(cursor, tgt_id)
+    if not tgt_info:
         return False
-
-    # Dependency at field definition line or nearby
-    if dep_row == src_start_row or dep_row == src_end_row:
-        return True
-
-    return False
+    return _field_sibling_rule(src_info, tgt_info, dep_row)
 
 
 def filter_dependencies(input_db: str, output_db: str):
     """
     Filter false positive dependencies and create a cleaned database.
+
+    Entities are loaded once into memory and the rules are applied in a single
+    streamed pass over ``deps``; false positives are then deleted in bulk by
+    rowid.  Only their rowids, a count per reason and the first few examples are
+    kept, so memory does not grow with the size of the deps table.
     """
     # Create a copy of the database
     print(f"Copying database from {input_db} to {output_db}...")
@@ -216,73 +181,64 @@ def filter_dependencies(input_db: str, output_db: str):
     conn = sqlite3.connect(output_db)
     cursor = conn.cursor()
 
+    entities = _load_entity_infos(cursor)
+
     # Get all dependencies
     print("Analyzing dependencies...")
-    cursor.execute("SELECT src, tgt, kind, row FROM deps")
-    all_deps = cursor.fetchall()
-
-    total_deps = len(all_deps)
-    false_positives = []
+    cursor.execute("SELECT COUNT(*) FROM deps")
+    total_deps = cursor.fetchone()[0]
 
     print(f"Total dependencies: {total_deps}")
     print("Detecting false positives...")
 
-    # Check each dependency
-    for src, tgt, kind, row in all_deps:
-        is_fp = False
-        fp_reason = None
-
-        # Check for sibling method false positive
-        if is_false_positive_sibling_method(cursor, src, tgt, row):
-            is_fp = True
-            fp_reason = "sibling_method"
-
-        # Check for parent class false positive
-        elif is_false_positive_parent_class(cursor, src, tgt, row):
-            is_fp = True
-            fp_reason = "parent_class"
-
-        # Check for field-method false positive
-        elif is_false_positive_field_sibling(cursor, src, tgt, row):
-            is_fp = True
-            fp_reason = "field_to_method"
-
-        if is_fp:
-            false_positives.append((src, tgt, kind, row, fp_reason))
-
-    print(f"Found {len(false_positives)} false positive dependencies")
-
-    if false_positives:
+    # Rowids of the false positives in table order, their reasons, and the
+    # first (src, tgt, row, reason) examples for the report.
+    fp_rowids = array('q')
+    reasons: Counter = Counter()
+    examples: List[Tuple[bytes, bytes, int, str]] = []
+    cursor.execute("SELECT rowid, src, tgt, row FROM deps")
+    for rowid, src, tgt, row in iter_rows(cursor):
+        src_info = entities.get(src)
+        if src_info is None or src_info[0] not in ('Method', 'Field'):
+            continue
+        reason = _false_positive_reason(src, tgt, row, src_info, entities.get(tgt))
+        if reason is not None:
+            fp_rowids.append(rowid)
+            reasons[reason] += 1
+            if len(examples) < 5:
+                examples.append((src, tgt, row, reason))
+
+    print(f"Found {len(fp_rowids)} false positive dependencies")
+
+    if fp_rowids:
         print("\nFalse Positives Breakdown:")
 
         # Count by reason
-        from collections import Counter
-        reasons = Counter(fp[4] for fp in false_positives)
         for reason, count in reasons.items():
             print(f"  {reason}: {count}")
 
         # Show some examples
         print("\nExamples of false positives being removed:")
-        for i, (src, tgt, kind, row, reason) in enumerate(false_positives[:5]):
+        for i, (src, tgt, row, reason) in enumerate(examples):
             cursor.execute("SELECT name, kind FROM entities WHERE id = ?", (src,))
             src_name, src_kind = cursor.fetchone()
             cursor.execute("SELECT name, kind FROM entities WHERE id = ?", (tgt,))
             tgt_name, tgt_kind = cursor.fetchone()
             print(f"  {i+1}. [{src_name} ({src_kind})] -> [{tgt_name} ({tgt_kind})] at row {row} (reason: {reason})")
 
-        if len(false_positives) > 5:
-            print(f"  ... and {len(false_positives) - 5} more")
+        if len(fp_rowids) > 5:
+            print(f"  ... and {len(fp_rowids) - 5} more")
 
         # Delete false positives
         print("\nRemoving false positives from database...")
-        for src, tgt, kind, row, _ in false_positives:
-            cursor.execute("""
-                DELETE FROM deps
-                WHERE src = ? AND tgt = ? AND kind = ? AND row = ?
-            """, (src, tgt, kind, row))
-
-        conn.commit()
-        print(f"Removed {len(false_positives)} false positive dependencies")
+        with bulk_mutation(conn, len(fp_rowids)):
+            cursor.executemany(
+                "DELETE FROM deps WHERE rowid = ?",
+                ((rowid,) for rowid in fp_rowids),
+            )
+            note_rows_written(cursor.rowcount)
+            conn.commit()
+        print(f"Removed {len(fp_rowids)} false positive dependencies")
 
     # Report final statistics
     cursor.execute("SELECT COUNT(*) FROM deps")
@@ -290,10 +246,10 @@ def filter_dependencies(input_db: str, output_db: str):
 
     print(f"\nFinal Statistics:")
     print(f"  Original dependencies: {total_deps}")
-    print(f"  False positives removed: {len(false_positives)}")
+    print(f"  False positives removed: {len(fp_rowids)}")
     print(f"  Cleaned dependencies: {final_count}")
     if total_deps > 0:
-        print(f"  Reduction: {len(false_positives) / total_deps * 100:.1f}%")
+        print(f"  Reduction: {len(fp_rowids) / total_deps * 100:.1f}%")
     else:
         print(f"  Reduction: N/A (no dependencies found)")
 
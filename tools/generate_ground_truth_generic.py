@@ -8,6 +8,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from ast_cache import blob_id, shared_ast_cache
+from module_index import ModuleIndex
+from source_walk import source_inventory
+
 
 KINDS = ("Import", "Extend", "Create", "Call", "Use", "Parameter", "Cast")
 
@@ -32,35 +36,54 @@ def _read(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore")
 
 
+def _parse(path: Path, rel: str) -> ast.Module:
+    """Parse a project file through the shared AST cache (keyed like NeoDepends `contents.id`)."""
+    text = _read(path)
+    tree = shared_ast_cache().parse(blob_id(text), text)
+    if tree is None:
+        # Blank file (empty module) or a syntax error, which should surface with its filename.
+        return ast.parse(text, filename=rel)
+    return tree
+
+
+# Directories whose files are not part of the project (on top of source_walk.SKIP_DIRS).
+_SKIP_DIR_NAMES = {
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "env",
+    "build",
+    "dist",
+    "site-packages",
+    "node_modules",
+    "dependencies_files_handcount",
+}
+
+
+def _is_project_file(rel: Path) -> bool:
+    if any((part in _SKIP_DIR_NAMES) or part.startswith("dependencies_files_handcount") for part in rel.parts[:-1]):
+        return False
+    return not rel.name.startswith(".")
+
+
+def _project_py(project_root: Path) -> List[Path]:
+    """
+    Python files under `project_root`, skipping common junk directories.
+
+    The tree is walked once per root (source_walk.source_inventory), which also
+    never enters virtualenvs, caches or VCS metadata.
+    """
+    return [p for p in source_inventory(project_root).files(".py") if _is_project_file(p.relative_to(project_root))]
+
+
 def _iter_project_py(project_root: Path, *, exclude_init: bool) -> List[Path]:
     """
     Recursively collect Python files under `project_root`, skipping common junk directories.
     """
-    skip_dir_names = {
-        ".git",
-        ".hg",
-        ".svn",
-        "__pycache__",
-        ".venv",
-        "venv",
-        "env",
-        "build",
-        "dist",
-        "site-packages",
-        "node_modules",
-        "dependencies_files_handcount",
-    }
-
-    out: List[Path] = []
-    for p in project_root.rglob("*.py"):
-        if any((part in skip_dir_names) or part.startswith("dependencies_files_handcount") for part in p.parts):
-            continue
-        if p.name.startswith("."):
-            continue
-        if exclude_init and p.name == "__init__.py":
-            continue
-        out.append(p)
-    return sorted(out)
+    return [p for p in _project_py(project_root) if not (exclude_init and p.name == "__init__.py")]
 
 def _iter_class_defs(body: List[ast.stmt], *, prefix: str = "") -> Iterable[Tuple[str, ast.ClassDef]]:
     """
@@ -99,13 +122,32 @@ def _ann_name(expr: Optional[ast.AST]) -> Optional[str]:
     return None
 
 
-def _module_to_file(project_root: Path, *, current_file: str, module: str, level: int) -> Optional[str]:
+def _module_to_file(
+    project_root: Path,
+    *,
+    current_file: str,
+    module: str,
+    level: int,
+    modules: Optional[ModuleIndex] = None,
+) -> Optional[str]:
     """
     Best-effort import resolution:
 
     - Absolute: `a.b.c` -> `a/b/c.py` or `a/b/c/__init__.py`
     - Relative: `from .x import y` where `level>=1` resolves relative to current file's parent.
+
+    `modules` (see `_project_module_index`) answers the lookup from an index of the
+    project's `.py` files instead of probing the filesystem; imports that climb
+    above `project_root` or name the package itself (`from . import x`) still
+    take the filesystem path.
     """
+    parts = [p for p in module.split(".") if p]
+    if modules is not None and parts:
+        pkg_parts = current_file.split("/")[:-1]
+        up = level - 1 if level and level > 0 else len(pkg_parts)
+        if up <= len(pkg_parts):
+            return modules.lookup(".".join(parts), package="/".join(pkg_parts[: len(pkg_parts) - up]))
+
     base_dir = project_root
     if level and level > 0:
         cur_path = project_root / current_file
@@ -114,7 +156,6 @@ def _module_to_file(project_root: Path, *, current_file: str, module: str, level
             pkg_dir = pkg_dir.parent
         base_dir = pkg_dir
 
-    parts = [p for p in module.split(".") if p]
     candidate_py = base_dir.joinpath(*parts).with_suffix(".py")
     if candidate_py.exists():
         try:
@@ -132,6 +173,11 @@ def _module_to_file(project_root: Path, *, current_file: str, module: str, level
     return None
 
 
+def _project_module_index(project_root: Path) -> ModuleIndex:
+    """Every project `.py` file under `project_root`, `__init__.py` included (see `_project_py`)."""
+    return ModuleIndex(p.relative_to(project_root).as_posix() for p in _project_py(project_root))
+
+
 def var_name_for_entity(file: str, kind: str, class_name: Optional[str], name: str) -> str:
     if kind == "File":
         return f"{file}/module (Module)"
@@ -155,7 +201,7 @@ def collect_classes(project_root: Path, files: List[Path]) -> Dict[Tuple[str, st
 
     for path in files:
         rel = path.relative_to(project_root).as_posix()
-        tree = ast.parse(_read(path), filename=rel)
+        tree = _parse(path, rel)
         for full_name, node in _iter_class_defs(tree.body):
             bases = [n for n in (_simple_name(b) for b in node.bases) if n]
             methods: Dict[str, MethodSig] = {}
@@ -301,6 +347,7 @@ def compute_edges(
             method_param_types[(f, cls, mname)] = tmap
 
     edges_by_file: Dict[str, Dict[str, Set[Tuple[str, str, str]]]] = {}
+    modules = _project_module_index(project_root)
 
     def add_edge(src_file: str, kind: str, src: str, tgt: str) -> None:
         edges_by_file.setdefault(src_file, {}).setdefault(kind, set()).add((src, tgt, kind))
@@ -341,19 +388,23 @@ def compute_edges(
 
     for path in files:
         src_file = path.relative_to(project_root).as_posix()
-        tree = ast.parse(_read(path), filename=src_file)
+        tree = _parse(path, src_file)
         src_file_var = var_name_for_entity(src_file, "File", None, src_file)
 
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
-                    tgt_file = _module_to_file(project_root, current_file=src_file, module=alias.name, level=0)
+                    tgt_file = _module_to_file(
+                        project_root, current_file=src_file, module=alias.name, level=0, modules=modules
+                    )
                     if tgt_file:
                         tgt_var = var_name_for_entity(tgt_file, "File", None, tgt_file)
                         add_edge(src_file, "Import", src_file_var, tgt_var)
             elif isinstance(node, ast.ImportFrom):
                 mod = node.module or ""
-                tgt_file = _module_to_file(project_root, current_file=src_file, module=mod, level=int(node.level or 0))
+                tgt_file = _module_to_file(
+                    project_root, current_file=src_file, module=mod, level=int(node.level or 0), modules=modules
+                )
                 if tgt_file:
                     tgt_var = var_name_for_entity(tgt_file, "File", None, tgt_file)
                     add_edge(src_file, "Import", src_file_var, tgt_var)
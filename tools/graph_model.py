@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Columnar in-memory model of a NeoDepends DB (``entities`` + ``deps``).
+
+The post-processing tools used to hold the graph as ``Dict[bytes, <dataclass>]``
+keyed by 20-byte blob ids and to answer "which File / Class owns this entity?"
+by walking parent pointers through those dicts, memoizing per id.  ``GraphModel``
+interns every entity id to a dense int once and keeps each attribute in a flat
+column:
+
+- entities: ``parent`` (int index, -1 for none/unknown), ``kind`` (code into
+  ``kinds``), ``content`` (code into ``contents``), ``start_row`` / ``end_row``
+  as ``array`` columns; ``name`` as a plain list
+- deps: ``dep_src`` / ``dep_tgt`` (entity index, -1 when the id is not an
+  entity), ``dep_kind``, ``dep_row`` and ``dep_rowid``, in table order
+- CSR adjacency over the deps (``out_dep_indices``), built on first use
+
+Ancestor lookups are whole columns computed in one pass over the entities in
+topological order (parents first): ``nearest("File")[i]`` is the index of the
+closest entity of kind ``File`` at or above ``i`` (-1 if there is none or the
+chain leaves the table), and ``ancestry()`` bundles the owner tables the
+exporters need -- owning file, owning class, class chain, nesting depth and
+nested-function flag.  Callers index a column instead of walking parents.
+
+Deps tables can run to millions of rows, so nothing here ``fetchall()``s them:
+``iter_rows`` streams a query ``fetchmany`` chunk by chunk (chunk size from
+``$NEODEPENDS_SCAN_ROWS``; small lookups that do want a list use ``fetch_all``;
+both count the rows for stage_profile.py), and ``RowColumns`` keeps rows that must stay in
+memory as interned int columns rather than a list of tuples of blobs.
+``write_ancestry_table`` can also materialise them in the DB:
+
+    python3 tools/graph_model.py <dependencies.db>
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+from array import array
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from stage_profile import note_rows_read
+
+
+SCAN_ROWS_ENV = "NEODEPENDS_SCAN_ROWS"
+DEFAULT_SCAN_ROWS = 10_000
+
+
+def scan_rows() -> int:
+    """Rows per ``fetchmany`` chunk: ``$NEODEPENDS_SCAN_ROWS`` if set to a positive int, else the default."""
+    try:
+        rows = int(os.environ.get(SCAN_ROWS_ENV, ""))
+    except ValueError:
+        return DEFAULT_SCAN_ROWS
+    return rows if rows > 0 else DEFAULT_SCAN_ROWS
+
+
+def iter_rows(cursor: sqlite3.Cursor, chunk_rows: Optional[int] = None) -> Iterator[tuple]:
+    """Rows of an executed *cursor*, fetched *chunk_rows* (default ``scan_rows()``) at a time."""
+    size = chunk_rows or scan_rows()
+    while True:
+        chunk = cursor.fetchmany(size)
+        if not chunk:
+            return
+        note_rows_read(len(chunk))
+        yield from chunk
+
+
+def fetch_all(cursor: sqlite3.Cursor) -> List[tuple]:
+    """``cursor.fetchall()``, counted like ``iter_rows``."""
+    rows = cursor.fetchall()
+    note_rows_read(len(rows))
+    return rows
+
+
+class RowColumns(Sequence):
+    """
+    Read-only sequence of fixed-width rows stored as interned int columns.
+
+    Every distinct value (entity id, kind, row number, ...) is kept once in
+    ``values`` and each row as one ``array("i")`` code per column, so holding a
+    deps scan costs a few bytes per row instead of a tuple and fresh blob
+    objects per row.  Indexing and iteration rebuild the row tuples.
+    """
+
+    def __init__(self, width: int) -> None:
+        self.values: List[object] = []
+        self._codes: Dict[object, int] = {}
+        self.columns: List[array] = [array("i") for _ in range(width)]
+
+    @classmethod
+    def from_cursor(cls, cursor: sqlite3.Cursor, *, chunk_rows: Optional[int] = None) -> "RowColumns":
+        """Stream the result of an executed *cursor* into columns."""
+        table = cls(len(cursor.description))
+        table.extend(iter_rows(cursor, chunk_rows))
+        return table
+
+    def extend(self, rows: Iterable[Sequence]) -> None:
+        codes, values = self._codes, self.values
+        appends = [col.append for col in self.columns]
+        for row in rows:
+            for append, value in zip(appends, row):
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(values)
+                    values.append(value)
+                append(code)
+
+    def head(self, width: int) -> "RowColumns":
+        """View of the first *width* columns (shares storage; do not extend either)."""
+        view = RowColumns(0)
+        view.values, view._codes, view.columns = self.values, self._codes, self.columns[:width]
+        return view
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, i: int) -> tuple:  # type: ignore[override]
+        values = self.values
+        return tuple([values[col[i]] for col in self.columns])
+
+    def __iter__(self) -> Iterator[tuple]:
+        get = self.values.__getitem__
+        for codes in zip(*self.columns):
+            yield tuple(map(get, codes))
+
+
+class GraphModel:
+    """Entities and deps of one DB, interned to dense int indices."""
+
+    def __init__(self) -> None:
+        self.ids: List[bytes] = []
+        self.index: Dict[bytes, int] = {}
+        self.parent = array("i")
+        self.kind = array("H")
+        self.name: List[str] = []
+        self.content = array("i")
+        self.start_row = array("i")
+        self.end_row = array("i")
+        self.kinds: List[str] = []
+        self.contents: List[Optional[bytes]] = []
+        self._kind_codes: Dict[str, int] = {}
+        self._content_codes: Dict[Optional[bytes], int] = {}
+
+        self.dep_src = array("i")
+        self.dep_tgt = array("i")
+        self.dep_kind = array("H")
+        self.dep_row = array("i")
+        self.dep_rowid = array("q")
+
+        self._nearest: Dict[Tuple[str, bool], array] = {}
+        self._topo: Optional[Tuple[array, array]] = None
+        self._ancestry: Optional[Ancestry] = None
+        self._out_offsets: Optional[array] = None
+        self._out_deps: Optional[array] = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, *, deps: bool = True) -> "GraphModel":
+        graph = cls()
+        graph.add_entities(
+            iter_rows(conn.execute("SELECT id, parent_id, kind, name, content_id, start_row, end_row FROM entities"))
+        )
+        if deps:
+            graph.add_deps(iter_rows(conn.execute("SELECT rowid, src, tgt, kind, row FROM deps")))
+        return graph
+
+    def kind_code(self, kind: str) -> int:
+        """Code of *kind* in ``kinds`` (interned on first use, shared by entities and deps)."""
+        code = self._kind_codes.get(kind)
+        if code is None:
+            code = self._kind_codes[kind] = len(self.kinds)
+            self.kinds.append(kind)
+        return code
+
+    def add_entities(self, rows: Iterable[Sequence]) -> None:
+        """
+        Add ``(id, parent_id, kind[, name, content_id, start_row, end_row])`` rows.
+
+        Parents may appear after their children within the batch; they are
+        resolved once all rows are in.  A repeated id keeps its first index and
+        takes the later row's attributes, like building a dict from the rows would.
+        """
+        parent_ids: Dict[int, Optional[bytes]] = {}
+        for row in rows:
+            eid, parent_id, kind = row[0], row[1], row[2]
+            name = row[3] if len(row) > 3 else ""
+            content_id = row[4] if len(row) > 4 else None
+            start = (row[5] or 0) if len(row) > 5 else 0
+            end = (row[6] or 0) if len(row) > 6 else 0
+            ccode = self._content_codes.get(content_id)
+            if ccode is None:
+                ccode = self._content_codes[content_id] = len(self.contents)
+                self.contents.append(content_id)
+            i = self.index.get(eid)
+            if i is None:
+                i = self.index[eid] = len(self.ids)
+                self.ids.append(eid)
+                self.parent.append(-1)
+                self.kind.append(self.kind_code(kind))
+                self.name.append(name)
+                self.content.append(ccode)
+                self.start_row.append(start)
+                self.end_row.append(end)
+            else:
+                self.kind[i] = self.kind_code(kind)
+                self.name[i] = name
+                self.content[i] = ccode
+                self.start_row[i] = start
+                self.end_row[i] = end
+            parent_ids[i] = parent_id
+        index = self.index
+        for i, parent_id in parent_ids.items():
+            self.parent[i] = index.get(parent_id, -1) if parent_id is not None else -1
+        self._nearest.clear()
+        self._topo = None
+        self._ancestry = None
+
+    def add_deps(self, rows: Iterable[Sequence]) -> None:
+        """Add ``(rowid, src, tgt, kind[, row])`` rows in table order."""
+        index = self.index
+        for row in rows:
+            self.dep_rowid.append(row[0])
+            self.dep_src.append(index.get(row[1], -1))
+            self.dep_tgt.append(index.get(row[2], -1))
+            self.dep_kind.append(self.kind_code(row[3]))
+            self.dep_row.append((row[4] or 0) if len(row) > 4 else 0)
+        self._out_offsets = self._out_deps = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dep_count(self) -> int:
+        return len(self.dep_src)
+
+    # ------------------------------------------------------------------
+    # Ancestor columns
+    # ------------------------------------------------------------------
+
+    def _topological(self) -> Tuple[array, array]:
+        """
+        ``(order, parent)``: every entity index with parents before children, and
+        the parent column the ancestor tables are built from.
+
+        Entities on a parent cycle (corrupt input) are treated as roots, i.e. as
+        if their parent were not in the table, so no ancestor walk can loop.
+        """
+        if self._topo is not None:
+            return self._topo
+        n = len(self.ids)
+        parent = array("i", self.parent)
+        state = array("b", [0]) * n  # 0 = new, 1 = on the current path, 2 = placed
+        order = array("i")
+        path: List[int] = []
+        for start in range(n):
+            cur = start
+            while cur >= 0 and state[cur] == 0:
+                state[cur] = 1
+                path.append(cur)
+                cur = parent[cur]
+            if cur >= 0 and state[cur] == 1:
+                cycle_start = path.index(cur)
+                for i in path[cycle_start:]:
+                    parent[i] = -1
+            for i in reversed(path):
+                state[i] = 2
+                order.append(i)
+            path.clear()
+        self._topo = (order, parent)
+        return self._topo
+
+    def nearest(self, kind: str, *, include_self: bool = True) -> array:
+        """
+        Column of the closest entity of *kind* at (or, with ``include_self=False``,
+        strictly above) each entity; -1 where there is none.
+        """
+        key = (kind, include_self)
+        col = self._nearest.get(key)
+        if col is not None:
+            return col
+        order, parent = self._topological()
+        if not include_self:
+            at_or_above = self.nearest(kind)
+            col = array("i", (at_or_above[p] if p >= 0 else -1 for p in parent))
+        else:
+            code = self._kind_codes.get(kind, -1)
+            kinds = self.kind
+            col = array("i", [-1]) * len(self.ids)
+            for i in order:
+                if kinds[i] == code:
+                    col[i] = i
+                elif parent[i] >= 0:
+                    col[i] = col[parent[i]]
+        self._nearest[key] = col
+        return col
+
+    def ancestry(self) -> "Ancestry":
+        """Owner and nesting tables for every entity, computed once in topological order."""
+        if self._ancestry is None:
+            self._ancestry = Ancestry.build(self)
+        return self._ancestry
+
+    def nearest_id(self, entity_id: bytes, kind: str, *, include_self: bool = True) -> Optional[bytes]:
+        """Blob id of the closest *kind* entity for *entity_id* (``None`` if there is none)."""
+        i = self.index.get(entity_id)
+        if i is None:
+            return None
+        j = self.nearest(kind, include_self=include_self)[i]
+        return self.ids[j] if j >= 0 else None
+
+    def nearest_map(self, kind: str) -> "NearestMap":
+        """Dict-like ``entity_id -> closest *kind* id`` view over ``nearest(kind)``."""
+        return NearestMap(self, kind)
+
+    # ------------------------------------------------------------------
+    # Adjacency
+    # ------------------------------------------------------------------
+
+    def _build_adjacency(self) -> Tuple[array, array]:
+        if self._out_offsets is not None and self._out_deps is not None:
+            return self._out_offsets, self._out_deps
+        n = len(self.ids)
+        offsets = array("i", [0]) * (n + 1)
+        for s in self.dep_src:
+            if s >= 0:
+                offsets[s + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        fill = array("i", offsets[:n])
+        out = array("i", [0]) * offsets[n]
+        for d, s in enumerate(self.dep_src):
+            if s >= 0:
+                out[fill[s]] = d
+                fill[s] += 1
+        self._out_offsets, self._out_deps = offsets, out
+        return offsets, out
+
+    def out_dep_indices(self, entity: int) -> array:
+        """Indices of the deps whose ``src`` is entity index *entity*, in table order."""
+        offsets, out = self._build_adjacency()
+        return out[offsets[entity] : offsets[entity + 1]]
+
+    def iter_deps(self) -> Iterator[Tuple[int, int, int, int]]:
+        """``(dep_index, src, tgt, kind_code)`` for every dep in table order."""
+        return zip(range(self.dep_count), self.dep_src, self.dep_tgt, self.dep_kind)
+
+
+class NearestMap(MutableMapping):
+    """
+    ``entity_id -> nearest ancestor id`` mapping backed by a ``nearest`` column.
+
+    Drop-in for the per-tool memo dicts it replaces: every entity is already
+    present, and assignments for ids outside the entity table (callers memoizing
+    a miss) go to a small side table.
+    """
+
+    def __init__(self, graph: GraphModel, kind: str) -> None:
+        self._graph = graph
+        self._column = graph.nearest(kind)
+        self._extra: Dict[bytes, Optional[bytes]] = {}
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._graph.index or entity_id in self._extra
+
+    def __getitem__(self, entity_id: bytes) -> Optional[bytes]:
+        i = self._graph.index.get(entity_id)
+        if i is None:
+            return self._extra[entity_id]
+        j = self._column[i]
+        return self._graph.ids[j] if j >= 0 else None
+
+    def __setitem__(self, entity_id: bytes, value: Optional[bytes]) -> None:
+        if entity_id not in self._graph.index:
+            self._extra[entity_id] = value
+
+    def __delitem__(self, entity_id: bytes) -> None:
+        del self._extra[entity_id]
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._graph.ids
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self._graph.ids) + len(self._extra)
+
+
+_FUNCTION_KINDS = ("Method", "Function")
+
+
+@dataclass
+class Ancestry:
+    """
+    Per-entity owner tables (indexed like ``GraphModel.ids``; -1 means none).
+
+    - ``file``: closest File at or above the entity
+    - ``owner_class``: the Class that owns the entity -- the first Class met
+      walking up from its parent, unless a File is met first (module-level
+      functions are stored as Methods under their File)
+    - ``class_chain``: names of the Classes at or above the entity, outer to
+      inner, with directly repeated names collapsed (duplicate tagging can nest
+      a class under a copy of itself)
+    - ``depth``: number of ancestors in the table
+    - ``nested_function``: 1 for a Method/Function defined inside another
+      Method/Function (ignoring same-name duplicate parents), else 0
+    """
+
+    file: array
+    owner_class: array
+    class_chain: List[Tuple[str, ...]]
+    depth: array
+    nested_function: array
+
+    @classmethod
+    def build(cls, graph: GraphModel) -> "Ancestry":
+        order, parent = graph._topological()
+        n = len(graph.ids)
+        kinds, names = graph.kind, graph.name
+        code = graph._kind_codes.get
+        file_code, class_code = code("File", -1), code("Class", -1)
+        function_codes = {code(k, -1) for k in _FUNCTION_KINDS}
+
+        file_col = array("i", [-1]) * n
+        owner = array("i", [-1]) * n
+        depth = array("i", [0]) * n
+        nested = array("b", [0]) * n
+        chain: List[Tuple[str, ...]] = [()] * n
+        # Closest Class-or-File at or above, and closest Method/Function/Class/File at or above.
+        class_or_file = array("i", [-1]) * n
+        scope = array("i", [-1]) * n
+
+        for i in order:
+            k = kinds[i]
+            p = parent[i]
+            if p >= 0:
+                depth[i] = depth[p] + 1
+                file_col[i] = file_col[p]
+                class_or_file[i] = class_or_file[p]
+                scope[i] = scope[p]
+                chain[i] = chain[p]
+                up = class_or_file[p]
+                owner[i] = up if up >= 0 and kinds[up] == class_code else -1
+                if k in function_codes:
+                    # First enclosing scope that is not a same-name duplicate of this function.
+                    j = scope[p]
+                    while j >= 0 and kinds[j] in function_codes and names[j] == names[i]:
+                        j = scope[parent[j]] if parent[j] >= 0 else -1
+                    nested[i] = 1 if j >= 0 and kinds[j] in function_codes else 0
+            if k == file_code:
+                file_col[i] = i
+            if k == class_code or k == file_code:
+                class_or_file[i] = i
+            if k == class_code or k == file_code or k in function_codes:
+                scope[i] = i
+            if k == class_code and (not chain[i] or chain[i][-1] != names[i]):
+                chain[i] = chain[i] + (names[i],)
+        return cls(file=file_col, owner_class=owner, class_chain=chain, depth=depth, nested_function=nested)
+
+
+ANCESTRY_TABLE = "entity_ancestry"
+
+
+def write_ancestry_table(conn: sqlite3.Connection, graph: Optional[GraphModel] = None) -> int:
+    """
+    (Re)create ``entity_ancestry(id, file_id, owner_class_id, class_chain, depth,
+    nested_function)`` from *graph* (loaded from *conn* if omitted).
+
+    ``class_chain`` is the dotted outer-to-inner chain ("" outside classes).
+    Returns the number of rows written.
+    """
+    if graph is None:
+        graph = GraphModel.from_db(conn, deps=False)
+    anc = graph.ancestry()
+    ids = graph.ids
+
+    def _id(j: int) -> Optional[bytes]:
+        return ids[j] if j >= 0 else None
+
+    conn.execute(f"DROP TABLE IF EXISTS {ANCESTRY_TABLE}")
+    conn.execute(
+        f"CREATE TABLE {ANCESTRY_TABLE} (id BLOB PRIMARY KEY, file_id BLOB, owner_class_id BLOB, "
+        "class_chain TEXT NOT NULL, depth INTEGER NOT NULL, nested_function INTEGER NOT NULL)"
+    )
+    conn.executemany(
+        f"INSERT INTO {ANCESTRY_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (ids[i], _id(anc.file[i]), _id(anc.owner_class[i]), ".".join(anc.class_chain[i]), anc.depth[i], anc.nested_function[i])
+            for i in range(len(ids))
+        ),
+    )
+    conn.commit()
+    return len(ids)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Materialise the entity ancestry table in a NeoDepends DB.")
+    parser.add_argument("database_path", type=str)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database_path)
+    try:
+        rows = write_ancestry_table(conn)
+    finally:
+        conn.close()
+    print(f"Wrote {rows} rows to {ANCESTRY_TABLE}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
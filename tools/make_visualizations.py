@@ -26,11 +26,14 @@ intended producer of clustering input.
 """
 
 import argparse
+import gzip
 import json
 import re
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dv8_matrix import CellMatrix
 
 # ---------------------------------------------------------------------------
 # Color palettes
@@ -98,14 +101,26 @@ def _short_name(path: str) -> str:
 # ---------------------------------------------------------------------------
 
 def load_dep_json(path: Path) -> Tuple[List[str], List[Dict]]:
-    """Load variables + cells from a dv8-dsm-v3 / dv8-dependency JSON."""
-    with open(path) as f:
+    """Load variables + cells from a dv8-dsm-v3 / dv8-dependency JSON (``.json.gz`` too)."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
         data = json.load(f)
     if isinstance(data, dict) and "variables" in data and "cells" in data:
         return data["variables"], data["cells"]
     raise ValueError(f"Need {{variables, cells}} in {path}")
 
 
+def load_dep_matrix(path: Path) -> CellMatrix:
+    """``load_dep_json`` aggregated once into a ``CellMatrix`` both views can share."""
+    return CellMatrix.from_cells(*load_dep_json(path))
+
+
+def _as_matrix(variables: List[str], cells: Union[List[Dict], CellMatrix]) -> CellMatrix:
+    if isinstance(cells, CellMatrix):
+        return cells
+    return CellMatrix.from_cells(variables, cells)
+
+
 def load_clustering(path: Path) -> Optional[Dict]:
     """Load a clustering JSON (DV8 DRH format or simple tree)."""
     with open(path) as f:
@@ -175,7 +190,7 @@ def _load_d3_lib() -> str:
 # DSM view
 # ---------------------------------------------------------------------------
 
-def generate_dsm_html(variables: List[str], cells: List[Dict],
+def generate_dsm_html(variables: List[str], cells: Union[List[Dict], CellMatrix],
                       output_path: Path, title: str = "DSM View",
                       clustering: Optional[Dict] = None,
                       is_entity_level: bool = False) -> None:
@@ -235,21 +250,8 @@ def generate_dsm_html(variables: List[str], cells: List[Dict],
     # Build matrix as sparse dict "row,col" -> {kind: count}
     idx_to_pos = {idx: pos for pos, idx in enumerate(order)}
     matrix: Dict[str, Dict[str, float]] = {}
-    for cell in cells:
-        s, d = cell.get("src", -1), cell.get("dest", -1)
-        if s < 0 or s >= n or d < 0 or d >= n:
-            continue
-        values = cell.get("values", {})
-        if not values:
-            continue
-        sp, dp = idx_to_pos.get(s), idx_to_pos.get(d)
-        if sp is None or dp is None:
-            continue
-        key = f"{sp},{dp}"
-        if key not in matrix:
-            matrix[key] = {}
-        for k, v in values.items():
-            matrix[key][k] = matrix[key].get(k, 0) + v
+    for s, d, values in _as_matrix(variables, cells).cells():
+        matrix[f"{idx_to_pos[s]},{idx_to_pos[d]}"] = values
 
     # Ordered display names
     ordered_names = [norm_names[i] for i in order]
@@ -637,7 +639,7 @@ window.addEventListener("resize", draw);
 # Graph view (D3 force-directed, arch-agent visual language)
 # ---------------------------------------------------------------------------
 
-def generate_graph_html(variables: List[str], cells: List[Dict],
+def generate_graph_html(variables: List[str], cells: Union[List[Dict], CellMatrix],
                         output_path: Path, title: str = "Graph View",
                         is_entity_level: bool = False) -> None:
     n = len(variables)
@@ -651,11 +653,9 @@ def generate_graph_html(variables: List[str], cells: List[Dict],
     links: List[Dict] = []
     all_kinds: set = set()
 
-    for cell in cells:
-        s, d = cell.get("src", -1), cell.get("dest", -1)
-        if s < 0 or s >= n or d < 0 or d >= n or s == d:
+    for s, d, values in _as_matrix(variables, cells).cells():
+        if s == d:
             continue
-        values = cell.get("values", {})
         for k, v in values.items():
             if v > 0:
                 links.append({"src": s, "dst": d, "kind": k, "weight": v})
@@ -1416,7 +1416,8 @@ def main():
                              "boxes (DRH format or simple tree)")
     args = parser.parse_args()
 
-    variables, cells = load_dep_json(args.input)
+    matrix = load_dep_matrix(args.input)
+    variables = matrix.variables
     out_dir = args.output_dir or args.input.parent
     title = args.title or args.input.stem
 
@@ -1428,7 +1429,7 @@ def main():
 
     if not args.graph_only:
         dsm_path = out_dir / "dsm_view.html"
-        generate_dsm_html(variables, cells, dsm_path,
+        generate_dsm_html(variables, matrix, dsm_path,
                           title=f"DSM: {title}",
                           clustering=clustering,
                           is_entity_level=is_entity)
@@ -1436,7 +1437,7 @@ def main():
 
     if not args.dsm_only:
         graph_path = out_dir / "graph_view.html"
-        generate_graph_html(variables, cells, graph_path,
+        generate_graph_html(variables, matrix, graph_path,
                             title=f"Graph: {title}",
                             is_entity_level=is_entity)
         print(f"[OK] Graph view: {graph_path}")
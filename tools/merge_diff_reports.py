@@ -3,11 +3,11 @@ from __future__ import annotations
 
 import argparse
 import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, List, Sequence
 
-
-Edge = Tuple[str, str, str]
+from edge_diff import Edge, EdgeDiff
 
 
 def _read_json(path: Path) -> Any:
@@ -27,34 +27,58 @@ def _fmt_edge(e: Edge) -> str:
     return f"- `{k}`: `{s}` -> `{t}`"
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--out-md", type=Path, required=True)
-    parser.add_argument("--diff-json", type=Path, action="append", required=True)
-    args = parser.parse_args()
-
-    diffs: List[Dict[str, Any]] = []
-    for p in args.diff_json:
-        d = _read_json(p)
-        d["_path"] = str(p)
-        diffs.append(d)
-
+@dataclass(frozen=True)
+class DiffSection:
+    """One resolver run: where its diff came from and its Missing/Extra edges."""
+
+    name: str
+    diff_json: str
+    neodepends_dv8: str
+    ground_truth: str
+    missing: List[Edge]
+    extra: List[Edge]
+
+    @classmethod
+    def from_json(cls, path: Path) -> "DiffSection":
+        d = _read_json(path)
+        return cls(
+            name=Path(d.get("neodepends_dv8", str(path))).parent.name,
+            diff_json=str(path),
+            neodepends_dv8=d.get("neodepends_dv8", ""),
+            ground_truth=d.get("ground_truth", ""),
+            missing=_edges(d.get("missing") or []),
+            extra=_edges(d.get("extra") or []),
+        )
+
+    @classmethod
+    def from_diff(cls, diff: EdgeDiff, *, neodepends_dv8: str, ground_truth: str, diff_json: str = "") -> "DiffSection":
+        """A section straight from an in-process ``EdgeDiff``."""
+        return cls(
+            name=Path(neodepends_dv8).parent.name,
+            diff_json=diff_json,
+            neodepends_dv8=neodepends_dv8,
+            ground_truth=ground_truth,
+            missing=diff.edges("missing"),
+            extra=diff.edges("extra"),
+        )
+
+
+def render_markdown(sections: Sequence[DiffSection]) -> str:
     lines: List[str] = []
     lines.append("# Diff Summary (All Resolvers)")
     lines.append("")
     lines.append("This file concatenates the complete Missing/Extra edge lists for multiple resolver runs.")
     lines.append("")
 
-    for d in diffs:
-        name = Path(d.get("neodepends_dv8", d["_path"])).parent.name
-        missing = _edges(d.get("missing") or [])
-        extra = _edges(d.get("extra") or [])
+    for sec in sections:
+        missing = sec.missing
+        extra = sec.extra
 
-        lines.append(f"## {name}")
+        lines.append(f"## {sec.name}")
         lines.append("")
-        lines.append(f"- Diff JSON: `{d['_path']}`")
-        lines.append(f"- NeoDepends DV8: `{d.get('neodepends_dv8','')}`")
-        lines.append(f"- Ground truth: `{d.get('ground_truth','')}`")
+        lines.append(f"- Diff JSON: `{sec.diff_json}`")
+        lines.append(f"- NeoDepends DV8: `{sec.neodepends_dv8}`")
+        lines.append(f"- Ground truth: `{sec.ground_truth}`")
         lines.append(f"- Missing: `{len(missing)}`")
         lines.append(f"- Extra: `{len(extra)}`")
         lines.append("")
@@ -77,13 +101,23 @@ def main() -> int:
             lines.append("- (none)")
         lines.append("")
 
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out-md", type=Path, required=True)
+    parser.add_argument("--diff-json", type=Path, action="append", required=True)
+    args = parser.parse_args()
+
+    sections = [DiffSection.from_json(p) for p in args.diff_json]
+
     out = args.out_md.expanduser().resolve()
     out.parent.mkdir(parents=True, exist_ok=True)
-    out.write_text("\n".join(lines).rstrip() + "\n", encoding="utf-8")
+    out.write_text(render_markdown(sections), encoding="utf-8")
     print(f"[OK] Wrote: {out}")
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
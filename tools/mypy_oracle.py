@@ -21,6 +21,7 @@ v0.3.10 development — NeoDepends (FreeworkEarth fork)
 """
 
 import argparse
+import gzip
 import json
 import re
 import sys
@@ -231,8 +232,9 @@ def load_handcount_edges(path: Path) -> List[Tuple[str, str, str]]:
 
 
 def load_neo_edges(path: Path) -> List[Tuple[str, str, str]]:
-    """Load import edges from NeoDepends output (edge-list or DSM JSON)."""
-    with open(path) as f:
+    """Load import edges from NeoDepends output (edge-list or DSM JSON, optionally .json.gz)."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
         data = json.load(f)
 
     import_kinds = {"Import", "ImportLazy", "ImportType"}
@@ -58,17 +58,30 @@ that and still export DV8/DBs only for the requested focus dir.
 from __future__ import annotations
 
 import argparse
+import collections
+import contextlib
 import datetime as _dt
+import gzip
+import importlib.util
+import io
 import json
+import os
 import sqlite3
 import subprocess
 import sys
 import shutil
 import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
+from analysis_cache import AnalysisCache, source_fingerprint, stage_key, tool_fingerprint
+from commit_batch import CommitIndexWriter, CommitSlicer, commit_files, commit_tags, resolve_commits, structure_args
+from db_indexes import create_indexes, ensure_db_indexes
+from dv8_matrix import CellMatrix
+from graph_model import SCAN_ROWS_ENV, GraphModel, RowColumns, fetch_all, iter_rows
 from pipeline_errors import (
     PreflightError, ExecutionError, EnhancementError, ExportError,
     handle_pipeline_error,
@@ -80,6 +93,18 @@ from pipeline_errors import (
     check_db_created, check_db_non_empty,
     warn_empty_entities, safe_summarize_db, safe_summarize_dv8_dir,
 )
+from reachability import EXTEND_ANCHOR_HOPS, Reachability
+from source_walk import source_inventory
+from stage_profile import (
+    PROFILE_DIR_ENV,
+    StageProfiler,
+    child_row_counts,
+    count_rows,
+    note_rows_read,
+    note_rows_written,
+    read_stage_profile,
+    row_counts,
+)
 
 
 def _get_python_executable() -> str:
@@ -347,16 +372,18 @@ def _run_and_tee(cmd: Sequence[str], *, logger: Any) -> float:
     """
     start = time.time()
     logger.line(f"[CMD] {' '.join(cmd)}")
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    if proc.stdout is None:
-        proc.kill()
-        raise RuntimeError(
-            "An internal error occurred while starting the analysis engine.\n"
-            "       Please contact the development team and share the dev log."
-        )
-    for line in proc.stdout:
-        logger.line(line.rstrip("\n"))
-    rc = proc.wait()
+    # Python tools hand their DB row counts back to the open stages (stage_profile.py).
+    with child_row_counts() as env:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+        if proc.stdout is None:
+            proc.kill()
+            raise RuntimeError(
+                "An internal error occurred while starting the analysis engine.\n"
+                "       Please contact the development team and share the dev log."
+            )
+        for line in proc.stdout:
+            logger.line(line.rstrip("\n"))
+        rc = proc.wait()
     elapsed = time.time() - start
     if rc != 0:
         raise subprocess.CalledProcessError(rc, list(cmd))
@@ -390,6 +417,7 @@ def run_neodepends(
     xmx: Optional[str],
     stackgraphs_python_mode: str,
     logger: Any,
+    commits: Sequence[str] = (),
 ) -> None:
     cmd: List[str] = [
         str(neodepends_bin),
@@ -419,10 +447,124 @@ def run_neodepends(
     # The binary operates in git-commit mode. When input_dir is a git worktree or repo,
     # passing no commit defaults to WORKDIR — which has no staged content in a detached HEAD
     # worktree → 0 entities. Explicitly pass HEAD to scan the checked-out commit.
-    if (input_dir / ".git").exists():
+    # --commits batch mode instead extracts every requested commit into the one DB.
+    if commits:
+        cmd.extend(structure_args(commits))
+    elif (input_dir / ".git").exists():
         cmd.append("HEAD")
 
     _run_and_tee(cmd, logger=logger)
+    # The core binary does not report row counts; everything in its fresh DB is its output.
+    note_rows_written(sum(count_rows(db_out, table) or 0 for table in ("entities", "deps")))
+
+
+class _LoggerStream:
+    """File-like adapter that forwards printed text to a dev logger line by line."""
+
+    def __init__(self, logger: Any) -> None:
+        self._logger = logger
+        self._buf = ""
+
+    def write(self, text: str) -> int:
+        self._buf += text
+        while "\n" in self._buf:
+            line, self._buf = self._buf.split("\n", 1)
+            self._logger.line(line)
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buf:
+            self._logger.line(self._buf)
+            self._buf = ""
+
+
+_TOOL_MODULES: Dict[Path, Any] = {}
+
+
+def _load_tool_module(script: Path) -> Any:
+    """Import a post-processing script as a module (cached per resolved path)."""
+    script = script.resolve()
+    mod = _TOOL_MODULES.get(script)
+    if mod is None:
+        spec = importlib.util.spec_from_file_location(script.stem, str(script))
+        if spec is None or spec.loader is None:
+            raise ImportError(f"cannot load {script}")
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[script.stem] = mod
+        spec.loader.exec_module(mod)
+        _TOOL_MODULES[script] = mod
+    return mod
+
+
+class _InProcessSession:
+    """
+    In-process replacement for the per-stage `_run_and_tee` subprocesses.
+
+    The post-processing scripts are imported once and called directly. All stages
+    that touch the main DB share one read-write connection, so the DB is opened
+    once per run instead of once per stage. Only the connection is shared: each
+    tool still loads the entity rows it needs through it, because enhancement
+    deletes and reparents Field entities (so a table cached before it would be
+    stale) and the false-positive filter works on a separate DB copy. File
+    contents and parsed ASTs are shared across tools via ``shared_ast_cache``.
+    Script output is routed to the dev log exactly like subprocess output; any
+    exception, and a SystemExit with a nonzero code (a script's `sys.exit(n)` or
+    `parser.error()`), is re-raised as CalledProcessError so callers keep their
+    `wrap_subprocess_error` handling.
+    """
+
+    def __init__(self, db_path: Path, *, logger: Any) -> None:
+        self.db_path = db_path
+        self.logger = logger
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect_rw(self.db_path)
+        return self._conn
+
+    def close(self) -> None:
+        """Close the shared connection (call before read-only exports open the DB)."""
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def run(self, script: Path, call: Callable[[Any], Any]) -> float:
+        """Import `script` and invoke `call(module)`; returns elapsed seconds."""
+        start = time.time()
+        self.logger.line(f"[IN-PROCESS] {script.name}")
+        mod = _load_tool_module(script)
+        stream = _LoggerStream(self.logger)
+        # _StdoutLogger writes to sys.stdout itself, so only redirect for file loggers.
+        redirect = not isinstance(self.logger, _StdoutLogger)
+        try:
+            with contextlib.ExitStack() as stack:
+                if redirect:
+                    stack.enter_context(contextlib.redirect_stdout(stream))
+                    stack.enter_context(contextlib.redirect_stderr(stream))
+                call(mod)
+        except SystemExit as exc:
+            if exc.code is None or exc.code == 0:
+                stream.flush()
+                return time.time() - start
+            if not isinstance(exc.code, int):
+                # sys.exit("message") prints the message and exits with status 1.
+                stream.write(f"{exc.code}\n")
+            self._fail(stream, script, exc, exc.code if isinstance(exc.code, int) else 1)
+        except Exception as exc:
+            stream.flush()
+            self.logger.line(traceback.format_exc().rstrip("\n"))
+            self._fail(stream, script, exc, 1)
+        stream.flush()
+        return time.time() - start
+
+    def _fail(self, stream: "_LoggerStream", script: Path, exc: BaseException, returncode: int) -> None:
+        stream.flush()
+        if self._conn is not None:
+            self._conn.rollback()
+        raise subprocess.CalledProcessError(returncode, [str(script)]) from exc
 
 
 def run_python_enhancement(
@@ -433,21 +575,76 @@ def run_python_enhancement(
     logger: Any,
     include_transitive_inheritance: bool = False,
     type_annotated_params: bool = False,
+    incremental_manifest: Optional[Path] = None,
+    stage_profile: Optional[Path] = None,
+    session: Optional[_InProcessSession] = None,
+    jobs: int = 1,
 ) -> None:
+    if session is not None:
+        session.run(
+            enhance_script,
+            lambda mod: mod.run_enhancement(
+                str(db_path),
+                str(db_path.parent),
+                profile=profile,
+                include_transitive_inheritance=include_transitive_inheritance,
+                type_annotated_params=type_annotated_params,
+                conn=session.conn,
+                incremental_manifest=str(incremental_manifest) if incremental_manifest else None,
+                stage_profile=str(stage_profile) if stage_profile else None,
+                jobs=jobs,
+            ),
+        )
+        return
     cmd = [_get_python_executable(), str(enhance_script), str(db_path), "--profile", profile]
     if include_transitive_inheritance:
         cmd.append("--include-transitive-inheritance")
     if type_annotated_params:
         cmd.append("--type-annotated-params")
+    if incremental_manifest is not None:
+        cmd.extend(["--incremental-manifest", str(incremental_manifest)])
+    if stage_profile is not None:
+        cmd.extend(["--stage-profile", str(stage_profile)])
+    if jobs > 1:
+        cmd.extend(["--jobs", str(jobs)])
     _run_and_tee(cmd, logger=logger)
 
-def run_override_detection(*, override_script: Path, db_path: Path, source_root: Path, logger: Any) -> None:
+def run_override_detection(
+    *,
+    override_script: Path,
+    db_path: Path,
+    source_root: Path,
+    logger: Any,
+    session: Optional[_InProcessSession] = None,
+) -> None:
     """Run the unified detect_overrides.py script (Python + Java override detection)."""
+    if session is not None:
+        session.run(
+            override_script,
+            lambda mod: mod.detect_overrides(str(db_path), str(source_root), conn=session.conn),
+        )
+        return
     _run_and_tee([_get_python_executable(), str(override_script), str(db_path), str(source_root)], logger=logger)
 
 
-def run_java_enhancement(*, enhance_script: Path, db_path: Path, source_root: Path, logger: Any) -> None:
+def run_java_enhancement(
+    *,
+    enhance_script: Path,
+    db_path: Path,
+    source_root: Path,
+    logger: Any,
+    session: Optional[_InProcessSession] = None,
+) -> None:
     """Run Java dependency enhancement (constructor Use/Call heuristics)."""
+    if session is not None:
+        def _call(mod: Any) -> None:
+            added_use, added_call, added_create = mod.enhance_java_dependencies(
+                db_path, source_root, conn=session.conn
+            )
+            print(f"[OK] Added Java deps: Use={added_use}, Call={added_call}, Create={added_create}")
+
+        session.run(enhance_script, _call)
+        return
     _run_and_tee([_get_python_executable(), str(enhance_script), str(db_path), str(source_root)], logger=logger)
 
 def run_stackgraphs_false_positive_filter(
@@ -456,33 +653,90 @@ def run_stackgraphs_false_positive_filter(
     input_db: Path,
     output_db: Path,
     logger: Any,
+    session: Optional[_InProcessSession] = None,
 ) -> None:
     """
     Filter StackGraphs false positives in a *raw* NeoDepends DB.
 
     Important: this must run before the Python enhancement step, otherwise the filter might
     delete enhancement-added deps (which intentionally use method_start rows).
+
+    The filter copies `input_db` to `output_db`, so it never uses the session connection.
     """
+    if session is not None:
+        session.run(filter_script, lambda mod: mod.filter_dependencies(str(input_db), str(output_db)))
+        return
     _run_and_tee([_get_python_executable(), str(filter_script), str(input_db), str(output_db)], logger=logger)
 
 
-def _load_entities(conn: sqlite3.Connection) -> Dict[bytes, DbEntity]:
+def run_shadow_import_resolution(
+    *,
+    shadow_script: Path,
+    db_path: Path,
+    source_root: Path,
+    report_path: Path,
+    logger: Any,
+    session: Optional[_InProcessSession] = None,
+) -> None:
+    """Drop phantom Import edges to project files that shadow stdlib module names."""
+    if session is not None:
+        session.run(
+            shadow_script,
+            lambda mod: mod.resolve_shadow_imports(
+                str(db_path), str(source_root), str(report_path), conn=session.conn
+            ),
+        )
+        return
+    _run_and_tee(
+        [
+            _get_python_executable(),
+            str(shadow_script),
+            str(db_path),
+            str(source_root),
+            "--report", str(report_path),
+        ],
+        logger=logger,
+    )
+
+
+class _EntityTable(Dict[bytes, DbEntity]):
+    """
+    ``id -> DbEntity`` for one DB, plus a ``GraphModel`` over the same rows.
+
+    The graph's ancestor tables (owning file / class, class chain, nesting) are
+    computed once in a single topological pass, so the naming helpers below are
+    index lookups instead of parent walks per edge endpoint.
+    """
+
+    _graph: Optional[GraphModel] = None
+
+    @property
+    def graph(self) -> GraphModel:
+        if self._graph is None:
+            graph = GraphModel()
+            graph.add_entities((e.id, e.parent_id, e.kind, e.name) for e in self.values())
+            self._graph = graph
+        return self._graph
+
+
+def _load_entities(conn: sqlite3.Connection) -> _EntityTable:
     cur = conn.cursor()
-    rows = cur.execute("SELECT id, parent_id, kind, name, content_id FROM entities").fetchall()
-    return {r[0]: DbEntity(id=r[0], parent_id=r[1], kind=r[2], name=r[3], content_id=r[4]) for r in rows}
+    rows = fetch_all(cur.execute("SELECT id, parent_id, kind, name, content_id FROM entities"))
+    return _EntityTable(
+        (r[0], DbEntity(id=r[0], parent_id=r[1], kind=r[2], name=r[3], content_id=r[4])) for r in rows
+    )
 
 
-def _ancestor_class_name(entities: Dict[bytes, DbEntity], entity_id: bytes) -> Optional[str]:
-    current = entities.get(entity_id)
-    while current and current.parent_id is not None:
-        parent = entities.get(current.parent_id)
-        if parent and parent.kind == "Class":
-            return parent.name
-        current = parent
-    return None
+def _ancestor_class_name(entities: _EntityTable, entity_id: bytes) -> Optional[str]:
+    graph = entities.graph
+    i = graph.index.get(entity_id)
+    if i is None:
+        return None
+    j = graph.nearest("Class", include_self=False)[i]
+    return graph.name[j] if j >= 0 else None
 
 
-def _display_name(entities: Dict[bytes, DbEntity], entity_id: bytes) -> str:
+def _display_name(entities: _EntityTable, entity_id: bytes) -> str:
     ent = entities[entity_id]
     if ent.kind in {"Method", "Function", "Field"}:
         class_name = _ancestor_class_name(entities, entity_id)
@@ -491,20 +745,109 @@ def _display_name(entities: Dict[bytes, DbEntity], entity_id: bytes) -> str:
     return ent.name
 
 
-def _descendants(conn: sqlite3.Connection, root_id: bytes) -> Set[bytes]:
-    cur = conn.cursor()
-    rows = cur.execute(
-        """
-        WITH RECURSIVE tree(id) AS (
-          SELECT id FROM entities WHERE id = ?
-          UNION ALL
-          SELECT e.id FROM entities e JOIN tree t ON e.parent_id = t.id
-        )
-        SELECT id FROM tree
-        """,
-        (root_id,),
-    ).fetchall()
-    return {r[0] for r in rows}
+class _ExportModel:
+    """
+    In-memory snapshot of one DB for the DV8 and per-file exporters.
+
+    Entities and deps are read once; the deps are held as interned int columns
+    (``RowColumns``) rather than a list of row tuples. The entity->file map and a one-time file
+    index (each File's member entities, and dep rows grouped by the file owning
+    their ``src`` / ``tgt``) are shared by every matrix variant exported from the
+    same snapshot (see ``export_dv8_snapshot``), so per-file exports are slice
+    lookups rather than one recursive query and one ``IN (...)`` query per file.
+
+    ``file_id_memo`` is backed by the owning-File column of the entity table's
+    ``GraphModel``, so ``_ancestor_file_id`` never walks parents.
+    """
+
+    def __init__(self, entities: _EntityTable, dep_rows: Sequence[Tuple[bytes, bytes, str]]) -> None:
+        self.entities = entities
+        self.dep_rows = dep_rows
+        self.file_id_memo: MutableMapping[bytes, Optional[bytes]] = entities.graph.nearest_map("File")
+        self.file_name_by_id = {
+            eid: _normalize_file_name(e.name) for eid, e in entities.items() if e.kind == "File"
+        }
+        self._file_members: Optional[Dict[bytes, List[bytes]]] = None
+        self._class_folder_index: Optional[_ClassFolderIndex] = None
+        self._rows_by_src_file: Dict[bytes, List[int]] = {}
+        self._rows_by_tgt_file: Dict[bytes, List[int]] = {}
+
+    @classmethod
+    def load(cls, db_path: Path) -> "_ExportModel":
+        con = _connect_ro(db_path)
+        try:
+            entities = _load_entities(con)
+            dep_rows = RowColumns.from_cursor(con.execute("SELECT src, tgt, kind FROM deps"))
+        finally:
+            con.close()
+        return cls(entities, dep_rows)
+
+    def file_rows(self) -> List[Tuple[bytes, str]]:
+        """``(id, name)`` of every File entity ordered by raw name (as ``ORDER BY name``)."""
+        rows = [(eid, e.name) for eid, e in self.entities.items() if e.kind == "File"]
+        rows.sort(key=lambda r: r[1])
+        return rows
+
+    def _build_file_index(self) -> Dict[bytes, List[bytes]]:
+        if self._file_members is not None:
+            return self._file_members
+        children: Dict[bytes, List[bytes]] = {}
+        for eid, ent in self.entities.items():
+            if ent.parent_id is not None:
+                children.setdefault(ent.parent_id, []).append(eid)
+        for kids in children.values():
+            kids.sort()
+
+        # Members of each File: the File plus everything below it, breadth-first
+        # with children ordered by id. That is the order the former recursive CTE
+        # produced (it joined through an automatic (parent_id, id) index), so
+        # callers iterating the member set see the same order as before.
+        members_by_file: Dict[bytes, List[bytes]] = {}
+        files_of: Dict[bytes, List[bytes]] = {}
+        for file_id in self.file_name_by_id:
+            members = [file_id]
+            seen = {file_id}
+            queue = collections.deque([file_id])
+            while queue:
+                for child in children.get(queue.popleft(), ()):
+                    if child not in seen:
+                        seen.add(child)
+                        members.append(child)
+                        queue.append(child)
+            members_by_file[file_id] = members
+            for eid in members:
+                files_of.setdefault(eid, []).append(file_id)
+
+        for i, (src, tgt, _kind) in enumerate(self.dep_rows):
+            for file_id in files_of.get(src, ()):
+                self._rows_by_src_file.setdefault(file_id, []).append(i)
+            for file_id in files_of.get(tgt, ()):
+                self._rows_by_tgt_file.setdefault(file_id, []).append(i)
+
+        self._file_members = members_by_file
+        return members_by_file
+
+    def file_members(self, file_id: bytes) -> Tuple[bytes, ...]:
+        """The File entity and all entities below it, in the order of ``_build_file_index``."""
+        return tuple(self._build_file_index().get(file_id, (file_id,)))
+
+    def file_dep_indices(self, file_id: bytes, *, include_incoming: bool) -> List[int]:
+        """Indices into ``dep_rows`` of deps leaving (or, optionally, entering) a file, in table order."""
+        self._build_file_index()
+        outgoing = self._rows_by_src_file.get(file_id, [])
+        if not include_incoming:
+            return list(outgoing)
+        return sorted(set(outgoing).union(self._rows_by_tgt_file.get(file_id, ())))
+
+    def file_deps(self, file_id: bytes, *, include_incoming: bool) -> List[Tuple[bytes, bytes, str]]:
+        return [self.dep_rows[i] for i in self.file_dep_indices(file_id, include_incoming=include_incoming)]
+
+    def class_folder_index(self) -> _ClassFolderIndex:
+        """``_class_folder_index`` of the entities, built once for every per-file clustering."""
+        if self._class_folder_index is None:
+            self._class_folder_index = _class_folder_index(self.entities)
+        return self._class_folder_index
+
 
 def _ensure_ancestors(entities: Dict[bytes, DbEntity], ids: Set[bytes]) -> Set[bytes]:
     out = set(ids)
@@ -523,54 +866,85 @@ def export_per_file_dbs(
     only_py: bool,
     focus_prefix: Optional[str],
     include_root_py: bool,
+    jobs: int = 1,
+    logger: Any = None,
 ) -> None:
     """
     Create a small, file-scoped SQLite DB for each File entity.
 
     Goal: make it easy to hand-audit dependencies per file without slicing the big DB manually.
-    """
-    con = _connect_ro(db_path)
-    entities = _load_entities(con)
-    cur = con.cursor()
 
+    Entities and deps are loaded once and sliced per file through ``_ExportModel``'s
+    file index, so no query depends on the size of a file (large files used to
+    exceed SQLITE_MAX_VARIABLE_NUMBER in ``IN (...)`` lists). With ``jobs > 1`` the
+    files are spread over a process pool (see ``_run_per_file_jobs``), which
+    reports progress to the dev *logger* if one is given.
+    """
     out = out_dir / "per_file_dbs"
     out.mkdir(parents=True, exist_ok=True)
+    select = dict(only_py=only_py, focus_prefix=focus_prefix, include_root_py=include_root_py)
+    options: Dict[str, Any] = dict(out=out, include_incoming_edges=include_incoming_edges)
 
-    file_rows = cur.execute("SELECT id, name FROM entities WHERE kind = 'File' ORDER BY name").fetchall()
-    for file_id, file_name in file_rows:
-        if only_py and not file_name.endswith(".py"):
-            continue
-        if focus_prefix is not None:
-            if file_name.startswith(focus_prefix):
-                pass
-            elif include_root_py and "/" not in file_name and file_name.endswith(".py"):
-                pass
-            else:
-                continue
+    if jobs > 1:
+        files = _select_per_file_rows(_query_file_rows(db_path), **select)
+        _run_per_file_jobs(
+            _per_file_db_worker, db_path, files, options, jobs=jobs, label="Per-file databases", logger=logger
+        )
+        return
 
-        internal_ids = _descendants(con, file_id)
-        if not internal_ids:
-            continue
+    slicer = _PerFileDbSlicer(db_path)
+    try:
+        for file_id, file_name in _select_per_file_rows(slicer.model.file_rows(), **select):
+            slicer.write(file_id, file_name, **options)
+    finally:
+        slicer.close()
+
+
+class _PerFileDbSlicer:
+    """Loads one DB once and writes file-scoped copies of it (see ``export_per_file_dbs``)."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.con = _connect_ro(db_path)
+        cur = self.con.cursor()
+        entities = _load_entities(self.con)
+        self.full_dep_rows = RowColumns.from_cursor(cur.execute("SELECT src, tgt, kind, row, commit_id FROM deps"))
+        self.model = _ExportModel(entities, self.full_dep_rows.head(3))
+        self.entity_rows = {
+            r[0]: r
+            for r in iter_rows(cur.execute(
+                """
+                SELECT
+                  id, parent_id, name, kind,
+                  start_byte, start_row, start_column,
+                  end_byte, end_row, end_column,
+                  comment_start_byte, comment_start_row, comment_start_column,
+                  comment_end_byte, comment_end_row, comment_end_column,
+                  content_id, simple_id
+                FROM entities
+                """
+            ))
+        }
+        self._contents: Dict[bytes, Optional[Tuple[bytes, str]]] = {}
 
-        placeholders = ",".join(["?"] * len(internal_ids))
-        if include_incoming_edges:
-            dep_rows = cur.execute(
-                f"""
-                SELECT src, tgt, kind, row, commit_id
-                FROM deps
-                WHERE src IN ({placeholders}) OR tgt IN ({placeholders})
-                """,
-                list(internal_ids) + list(internal_ids),
-            ).fetchall()
-        else:
-            dep_rows = cur.execute(
-                f"""
-                SELECT src, tgt, kind, row, commit_id
-                FROM deps
-                WHERE src IN ({placeholders})
-                """,
-                list(internal_ids),
-            ).fetchall()
+    def close(self) -> None:
+        self.con.close()
+
+    def content_row(self, content_id: bytes) -> Optional[Tuple[bytes, str]]:
+        if content_id not in self._contents:
+            self._contents[content_id] = self.con.execute(
+                "SELECT id, content FROM contents WHERE id = ?", (content_id,)
+            ).fetchone()
+            note_rows_read(1)
+        return self._contents[content_id]
+
+    def write(self, file_id: bytes, file_name: str, *, out: Path, include_incoming_edges: bool) -> None:
+        model = self.model
+        entities = model.entities
+        internal_ids = model.file_members(file_id)
+        dep_rows = [
+            self.full_dep_rows[i]
+            for i in model.file_dep_indices(file_id, include_incoming=include_incoming_edges)
+        ]
 
         keep_entity_ids: Set[bytes] = set(internal_ids)
         for src, tgt, _k, _row, _cid in dep_rows:
@@ -626,22 +1000,8 @@ def export_per_file_dbs(
             """
         )
 
-        # Entities
-        ent_placeholders = ",".join(["?"] * len(keep_entity_ids))
-        ent_rows = cur.execute(
-            f"""
-            SELECT
-              id, parent_id, name, kind,
-              start_byte, start_row, start_column,
-              end_byte, end_row, end_column,
-              comment_start_byte, comment_start_row, comment_start_column,
-              comment_end_byte, comment_end_row, comment_end_column,
-              content_id, simple_id
-            FROM entities
-            WHERE id IN ({ent_placeholders})
-            """,
-            list(keep_entity_ids),
-        ).fetchall()
+        # Entities (in id order, as the former `WHERE id IN (...)` lookup returned them)
+        ent_rows = [self.entity_rows[eid] for eid in sorted(keep_entity_ids) if eid in self.entity_rows]
         dst.executemany(
             """
             INSERT INTO entities (
@@ -664,22 +1024,147 @@ def export_per_file_dbs(
         )
 
         # Contents (only the ones referenced by kept entities)
+        content_rows: List[Tuple[bytes, str]] = []
         if keep_content_ids:
-            c_placeholders = ",".join(["?"] * len(keep_content_ids))
-            content_rows = cur.execute(
-                f"SELECT id, content FROM contents WHERE id IN ({c_placeholders})",
-                list(keep_content_ids),
-            ).fetchall()
+            content_rows = [r for r in map(self.content_row, sorted(keep_content_ids)) if r is not None]
             dst.executemany("INSERT INTO contents (id, content) VALUES (?, ?)", content_rows)
 
         # Deps: keep only those where endpoints exist in the per-file DB.
         filtered_dep_rows = [r for r in dep_rows if r[0] in keep_entity_ids and r[1] in keep_entity_ids]
         dst.executemany("INSERT INTO deps (src, tgt, kind, row, commit_id) VALUES (?, ?, ?, ?, ?)", filtered_dep_rows)
+        create_indexes(dst)
 
         dst.commit()
         dst.close()
+        note_rows_written(len(ent_rows) + len(content_rows) + len(filtered_dep_rows))
 
-    con.close()
+
+def _query_file_rows(db_path: Path) -> List[Tuple[bytes, str]]:
+    con = _connect_ro(db_path)
+    try:
+        return con.execute("SELECT id, name FROM entities WHERE kind = 'File' ORDER BY name").fetchall()
+    finally:
+        con.close()
+
+
+def _select_per_file_rows(
+    file_rows: Sequence[Tuple[bytes, str]],
+    *,
+    only_py: bool,
+    focus_prefix: Optional[str],
+    include_root_py: bool,
+    skip_init: bool = False,
+) -> List[Tuple[bytes, str]]:
+    """Files that get their own per-file artifact, in export order."""
+    selected: List[Tuple[bytes, str]] = []
+    for file_id, file_name in file_rows:
+        if skip_init and file_name.endswith("/__init__.py"):
+            continue
+        if only_py and not file_name.endswith(".py"):
+            continue
+        if focus_prefix is not None:
+            if file_name.startswith(focus_prefix):
+                pass
+            elif include_root_py and "/" not in file_name and file_name.endswith(".py"):
+                pass
+            else:
+                continue
+        selected.append((file_id, file_name))
+    return selected
+
+
+# Per-process snapshot cache for per-file workers: a worker that receives several
+# batches of the same DB loads it only once.
+_WORKER_SNAPSHOTS: Dict[Tuple[str, str], Any] = {}
+
+
+def _worker_snapshot(kind: str, db_path: Path) -> Any:
+    key = (kind, str(db_path))
+    if key not in _WORKER_SNAPSHOTS:
+        for snapshot in _WORKER_SNAPSHOTS.values():
+            if isinstance(snapshot, _PerFileDbSlicer):
+                snapshot.close()
+        _WORKER_SNAPSHOTS.clear()
+        if kind == "dv8":
+            _WORKER_SNAPSHOTS[key] = _ExportModel.load(db_path)
+        else:
+            _WORKER_SNAPSHOTS[key] = _PerFileDbSlicer(db_path)
+    return _WORKER_SNAPSHOTS[key]
+
+
+# (files exported, rows read, rows written) by one batch; the parent credits the
+# row counts to its open stage.
+_WorkerResult = Tuple[int, int, int]
+
+
+def _worker_result(files: int, rows0: Tuple[int, int]) -> _WorkerResult:
+    rows_read, rows_written = row_counts()
+    return files, rows_read - rows0[0], rows_written - rows0[1]
+
+
+def _dv8_per_file_worker(db_path: Path, files: List[Tuple[bytes, str]], options: Dict[str, Any]) -> _WorkerResult:
+    rows0 = row_counts()
+    model = _worker_snapshot("dv8", db_path)
+    for file_id, file_name in files:
+        _export_dv8_file(model, file_id, file_name, **options)
+    return _worker_result(len(files), rows0)
+
+
+def _per_file_db_worker(db_path: Path, files: List[Tuple[bytes, str]], options: Dict[str, Any]) -> _WorkerResult:
+    rows0 = row_counts()
+    slicer = _worker_snapshot("db", db_path)
+    for file_id, file_name in files:
+        slicer.write(file_id, file_name, **options)
+    return _worker_result(len(files), rows0)
+
+
+def _run_per_file_jobs(
+    worker: Callable[[Path, List[Tuple[bytes, str]], Dict[str, Any]], _WorkerResult],
+    db_path: Path,
+    files: List[Tuple[bytes, str]],
+    options: Dict[str, Any],
+    *,
+    jobs: int,
+    label: str,
+    logger: Any = None,
+) -> None:
+    """
+    Spread per-file exports over ``jobs`` worker processes.
+
+    After each finished batch a progress line goes to the dev *logger* (if any),
+    like the output of every other stage.
+
+    Artifacts are named by file stem, so files sharing a stem overwrite each other.
+    They are kept in one batch, in export order, so the surviving artifact is the
+    same one a sequential run leaves behind.
+    """
+    by_stem: Dict[str, List[Tuple[bytes, str]]] = {}
+    for file_id, file_name in files:
+        by_stem.setdefault(Path(file_name).stem, []).append((file_id, file_name))
+    groups = list(by_stem.values())
+    # A few batches per worker keeps the pool busy without pickling one task per file.
+    batch_size = max(1, len(files) // (jobs * 4))
+    batches: List[List[Tuple[bytes, str]]] = []
+    current: List[Tuple[bytes, str]] = []
+    for group in groups:
+        current.extend(group)
+        if len(current) >= batch_size:
+            batches.append(current)
+            current = []
+    if current:
+        batches.append(current)
+
+    total = len(files)
+    done = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(worker, db_path, batch, options) for batch in batches]
+        for future in as_completed(futures):
+            n, rows_read, rows_written = future.result()
+            note_rows_read(rows_read)
+            note_rows_written(rows_written)
+            done += n
+            if logger is not None:
+                logger.line(f"[PER-FILE] {label}: {done}/{total} files")
 
 
 def _dv8_write_dependency_json(
@@ -690,90 +1175,84 @@ def _dv8_write_dependency_json(
     sort_key: Optional[Callable[[str], Any]] = None,
     all_entities: Optional[List[str]] = None,
     collapse_weights: bool = False,
+    compact_json: bool = False,
 ) -> None:
-    out, _variables = _dv8_build_dependency_json(
-        name=name, edges=edges, all_entities=all_entities, collapse_weights=collapse_weights
-    )
+    matrix = _dv8_build_matrix(edges=edges, all_entities=all_entities, collapse_weights=collapse_weights)
     if sort_key is not None:
-        out = _dv8_reorder_dependency_json(out, sort_key=sort_key)
+        matrix = matrix.sorted_by(sort_key)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(out, indent=2), encoding="utf-8")
+    _dv8_stream_matrix_json(output_path, name=name, matrix=matrix, compact=compact_json)
 
-def _dv8_build_dependency_json(
+def _dv8_build_matrix(
     *,
-    name: str,
     edges: Iterable[Tuple[str, str, str]],
     all_entities: Optional[List[str]] = None,
     collapse_weights: bool = False,
-) -> Tuple[Dict[str, Any], List[str]]:
+) -> CellMatrix:
     # edges: (src_name, tgt_name, dep_kind)
     # all_entities: optional list of ALL entity names to include (even if no dependencies)
-    variables: List[str] = []
-    idx: Dict[str, int] = {}
-    cell_map: Dict[Tuple[int, int], Dict[str, float]] = {}
-
-    def ensure(v: str) -> int:
-        if v in idx:
-            return idx[v]
-        i = len(variables)
-        variables.append(v)
-        idx[v] = i
-        return i
-
-    # First, add all entities to variables list (even those without dependencies)
-    if all_entities:
-        for entity_name in all_entities:
-            ensure(entity_name)
-
-    # Then, process dependencies
-    for src, tgt, kind in edges:
-        s = ensure(src)
-        t = ensure(tgt)
-        key = (s, t)
-        vals = cell_map.setdefault(key, {})
-        if collapse_weights:
-            vals[kind] = 1.0
-        else:
-            vals[kind] = float(vals.get(kind, 0.0) + 1.0)
-
-    cells = [{"src": s, "dest": t, "values": vals} for (s, t), vals in sorted(cell_map.items())]
-    out = {"@schemaVersion": "1.0", "name": name, "variables": variables, "cells": cells}
-    return out, variables
+    matrix = CellMatrix(all_entities)
+    matrix.add_edges(edges, collapse=collapse_weights)
+    return matrix
 
 
-def _dv8_reorder_dependency_json(obj: Dict[str, Any], *, sort_key: Callable[[str], Any]) -> Dict[str, Any]:
+def _dv8_stream_matrix_json(
+    output_path: Path,
+    *,
+    name: str,
+    matrix: CellMatrix,
+    compact: bool = False,
+) -> None:
     """
-    Reorder `variables` and remap cell indices accordingly.
+    Write a DV8 dependency JSON without materialising the document.
 
-    DV8 uses the variables list order for matrix axes, and typically also for tree insertion order.
+    Variables and (src, dest)-sorted cells are encoded one at a time. The default
+    layout is byte-identical to ``json.dumps(doc, indent=2)``; *compact* drops all
+    whitespace. A ``.gz`` *output_path* is written gzip-compressed, with a fixed
+    header so the bytes depend only on the matrix.
     """
-    variables: List[str] = list(obj.get("variables") or [])
-    if not variables:
-        return obj
-
-    order = sorted(range(len(variables)), key=lambda i: sort_key(variables[i]))
-    old_to_new = {old: new for new, old in enumerate(order)}
-    new_vars = [variables[i] for i in order]
-
-    new_cells = []
-    for cell in obj.get("cells") or []:
-        new_cells.append(
-            {
-                "src": old_to_new[int(cell["src"])],
-                "dest": old_to_new[int(cell["dest"])],
-                "values": cell.get("values") or {},
-            }
+    if compact:
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        open_list, item_sep, close_list, key_sep, field_sep = "[", ",", "]", ":", ","
+        doc_open, doc_close = "{", "}"
+    else:
+        cell_encode = json.JSONEncoder(indent=2).encode
+
+        def encode(obj: Any) -> str:
+            # Cells sit two levels deep in the document.
+            return cell_encode(obj).replace("\n", "\n    ")
+
+        open_list, item_sep, close_list, key_sep, field_sep = "[\n    ", ",\n    ", "\n  ]", ": ", ",\n  "
+        doc_open, doc_close = "{\n  ", "\n}"
+
+    def write_list(fh: Any, items: Iterable[str]) -> None:
+        first = True
+        for item in items:
+            fh.write(open_list if first else item_sep)
+            fh.write(item)
+            first = False
+        fh.write("[]" if first else close_list)
+
+    with contextlib.ExitStack() as stack:
+        if output_path.suffix == ".gz":
+            # No file name and mtime 0 in the gzip header: the same matrix gives the same bytes.
+            raw = stack.enter_context(open(output_path, "wb"))
+            gz = stack.enter_context(gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0))
+            fh: Any = stack.enter_context(io.TextIOWrapper(gz, encoding="utf-8"))
+        else:
+            fh = stack.enter_context(open(output_path, "w", encoding="utf-8"))
+        fh.write(doc_open)
+        fh.write(f'"@schemaVersion"{key_sep}"1.0"{field_sep}')
+        fh.write(f'"name"{key_sep}{json.dumps(name)}{field_sep}')
+        fh.write(f'"variables"{key_sep}')
+        write_list(fh, (json.dumps(v) for v in matrix.variables))
+        fh.write(f'{field_sep}"cells"{key_sep}')
+        write_list(
+            fh, (encode({"src": src, "dest": dest, "values": values}) for src, dest, values in matrix.cells())
         )
-    new_cells.sort(key=lambda c: (c["src"], c["dest"]))
-
-    return {
-        "@schemaVersion": obj.get("@schemaVersion", "1.0"),
-        "name": obj.get("name", ""),
-        "variables": new_vars,
-        "cells": new_cells,
-    }
+        fh.write(doc_close)
 
-def _ancestor_file_id(entities: Dict[bytes, DbEntity], entity_id: bytes, memo: Dict[bytes, Optional[bytes]]) -> Optional[bytes]:
+def _ancestor_file_id(entities: Dict[bytes, DbEntity], entity_id: bytes, memo: MutableMapping[bytes, Optional[bytes]]) -> Optional[bytes]:
     if entity_id in memo:
         return memo[entity_id]
     current = entities.get(entity_id)
@@ -805,6 +1284,8 @@ def export_dv8_file_level(
     import_scoped: bool = True,
     include_transitive_use: bool = False,
     exclude_transitive_use: bool = False,
+    model: Optional[_ExportModel] = None,
+    compact_json: bool = False,
 ) -> None:
     """
     Export a single DV8 dependency matrix at FILE level.
@@ -817,13 +1298,13 @@ def export_dv8_file_level(
     Import or ImportLazy edge.  This eliminates phantom edges caused by
     StackGraphs resolving names to their *definition* site rather than their
     *import* site (e.g. an enum used via re-export).
-    """
-    con = _connect_ro(db_path)
-    entities = _load_entities(con)
-    cur = con.cursor()
 
-    file_ids = {eid for eid, e in entities.items() if e.kind == "File"}
-    file_name_by_id = {eid: _normalize_file_name(entities[eid].name) for eid in file_ids}
+    Pass *model* to reuse an already loaded snapshot of *db_path*.
+    """
+    if model is None:
+        model = _ExportModel.load(db_path)
+    entities = model.entities
+    file_name_by_id = model.file_name_by_id
 
     def in_focus(file_name: str) -> bool:
         if align_handcount and file_name.endswith("/__init__.py"):
@@ -842,9 +1323,9 @@ def export_dv8_file_level(
     focus_file_names = pkg_files + root_files
 
     # Map entity->file via parent chain.
-    memo: Dict[bytes, Optional[bytes]] = {}
+    memo = model.file_id_memo
 
-    dep_rows = cur.execute("SELECT src, tgt, kind FROM deps").fetchall()
+    dep_rows = model.dep_rows
 
     # --- Import-scoped resolution (pass 1): collect file pairs with import
     # or inheritance edges.  Import edges anchor direct coupling; Extend edges
@@ -852,6 +1333,7 @@ def export_dv8_file_level(
     _IMPORT_KINDS = {"Import", "ImportLazy"}
     _ANCHOR_KINDS = {"Import", "ImportLazy", "Extend"}
     import_file_pairs: Set[Tuple[bytes, bytes]] = set()
+    extend_reach: Reachability[bytes] = Reachability(())
     if import_scoped:
         extend_pairs: Set[Tuple[bytes, bytes]] = set()
         for src_id, tgt_id, dep_kind in dep_rows:
@@ -865,21 +1347,11 @@ def export_dv8_file_level(
                 import_file_pairs.add((src_fid, tgt_fid))
                 if dep_kind == "Extend":
                     extend_pairs.add((src_fid, tgt_fid))
-        # Transitive closure on Extend chains ONLY: if A→B (Extend) and
-        # B→C (Extend), add A→C.  This lets Override/Use edges on grandparent
-        # classes survive.  We do NOT propagate Import→Extend (that would let
+        # Two-hop Extend chains ONLY: if A→B (Extend) and B→C (Extend), A→C
+        # is anchored.  This lets Override/Use edges on grandparent classes
+        # survive.  We do NOT propagate Import→Extend (that would let
         # "A imports B, B extends C" wrongly anchor A→C).
-        changed = True
-        while changed:
-            changed = False
-            new_pairs: Set[Tuple[bytes, bytes]] = set()
-            for a, b in extend_pairs:
-                for c, d in extend_pairs:
-                    if b == c and (a, d) not in import_file_pairs:
-                        new_pairs.add((a, d))
-            if new_pairs:
-                import_file_pairs |= new_pairs
-                changed = True
+        extend_reach = Reachability(extend_pairs, max_hops=EXTEND_ANCHOR_HOPS)
 
     import_scoped_dropped = 0
     edges: List[Tuple[str, str, str]] = []
@@ -935,7 +1407,8 @@ def export_dv8_file_level(
             # whose file pair has no import relationship.  UseTransitive
             # edges are handled above; remaining anchor-less non-import
             # edges are unlabeled stragglers (safety net).
-            if (src_file_id, tgt_file_id) not in import_file_pairs:
+            file_pair = (src_file_id, tgt_file_id)
+            if file_pair not in import_file_pairs and not extend_reach.reaches(*file_pair):
                 import_scoped_dropped += 1
                 continue
 
@@ -999,23 +1472,18 @@ def export_dv8_file_level(
     if align_handcount:
         # Always include all focus files as variables so DV8 shows the full file list,
         # even if some files have no edges.
-        variables = [_aligned_file_node(f, dv8_hierarchy) for f in focus_file_names]
-        index = {v: i for i, v in enumerate(variables)}
-        cell_map: Dict[Tuple[int, int], Dict[str, float]] = {}
+        matrix = CellMatrix(_aligned_file_node(f, dv8_hierarchy) for f in focus_file_names)
+        index = matrix.index
         for s, t, k in edges:
             if s not in index or t not in index:
                 continue
-            key = (index[s], index[t])
-            values = cell_map.setdefault(key, {})
-            if collapse_weights:
-                values[k] = 1.0
-            else:
-                values[k] = values.get(k, 0.0) + 1.0
-        cells = [{"src": s, "dest": t, "values": v} for (s, t), v in sorted(cell_map.items())]
+            matrix.add(index[s], index[t], k, collapse=collapse_weights)
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(
-            json.dumps({"@schemaVersion": "1.0", "name": "dependencies (file-level)", "variables": variables, "cells": cells}, indent=2),
-            encoding="utf-8",
+        _dv8_stream_matrix_json(
+            out_path,
+            name="dependencies (file-level)",
+            matrix=matrix,
+            compact=compact_json,
         )
     else:
         # Include all focus files even if they have no dependencies
@@ -1027,14 +1495,14 @@ def export_dv8_file_level(
             sort_key=_dv8_sort_key_for_hierarchy(dv8_hierarchy),
             all_entities=all_file_names,
             collapse_weights=collapse_weights,
+            compact_json=compact_json,
         )
-    con.close()
 
 def _display_name_with_file(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
 ) -> Optional[str]:
     file_id = _ancestor_file_id(entities, entity_id, file_id_memo)
@@ -1058,32 +1526,20 @@ def _handcount_file_node(file_name: str) -> str:
     # "file (File)" item. This is an actual leaf variable that can have children.
     return f"{file_name}/module (Module)"
 
-def _class_chain_names(entities: Dict[bytes, DbEntity], entity_id: bytes) -> List[str]:
+def _class_chain_names(entities: _EntityTable, entity_id: bytes) -> List[str]:
     """
     Return the containing class chain (outer -> inner) for an entity.
 
     For a Class entity itself, this includes that class name.
     For a Method/Field, this includes its owning class(es).
+    Directly repeated names are collapsed: duplicate tagging can create nested Class
+    entities with the same name (Class X extracted twice, one parented by the other).
     """
-    chain: List[str] = []
-    cur = entities.get(entity_id)
-    while cur and cur.parent_id is not None and cur.parent_id in entities:
-        parent = entities[cur.parent_id]
-        if parent.kind == "Class":
-            chain.append(parent.name)
-        cur = parent
-    chain.reverse()
-    ent = entities.get(entity_id)
-    if ent and ent.kind == "Class":
-        chain.append(ent.name)
-    # Guard against duplicate tagging that can create nested Class entities with the same name
-    # (e.g., Class X extracted twice and one ends up parented by the other).
-    deduped: List[str] = []
-    for name in chain:
-        if deduped and deduped[-1] == name:
-            continue
-        deduped.append(name)
-    return deduped
+    graph = entities.graph
+    i = graph.index.get(entity_id)
+    if i is None:
+        return []
+    return list(graph.ancestry().class_chain[i])
 
 def _structured_file_node(file_name: str) -> str:
     # Structured hierarchy: keep a file-local "self" leaf to attach file-level deps.
@@ -1105,9 +1561,9 @@ def _segments_from_class_chain(chain: List[str]) -> List[str]:
 
 def _build_structured_class_folder_map(
     *,
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     dep_rows: Sequence[Tuple[bytes, bytes, str]],
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     in_focus_file: Callable[[str], bool],
 ) -> Dict[bytes, List[str]]:
@@ -1210,10 +1666,10 @@ def _build_structured_class_folder_map(
     return memo
 
 def _structured_name(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     class_folder_by_id: Optional[Dict[bytes, List[str]]] = None,
 ) -> Optional[str]:
@@ -1320,10 +1776,10 @@ def _structured_name(
     return f"{file_name}::{_display_name(entities, entity_id)}"
 
 def _professor_name(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     class_folder_by_id: Optional[Dict[bytes, List[str]]] = None,
 ) -> Optional[str]:
@@ -1338,9 +1794,9 @@ def _professor_name(
 
 def _build_local_base_dotted_map(
     *,
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     dep_rows: Sequence[Tuple[bytes, bytes, str]],
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     in_focus_file: Callable[[str], bool],
 ) -> Dict[bytes, str]:
@@ -1386,10 +1842,10 @@ def _build_local_base_dotted_map(
     return base_dotted
 
 def _flat_name(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     local_base_dotted_by_class_id: Optional[Dict[bytes, str]] = None,
 ) -> Optional[str]:
@@ -1475,11 +1931,11 @@ def _normalize_file_name(file_name: str) -> str:
     return file_name
 
 def _aligned_name(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
     dv8_hierarchy: str,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
     class_folder_by_id: Optional[Dict[bytes, List[str]]] = None,
     local_base_dotted_by_class_id: Optional[Dict[bytes, str]] = None,
@@ -1503,10 +1959,10 @@ def _aligned_name(
     )
 
 def _handcount_name(
-    entities: Dict[bytes, DbEntity],
+    entities: _EntityTable,
     entity_id: bytes,
     *,
-    file_id_memo: Dict[bytes, Optional[bytes]],
+    file_id_memo: MutableMapping[bytes, Optional[bytes]],
     file_name_by_id: Dict[bytes, str],
 ) -> Optional[str]:
     """
@@ -1605,25 +2061,21 @@ def _handcount_name(
     # Fallback: keep legacy naming for unexpected kinds.
     return f"{file_name}::{_display_name(entities, entity_id)}"
 
-def _owner_class_entity(entities: Dict[bytes, DbEntity], entity_id: bytes) -> Optional[DbEntity]:
+def _owner_class_entity(entities: _EntityTable, entity_id: bytes) -> Optional[DbEntity]:
     """
     Return the owning Class entity for an entity (Method/Field/etc), if any.
 
     For Python, module-level functions are stored as kind=Method with parent=File;
     those should return None here.
     """
-    cur = entities.get(entity_id)
-    if cur is None:
+    graph = entities.graph
+    i = graph.index.get(entity_id)
+    if i is None:
         return None
-    while cur.parent_id is not None and cur.parent_id in entities:
-        cur = entities[cur.parent_id]
-        if cur.kind == "Class":
-            return cur
-        if cur.kind == "File":
-            return None
-    return None
+    j = graph.ancestry().owner_class[i]
+    return entities.get(graph.ids[j]) if j >= 0 else None
 
-def _is_nested_method(entities: Dict[bytes, DbEntity], entity_id: bytes) -> bool:
+def _is_nested_method(entities: _EntityTable, entity_id: bytes) -> bool:
     """
     Return True if this Method/Function entity is nested inside another Method/Function (i.e., a local helper
     function defined inside a method/function body).
@@ -1631,29 +2083,16 @@ def _is_nested_method(entities: Dict[bytes, DbEntity], entity_id: bytes) -> bool
     Why (handcount alignment): the handcount ground truth treats dependencies inside nested
     helper functions as part of the *enclosing* method. Keeping nested Method/Function entities
     produces systematic "extra" edges (e.g. `apply` + `filter` both using the same fields).
+
+    Duplicate tagging artifacts where a method ends up parented by a method with the same
+    name (e.g. two Method entities for `with_mask`, one nested under the other) are treated
+    as duplicates, not real nested helper functions.
     """
-    ent = entities.get(entity_id)
-    if ent is None or ent.kind not in {"Method", "Function"}:
+    graph = entities.graph
+    i = graph.index.get(entity_id)
+    if i is None:
         return False
-    cur = ent
-    seen: Set[bytes] = set()
-    while cur.parent_id is not None and cur.parent_id in entities:
-        if cur.id in seen:
-            return False
-        seen.add(cur.id)
-        parent = entities[cur.parent_id]
-        if parent.kind in {"Method", "Function"}:
-            # Guard against duplicate tagging artifacts where a method ends up parented by a
-            # method with the same name (e.g. two Method entities for `with_mask`, one nested
-            # under the other). Treat these as duplicates, not real nested helper functions.
-            if parent.name == ent.name:
-                cur = parent
-                continue
-            return True
-        if parent.kind in {"Class", "File"}:
-            return False
-        cur = parent
-    return False
+    return bool(graph.ancestry().nested_function[i])
 
 def _handcount_var_sort_key(var: str) -> Tuple[int, str, int, str, str]:
     """
@@ -1850,19 +2289,21 @@ def export_dv8_full_project(
     align_handcount: bool,
     dv8_hierarchy: str,
     collapse_weights: bool = False,
+    model: Optional[_ExportModel] = None,
+    compact_json: bool = False,
 ) -> None:
     """
     Export a single "full" DV8 dependency matrix that supports drill-down in DV8.
 
     The hierarchy is encoded in the variable names (slash-delimited), so a separate
     DV8 clustering JSON is intentionally not required.
-    """
-    con = _connect_ro(db_path)
-    entities = _load_entities(con)
-    cur = con.cursor()
 
-    file_ids = {eid for eid, e in entities.items() if e.kind == "File"}
-    file_name_by_id = {eid: _normalize_file_name(entities[eid].name) for eid in file_ids}
+    Pass *model* to reuse an already loaded snapshot of *db_path*.
+    """
+    if model is None:
+        model = _ExportModel.load(db_path)
+    entities = model.entities
+    file_name_by_id = model.file_name_by_id
 
     def in_focus(file_name: str) -> bool:
         if align_handcount and file_name.endswith("/__init__.py"):
@@ -1875,7 +2316,7 @@ def export_dv8_full_project(
             return True
         return False
 
-    file_id_memo: Dict[bytes, Optional[bytes]] = {}
+    file_id_memo = model.file_id_memo
 
     focus_all = [name for name in file_name_by_id.values() if in_focus(name)]
     # Ordering: show package files (e.g. tts/...) before root files (e.g. main.py).
@@ -1883,7 +2324,7 @@ def export_dv8_full_project(
     root_files = sorted([n for n in focus_all if "/" not in n])
     focus_file_names = pkg_files + root_files
 
-    dep_rows = cur.execute("SELECT src, tgt, kind FROM deps").fetchall()
+    dep_rows = model.dep_rows
 
     # Build a class ancestry map (class_id -> set of ancestor class_ids via Extend edges).
     # Used to filter spurious Field->Class Use edges produced by StackGraphs where the
@@ -1987,6 +2428,22 @@ def export_dv8_full_project(
             in_focus_file=in_focus,
         )
 
+    # Each entity is named once, however many edges it appears on.
+    name_memo: Dict[bytes, Optional[str]] = {}
+
+    def aligned_name(entity_id: bytes) -> Optional[str]:
+        if entity_id not in name_memo:
+            name_memo[entity_id] = _aligned_name(
+                entities,
+                entity_id,
+                dv8_hierarchy=dv8_hierarchy,
+                file_id_memo=file_id_memo,
+                file_name_by_id=file_name_by_id,
+                class_folder_by_id=structured_class_folders,
+                local_base_dotted_by_class_id=local_base_dotted_by_class_id,
+            )
+        return name_memo[entity_id]
+
     if align_handcount:
         # Handcount DSM is internal-only.
         include_external_targets = False
@@ -2063,28 +2520,12 @@ def export_dv8_full_project(
                 # Prefer the explicit inheritance edge (Extend) and avoid double-counting via type-use.
                 continue
 
-        src_name = _aligned_name(
-            entities,
-            src_id,
-            dv8_hierarchy=dv8_hierarchy,
-            file_id_memo=file_id_memo,
-            file_name_by_id=file_name_by_id,
-            class_folder_by_id=structured_class_folders,
-            local_base_dotted_by_class_id=local_base_dotted_by_class_id,
-        )
+        src_name = aligned_name(src_id)
         if not src_name:
             continue
 
         if tgt_id in focus_entity_ids:
-            tgt_name = _aligned_name(
-                entities,
-                tgt_id,
-                dv8_hierarchy=dv8_hierarchy,
-                file_id_memo=file_id_memo,
-                file_name_by_id=file_name_by_id,
-                class_folder_by_id=structured_class_folders,
-                local_base_dotted_by_class_id=local_base_dotted_by_class_id,
-            )
+            tgt_name = aligned_name(tgt_id)
             if not tgt_name:
                 continue
         else:
@@ -2105,15 +2546,7 @@ def export_dv8_full_project(
     for entity_id in focus_entity_ids:
         if entity_id not in entities:
             continue
-        entity_name = _aligned_name(
-            entities,
-            entity_id,
-            dv8_hierarchy=dv8_hierarchy,
-            file_id_memo=file_id_memo,
-            file_name_by_id=file_name_by_id,
-            class_folder_by_id=structured_class_folders,
-            local_base_dotted_by_class_id=local_base_dotted_by_class_id,
-        )
+        entity_name = aligned_name(entity_id)
         if entity_name:
             all_entity_names.append(entity_name)
 
@@ -2129,8 +2562,8 @@ def export_dv8_full_project(
         sort_key=_dv8_sort_key_for_hierarchy(dv8_hierarchy),
         all_entities=all_entity_names,
         collapse_weights=collapse_weights,
+        compact_json=compact_json,
     )
-    con.close()
 
 
 def _summarize_db(db_path: Path) -> Dict[str, Any]:
@@ -2208,165 +2641,156 @@ def export_dv8_per_file(
     align_handcount: bool,
     dv8_hierarchy: str,
     collapse_weights: bool = False,
+    model: Optional[_ExportModel] = None,
+    jobs: int = 1,
+    compact_json: bool = False,
+    logger: Any = None,
 ) -> None:
-    con = _connect_ro(db_path)
-    entities = _load_entities(con)
-    cur = con.cursor()
+    """
+    Write one DV8 dependency JSON (and optionally a clustering JSON) per File entity.
+
+    With ``jobs > 1`` the files are spread over a process pool (see ``_run_per_file_jobs``);
+    each worker loads its own snapshot of the immutable DB and *model* is not used.
+    Progress is reported to the dev *logger* if one is given.
+    """
+    options: Dict[str, Any] = dict(
+        out_dir=out_dir,
+        include_external_targets=include_external_targets,
+        include_incoming_edges=include_incoming_edges,
+        write_clustering=write_clustering,
+        align_handcount=align_handcount,
+        dv8_hierarchy=dv8_hierarchy,
+        collapse_weights=collapse_weights,
+        compact_json=compact_json,
+    )
+    select = dict(
+        only_py=only_py,
+        focus_prefix=focus_prefix,
+        include_root_py=include_root_py,
+        skip_init=align_handcount,
+    )
+    if jobs > 1:
+        files = _select_per_file_rows(_query_file_rows(db_path), **select)
+        _run_per_file_jobs(
+            _dv8_per_file_worker, db_path, files, options, jobs=jobs, label="Per-file DV8 matrices", logger=logger
+        )
+        return
+
+    if model is None:
+        model = _ExportModel.load(db_path)
+    for file_id, file_name in _select_per_file_rows(model.file_rows(), **select):
+        _export_dv8_file(model, file_id, file_name, **options)
 
-    file_rows = cur.execute("SELECT id, name FROM entities WHERE kind = 'File' ORDER BY name").fetchall()
+
+def _export_dv8_file(
+    model: _ExportModel,
+    file_id: bytes,
+    file_name: str,
+    *,
+    out_dir: Path,
+    include_external_targets: bool,
+    include_incoming_edges: bool,
+    write_clustering: bool,
+    align_handcount: bool,
+    dv8_hierarchy: str,
+    collapse_weights: bool,
+    compact_json: bool = False,
+) -> None:
+    entities = model.entities
     core_kinds = {
         # Original core 8
         "Import", "Extend", "Create", "Call", "Use", "Override", "Parameter", "Cast",
         # All Java-relevant Depends dep kinds (previously filtered out)
         "Contain", "Implement", "Return", "Throw", "MixIn",
     }
-    for file_id, file_name in file_rows:
-        if align_handcount and file_name.endswith("/__init__.py"):
-            continue
-        if only_py and not file_name.endswith(".py"):
-            continue
-        if focus_prefix is not None:
-            if file_name.startswith(focus_prefix):
-                pass
-            elif include_root_py and "/" not in file_name and file_name.endswith(".py"):
-                pass
-            else:
-                continue
-
-        ids = _descendants(con, file_id)
-        placeholders = ",".join(["?"] * len(ids))
-        if include_incoming_edges:
-            dep_rows = cur.execute(
-                f"""
-                SELECT d.src, d.tgt, d.kind
-                FROM deps d
-                WHERE d.src IN ({placeholders}) OR d.tgt IN ({placeholders})
-                """,
-                list(ids) + list(ids),
-            ).fetchall()
-        else:
-            dep_rows = cur.execute(
-                f"""
-                SELECT d.src, d.tgt, d.kind
-                FROM deps d
-                WHERE d.src IN ({placeholders})
-                """,
-                list(ids),
-            ).fetchall()
-
-        edges: List[Tuple[str, str, str]] = []
-        if align_handcount:
-            file_id_memo: Dict[bytes, Optional[bytes]] = {}
-            file_name_by_id = {eid: _normalize_file_name(e.name) for eid, e in entities.items() if e.kind == "File"}
-            class_folder_by_id: Optional[Dict[bytes, List[str]]] = None
-            local_base_dotted_by_class_id: Optional[Dict[bytes, str]] = None
-            if dv8_hierarchy == "structured":
-                class_folder_by_id = _build_structured_class_folder_map(
-                    entities=entities,
-                    dep_rows=dep_rows,
-                    file_id_memo=file_id_memo,
-                    file_name_by_id=file_name_by_id,
-                    in_focus_file=lambda f, fn=file_name: f == fn,
-                )
-            elif dv8_hierarchy == "flat":
-                local_base_dotted_by_class_id = _build_local_base_dotted_map(
-                    entities=entities,
-                    dep_rows=dep_rows,
-                    file_id_memo=file_id_memo,
-                    file_name_by_id=file_name_by_id,
-                    in_focus_file=lambda f, fn=file_name: f == fn,
-                )
+    members = model.file_members(file_id)
+    ids = set(members)
+    dep_rows = model.file_deps(file_id, include_incoming=include_incoming_edges)
 
-        for src_id, tgt_id, dep_kind in dep_rows:
-            if src_id not in entities or tgt_id not in entities:
-                continue
-
-            src_in_file = src_id in ids
-            tgt_in_file = tgt_id in ids
+    edges: List[Tuple[str, str, str]] = []
+    if align_handcount:
+        file_id_memo = model.file_id_memo
+        file_name_by_id = model.file_name_by_id
+        class_folder_by_id: Optional[Dict[bytes, List[str]]] = None
+        local_base_dotted_by_class_id: Optional[Dict[bytes, str]] = None
+        if dv8_hierarchy == "structured":
+            class_folder_by_id = _build_structured_class_folder_map(
+                entities=entities,
+                dep_rows=dep_rows,
+                file_id_memo=file_id_memo,
+                file_name_by_id=file_name_by_id,
+                in_focus_file=lambda f, fn=file_name: f == fn,
+            )
+        elif dv8_hierarchy == "flat":
+            local_base_dotted_by_class_id = _build_local_base_dotted_map(
+                entities=entities,
+                dep_rows=dep_rows,
+                file_id_memo=file_id_memo,
+                file_name_by_id=file_name_by_id,
+                in_focus_file=lambda f, fn=file_name: f == fn,
+            )
 
-            tgt_ent = entities[tgt_id]
-            if align_handcount:
-                if dep_kind not in core_kinds:
-                    continue
-                src_ent = entities[src_id]
-                # Strict handcount schema by dep kind.
-                if dep_kind == "Import" and not (src_ent.kind == "File" and tgt_ent.kind == "File"):
-                    continue
-                if dep_kind == "Extend" and not (src_ent.kind == "Class" and tgt_ent.kind == "Class"):
-                    continue
-                if dep_kind == "Create" and not (src_ent.kind == "Method" and tgt_ent.kind == "Class"):
-                    continue
-                if dep_kind == "Call" and not (src_ent.kind == "Method" and tgt_ent.kind == "Method"):
-                    continue
-                if dep_kind == "Use" and not (
-                    src_ent.kind in {"Method", "Function", "Constructor"} and tgt_ent.kind in {"Field", "Class"}
-                ):
-                    continue
-                if dep_kind == "Override" and not (src_ent.kind == "Method" and tgt_ent.kind == "Method"):
-                    continue
+    for src_id, tgt_id, dep_kind in dep_rows:
+        if src_id not in entities or tgt_id not in entities:
+            continue
 
-                if dep_kind == "Call" and tgt_ent.kind == "Method" and tgt_ent.name in {"__init__", "__new__"}:
-                    if src_ent.name not in {"__init__", "__new__"}:
-                        continue
+        src_in_file = src_id in ids
+        tgt_in_file = tgt_id in ids
 
-                # Drop Field->Method edges for handcount alignment.
-                if src_ent.kind == "Field" and tgt_ent.kind == "Method":
-                    continue
-                if src_ent.kind == "Class" and tgt_ent.kind == "Class" and dep_kind == "Use":
-                    continue
+        tgt_ent = entities[tgt_id]
+        if align_handcount:
+            if dep_kind not in core_kinds:
+                continue
+            src_ent = entities[src_id]
+            # Strict handcount schema by dep kind.
+            if dep_kind == "Import" and not (src_ent.kind == "File" and tgt_ent.kind == "File"):
+                continue
+            if dep_kind == "Extend" and not (src_ent.kind == "Class" and tgt_ent.kind == "Class"):
+                continue
+            if dep_kind == "Create" and not (src_ent.kind == "Method" and tgt_ent.kind == "Class"):
+                continue
+            if dep_kind == "Call" and not (src_ent.kind == "Method" and tgt_ent.kind == "Method"):
+                continue
+            if dep_kind == "Use" and not (
+                src_ent.kind in {"Method", "Function", "Constructor"} and tgt_ent.kind in {"Field", "Class"}
+            ):
+                continue
+            if dep_kind == "Override" and not (src_ent.kind == "Method" and tgt_ent.kind == "Method"):
+                continue
 
-            if align_handcount:
-                if src_in_file:
-                    src_name = _aligned_name(
-                        entities,
-                        src_id,
-                        dv8_hierarchy=dv8_hierarchy,
-                        file_id_memo=file_id_memo,
-                        file_name_by_id=file_name_by_id,
-                        class_folder_by_id=class_folder_by_id,
-                        local_base_dotted_by_class_id=local_base_dotted_by_class_id,
-                    )
-                else:
-                    if not include_external_targets:
-                        continue
-                    src_ent = entities[src_id]
-                    src_name = f"(External {src_ent.kind}) {_display_name(entities, src_id)}"
-            else:
-                src_name = _display_name(entities, src_id)
-            if tgt_in_file:
-                if align_handcount:
-                    tgt_name = _aligned_name(
-                        entities,
-                        tgt_id,
-                        dv8_hierarchy=dv8_hierarchy,
-                        file_id_memo=file_id_memo,
-                        file_name_by_id=file_name_by_id,
-                        class_folder_by_id=class_folder_by_id,
-                        local_base_dotted_by_class_id=local_base_dotted_by_class_id,
-                    )
-                else:
-                    tgt_name = _display_name(entities, tgt_id)
-            else:
-                if not include_external_targets:
+            if dep_kind == "Call" and tgt_ent.kind == "Method" and tgt_ent.name in {"__init__", "__new__"}:
+                if src_ent.name not in {"__init__", "__new__"}:
                     continue
-                tgt_name = f"(External {tgt_ent.kind}) {_display_name(entities, tgt_id)}"
 
-            if not src_name or not tgt_name:
+            # Drop Field->Method edges for handcount alignment.
+            if src_ent.kind == "Field" and tgt_ent.kind == "Method":
+                continue
+            if src_ent.kind == "Class" and tgt_ent.kind == "Class" and dep_kind == "Use":
                 continue
-            edges.append((src_name, tgt_name, dep_kind))
 
         if align_handcount:
-            edges = sorted(set(edges))
-
-        # Collect all entity names (including those without dependencies)
-        all_entity_names: List[str] = []
-        for entity_id in ids:
-            if entity_id not in entities:
-                continue
+            if src_in_file:
+                src_name = _aligned_name(
+                    entities,
+                    src_id,
+                    dv8_hierarchy=dv8_hierarchy,
+                    file_id_memo=file_id_memo,
+                    file_name_by_id=file_name_by_id,
+                    class_folder_by_id=class_folder_by_id,
+                    local_base_dotted_by_class_id=local_base_dotted_by_class_id,
+                )
+            else:
+                if not include_external_targets:
+                    continue
+                src_ent = entities[src_id]
+                src_name = f"(External {src_ent.kind}) {_display_name(entities, src_id)}"
+        else:
+            src_name = _display_name(entities, src_id)
+        if tgt_in_file:
             if align_handcount:
-                entity_name = _aligned_name(
+                tgt_name = _aligned_name(
                     entities,
-                    entity_id,
+                    tgt_id,
                     dv8_hierarchy=dv8_hierarchy,
                     file_id_memo=file_id_memo,
                     file_name_by_id=file_name_by_id,
@@ -2374,40 +2798,164 @@ def export_dv8_per_file(
                     local_base_dotted_by_class_id=local_base_dotted_by_class_id,
                 )
             else:
-                entity_name = _display_name(entities, entity_id)
-            if entity_name:
-                all_entity_names.append(entity_name)
+                tgt_name = _display_name(entities, tgt_id)
+        else:
+            if not include_external_targets:
+                continue
+            tgt_name = f"(External {tgt_ent.kind}) {_display_name(entities, tgt_id)}"
 
-        out_path = out_dir / "dv8_deps" / f"{Path(file_name).stem}.dv8-dependency.json"
-        dv8_obj, variables = _dv8_build_dependency_json(
-            name=Path(file_name).name,
-            edges=edges,
-            all_entities=all_entity_names,
-            collapse_weights=collapse_weights,
-        )
+        if not src_name or not tgt_name:
+            continue
+        edges.append((src_name, tgt_name, dep_kind))
+
+    if align_handcount:
+        edges = sorted(set(edges))
+
+    # Collect all entity names (including those without dependencies)
+    all_entity_names: List[str] = []
+    for entity_id in members:
+        if entity_id not in entities:
+            continue
         if align_handcount:
-            dv8_obj = _dv8_reorder_dependency_json(dv8_obj, sort_key=_dv8_sort_key_for_hierarchy(dv8_hierarchy))
-        try:
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            out_path.write_text(json.dumps(dv8_obj, indent=2), encoding="utf-8")
-        except PermissionError as exc:
-            raise ExportError(
-                f"Cannot write results to the output directory: {out_path.parent}\n"
-                "       Check that you have permission to write to that location,\n"
-                "       or choose a different output directory and run again."
-            ) from exc
-
-        if write_clustering and not align_handcount:
-            clustering = build_class_folder_clustering(
-                db_entities=entities,
-                file_id=file_id,
-                file_name=file_name,
-                variables=set(variables),
+            entity_name = _aligned_name(
+                entities,
+                entity_id,
+                dv8_hierarchy=dv8_hierarchy,
+                file_id_memo=file_id_memo,
+                file_name_by_id=file_name_by_id,
+                class_folder_by_id=class_folder_by_id,
+                local_base_dotted_by_class_id=local_base_dotted_by_class_id,
             )
-            clustering_path = out_dir / "dv8_deps" / f"{Path(file_name).stem}.dv8-clustering.json"
-            clustering_path.write_text(json.dumps(clustering, indent=2), encoding="utf-8")
+        else:
+            entity_name = _display_name(entities, entity_id)
+        if entity_name:
+            all_entity_names.append(entity_name)
+
+    out_path = out_dir / "dv8_deps" / f"{Path(file_name).stem}.dv8-dependency.json"
+    matrix = _dv8_build_matrix(
+        edges=edges,
+        all_entities=all_entity_names,
+        collapse_weights=collapse_weights,
+    )
+    if align_handcount:
+        matrix = matrix.sorted_by(_dv8_sort_key_for_hierarchy(dv8_hierarchy))
+    try:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        _dv8_stream_matrix_json(out_path, name=Path(file_name).name, matrix=matrix, compact=compact_json)
+    except PermissionError as exc:
+        raise ExportError(
+            f"Cannot write results to the output directory: {out_path.parent}\n"
+            "       Check that you have permission to write to that location,\n"
+            "       or choose a different output directory and run again."
+        ) from exc
+
+    if write_clustering and not align_handcount:
+        clustering = build_class_folder_clustering(
+            db_entities=entities,
+            file_id=file_id,
+            file_name=file_name,
+            variables=set(matrix.index),
+            index=model.class_folder_index(),
+        )
+        clustering_path = out_dir / "dv8_deps" / f"{Path(file_name).stem}.dv8-clustering.json"
+        clustering_path.write_text(json.dumps(clustering, indent=2), encoding="utf-8")
+
+
+def export_dv8_snapshot(
+    *,
+    db_path: Path,
+    per_file: Optional[Dict[str, Any]] = None,
+    file_level: Optional[Dict[str, Any]] = None,
+    full: Optional[Dict[str, Any]] = None,
+    logger: Any = None,
+) -> None:
+    """
+    Export every requested DV8 variant of one DB snapshot from a single load.
+
+    *per_file*, *file_level* and *full* are the keyword arguments (minus
+    ``db_path``) for ``export_dv8_per_file``, ``export_dv8_file_level`` and
+    ``export_dv8_full_project``; ``None`` skips that variant. Module-level so it
+    can be submitted to a process pool (without a *logger*).
+    """
+    model = _ExportModel.load(db_path)
+    if per_file is not None:
+        export_dv8_per_file(db_path=db_path, model=model, logger=logger, **per_file)
+    if file_level is not None:
+        export_dv8_file_level(db_path=db_path, model=model, **file_level)
+    if full is not None:
+        export_dv8_full_project(db_path=db_path, model=model, **full)
+
+
+def _snapshot_signature(value: Any) -> Any:
+    """The export options of a snapshot job as cache-key material (output locations by name only)."""
+    if isinstance(value, dict):
+        return {k: _snapshot_signature(v) for k, v in value.items() if k not in ("db_path", "jobs")}
+    if isinstance(value, Path):
+        return value.name
+    return value
+
+
+def _snapshot_outputs(job: Dict[str, Any]) -> Dict[str, Path]:
+    outputs: Dict[str, Path] = {}
+    if job.get("per_file") is not None:
+        outputs["dv8_deps"] = job["per_file"]["out_dir"] / "dv8_deps"
+    if job.get("file_level") is not None:
+        outputs["file_level"] = job["file_level"]["output_path"]
+    if job.get("full") is not None:
+        outputs["full"] = job["full"]["output_path"]
+    return outputs
+
+
+def export_dv8_snapshot_cached(
+    cache: Optional[AnalysisCache], db_key: Optional[str], job: Dict[str, Any], logger: Any = None
+) -> bool:
+    """
+    ``export_dv8_snapshot(**job)`` through the analysis cache.
+
+    *db_key* is the cache key of the DB stage that produced ``job["db_path"]``.
+    Returns True when the outputs were restored from the cache instead of
+    exported. Module-level so it can be submitted to a process pool.
+    """
+    if cache is None or db_key is None:
+        export_dv8_snapshot(logger=logger, **job)
+        return False
+    key = stage_key("dv8", db_key, _snapshot_signature(job))
+    outputs = _snapshot_outputs(job)
+    if cache.restore(key, outputs):
+        return True
+    export_dv8_snapshot(logger=logger, **job)
+    cache.store(key, outputs)
+    return False
+
+
+def _profiled_snapshot_export(
+    cache: Optional[AnalysisCache], db_key: Optional[str], job: Dict[str, Any], label: str, prefix: str
+) -> Tuple[bool, List[Dict[str, Any]]]:
+    """
+    ``export_dv8_snapshot_cached`` in a --parallel-snapshots worker, profiled as
+    stage *label*. Returns the cache-hit flag and the stage records for the
+    parent's profiler (``StageProfiler.adopt``).
+    """
+    stages = StageProfiler(prefix=f"{prefix}{label}_")
+    with stages.stage(label, db_in=job["db_path"]):
+        hit = export_dv8_snapshot_cached(cache, db_key, job)
+    return hit, stages.to_json()
+
+
+# (Class entities by content id, Method / Field entities by parent id), in entity order.
+_ClassFolderIndex = Tuple[Dict[bytes, List[DbEntity]], Dict[bytes, List[DbEntity]]]
+
+
+def _class_folder_index(db_entities: Mapping[bytes, DbEntity]) -> _ClassFolderIndex:
+    classes: Dict[bytes, List[DbEntity]] = {}
+    members: Dict[bytes, List[DbEntity]] = {}
+    for e in db_entities.values():
+        if e.kind == "Class":
+            classes.setdefault(e.content_id, []).append(e)
+        elif e.kind in ("Method", "Field") and e.parent_id is not None:
+            members.setdefault(e.parent_id, []).append(e)
+    return classes, members
 
-    con.close()
 
 def build_class_folder_clustering(
     *,
@@ -2415,10 +2963,14 @@ def build_class_folder_clustering(
     file_id: bytes,
     file_name: str,
     variables: Set[str],
+    index: Optional[_ClassFolderIndex] = None,
 ) -> Dict[str, Any]:
     """
     Create a DV8 clustering structure for a single file dependency matrix.
 
+    Pass the entities' *index* (``_ExportModel.class_folder_index``) when
+    clustering many files; without it each call scans every entity.
+
     Desired view:
       <Class>
         self
@@ -2439,9 +2991,10 @@ def build_class_folder_clustering(
     file_ent = db_entities[file_id]
     file_content_id = file_ent.content_id
 
+    classes_by_content, members_by_parent = index if index is not None else _class_folder_index(db_entities)
+
     # Collect classes that belong to this file.
-    classes = [e for e in db_entities.values() if e.kind == "Class" and e.content_id == file_content_id]
-    classes.sort(key=lambda e: e.name)
+    classes = sorted(classes_by_content.get(file_content_id, ()), key=lambda e: e.name)
 
     assigned: Set[str] = set()
     structure: List[Dict[str, Any]] = []
@@ -2458,8 +3011,9 @@ def build_class_folder_clustering(
             cls_items.append(group("self", self_items))
 
         # children (methods/fields) under this class (parent_id == class id)
-        child_methods = [e for e in db_entities.values() if e.kind == "Method" and e.parent_id == cls.id]
-        child_fields = [e for e in db_entities.values() if e.kind == "Field" and e.parent_id == cls.id]
+        members = members_by_parent.get(cls.id, ())
+        child_methods = [e for e in members if e.kind == "Method"]
+        child_fields = [e for e in members if e.kind == "Field"]
         child_methods.sort(key=lambda e: e.name)
         child_fields.sort(key=lambda e: e.name)
 
@@ -2611,6 +3165,124 @@ def main() -> int:
         help="Path to detect_overrides.py (default: auto-discovered next to this script)",
     )
     parser.add_argument("--no-override", action="store_true", help="Skip override detection step (Java @Override / Python @abstractmethod)")
+    parser.add_argument(
+        "--ast-cache-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Directory for the on-disk parsed-AST cache shared by the Python post-processing "
+            "scripts (keyed by file content hash). Repeated runs skip re-parsing unchanged files. "
+            "Off by default."
+        ),
+    )
+    parser.add_argument(
+        "--scan-rows",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Rows fetched per chunk when the post-processing scripts and exporters stream the deps "
+            "table (default: 10000). Lower it to cap peak memory on very large DBs."
+        ),
+    )
+    parser.add_argument(
+        "--analysis-cache-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Persistent cache of stage outputs (raw / filtered / enhanced DBs and DV8 exports), "
+            "keyed by the source tree (git tree hash or content hash), the options reaching each "
+            "stage and the tool versions. Stages whose outputs are cached are skipped, so "
+            "re-running the same commit or re-exporting with other DV8 options takes seconds. "
+            "Off by default."
+        ),
+    )
+    parser.add_argument(
+        "--analysis-cache-max-mb",
+        type=int,
+        default=2048,
+        metavar="MB",
+        help="Size bound for --analysis-cache-dir; least recently used entries are evicted (default: 2048)",
+    )
+    parser.add_argument(
+        "--incremental-enhance",
+        action="store_true",
+        help=(
+            "Keep a sidecar manifest next to the output DB (data/dependencies.<tag>.enhance_manifest.db) "
+            "and, on later runs into the same output dir, re-run Python enhancement only for files "
+            "whose contents changed plus their reverse dependents. Off by default. "
+            "The enhanced DB is not taken from --analysis-cache-dir in this mode."
+        ),
+    )
+    parser.add_argument(
+        "--commits",
+        default=None,
+        metavar="SPEC",
+        help=(
+            "Batch mode over git history: a range (A..B), a comma-separated list of revisions or "
+            "@FILE with one revision per line. NeoDepends runs once for all the commits (files "
+            "unchanged between commits are extracted once), then each commit, oldest first, is "
+            "post-processed with incremental enhancement against the previous one and exported to "
+            "commits/<seq>_<sha>/. Also writes the commit-indexed data/dependencies.<tag>.commits.db. "
+            "Requires the project root to be a git checkout."
+        ),
+    )
+    parser.add_argument(
+        "--parallel-snapshots",
+        action="store_true",
+        help=(
+            "Export the raw and raw_filtered DV8 snapshots in worker processes while "
+            "filtering/enhancement continue, instead of sequentially. Off by default."
+        ),
+    )
+    parser.add_argument(
+        "--compact-json",
+        action="store_true",
+        help=(
+            "Write DV8 matrices (per-file, file-level, full) without indentation. Same content, "
+            "much smaller files. Default: pretty-printed (indent=2)."
+        ),
+    )
+    parser.add_argument(
+        "--gzip-json",
+        action="store_true",
+        help=(
+            "Write the full-project DV8 matrices gzip-compressed (analysis-result.json.gz and "
+            "the raw / raw_filtered *.dv8-dsm-v3.json.gz snapshots)."
+        ),
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Write a cProfile dump per pipeline stage (and per Python enhancement STEP) to this "
+            "directory. Stage timings, CPU time, peak RSS and deps row counts are always recorded "
+            "in data/run_summary.json under stage_profile."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help=(
+            "Worker processes for the per-file exports (per-file DV8 matrices and --per-file-dbs) "
+            "and for the per-method AST analysis in Python enhancement. "
+            "Output is identical to a sequential run. Default: 1 (sequential)."
+        ),
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        default=False,
+        help=(
+            "Run the post-processing scripts (FP filter, enhancement, override detection, "
+            "shadow-import resolution) as imported modules sharing one DB connection instead "
+            "of one Python subprocess per stage. Faster on large repos; the default subprocess "
+            "mode keeps each stage isolated."
+        ),
+    )
     parser.add_argument(
         "--java-enhance-script",
         type=Path,
@@ -2801,6 +3473,24 @@ def main() -> int:
 
     args = parser.parse_args()
 
+    if args.profile_dir is not None:
+        # Read by tools/stage_profile.py in the exporter and in the enhancement stage.
+        os.environ[PROFILE_DIR_ENV] = str(
+            _resolve_path_arg(args.profile_dir, prefer_agent_root=False, must_exist=False, kind="Profile dump")
+        )
+
+    if args.ast_cache_dir is not None:
+        # Read by tools/ast_cache.py in both the subprocess and the --in-process stages.
+        os.environ["NEODEPENDS_AST_CACHE_DIR"] = str(
+            _resolve_path_arg(args.ast_cache_dir, prefer_agent_root=False, must_exist=False, kind="AST cache")
+        )
+
+    if args.scan_rows is not None:
+        if args.scan_rows < 1:
+            parser.error("--scan-rows must be a positive integer")
+        # Read by graph_model.scan_rows() in this process, the workers and the post-processing subprocesses.
+        os.environ[SCAN_ROWS_ENV] = str(args.scan_rows)
+
     # Apply config presets
     if args.config in ("automatic", "default", "python", "java"):
         preset_type = args.config
@@ -2819,8 +3509,9 @@ def main() -> int:
                     preset_type = "python"  # Fallback
             else:
                 # Directory - scan for predominant language
-                py_count = sum(1 for _ in input_path.rglob("*.py"))
-                java_count = sum(1 for _ in input_path.rglob("*.java"))
+                inventory = source_inventory(input_path)
+                py_count = inventory.count(".py")
+                java_count = inventory.count(".java")
                 if java_count > py_count:
                     preset_type = "java"
                 else:
@@ -2990,15 +3681,11 @@ def main() -> int:
 
         # Heuristic: if any file mentions `from <pkg>.` or `import <pkg>`,
         # treat parent as project root so files are named `<pkg>/...`.
+        # The walk is shared with the pre-flight checks; file heads are searched before whole files.
         import_pat_1 = f"from {pkg_name}."
         import_pat_2 = f"import {pkg_name}"
-        found = False
         try:
-            for py in focus_path.rglob("*.py"):
-                txt = py.read_text(encoding="utf-8", errors="ignore")
-                if import_pat_1 in txt or import_pat_2 in txt:
-                    found = True
-                    break
+            found = source_inventory(focus_path).first_containing(".py", [import_pat_1, import_pat_2]) is not None
         except Exception:
             found = False
 
@@ -3009,6 +3696,27 @@ def main() -> int:
 
     project_root, focus_prefix = detect_project_root_and_focus_prefix()
     check_input_inside_project_root(focus_path, project_root)
+
+    analysis_cache: Optional[AnalysisCache] = None
+    source_fp: Optional[str] = None
+    tool_fp: Optional[str] = None
+    if args.analysis_cache_dir is not None:
+        analysis_cache = AnalysisCache(
+            _resolve_path_arg(args.analysis_cache_dir, prefer_agent_root=False, must_exist=False, kind="Analysis cache"),
+            max_bytes=max(0, int(args.analysis_cache_max_mb)) * 1024 * 1024,
+        )
+        source_fp = source_fingerprint(project_root, langs)
+        tool_fp = tool_fingerprint(
+            neodepends_bin,
+            [
+                *Path(__file__).resolve().parent.glob("*.py"),
+                enhance_script,
+                override_script,
+                java_enhance_script,
+                filter_fp_script,
+                shadow_script,
+            ],
+        )
     include_root_py = focus_prefix is not None
     dv8_hierarchy = str(args.dv8_hierarchy)
     if dv8_hierarchy == "professor":
@@ -3025,6 +3733,74 @@ def main() -> int:
         file_level_include_external = False
         per_file_clustering = False
 
+    compact_json = bool(getattr(args, "compact_json", False))
+    jobs = max(1, int(getattr(args, "jobs", 1) or 1))
+
+    def _snapshot_job(
+        snap_db: Path,
+        snap_out_dir: Path,
+        *,
+        file_level_path: Path,
+        full_path: Path,
+        align: bool,
+        collapse: bool,
+        final: bool = False,
+    ) -> Dict[str, Any]:
+        """Keyword arguments for export_dv8_snapshot() for one DB snapshot."""
+        file_level_kwargs: Optional[Dict[str, Any]] = None
+        if file_level_dv8:
+            file_level_kwargs = dict(
+                out_dir=snap_out_dir,
+                output_path=file_level_path,
+                focus_prefix=focus_prefix,
+                include_root_py=include_root_py,
+                include_external_target_files=file_level_include_external,
+                include_self_edges=bool(args.file_level_include_self_edges),
+                align_handcount=align,
+                dv8_hierarchy=dv8_hierarchy,
+                collapse_weights=collapse,
+                exclude_lazy_imports=bool(args.exclude_lazy_imports),
+                import_scoped=not bool(args.no_import_scoped),
+                compact_json=compact_json,
+            )
+            if final:
+                file_level_kwargs["include_transitive_use"] = bool(args.include_transitive_use)
+                file_level_kwargs["exclude_transitive_use"] = bool(args.exclude_transitive_use)
+        full_kwargs: Optional[Dict[str, Any]] = None
+        if full_dv8:
+            full_kwargs = dict(
+                out_dir=snap_out_dir,
+                output_path=full_path,
+                focus_prefix=focus_prefix,
+                include_root_py=include_root_py,
+                include_external_targets=include_external,
+                include_external_target_files=file_level_include_external,
+                include_self_edges=bool(args.file_level_include_self_edges),
+                align_handcount=align,
+                dv8_hierarchy=dv8_hierarchy,
+                collapse_weights=collapse,
+                compact_json=compact_json,
+            )
+        return dict(
+            db_path=snap_db,
+            per_file=dict(
+                out_dir=snap_out_dir,
+                include_external_targets=include_external,
+                include_incoming_edges=include_incoming,
+                only_py=args.only_py,
+                focus_prefix=focus_prefix,
+                include_root_py=include_root_py,
+                write_clustering=per_file_clustering,
+                align_handcount=align,
+                dv8_hierarchy=dv8_hierarchy,
+                collapse_weights=collapse,
+                jobs=jobs,
+                compact_json=compact_json,
+            ),
+            file_level=file_level_kwargs,
+            full=full_kwargs,
+        )
+
     def run_one(*, resolver: str, out_dir: Path, stackgraphs_python_mode_override: Optional[str] = None) -> Dict[str, Any]:
         out_dir.mkdir(parents=True, exist_ok=True)
         data_dir = out_dir / "data"
@@ -3043,6 +3819,9 @@ def main() -> int:
         else:
             logger = _Logger(terminal_path)
         ulog = _UserLogger()
+        session: Optional[_InProcessSession] = None
+        snapshot_pool: Optional[ProcessPoolExecutor] = None
+        snapshot_futures: List[Tuple[str, Future]] = []
         try:
             logger.line(f"timestamp: {_dt.datetime.now().isoformat()}")
             logger.line(f"resolver: {resolver}")
@@ -3071,8 +3850,98 @@ def main() -> int:
             filtered_raw_db_path = data_dir / f"dependencies.{option_tag}.raw_filtered.db"
             raw_full_dep_out_path = data_dir / f"dependencies.{option_tag}.raw.dv8-dsm-v3.json"
             raw_filtered_full_dep_out_path = data_dir / f"dependencies.{option_tag}.raw_filtered.dv8-dsm-v3.json"
+            if bool(getattr(args, "gzip_json", False)):
+                # --gzip-json: the full-project matrices are the large ones; write them as .json.gz.
+                full_dep_out_path = full_dep_out_path.with_name(full_dep_out_path.name + ".gz")
+                raw_full_dep_out_path = raw_full_dep_out_path.with_name(raw_full_dep_out_path.name + ".gz")
+                raw_filtered_full_dep_out_path = raw_filtered_full_dep_out_path.with_name(
+                    raw_filtered_full_dep_out_path.name + ".gz"
+                )
             raw_file_level_out_path = data_dir / f"dependencies.{option_tag}.raw_file.dv8-dsm-v3.json"
             raw_filtered_file_level_out_path = data_dir / f"dependencies.{option_tag}.raw_filtered_file.dv8-dsm-v3.json"
+            enhance_profile_path = data_dir / f"dependencies.{option_tag}.enhance_profile.json"
+
+            # Per-stage wall/CPU time, peak RSS and deps row counts for run_summary.json;
+            # cProfile dumps too when --profile-dir is set.
+            stages = StageProfiler(prefix=f"{option_tag}_")
+
+            # --analysis-cache-dir: every DB stage is keyed off the one before it, and every
+            # DV8 snapshot off the DB it is exported from (see analysis_cache.py).
+            cache = analysis_cache
+            cache_hits: List[str] = []
+            raw_key: Optional[str] = None
+            if cache is not None:
+                raw_key = stage_key(
+                    "neodepends",
+                    source_fp,
+                    tool_fp,
+                    resolver,
+                    stackgraphs_mode,
+                    langs,
+                    args.depends_jar,
+                    args.depends_java,
+                    args.depends_xmx,
+                )
+            base_key = raw_key
+
+            # --in-process: run post-processing scripts as imported modules sharing one
+            # DB connection instead of one interpreter + connection per stage.
+            if bool(getattr(args, "in_process", False)):
+                session = _InProcessSession(db_path, logger=logger)
+
+            # --parallel-snapshots: export the raw / raw_filtered snapshots in worker
+            # processes while the pipeline carries on with the next stage.
+            if bool(getattr(args, "parallel_snapshots", False)):
+                snapshot_pool = ProcessPoolExecutor(max_workers=2)
+
+            def _export_snapshot_in_background(job: Dict[str, Any], db_key: Optional[str], label: str) -> None:
+                """
+                Export a DB snapshot as stage *label*. With --parallel-snapshots the export runs in
+                a worker that profiles it; its record is added when it is collected below.
+                """
+                if snapshot_pool is not None:
+                    snapshot_futures.append(
+                        (label, snapshot_pool.submit(_profiled_snapshot_export, cache, db_key, job, label, stages.prefix))
+                    )
+                    return
+                with stages.stage(label, db_in=job["db_path"]):
+                    if export_dv8_snapshot_cached(cache, db_key, job, logger):
+                        cache_hits.append(label)
+
+            def _restore_cached(key: Optional[str], outputs: Dict[str, Path], label: str) -> bool:
+                if cache is None or key is None or not cache.restore(key, outputs):
+                    return False
+                cache_hits.append(label)
+                logger.line(f"[CACHE] {label}: restored from {cache.root} ({key[:12]})")
+                ulog.info("Restored from analysis cache")
+                return True
+
+            def _store_cached(key: Optional[str], outputs: Dict[str, Path]) -> None:
+                if cache is not None and key is not None:
+                    cache.store(key, outputs)
+
+            enhanced_outputs: Dict[str, Path] = {"db": db_path}
+            if bool(getattr(args, "resolve_shadow_imports", False)):
+                enhanced_outputs["shadow_report"] = data_dir / "shadow_report.json"
+
+            def _enhanced_key(db_key: Optional[str]) -> Optional[str]:
+                """Key of the post-processed DB (enhancement, overrides, Java enhancement, shadow imports)."""
+                # --incremental-enhance tracks the DB it last enhanced in its manifest; never bypass it.
+                if db_key is None or bool(getattr(args, "incremental_enhance", False)):
+                    return None
+                return stage_key(
+                    "enhanced",
+                    db_key,
+                    dict(
+                        python="python" in langs,
+                        no_enhance=bool(args.no_enhance),
+                        include_transitive_inheritance=bool(getattr(args, "include_transitive_inheritance", False)),
+                        type_annotated_params=bool(getattr(args, "type_annotated_params", False)),
+                        no_override=bool(args.no_override),
+                        no_java_enhance=bool(args.no_java_enhance),
+                        resolve_shadow_imports=bool(getattr(args, "resolve_shadow_imports", False)),
+                    ),
+                )
 
             # Intermediate directories (move to details/ subdirectory)
             raw_out_dir = data_dir / "raw"
@@ -3083,78 +3952,55 @@ def main() -> int:
 
             ulog.step(f"Scanning source files and extracting dependencies ({resolver})")
             t1 = time.time()
-            try:
-                run_neodepends(
-                    neodepends_bin=neodepends_bin,
-                    input_dir=project_root,
-                    db_out=db_path,
-                    resolver=resolver,
-                    langs=langs,
-                    depends_jar=args.depends_jar,
-                    java_bin=args.depends_java,
-                    xmx=args.depends_xmx,
-                    stackgraphs_python_mode=stackgraphs_mode,
-                    logger=logger,
-                )
-            except subprocess.CalledProcessError as exc:
-                raise wrap_subprocess_error(exc, f"NeoDepends ({resolver})")
+            with stages.stage("neodepends", db_out=db_path):
+                if not _restore_cached(raw_key, {"db": db_path}, "neodepends"):
+                    try:
+                        run_neodepends(
+                            neodepends_bin=neodepends_bin,
+                            input_dir=project_root,
+                            db_out=db_path,
+                            resolver=resolver,
+                            langs=langs,
+                            depends_jar=args.depends_jar,
+                            java_bin=args.depends_java,
+                            xmx=args.depends_xmx,
+                            stackgraphs_python_mode=stackgraphs_mode,
+                            logger=logger,
+                        )
+                    except subprocess.CalledProcessError as exc:
+                        raise wrap_subprocess_error(exc, f"NeoDepends ({resolver})")
+                    _store_cached(raw_key, {"db": db_path})
             elapsed_neodepends = time.time() - t1
             ulog.info(f"Done in {elapsed_neodepends:.1f}s")
             check_db_created(db_path, project_root, resolver)
             check_db_non_empty(db_path, focus_prefix, project_root)
+            # Every later stage works on copies of this DB, so they all inherit the indexes.
+            with stages.stage("db_indexes", db_in=db_path, db_out=db_path):
+                ensure_db_indexes(db_path)
 
             elapsed_enhance = 0.0
             raw_exported = False
             raw_filtered_exported = False
             used_filtered_db = False
             if "python" in langs:
-                shutil.copyfile(db_path, raw_db_path)
+                with stages.stage("snapshot_copy", db_in=db_path, db_out=raw_db_path):
+                    shutil.copyfile(db_path, raw_db_path)
 
                 ulog.step("Saving pre-enhancement snapshot")
                 # Export a raw snapshot before any enhancement mutates the DB.
                 t_raw = time.time()
-                export_dv8_per_file(
-                    db_path=raw_db_path,
-                    out_dir=raw_out_dir,
-                    include_external_targets=include_external,
-                    include_incoming_edges=include_incoming,
-                    only_py=args.only_py,
-                    focus_prefix=focus_prefix,
-                    include_root_py=include_root_py,
-                    write_clustering=per_file_clustering,
-                    align_handcount=align_handcount,
-                    dv8_hierarchy=dv8_hierarchy,
-                    collapse_weights=collapse_weights,
+                _export_snapshot_in_background(
+                    _snapshot_job(
+                        raw_db_path,
+                        raw_out_dir,
+                        file_level_path=raw_file_level_out_path,
+                        full_path=raw_full_dep_out_path,
+                        align=align_handcount,
+                        collapse=collapse_weights,
+                    ),
+                    raw_key,
+                    "raw_dv8_export",
                 )
-                if file_level_dv8:
-                    export_dv8_file_level(
-                        db_path=raw_db_path,
-                        out_dir=raw_out_dir,
-                        output_path=raw_file_level_out_path,
-                        focus_prefix=focus_prefix,
-                        include_root_py=include_root_py,
-                        include_external_target_files=file_level_include_external,
-                        include_self_edges=bool(args.file_level_include_self_edges),
-                        align_handcount=align_handcount,
-                        dv8_hierarchy=dv8_hierarchy,
-                        collapse_weights=collapse_weights,
-                        exclude_lazy_imports=bool(args.exclude_lazy_imports),
-                        import_scoped=not bool(args.no_import_scoped),
-                    )
-                if full_dv8:
-                    export_dv8_full_project(
-                        db_path=raw_db_path,
-                        out_dir=raw_out_dir,
-                        output_path=raw_full_dep_out_path,
-                        focus_prefix=focus_prefix,
-                        include_root_py=include_root_py,
-                        include_external_targets=include_external,
-                        include_external_target_files=file_level_include_external,
-                        include_self_edges=bool(args.file_level_include_self_edges),
-                        align_handcount=align_handcount,
-                        dv8_hierarchy=dv8_hierarchy,
-                        collapse_weights=collapse_weights,
-                    )
                 elapsed_raw_export = time.time() - t_raw
                 raw_exported = True
 
@@ -3169,253 +4015,204 @@ def main() -> int:
                     if filtered_raw_db_path.exists():
                         filtered_raw_db_path.unlink()
 
-                    try:
-                        run_stackgraphs_false_positive_filter(
-                            filter_script=filter_fp_script,
-                            input_db=raw_db_path,
-                            output_db=filtered_raw_db_path,
-                            logger=logger,
-                        )
-                    except subprocess.CalledProcessError as exc:
-                        raise wrap_subprocess_error(exc, "StackGraphs false-positive filter", filter_fp_script)
+                    filtered_key = stage_key("fp_filter", raw_key) if raw_key is not None else None
+                    with stages.stage("fp_filter", db_in=raw_db_path, db_out=filtered_raw_db_path):
+                        if not _restore_cached(filtered_key, {"db": filtered_raw_db_path}, "fp_filter"):
+                            try:
+                                run_stackgraphs_false_positive_filter(
+                                    filter_script=filter_fp_script,
+                                    input_db=raw_db_path,
+                                    output_db=filtered_raw_db_path,
+                                    logger=logger,
+                                    session=session,
+                                )
+                            except subprocess.CalledProcessError as exc:
+                                raise wrap_subprocess_error(exc, "StackGraphs false-positive filter", filter_fp_script)
+                            _store_cached(filtered_key, {"db": filtered_raw_db_path})
                     check_filtered_db_valid(filtered_raw_db_path, db_path)
 
                     # Export filtered-raw DV8 snapshots for debugging.
-                    export_dv8_per_file(
-                        db_path=filtered_raw_db_path,
-                        out_dir=raw_filtered_out_dir,
-                        include_external_targets=include_external,
-                        include_incoming_edges=include_incoming,
-                        only_py=args.only_py,
-                        focus_prefix=focus_prefix,
-                        include_root_py=include_root_py,
-                        write_clustering=per_file_clustering,
-                        align_handcount=align_handcount,
-                        dv8_hierarchy=dv8_hierarchy,
-                        collapse_weights=collapse_weights,
+                    _export_snapshot_in_background(
+                        _snapshot_job(
+                            filtered_raw_db_path,
+                            raw_filtered_out_dir,
+                            file_level_path=raw_filtered_file_level_out_path,
+                            full_path=raw_filtered_full_dep_out_path,
+                            align=align_handcount,
+                            collapse=collapse_weights,
+                        ),
+                        filtered_key,
+                        "raw_filtered_dv8_export",
                     )
-                    if file_level_dv8:
-                        export_dv8_file_level(
-                            db_path=filtered_raw_db_path,
-                            out_dir=raw_filtered_out_dir,
-                            output_path=raw_filtered_file_level_out_path,
-                            focus_prefix=focus_prefix,
-                            include_root_py=include_root_py,
-                            include_external_target_files=file_level_include_external,
-                            include_self_edges=bool(args.file_level_include_self_edges),
-                            align_handcount=align_handcount,
-                            dv8_hierarchy=dv8_hierarchy,
-                            collapse_weights=collapse_weights,
-                            exclude_lazy_imports=bool(args.exclude_lazy_imports),
-                            import_scoped=not bool(args.no_import_scoped),
-                        )
-                    if full_dv8:
-                        export_dv8_full_project(
-                            db_path=filtered_raw_db_path,
-                            out_dir=raw_filtered_out_dir,
-                            output_path=raw_filtered_full_dep_out_path,
-                            focus_prefix=focus_prefix,
-                            include_root_py=include_root_py,
-                            include_external_targets=include_external,
-                            include_external_target_files=file_level_include_external,
-                            include_self_edges=bool(args.file_level_include_self_edges),
-                            align_handcount=align_handcount,
-                            dv8_hierarchy=dv8_hierarchy,
-                            collapse_weights=collapse_weights,
-                        )
                     raw_filtered_exported = True
 
                     # Use the filtered raw DB as the base for enhancement + final DV8 exports.
-                    shutil.copyfile(filtered_raw_db_path, db_path)
+                    with stages.stage("filtered_snapshot_copy", db_in=filtered_raw_db_path, db_out=db_path):
+                        shutil.copyfile(filtered_raw_db_path, db_path)
                     used_filtered_db = True
+                    base_key = filtered_key
 
+                enhanced_key = _enhanced_key(base_key)
+                with stages.stage("enhanced_cache_restore", db_out=db_path):
+                    enhanced_hit = _restore_cached(enhanced_key, enhanced_outputs, "enhance")
                 if args.no_enhance:
                     warn_no_enhance(ulog)
-                if not args.no_enhance:
+                if not args.no_enhance and not enhanced_hit:
                     if not enhance_script.exists():
                         raise FileNotFoundError(f"enhance script not found: {enhance_script}")
                     ulog.step("Enhancing Python dependencies (field references, constructors)")
                     t2 = time.time()
-                    try:
-                        run_python_enhancement(
-                            enhance_script=enhance_script,
-                            db_path=db_path,
-                            profile=resolver,
-                            logger=logger,
-                            include_transitive_inheritance=bool(getattr(args, "include_transitive_inheritance", False)),
-                            type_annotated_params=bool(getattr(args, "type_annotated_params", False)),
-                        )
-                    except subprocess.CalledProcessError as exc:
-                        raise wrap_subprocess_error(exc, "Python enhancement", enhance_script)
+                    with stages.stage("enhance", db_in=db_path, db_out=db_path) as enhance_stage:
+                        try:
+                            run_python_enhancement(
+                                enhance_script=enhance_script,
+                                db_path=db_path,
+                                profile=resolver,
+                                logger=logger,
+                                session=session,
+                                include_transitive_inheritance=bool(getattr(args, "include_transitive_inheritance", False)),
+                                type_annotated_params=bool(getattr(args, "type_annotated_params", False)),
+                                incremental_manifest=(
+                                    data_dir / f"dependencies.{option_tag}.enhance_manifest.db"
+                                    if bool(getattr(args, "incremental_enhance", False))
+                                    else None
+                                ),
+                                stage_profile=enhance_profile_path,
+                                jobs=jobs,
+                            )
+                        except subprocess.CalledProcessError as exc:
+                            raise wrap_subprocess_error(exc, "Python enhancement", enhance_script)
+                    enhance_stage.substages = read_stage_profile(enhance_profile_path)
+                    enhance_profile_path.unlink(missing_ok=True)
                     elapsed_enhance = time.time() - t2
                     ulog.info(f"Done in {elapsed_enhance:.1f}s")
             else:
                 # Java: save raw depends snapshot before any enhancement (mirrors Python raw snapshot).
-                shutil.copyfile(db_path, raw_db_path)
+                with stages.stage("snapshot_copy", db_in=db_path, db_out=raw_db_path):
+                    shutil.copyfile(db_path, raw_db_path)
                 ulog.step("Saving pre-enhancement Java snapshot (raw depends output)")
                 t_raw = time.time()
-                export_dv8_per_file(
-                    db_path=raw_db_path,
-                    out_dir=raw_out_dir,
-                    include_external_targets=include_external,
-                    include_incoming_edges=include_incoming,
-                    only_py=args.only_py,
-                    focus_prefix=focus_prefix,
-                    include_root_py=include_root_py,
-                    write_clustering=per_file_clustering,
-                    align_handcount=False,   # raw: no shape/kind filtering
-                    dv8_hierarchy=dv8_hierarchy,
-                    collapse_weights=False,  # raw: keep actual counts
+                _export_snapshot_in_background(
+                    _snapshot_job(
+                        raw_db_path,
+                        raw_out_dir,
+                        file_level_path=raw_file_level_out_path,
+                        full_path=raw_full_dep_out_path,
+                        align=False,     # raw: no shape/kind filtering
+                        collapse=False,  # raw: keep actual counts
+                    ),
+                    raw_key,
+                    "raw_dv8_export",
                 )
-                if file_level_dv8:
-                    export_dv8_file_level(
-                        db_path=raw_db_path,
-                        out_dir=raw_out_dir,
-                        output_path=raw_file_level_out_path,
-                        focus_prefix=focus_prefix,
-                        include_root_py=include_root_py,
-                        include_external_target_files=file_level_include_external,
-                        include_self_edges=bool(args.file_level_include_self_edges),
-                        align_handcount=False,
-                        dv8_hierarchy=dv8_hierarchy,
-                        collapse_weights=False,
-                        exclude_lazy_imports=bool(args.exclude_lazy_imports),
-                        import_scoped=not bool(args.no_import_scoped),
-                    )
-                if full_dv8:
-                    export_dv8_full_project(
-                        db_path=raw_db_path,
-                        out_dir=raw_out_dir,
-                        output_path=raw_full_dep_out_path,
-                        focus_prefix=focus_prefix,
-                        include_root_py=include_root_py,
-                        include_external_targets=include_external,
-                        include_external_target_files=file_level_include_external,
-                        include_self_edges=bool(args.file_level_include_self_edges),
-                        align_handcount=False,
-                        dv8_hierarchy=dv8_hierarchy,
-                        collapse_weights=False,
-                    )
                 elapsed_raw_export = time.time() - t_raw
                 raw_exported = True
 
+                enhanced_key = _enhanced_key(base_key)
+                with stages.stage("enhanced_cache_restore", db_out=db_path):
+                    enhanced_hit = _restore_cached(enhanced_key, enhanced_outputs, "enhance")
+
                 # Java override detection: detect @Override annotations and insert Override edges.
-                if not args.no_override and override_script.exists():
+                if not args.no_override and override_script.exists() and not enhanced_hit:
                     logger.line(f"\n[OVERRIDE] Running Java override detection: {override_script}")
                     ulog.step("Detecting Java @Override annotations")
-                    try:
-                        run_override_detection(
-                            override_script=override_script,
-                            db_path=db_path,
-                            source_root=project_root,
-                            logger=logger,
-                        )
-                    except subprocess.CalledProcessError as exc:
-                        raise wrap_subprocess_error(exc, "Java override detection", override_script)
-                if not args.no_java_enhance and java_enhance_script.exists():
+                    with stages.stage("override_detection", db_in=db_path, db_out=db_path):
+                        try:
+                            run_override_detection(
+                                override_script=override_script,
+                                db_path=db_path,
+                                source_root=project_root,
+                                logger=logger,
+                                session=session,
+                            )
+                        except subprocess.CalledProcessError as exc:
+                            raise wrap_subprocess_error(exc, "Java override detection", override_script)
+                if not args.no_java_enhance and java_enhance_script.exists() and not enhanced_hit:
                     logger.line(f"\n[JAVA] Running Java dependency enhancement: {java_enhance_script}")
                     ulog.step("Enhancing Java dependencies (constructor heuristics)")
-                    try:
-                        run_java_enhancement(
-                            enhance_script=java_enhance_script,
-                            db_path=db_path,
-                            source_root=project_root,
-                            logger=logger,
-                        )
-                    except subprocess.CalledProcessError as exc:
-                        raise wrap_subprocess_error(exc, "Java dependency enhancement", java_enhance_script)
+                    with stages.stage("java_enhance", db_in=db_path, db_out=db_path):
+                        try:
+                            run_java_enhancement(
+                                enhance_script=java_enhance_script,
+                                db_path=db_path,
+                                source_root=project_root,
+                                logger=logger,
+                                session=session,
+                            )
+                        except subprocess.CalledProcessError as exc:
+                            raise wrap_subprocess_error(exc, "Java dependency enhancement", java_enhance_script)
 
             check_db_integrity_after_enhancement(db_path)
 
             # Shadow-import resolution: remove phantom Import edges caused by
             # stdlib name collisions (e.g. project logging.py vs stdlib logging).
             # Runs after enhancement so it sees final Import/ImportLazy classification.
-            if bool(getattr(args, "resolve_shadow_imports", False)):
+            if bool(getattr(args, "resolve_shadow_imports", False)) and not enhanced_hit:
                 if shadow_script and shadow_script.exists():
                     ulog.step("Resolving stdlib-shadow imports")
                     shadow_report_path = data_dir / "shadow_report.json"
-                    try:
-                        _run_and_tee(
-                            [
-                                _get_python_executable(),
-                                str(shadow_script),
-                                str(db_path),
-                                str(project_root),
-                                "--report", str(shadow_report_path),
-                            ],
-                            logger=logger,
-                        )
-                    except subprocess.CalledProcessError as exc:
-                        raise wrap_subprocess_error(exc, "Shadow-import resolution", shadow_script)
+                    with stages.stage("shadow_imports", db_in=db_path, db_out=db_path):
+                        try:
+                            run_shadow_import_resolution(
+                                shadow_script=shadow_script,
+                                db_path=db_path,
+                                source_root=project_root,
+                                report_path=shadow_report_path,
+                                logger=logger,
+                                session=session,
+                            )
+                        except subprocess.CalledProcessError as exc:
+                            raise wrap_subprocess_error(exc, "Shadow-import resolution", shadow_script)
                 else:
                     ulog.info("Shadow-import resolution requested but resolve_shadow_imports.py not found — skipping")
 
+            if session is not None:
+                # Release the shared connection before the read-only (immutable) exports.
+                session.close()
+            if not enhanced_hit:
+                _store_cached(enhanced_key, enhanced_outputs)
+
             with _connect_ro(db_path) as _chk:
                 _entity_count = _chk.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
             if _entity_count == 0:
                 warn_empty_entities(ulog, project_root, focus_prefix)
             ulog.step("Building dependency matrices (DV8 export)")
             t3 = time.time()
-            export_dv8_per_file(
-                db_path=db_path,
-                out_dir=data_dir,
-                include_external_targets=include_external,
-                include_incoming_edges=include_incoming,
-                only_py=args.only_py,
-                focus_prefix=focus_prefix,
-                include_root_py=include_root_py,
-                write_clustering=per_file_clustering,
-                align_handcount=align_handcount,
-                dv8_hierarchy=dv8_hierarchy,
-                collapse_weights=collapse_weights,
-            )
+            with stages.stage("dv8_export", db_in=db_path):
+                final_job = _snapshot_job(
+                    db_path,
+                    data_dir,
+                    file_level_path=file_level_out_path,
+                    full_path=full_dep_out_path,
+                    align=align_handcount,
+                    collapse=collapse_weights,
+                    final=True,
+                )
+                if export_dv8_snapshot_cached(cache, enhanced_key, final_job, logger):
+                    cache_hits.append("dv8_export")
+            with stages.stage("snapshot_export_wait"):
+                for label, future in snapshot_futures:
+                    hit, records = future.result()
+                    if hit:
+                        cache_hits.append(label)
+                    stages.adopt(records)
             elapsed_dv8 = time.time() - t3
             ulog.info(f"Done in {elapsed_dv8:.1f}s")
 
-            if file_level_dv8:
-                export_dv8_file_level(
-                    db_path=db_path,
-                    out_dir=data_dir,
-                    output_path=file_level_out_path,
-                    focus_prefix=focus_prefix,
-                    include_root_py=include_root_py,
-                    include_external_target_files=file_level_include_external,
-                    include_self_edges=bool(args.file_level_include_self_edges),
-                    align_handcount=align_handcount,
-                    dv8_hierarchy=dv8_hierarchy,
-                    collapse_weights=collapse_weights,
-                    exclude_lazy_imports=bool(args.exclude_lazy_imports),
-                    import_scoped=not bool(args.no_import_scoped),
-                    include_transitive_use=bool(args.include_transitive_use),
-                    exclude_transitive_use=bool(args.exclude_transitive_use),
-                )
-            if full_dv8:
-                export_dv8_full_project(
-                    db_path=db_path,
-                    out_dir=data_dir,
-                    output_path=full_dep_out_path,
-                    focus_prefix=focus_prefix,
-                    include_root_py=include_root_py,
-                    include_external_targets=include_external,
-                    include_external_target_files=file_level_include_external,
-                    include_self_edges=bool(args.file_level_include_self_edges),
-                    align_handcount=align_handcount,
-                    dv8_hierarchy=dv8_hierarchy,
-                    collapse_weights=collapse_weights,
-                )
-
             elapsed_per_file = 0.0
             if per_file:
                 ulog.step("Exporting per-file dependency databases")
                 t4 = time.time()
-                export_per_file_dbs(
-                    db_path=db_path,
-                    out_dir=data_dir,
-                    include_incoming_edges=include_incoming,
-                    only_py=args.only_py,
-                    focus_prefix=focus_prefix,
-                    include_root_py=include_root_py,
-                )
+                with stages.stage("per_file_db_export", db_in=db_path):
+                    export_per_file_dbs(
+                        db_path=db_path,
+                        out_dir=data_dir,
+                        include_incoming_edges=include_incoming,
+                        only_py=args.only_py,
+                        focus_prefix=focus_prefix,
+                        include_root_py=include_root_py,
+                        jobs=jobs,
+                        logger=logger,
+                    )
                 elapsed_per_file = time.time() - t4
 
             summary = {
@@ -3462,6 +4259,8 @@ def main() -> int:
                     "dv8_export": elapsed_dv8,
                     "per_file_db_export": elapsed_per_file,
                 },
+                "stage_profile": stages.to_json(),
+                "analysis_cache": {"dir": str(cache.root), "hits": cache_hits} if cache is not None else None,
                 "db_summary": safe_summarize_db(db_path),
                 "dv8_summary": safe_summarize_dv8_dir(data_dir / "dv8_deps"),
                 "raw_db_summary": safe_summarize_db(raw_db_path) if raw_db_path.exists() else None,
@@ -3471,7 +4270,6 @@ def main() -> int:
                 if raw_filtered_exported
                 else None,
             }
-            (data_dir / "run_summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
 
             # Log full file listing to dev log only
             logger.line("")
@@ -3528,60 +4326,63 @@ def main() -> int:
             # --- Visualization (--viz / --no-viz, --viz-level) ---
             viz_level = getattr(args, "viz_level", "file")
             if getattr(args, "viz", False):
-                try:
-                    viz_script = Path(__file__).resolve().parent / "make_visualizations.py"
-                    if viz_script.exists():
-                        import importlib.util as _ilu
-                        _spec = _ilu.spec_from_file_location("make_visualizations", str(viz_script))
-                        _viz_mod = _ilu.module_from_spec(_spec)
-                        _spec.loader.exec_module(_viz_mod)
-                        viz_title = Path(str(focus_path)).name
-                        viz_outputs = []
-
-                        # File-level viz
-                        if viz_level in ("file", "both"):
-                            _viz_file = None
-                            if file_level_dv8 and file_level_out_path.exists():
-                                _viz_file = file_level_out_path
-                            elif full_dv8 and full_dep_out_path.exists():
-                                _viz_file = full_dep_out_path
-                            if _viz_file:
-                                viz_vars, viz_cells = _viz_mod.load_dep_json(_viz_file)
-                                dsm_out = out_dir / "dsm_view.html"
-                                graph_out = out_dir / "graph_view.html"
-                                _viz_mod.generate_dsm_html(viz_vars, viz_cells, dsm_out,
-                                                           title=f"DSM: {viz_title}")
-                                _viz_mod.generate_graph_html(viz_vars, viz_cells, graph_out,
-                                                             title=f"Graph: {viz_title}")
-                                viz_outputs.extend([dsm_out, graph_out])
-
-                        # Entity-level viz
-                        if viz_level in ("entity", "both"):
-                            _viz_ent = None
-                            if full_dv8 and full_dep_out_path.exists():
-                                _viz_ent = full_dep_out_path
-                            if _viz_ent:
-                                viz_vars, viz_cells = _viz_mod.load_dep_json(_viz_ent)
-                                suffix = "_entity" if viz_level == "both" else ""
-                                dsm_out = out_dir / f"dsm_view{suffix}.html"
-                                graph_out = out_dir / f"graph_view{suffix}.html"
-                                _viz_mod.generate_dsm_html(viz_vars, viz_cells, dsm_out,
-                                                           title=f"DSM (entity): {viz_title}",
-                                                           is_entity_level=True)
-                                _viz_mod.generate_graph_html(viz_vars, viz_cells, graph_out,
-                                                             title=f"Graph (entity): {viz_title}",
-                                                             is_entity_level=True)
-                                viz_outputs.extend([dsm_out, graph_out])
-
-                        if viz_outputs:
-                            sys.stdout.write(f"  Visualizations: {viz_outputs[0]}\n")
-                            for vp in viz_outputs[1:]:
-                                sys.stdout.write(f"                  {vp}\n")
-                            sys.stdout.write("\n")
-                            sys.stdout.flush()
-                except Exception as viz_err:
-                    sys.stderr.write(f"[WARN] Visualization generation failed (non-fatal): {viz_err}\n")
-                    sys.stderr.flush()
+                with stages.stage("viz"):
+                    try:
+                        viz_script = Path(__file__).resolve().parent / "make_visualizations.py"
+                        if viz_script.exists():
+                            import importlib.util as _ilu
+                            _spec = _ilu.spec_from_file_location("make_visualizations", str(viz_script))
+                            _viz_mod = _ilu.module_from_spec(_spec)
+                            _spec.loader.exec_module(_viz_mod)
+                            viz_title = Path(str(focus_path)).name
+                            viz_outputs = []
+
+                            # File-level viz
+                            if viz_level in ("file", "both"):
+                                _viz_file = None
+                                if file_level_dv8 and file_level_out_path.exists():
+                                    _viz_file = file_level_out_path
+                                elif full_dv8 and full_dep_out_path.exists():
+                                    _viz_file = full_dep_out_path
+                                if _viz_file:
+                                    viz_matrix = _viz_mod.load_dep_matrix(_viz_file)
+                                    viz_vars = viz_matrix.variables
+                                    dsm_out = out_dir / "dsm_view.html"
+                                    graph_out = out_dir / "graph_view.html"
+                                    _viz_mod.generate_dsm_html(viz_vars, viz_matrix, dsm_out,
+                                                               title=f"DSM: {viz_title}")
+                                    _viz_mod.generate_graph_html(viz_vars, viz_matrix, graph_out,
+                                                                 title=f"Graph: {viz_title}")
+                                    viz_outputs.extend([dsm_out, graph_out])
+
+                            # Entity-level viz
+                            if viz_level in ("entity", "both"):
+                                _viz_ent = None
+                                if full_dv8 and full_dep_out_path.exists():
+                                    _viz_ent = full_dep_out_path
+                                if _viz_ent:
+                                    viz_matrix = _viz_mod.load_dep_matrix(_viz_ent)
+                                    viz_vars = viz_matrix.variables
+                                    suffix = "_entity" if viz_level == "both" else ""
+                                    dsm_out = out_dir / f"dsm_view{suffix}.html"
+                                    graph_out = out_dir / f"graph_view{suffix}.html"
+                                    _viz_mod.generate_dsm_html(viz_vars, viz_matrix, dsm_out,
+                                                               title=f"DSM (entity): {viz_title}",
+                                                               is_entity_level=True)
+                                    _viz_mod.generate_graph_html(viz_vars, viz_matrix, graph_out,
+                                                                 title=f"Graph (entity): {viz_title}",
+                                                                 is_entity_level=True)
+                                    viz_outputs.extend([dsm_out, graph_out])
+
+                            if viz_outputs:
+                                sys.stdout.write(f"  Visualizations: {viz_outputs[0]}\n")
+                                for vp in viz_outputs[1:]:
+                                    sys.stdout.write(f"                  {vp}\n")
+                                sys.stdout.write("\n")
+                                sys.stdout.flush()
+                    except Exception as viz_err:
+                        sys.stderr.write(f"[WARN] Visualization generation failed (non-fatal): {viz_err}\n")
+                        sys.stderr.flush()
 
             # --- Dynamism / extraction-confidence score ---
             _dyn_dep_path = None
@@ -3590,29 +4391,270 @@ def main() -> int:
             elif full_dv8 and full_dep_out_path.exists():
                 _dyn_dep_path = full_dep_out_path
             if getattr(args, "dynamism", True) and _dyn_dep_path:
+                with stages.stage("dynamism"):
+                    try:
+                        _dyn_script = Path(__file__).resolve().parent / "dynamism_score.py"
+                        if _dyn_script.exists():
+                            import importlib.util as _ilu2
+                            _dyn_spec = _ilu2.spec_from_file_location("dynamism_score", str(_dyn_script))
+                            _dyn_mod = _ilu2.module_from_spec(_dyn_spec)
+                            _dyn_spec.loader.exec_module(_dyn_mod)
+                            _dyn_edges = _dyn_mod.load_edges_from_dv8_dep(_dyn_dep_path)
+                            _dyn_result = _dyn_mod.compute_dynamism_score(_dyn_edges)
+                            _dyn_out = out_dir / "dynamism_report.json"
+                            _dyn_out.write_text(json.dumps(_dyn_result, indent=2), encoding="utf-8")
+                            sys.stdout.write(f"  {_dyn_result['verdict_line']}\n")
+                            sys.stdout.write(f"  CAVEAT: {_dyn_result['caveat']}\n")
+                            sys.stdout.write(f"  Dynamism report: {_dyn_out}\n\n")
+                            sys.stdout.flush()
+                    except Exception as dyn_err:
+                        sys.stderr.write(f"[WARN] Dynamism score generation failed (non-fatal): {dyn_err}\n")
+                        sys.stderr.flush()
+
+            # Written once every stage, including viz and dynamism, has finished.
+            summary["stage_profile"] = stages.to_json()
+            (data_dir / "run_summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+            return summary
+        finally:
+            if snapshot_pool is not None:
+                snapshot_pool.shutdown(wait=True, cancel_futures=True)
+            if session is not None:
+                session.close()
+            logger.close()
+
+    def run_batch(*, resolver: str, out_dir: Path, commits: List[str]) -> Dict[str, Any]:
+        """
+        --commits: one NeoDepends run over every commit, then per-commit post-processing
+        and DV8 export (oldest first, incremental enhancement between neighbours).
+        """
+        data_dir = out_dir / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        terminal_path = args.terminal_output
+        if terminal_path is None:
+            terminal_path = data_dir / "dev_log" / "dev_log.txt"
+        terminal_path = _resolve_path_arg(
+            terminal_path, prefer_agent_root=True, must_exist=False, kind="Terminal output"
+        )
+        logger: Any = _StdoutLogger() if args.no_terminal_output else _Logger(terminal_path)
+        ulog = _UserLogger()
+        try:
+            logger.line(f"timestamp: {_dt.datetime.now().isoformat()}")
+            logger.line(f"resolver: {resolver}")
+            logger.line(f"project_root: {project_root}")
+            logger.line(f"commits: {len(commits)} ({commits[0][:12]} .. {commits[-1][:12]})")
+            logger.line(f"output: {out_dir}")
+            logger.line("")
+
+            sys.stdout.write(f"\nAnalyzing: {focus_path} at {len(commits)} commit(s)\n")
+            sys.stdout.write(f"Output:    {out_dir}\n")
+            sys.stdout.write(f"Resolver:  {resolver}\n\n")
+            sys.stdout.flush()
+
+            stackgraphs_mode = args.stackgraphs_python_mode
+            option_tag = resolver if resolver == "depends" else f"stackgraphs_{_safe_tag(stackgraphs_mode)}"
+            batch_db_path = data_dir / f"dependencies.{option_tag}.commits.raw.db"
+            index_db_path = data_dir / f"dependencies.{option_tag}.commits.db"
+            manifest_path = data_dir / f"dependencies.{option_tag}.commits.enhance_manifest.db"
+            stages = StageProfiler(prefix=f"{option_tag}_")
+
+            _run_and_tee([str(neodepends_bin), "--version"], logger=logger)
+            ulog.step(f"Scanning {len(commits)} commit(s) and extracting dependencies ({resolver})")
+            t1 = time.time()
+            with stages.stage("neodepends", db_out=batch_db_path):
                 try:
-                    _dyn_script = Path(__file__).resolve().parent / "dynamism_score.py"
-                    if _dyn_script.exists():
-                        import importlib.util as _ilu2
-                        _dyn_spec = _ilu2.spec_from_file_location("dynamism_score", str(_dyn_script))
-                        _dyn_mod = _ilu2.module_from_spec(_dyn_spec)
-                        _dyn_spec.loader.exec_module(_dyn_mod)
-                        _dyn_edges = _dyn_mod.load_edges_from_dv8_dep(_dyn_dep_path)
-                        _dyn_result = _dyn_mod.compute_dynamism_score(_dyn_edges)
-                        _dyn_out = out_dir / "dynamism_report.json"
-                        _dyn_out.write_text(json.dumps(_dyn_result, indent=2), encoding="utf-8")
-                        sys.stdout.write(f"  {_dyn_result['verdict_line']}\n")
-                        sys.stdout.write(f"  CAVEAT: {_dyn_result['caveat']}\n")
-                        sys.stdout.write(f"  Dynamism report: {_dyn_out}\n\n")
-                        sys.stdout.flush()
-                except Exception as dyn_err:
-                    sys.stderr.write(f"[WARN] Dynamism score generation failed (non-fatal): {dyn_err}\n")
-                    sys.stderr.flush()
+                    run_neodepends(
+                        neodepends_bin=neodepends_bin,
+                        input_dir=project_root,
+                        db_out=batch_db_path,
+                        resolver=resolver,
+                        langs=langs,
+                        depends_jar=args.depends_jar,
+                        java_bin=args.depends_java,
+                        xmx=args.depends_xmx,
+                        stackgraphs_python_mode=stackgraphs_mode,
+                        logger=logger,
+                        commits=commits,
+                    )
+                except subprocess.CalledProcessError as exc:
+                    raise wrap_subprocess_error(exc, f"NeoDepends ({resolver})")
+            ulog.info(f"Done in {time.time() - t1:.1f}s")
+            check_db_created(batch_db_path, project_root, resolver)
+            check_db_non_empty(batch_db_path, focus_prefix, project_root)
+
+            # The manifest describes the previous commit of *this* batch only.
+            manifest_path.unlink(missing_ok=True)
+            slicer = CommitSlicer(batch_db_path)
+            index = CommitIndexWriter(index_db_path, slicer.schema)
+            commit_summaries: List[Dict[str, Any]] = []
+            try:
+                for seq, (sha, tag) in enumerate(zip(commits, commit_tags(commits))):
+                    commit_dir = out_dir / "commits" / tag
+                    commit_dir.mkdir(parents=True, exist_ok=True)
+                    db_path = commit_dir / f"dependencies.{option_tag}.db"
+                    ulog.step(f"Commit {seq + 1}/{len(commits)}: {sha[:12]}")
+                    logger.line(f"\n[COMMIT] {seq}: {sha}")
+                    t_commit = time.time()
+                    with stages.stage(f"slice_{seq}", db_in=batch_db_path, db_out=db_path):
+                        n_entities, n_deps = slicer.write(sha, commit_files(project_root, sha), db_path)
+                    logger.line(f"  sliced {n_entities} entities, {n_deps} deps")
+
+                    session = _InProcessSession(db_path, logger=logger) if bool(getattr(args, "in_process", False)) else None
+                    try:
+                        if "python" in langs:
+                            if resolver == "stackgraphs" and bool(args.filter_stackgraphs_false_positives):
+                                sliced_db_path = commit_dir / f"dependencies.{option_tag}.raw.db"
+                                shutil.move(str(db_path), str(sliced_db_path))
+                                try:
+                                    run_stackgraphs_false_positive_filter(
+                                        filter_script=filter_fp_script,
+                                        input_db=sliced_db_path,
+                                        output_db=db_path,
+                                        logger=logger,
+                                        session=session,
+                                    )
+                                except subprocess.CalledProcessError as exc:
+                                    raise wrap_subprocess_error(exc, "StackGraphs false-positive filter", filter_fp_script)
+                                check_filtered_db_valid(db_path, sliced_db_path)
+                                sliced_db_path.unlink()
+                            if not args.no_enhance:
+                                with stages.stage(f"enhance_{seq}", db_in=db_path, db_out=db_path):
+                                    try:
+                                        run_python_enhancement(
+                                            enhance_script=enhance_script,
+                                            db_path=db_path,
+                                            profile=resolver,
+                                            logger=logger,
+                                            session=session,
+                                            include_transitive_inheritance=bool(
+                                                getattr(args, "include_transitive_inheritance", False)
+                                            ),
+                                            type_annotated_params=bool(getattr(args, "type_annotated_params", False)),
+                                            incremental_manifest=manifest_path,
+                                            jobs=jobs,
+                                        )
+                                    except subprocess.CalledProcessError as exc:
+                                        raise wrap_subprocess_error(exc, "Python enhancement", enhance_script)
+                        else:
+                            if not args.no_override and override_script.exists():
+                                try:
+                                    run_override_detection(
+                                        override_script=override_script,
+                                        db_path=db_path,
+                                        source_root=project_root,
+                                        logger=logger,
+                                        session=session,
+                                    )
+                                except subprocess.CalledProcessError as exc:
+                                    raise wrap_subprocess_error(exc, "Java override detection", override_script)
+                            if not args.no_java_enhance and java_enhance_script.exists():
+                                try:
+                                    run_java_enhancement(
+                                        enhance_script=java_enhance_script,
+                                        db_path=db_path,
+                                        source_root=project_root,
+                                        logger=logger,
+                                        session=session,
+                                    )
+                                except subprocess.CalledProcessError as exc:
+                                    raise wrap_subprocess_error(exc, "Java dependency enhancement", java_enhance_script)
+                        check_db_integrity_after_enhancement(db_path)
+                        if bool(getattr(args, "resolve_shadow_imports", False)) and shadow_script and shadow_script.exists():
+                            try:
+                                run_shadow_import_resolution(
+                                    shadow_script=shadow_script,
+                                    db_path=db_path,
+                                    source_root=project_root,
+                                    report_path=commit_dir / "shadow_report.json",
+                                    logger=logger,
+                                    session=session,
+                                )
+                            except subprocess.CalledProcessError as exc:
+                                raise wrap_subprocess_error(exc, "Shadow-import resolution", shadow_script)
+                    finally:
+                        if session is not None:
+                            session.close()
+
+                    file_level_path = commit_dir / f"dependencies.{option_tag}.file.dv8-dsm-v3.json"
+                    full_path = commit_dir / "analysis-result.json"
+                    if bool(getattr(args, "gzip_json", False)):
+                        full_path = full_path.with_name(full_path.name + ".gz")
+                    job = _snapshot_job(
+                        db_path,
+                        commit_dir,
+                        file_level_path=file_level_path,
+                        full_path=full_path,
+                        align=align_handcount,
+                        collapse=collapse_weights,
+                        final=True,
+                    )
+                    # One matrix pair per commit; per-file matrices stay a single-commit export.
+                    job["per_file"] = None
+                    with stages.stage(f"dv8_export_{seq}", db_in=db_path):
+                        export_dv8_snapshot(**job)
+                    index.add(seq, sha, db_path)
+                    commit_summaries.append(
+                        {
+                            "seq": seq,
+                            "sha": sha,
+                            "dir": str(commit_dir),
+                            "db_path": str(db_path),
+                            "file_level_dv8_path": str(file_level_path) if file_level_dv8 else None,
+                            "full_dv8_dependency_path": str(full_path) if full_dv8 else None,
+                            "sliced_entities": n_entities,
+                            "sliced_deps": n_deps,
+                            "seconds": time.time() - t_commit,
+                            "db_summary": safe_summarize_db(db_path),
+                        }
+                    )
+            finally:
+                index.close()
+                slicer.close()
 
+            summary = {
+                "resolver": resolver,
+                "option_tag": option_tag,
+                "input_dir": str(focus_path),
+                "project_root": str(project_root),
+                "focus_prefix": focus_prefix,
+                "output_dir": str(out_dir),
+                "batch_db_path": str(batch_db_path),
+                "commit_index_db_path": str(index_db_path),
+                "commits": commit_summaries,
+                "stage_profile": stages.to_json(),
+            }
+            (data_dir / "batch_summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+            ulog.close()
+            sys.stdout.write(f"\nDone: {len(commits)} commit(s) in {out_dir / 'commits'}\n")
+            sys.stdout.write(f"  Commit index: {index_db_path}\n\n")
+            sys.stdout.flush()
             return summary
         finally:
             logger.close()
 
+    if args.commits is not None:
+        dev_log_hint = output_root / "data" / "dev_log" / "dev_log.txt"
+        try:
+            if args.experiment_all or args.compare_resolvers:
+                raise PreflightError("--commits runs one resolver; it cannot be combined with --experiment-all or --compare-resolvers.")
+            if not (project_root / ".git").exists():
+                raise PreflightError(
+                    f"--commits needs a git checkout, but {project_root} has no .git.\n"
+                    "       Pass --project-root pointing at the repository root."
+                )
+            _ = run_batch(resolver=args.resolver, out_dir=output_root, commits=resolve_commits(project_root, args.commits))
+        except (PreflightError, ExecutionError, EnhancementError, ExportError) as exc:
+            return handle_pipeline_error(exc, dev_log_hint)
+        except subprocess.CalledProcessError as exc:
+            return handle_pipeline_error(
+                ExecutionError(
+                    f"Dependency analysis failed (exit code {exc.returncode}).\n"
+                    "       Check the dev log for the full output."
+                ),
+                dev_log_hint,
+            )
+        return 0
+
     if args.experiment_all:
         depends_dir = output_root / "depends"
         sg_ast_dir = output_root / "stackgraphs_ast"
@@ -17,6 +17,8 @@ Output:
 Notes:
   - This tool intentionally groups edges by the *source* file (based on src node name).
   - External nodes without a ".py" prefix are grouped under "__external__".
+  - compare_dv8_to_ground_truth.py --per-file-out-dir calls ``write_reports`` on its
+    partitioned diff directly, without the JSON round trip.
 """
 
 from __future__ import annotations
@@ -24,24 +26,12 @@ from __future__ import annotations
 import argparse
 import json
 import os
-import re
 from collections import Counter, defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import DefaultDict, Iterable, Iterator, List, Sequence, Tuple
+from typing import Iterable, List, Sequence, Tuple
 
-
-Edge = Tuple[str, str, str]
-
-
-_PY_FILE_RE = re.compile(r"^(.*?\.py)(?:/|\b|$)")
-
-
-def _file_key(node_name: str) -> str:
-    match = _PY_FILE_RE.match(node_name)
-    if match:
-        return match.group(1)
-    return "__external__"
+from edge_diff import EXTERNAL, Edge, EdgeDiff
 
 
 def _load_edges_list(path: Path) -> List[Edge]:
@@ -82,13 +72,6 @@ def _load_diff(path: Path) -> tuple[List[Edge], List[Edge]]:
     return parse_edges(missing, "missing"), parse_edges(extra, "extra")
 
 
-def _group_by_src_file(edges: Iterable[Edge]) -> DefaultDict[str, List[Edge]]:
-    grouped: DefaultDict[str, List[Edge]] = defaultdict(list)
-    for src, dest, kind in edges:
-        grouped[_file_key(src)].append((src, dest, kind))
-    return grouped
-
-
 def _count_by_kind(edges: Iterable[Edge]) -> Counter[str]:
     c: Counter[str] = Counter()
     for _, _, kind in edges:
@@ -105,14 +88,6 @@ class FileReport:
     extra: List[Edge]
 
 
-def _reconstruct_neodepends_edges(gt_edges: Iterable[Edge], missing: Iterable[Edge], extra: Iterable[Edge]) -> List[Edge]:
-    gt_set = set(gt_edges)
-    miss_set = set(missing)
-    extra_set = set(extra)
-    nd_set = (gt_set - miss_set) | extra_set
-    return sorted(nd_set)
-
-
 def _fmt_pct(n: int, denom: int) -> str:
     if denom <= 0:
         return "n/a"
@@ -200,8 +175,8 @@ def _write_file_report(path: Path, report: FileReport) -> None:
 
 
 def _relative_report_path(out_dir: Path, file_key: str) -> Path:
-    if file_key == "__external__":
-        return out_dir / "__external__.md"
+    if file_key == EXTERNAL:
+        return out_dir / f"{EXTERNAL}.md"
     parts = file_key.split("/")
     if len(parts) == 1:
         return out_dir / f"{parts[0]}.md"
@@ -209,64 +184,58 @@ def _relative_report_path(out_dir: Path, file_key: str) -> Path:
     return out_dir.joinpath(*dirs) / f"{filename}.md"
 
 
-def main(argv: Sequence[str] | None = None) -> int:
-    parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--ground-truth", required=True, type=Path, help="Path to ground truth edge list JSON")
-    parser.add_argument("--diff", required=True, type=Path, help="Path to diff JSON (missing/extra)")
-    parser.add_argument("--out-dir", required=True, type=Path, help="Directory to write per-file markdown reports")
-    args = parser.parse_args(argv)
-
-    gt_edges = _load_edges_list(args.ground_truth)
-    missing_edges, extra_edges = _load_diff(args.diff)
-
-    gt_by_file = _group_by_src_file(gt_edges)
-    missing_by_file = _group_by_src_file(missing_edges)
-    extra_by_file = _group_by_src_file(extra_edges)
-
-    all_files = set(gt_by_file) | set(missing_by_file) | set(extra_by_file)
-    reports: List[FileReport] = []
-
-    for file_key in sorted(all_files):
-        gt_file_edges = gt_by_file.get(file_key, [])
-        miss_file_edges = missing_by_file.get(file_key, [])
-        extra_file_edges = extra_by_file.get(file_key, [])
-        nd_file_edges = _reconstruct_neodepends_edges(gt_file_edges, miss_file_edges, extra_file_edges)
-        reports.append(
-            FileReport(
-                file_key=file_key,
-                gt_edges=gt_file_edges,
-                nd_edges=nd_file_edges,
-                missing=miss_file_edges,
-                extra=extra_file_edges,
-            )
+def write_reports(diff: EdgeDiff, out_dir: Path, sources: Sequence[Tuple[str, str]] = ()) -> None:
+    """Write one report per source file of *diff* plus a README index listing *sources* (label, path)."""
+    reports = [
+        FileReport(
+            file_key=file_key,
+            gt_edges=diff.file_edges(file_key, "gt"),
+            nd_edges=diff.file_edges(file_key, "nd"),
+            missing=diff.file_edges(file_key, "missing"),
+            extra=diff.file_edges(file_key, "extra"),
         )
+        for file_key in diff.files()
+    ]
 
-    args.out_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     # Write per-file markdowns
     for r in reports:
-        report_path = _relative_report_path(args.out_dir, r.file_key)
+        report_path = _relative_report_path(out_dir, r.file_key)
         _write_file_report(report_path, r)
 
     # Write index
     index_lines: List[str] = []
     index_lines.append("# Per-file diff report")
     index_lines.append("")
-    index_lines.append(f"- Ground truth: `{args.ground_truth}`")
-    index_lines.append(f"- Diff JSON: `{args.diff}`")
+    for label, path in sources:
+        index_lines.append(f"- {label}: `{path}`")
     index_lines.append("")
     index_lines.append("## Files")
     index_lines.append("")
     index_lines.append("| File | GT | Missing | Extra |")
     index_lines.append("|---|---:|---:|---:|")
     for r in reports:
-        gt_total = len(set(r.gt_edges))
-        miss_total = len(set(r.missing))
-        extra_total = len(set(r.extra))
-        rel = os.path.relpath(_relative_report_path(args.out_dir, r.file_key), args.out_dir)
-        index_lines.append(f"| [`{r.file_key}`]({rel}) | {gt_total} | {miss_total} | {extra_total} |")
+        rel = os.path.relpath(_relative_report_path(out_dir, r.file_key), out_dir)
+        index_lines.append(f"| [`{r.file_key}`]({rel}) | {len(r.gt_edges)} | {len(r.missing)} | {len(r.extra)} |")
     index_lines.append("")
-    (args.out_dir / "README.md").write_text("\n".join(index_lines).rstrip() + "\n", encoding="utf-8")
+    (out_dir / "README.md").write_text("\n".join(index_lines).rstrip() + "\n", encoding="utf-8")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ground-truth", required=True, type=Path, help="Path to ground truth edge list JSON")
+    parser.add_argument("--diff", required=True, type=Path, help="Path to diff JSON (missing/extra)")
+    parser.add_argument("--out-dir", required=True, type=Path, help="Directory to write per-file markdown reports")
+    args = parser.parse_args(argv)
+
+    gt_edges = _load_edges_list(args.ground_truth)
+    missing_edges, extra_edges = _load_diff(args.diff)
+    write_reports(
+        EdgeDiff.from_lists(gt_edges, missing_edges, extra_edges),
+        args.out_dir,
+        sources=[("Ground truth", str(args.ground_truth)), ("Diff JSON", str(args.diff))],
+    )
 
     print(f"[OK] Wrote per-file diff reports to: {args.out_dir}")
     return 0
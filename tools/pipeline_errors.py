@@ -29,6 +29,8 @@ import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Sequence
 
+from source_walk import source_inventory
+
 
 # ---------------------------------------------------------------------------
 # Typed exceptions
@@ -195,10 +197,10 @@ def check_output_dir_not_dangling_symlink(output_dir: Path) -> None:
 
 def warn_no_source_files(focus_path: Path, langs: Sequence[str]) -> None:
     """Print a warning (no raise) if the input directory appears empty for the given langs."""
-    ext_map = {"python": "*.py", "java": "*.java"}
+    ext_map = {"python": ".py", "java": ".java"}
     for lang in langs:
-        pattern = ext_map.get(lang)
-        if pattern and not any(focus_path.rglob(pattern)):
+        suffix = ext_map.get(lang)
+        if suffix and not source_inventory(focus_path).count(suffix):
             sys.stderr.write(
                 f"  !!  Warning: no {lang} source files found in the input repository.\n"
                 f"       Path checked: {focus_path}\n"
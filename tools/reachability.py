@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Reachability over a directed graph given as an edge set.
+
+Both places that decide whether a cross-file Use/Call edge is "anchored" -- the
+UseTransitive relabel (STEP 0c of enhance_python_deps.py) and the
+import-scoped gate of ``export_dv8_file_level`` -- accept a file pair when the
+source file reaches the target file through a short chain of Extend edges:
+the parent's and the grandparent's file (``EXTEND_ANCHOR_HOPS``), as the
+pair-joining loop they used to run did.  They share ``Reachability`` so the two
+stay in agreement by construction.
+
+The graph is stored as adjacency lists.  ``reachable_from`` runs one BFS per
+source node the first time it is asked and memoizes the result, so a gate that
+only queries the sources it actually sees pays O(nodes + edges) per distinct
+source -- for class hierarchies, proportional to the source's ancestor chain --
+instead of the O(pairs^2) rounds of repeated pair-joining.  ``max_hops=None``
+gives the full transitive closure.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Generic, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+N = TypeVar("N", bound=Hashable)
+
+# Extend chain length that anchors a file pair: parent and grandparent files.
+EXTEND_ANCHOR_HOPS = 2
+
+
+class Reachability(Generic[N]):
+    """Answers "is there a path of one to *max_hops* edges from *a* to *b*?" (any length if ``None``)."""
+
+    def __init__(self, edges: Iterable[Tuple[N, N]], *, max_hops: Optional[int] = None) -> None:
+        self.max_hops = max_hops
+        self._succ: Dict[N, List[N]] = {}
+        seen: Set[Tuple[N, N]] = set()
+        for src, tgt in edges:
+            if (src, tgt) in seen:
+                continue
+            seen.add((src, tgt))
+            self._succ.setdefault(src, []).append(tgt)
+        self._memo: Dict[N, FrozenSet[N]] = {}
+
+    def __len__(self) -> int:
+        return len(self._succ)
+
+    def reachable_from(self, node: N) -> FrozenSet[N]:
+        """Nodes reachable from *node* in one or more steps (includes *node* only on a cycle)."""
+        memo = self._memo.get(node)
+        if memo is not None:
+            return memo
+        if self.max_hops is not None:
+            result = self._within_hops(node, self.max_hops)
+            self._memo[node] = result
+            return result
+        succ = self._succ
+        reached: Set[N] = set()
+        queue: Deque[N] = deque(succ.get(node, ()))
+        while queue:
+            cur = queue.popleft()
+            if cur in reached:
+                continue
+            reached.add(cur)
+            done = self._memo.get(cur)
+            if done is not None:
+                # Already expanded: take its reach wholesale instead of walking it again.
+                reached |= done
+                continue
+            queue.extend(succ.get(cur, ()))
+        result = frozenset(reached)
+        self._memo[node] = result
+        return result
+
+    def _within_hops(self, node: N, max_hops: int) -> FrozenSet[N]:
+        # Level by level: another node's memo covers *its* hop budget, not the
+        # remainder of this one, so it cannot be reused here.
+        succ = self._succ
+        reached: Set[N] = set()
+        level = [node]
+        for _ in range(max_hops):
+            next_level: List[N] = []
+            for cur in level:
+                for nxt in succ.get(cur, ()):
+                    if nxt not in reached:
+                        reached.add(nxt)
+                        next_level.append(nxt)
+            if not next_level:
+                break
+            level = next_level
+        return frozenset(reached)
+
+    def reaches(self, src: N, tgt: N) -> bool:
+        if src not in self._succ:
+            return False
+        return tgt in self.reachable_from(src)
+
+    def pairs(self) -> Iterator[Tuple[N, N]]:
+        """Every ``(a, b)`` of the transitive closure."""
+        for src in list(self._succ):
+            for tgt in self.reachable_from(src):
+                yield src, tgt
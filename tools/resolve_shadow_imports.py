@@ -5,8 +5,8 @@ Resolve stdlib-shadow imports in a NeoDepends database.
 Python 3 uses absolute imports by default.  A file inside a package that says
 ``import logging`` gets the *stdlib* logging, not a project module named
 ``logging.py`` buried inside the package tree.  StackGraphs (and the enhancer's
-``_module_to_file`` helper) cannot tell the difference — they match by name
-anywhere in the tree, creating phantom Import edges.
+suffix lookup in ``module_index.ModuleIndex``) cannot tell the difference — they
+match by name anywhere in the tree, creating phantom Import edges.
 
 This script walks every File→File Import/ImportLazy edge in the DB, identifies
 edges whose target file has a base-module name that shadows a stdlib module,
@@ -30,6 +30,11 @@ import sys
 from pathlib import Path
 from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
+from ast_cache import shared_ast_cache
+from graph_model import fetch_all
+from module_index import module_name
+from stage_profile import note_rows_written
+
 
 # ---------------------------------------------------------------------------
 # 1. Build stdlib module name set
@@ -102,7 +107,7 @@ def _project_shadow_targets(
             continue
 
         # Derive path components as dotted module parts.
-        parts = rel.replace("/", ".").removesuffix(".py").split(".")
+        parts = module_name(rel).split(".")
         if not parts:
             continue
 
@@ -128,6 +133,7 @@ def _source_has_qualified_import(
     source_code: str,
     target_module_name: str,
     target_file_name: str,
+    tree: Optional[ast.AST] = None,
 ) -> bool:
     """Check whether ``source_code`` imports ``target_module_name`` via a
     qualified or relative path (genuine project edge) rather than a bare
@@ -145,11 +151,14 @@ def _source_has_qualified_import(
     - ``import logging.handlers``                 — stdlib sub-module
     - ``from logging import getLogger``           — bare stdlib
     - ``from logging.handlers import Rotating``   — stdlib sub-module
+
+    ``tree`` may carry an already-parsed module (shared AST cache) for ``source_code``.
     """
-    try:
-        tree = ast.parse(source_code)
-    except SyntaxError:
-        return False  # can't parse → conservative: treat as phantom
+    if tree is None:
+        try:
+            tree = ast.parse(source_code)
+        except SyntaxError:
+            return False  # can't parse → conservative: treat as phantom
 
     for node in ast.walk(tree):
         if isinstance(node, ast.Import):
@@ -208,19 +217,25 @@ def resolve_shadow_imports(
     db_path: str,
     source_root: str,
     report_path: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> dict:
     """Remove phantom stdlib-shadow Import/ImportLazy edges from the DB.
 
+    ``conn`` lets an in-process caller share its open connection; it is
+    committed but not closed.
+
     Returns a report dict with statistics and per-edge actions.
     """
-    conn = sqlite3.connect(db_path)
+    owns_conn = conn is None
+    if conn is None:
+        conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     stdlib_names = _stdlib_module_names()
 
     # Load file entities.
     cursor.execute("SELECT id, name, content_id FROM entities WHERE kind = 'File'")
-    file_rows = cursor.fetchall()
+    file_rows = fetch_all(cursor)
     file_name_by_id: Dict[bytes, str] = {}
     file_content_id_by_id: Dict[bytes, bytes] = {}
     for fid, fname, cid in file_rows:
@@ -245,7 +260,8 @@ def resolve_shadow_imports(
             Path(report_path).parent.mkdir(parents=True, exist_ok=True)
             with open(report_path, "w") as f:
                 json.dump(report, f, indent=2)
-        conn.close()
+        if owns_conn:
+            conn.close()
         print("Shadow-import resolver: no shadow targets found.")
         return report
 
@@ -270,17 +286,10 @@ def resolve_shadow_imports(
         """,
         list(shadow_file_ids.keys()),
     )
-    candidate_edges = cursor.fetchall()
-
-    # Content cache to avoid re-reading.
-    content_cache: Dict[bytes, str] = {}
+    candidate_edges = fetch_all(cursor)
 
-    def _get_content(content_id: bytes) -> str:
-        if content_id not in content_cache:
-            cursor.execute("SELECT content FROM contents WHERE id = ?", (content_id,))
-            row = cursor.fetchone()
-            content_cache[content_id] = row[0] if row else ""
-        return content_cache[content_id]
+    # Sources and parsed trees are shared with the other post-processing stages.
+    ast_cache = shared_ast_cache()
 
     edges_checked = 0
     edges_dropped = 0
@@ -312,7 +321,7 @@ def resolve_shadow_imports(
             })
             continue
 
-        source_code = _get_content(src_cid)
+        source_code = ast_cache.source(conn, src_cid)
         if not source_code.strip():
             edges_kept += 1
             actions.append({
@@ -321,7 +330,10 @@ def resolve_shadow_imports(
             })
             continue
 
-        has_qualified = _source_has_qualified_import(source_code, stdlib_name, tgt_name)
+        src_tree = ast_cache.parse(src_cid, source_code)
+        has_qualified = src_tree is not None and _source_has_qualified_import(
+            source_code, stdlib_name, tgt_name, tree=src_tree
+        )
 
         if has_qualified:
             edges_kept += 1
@@ -341,9 +353,11 @@ def resolve_shadow_imports(
     if rowids_to_delete:
         for rid in rowids_to_delete:
             cursor.execute("DELETE FROM deps WHERE rowid = ?", (rid,))
+            note_rows_written(cursor.rowcount)
         conn.commit()
 
-    conn.close()
+    if owns_conn:
+        conn.close()
 
     print(f"Shadow-import resolver: checked {edges_checked}, dropped {edges_dropped}, kept {edges_kept}")
 
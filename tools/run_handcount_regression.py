@@ -1,12 +1,37 @@
 #!/usr/bin/env python3
+"""
+Run the handcount regression cases and compare each against its ground truth.
+
+Cases run concurrently on a pool of ``--jobs`` workers, so the matrix takes
+about as long as its slowest case.  Each case exports into its own
+``<output-dir>/<case>/`` directory with the exporter's output in ``run.log``
+there; the comparison runs in-process and writes ``<case>.diff.json`` /
+``<case>.diff.md`` next to the summaries, plus ``example_comparison_diffs.md``
+with every compared case's Missing/Extra lists (merge_diff_reports.py's
+report, built from the in-process diffs instead of re-reading the JSON).  Wall time of every case's export
+and the largest RSS of any single process it ran go into the summaries.
+
+With ``--analysis-cache-dir`` all cases share that analysis cache, so
+re-running after a change that does not touch a fixture tree or the tools
+restores that case's core outputs instead of re-running NeoDepends.  Without
+it every export runs from scratch.
+"""
+
 from __future__ import annotations
 
 import argparse
 import json
+import os
 import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from compare_dv8_to_ground_truth import compare_files, write_diff_json, write_diff_markdown
+from merge_diff_reports import DiffSection, render_markdown
 
 
 @dataclass
@@ -23,9 +48,30 @@ class Case:
     enforce: bool = False  # fail on diff for this case
 
 
-def _run(cmd: List[str], *, cwd: Path) -> None:
-    print(f"[CMD] {' '.join(cmd)}")
-    subprocess.run(cmd, cwd=str(cwd), check=True)
+def _run_logged(cmd: List[str], *, cwd: Path, log_path: Path) -> Optional[float]:
+    """
+    Run *cmd* with its output in *log_path*; raises ``CalledProcessError`` on failure.
+
+    Returns the largest RSS in MiB reached by any single process of the
+    command's tree (``os.wait4`` reports ``ru_maxrss`` as a maximum over the
+    process and its waited-for descendants, not their sum), or ``None`` where
+    the platform has no ``wait4``.
+    """
+    with log_path.open("w", encoding="utf-8") as log:
+        log.write(f"[CMD] {' '.join(cmd)}\n")
+        log.flush()
+        proc = subprocess.Popen(cmd, cwd=str(cwd), stdout=log, stderr=subprocess.STDOUT)
+        max_mb: Optional[float] = None
+        if hasattr(os, "wait4"):
+            _pid, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            # ru_maxrss is in KiB on Linux and in bytes on macOS.
+            max_mb = round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        else:
+            proc.wait()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return max_mb
 
 
 def _run_neodepends(
@@ -35,7 +81,9 @@ def _run_neodepends(
     depends_jar: Path,
     out_dir: Path,
     case: Case,
-) -> Path:
+    analysis_cache_dir: Optional[Path],
+) -> Optional[float]:
+    """Export *case* into *out_dir*; returns its largest process RSS in MiB (see ``_run_logged``)."""
     out_dir.mkdir(parents=True, exist_ok=True)
     cmd = [
         "python3",
@@ -56,46 +104,148 @@ def _run_neodepends(
         cmd += ["--resolver", "stackgraphs", "--stackgraphs-python-mode", "ast", "--filter-stackgraphs-false-positives"]
     else:
         cmd += ["--resolver", "depends", "--depends-jar", str(depends_jar)]
+    if analysis_cache_dir is not None:
+        cmd += ["--analysis-cache-dir", str(analysis_cache_dir)]
+
+    return _run_logged(cmd, cwd=repo_root, log_path=out_dir / "run.log")
+
+
+def _cache_hits(out_dir: Path) -> Optional[List[str]]:
+    """Stages the export restored from the analysis cache, from its run summary."""
+    try:
+        summary = json.loads((out_dir / "data" / "run_summary.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    cache = summary.get("analysis_cache") or {}
+    return cache.get("hits")
 
-    _run(cmd, cwd=repo_root)
-    return out_dir / "analysis-result.json"
 
+def _analysis_result(out_dir: Path) -> Path:
+    """The export's full-project matrix (``analysis-result.json``, or ``.json.gz`` under --gzip-json)."""
+    path = out_dir / "analysis-result.json"
+    gz_path = path.with_name(path.name + ".gz")
+    return gz_path if gz_path.exists() and not path.exists() else path
 
-def _run_compare(
+
+def _run_case(
     *,
     repo_root: Path,
-    dv8_path: Path,
-    handcount: Path,
-    out_dir: Path,
+    neodepends_bin: Path,
+    depends_jar: Path,
+    out_base: Path,
     case: Case,
-) -> Path:
-    diff_json = out_dir / f"{case.name}.diff.json"
-    diff_md = out_dir / f"{case.name}.diff.md"
-    cmd = [
-        "python3",
-        str(repo_root / "tools" / "compare_dv8_to_ground_truth.py"),
-        "--ground-truth",
-        str(handcount),
-        "--neodepends-dv8",
-        str(dv8_path),
-        "--out",
-        str(diff_json),
-        "--out-md",
-        str(diff_md),
-    ]
-    if case.normalize_professor:
-        cmd.append("--normalize-neodepends-professor")
-    if case.normalize_java:
-        cmd.append("--normalize-java-handcount")
-    if case.normalize_java_decl_site:
-        cmd.append("--normalize-java-declaration-site")
-    for p in case.strip_prefixes or []:
-        cmd += ["--strip-prefix", p]
-    for p in case.exclude_prefixes or []:
-        cmd += ["--exclude-prefix", p]
+    analysis_cache_dir: Optional[Path],
+) -> Tuple[dict, Optional[DiffSection]]:
+    """
+    Export and compare one case.
 
-    _run(cmd, cwd=repo_root)
-    return diff_json
+    Returns its summary entry (``error`` set if the export failed) and, for a
+    case with a handcount, its section of the merged diff report.
+    """
+    out_dir = out_base / case.name
+    started = time.perf_counter()
+    entry: dict = {"case": case.name, "missing": None, "extra": None, "diff_json": None}
+    section: Optional[DiffSection] = None
+    try:
+        entry["max_process_rss_mb"] = _run_neodepends(
+            repo_root=repo_root,
+            neodepends_bin=neodepends_bin,
+            depends_jar=depends_jar,
+            out_dir=out_dir,
+            case=case,
+            analysis_cache_dir=analysis_cache_dir,
+        )
+    except subprocess.CalledProcessError as exc:
+        entry["error"] = f"export exited with {exc.returncode}, see {out_dir / 'run.log'}"
+        entry["wall_sec"] = round(time.perf_counter() - started, 2)
+        return entry, None
+    entry["cache_hits"] = _cache_hits(out_dir)
+
+    if case.handcount:
+        dv8_path = _analysis_result(out_dir)
+        diff = compare_files(
+            case.handcount,
+            dv8_path,
+            normalize_professor=case.normalize_professor,
+            normalize_java=case.normalize_java,
+            normalize_java_decl_site=case.normalize_java_decl_site,
+            strip_prefixes=case.strip_prefixes,
+            exclude_prefixes=case.exclude_prefixes,
+        )
+        diff_json = out_base / f"{case.name}.diff.json"
+        write_diff_json(diff, diff_json, ground_truth=case.handcount, neodepends_dv8=dv8_path)
+        write_diff_markdown(diff, out_base / f"{case.name}.diff.md", ground_truth=case.handcount, neodepends_dv8=dv8_path)
+        ground_truth_count = diff.count("gt")
+        entry.update(
+            missing=diff.count("missing"),
+            extra=diff.count("extra"),
+            ground_truth_count=ground_truth_count,
+            neodepends_count=diff.count("nd"),
+            diff_ratio=(diff.count("missing") + diff.count("extra")) / ground_truth_count if ground_truth_count else None,
+            diff_json=str(diff_json),
+        )
+        section = DiffSection.from_diff(
+            diff, neodepends_dv8=str(dv8_path), ground_truth=str(case.handcount), diff_json=str(diff_json)
+        )
+    entry["wall_sec"] = round(time.perf_counter() - started, 2)
+    return entry, section
+
+
+def run_cases(
+    cases: List[Case],
+    *,
+    repo_root: Path,
+    neodepends_bin: Path,
+    depends_jar: Path,
+    out_base: Path,
+    analysis_cache_dir: Optional[Path],
+    jobs: int,
+) -> List[dict]:
+    """
+    Run *cases* on a pool of *jobs* threads; the summary entries come back in case order.
+
+    The compared cases' diffs are also written, in case order, to
+    ``<out_base>/example_comparison_diffs.md``.
+    """
+
+    def run(case: Case) -> Tuple[dict, Optional[DiffSection]]:
+        print(f"[RUN] {case.name}", flush=True)
+        entry, section = _run_case(
+            repo_root=repo_root,
+            neodepends_bin=neodepends_bin,
+            depends_jar=depends_jar,
+            out_base=out_base,
+            case=case,
+            analysis_cache_dir=analysis_cache_dir,
+        )
+        outcome = entry.get("error") or f"missing={entry['missing']} extra={entry['extra']}"
+        print(f"[DONE] {case.name} in {entry['wall_sec']:.1f}s: {outcome}", flush=True)
+        return entry, section
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        # map keeps case order, so the summaries do not depend on scheduling.
+        results = list(pool.map(run, cases))
+    sections = [section for _entry, section in results if section is not None]
+    diffs_md_path = out_base / "example_comparison_diffs.md"
+    if sections:
+        diffs_md_path.write_text(render_markdown(sections), encoding="utf-8")
+    else:
+        diffs_md_path.unlink(missing_ok=True)
+    return [entry for entry, _section in results]
+
+
+def status_for(entry: dict, tolerance: Optional[float]) -> str:
+    """ERROR / SKIP / FAIL / OK for one summary entry."""
+    if entry.get("error"):
+        return "ERROR"
+    if entry.get("ground_truth_count") in (None, 0):
+        return "SKIP"
+    if tolerance is None:
+        return "OK"
+    diff_ratio = entry.get("diff_ratio")
+    if diff_ratio is None:
+        return "SKIP"
+    return "FAIL" if diff_ratio > tolerance else "OK"
 
 
 def main() -> int:
@@ -116,6 +266,18 @@ def main() -> int:
         default=None,
         help="Fail if (missing+extra)/ground_truth_count exceeds this threshold (e.g. 0.05 for 5%%)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Cases run concurrently (default: all cases, up to the CPU count)",
+    )
+    parser.add_argument(
+        "--analysis-cache-dir",
+        type=Path,
+        default=None,
+        help="Analysis cache shared by the cases' exports (default: none, every export runs from scratch)",
+    )
     args = parser.parse_args()
 
     repo_root = Path(__file__).resolve().parents[1]
@@ -226,69 +388,42 @@ def main() -> int:
         ]
     )
 
-    summary = []
-    failures = []
+    analysis_cache_dir: Optional[Path] = None
+    if args.analysis_cache_dir:
+        analysis_cache_dir = Path(args.analysis_cache_dir).expanduser().resolve()
 
-    for case in cases:
-        print(f"\n=== Running {case.name} ===")
-        out_dir = out_base / case.name
-        dv8_path = _run_neodepends(
-            repo_root=repo_root,
-            neodepends_bin=neodepends_bin,
-            depends_jar=depends_jar,
-            out_dir=out_dir,
-            case=case,
-        )
-        if case.handcount:
-            diff_json = _run_compare(
-                repo_root=repo_root,
-                dv8_path=dv8_path,
-                handcount=case.handcount,
-                out_dir=out_base,
-                case=case,
-            )
-            diff = json.loads(diff_json.read_text())
-            missing = len(diff.get("missing", []))
-            extra = len(diff.get("extra", []))
-            ground_truth_count = int(diff.get("ground_truth_count", 0) or 0)
-            neodepends_count = int(diff.get("neodepends_count", 0) or 0)
-            diff_ratio = None
-            if ground_truth_count > 0:
-                diff_ratio = (missing + extra) / ground_truth_count
-            summary.append(
-                {
-                    "case": case.name,
-                    "missing": missing,
-                    "extra": extra,
-                    "ground_truth_count": ground_truth_count,
-                    "neodepends_count": neodepends_count,
-                    "diff_ratio": diff_ratio,
-                    "diff_json": str(diff_json),
-                }
-            )
-            enforce = case.enforce or args.fail_on_diff
-            if enforce and (missing > 0 or extra > 0):
-                failures.append(case.name)
-            if args.tolerance is not None and diff_ratio is not None and diff_ratio > args.tolerance:
-                failures.append(case.name)
-        else:
-            summary.append({"case": case.name, "missing": None, "extra": None, "diff_json": None})
+    jobs = args.jobs if args.jobs is not None else min(len(cases), os.cpu_count() or 1)
+    started = time.perf_counter()
+    summary = run_cases(
+        cases,
+        repo_root=repo_root,
+        neodepends_bin=neodepends_bin,
+        depends_jar=depends_jar,
+        out_base=out_base,
+        analysis_cache_dir=analysis_cache_dir,
+        jobs=jobs,
+    )
+    total_sec = time.perf_counter() - started
+
+    failures = []
+    for case, entry in zip(cases, summary):
+        if entry.get("error"):
+            failures.append(case.name)
+            continue
+        if entry["missing"] is None:
+            continue
+        enforce = case.enforce or args.fail_on_diff
+        if enforce and (entry["missing"] > 0 or entry["extra"] > 0):
+            failures.append(case.name)
+        diff_ratio = entry.get("diff_ratio")
+        if args.tolerance is not None and diff_ratio is not None and diff_ratio > args.tolerance:
+            failures.append(case.name)
 
     def fmt_ratio(value: float | None) -> str:
         if value is None:
             return "-"
         return f"{value * 100:.1f}%"
 
-    def status_for(entry: dict) -> str:
-        if entry.get("ground_truth_count") in (None, 0):
-            return "SKIP"
-        if args.tolerance is None:
-            return "OK"
-        diff_ratio = entry.get("diff_ratio")
-        if diff_ratio is None:
-            return "SKIP"
-        return "FAIL" if diff_ratio > args.tolerance else "OK"
-
     # Write JSON summaries (new + backwards-compatible)
     summary_path = out_base / "example_comparison_summary.json"
     summary_path.write_text(json.dumps(summary, indent=2))
@@ -299,21 +434,25 @@ def main() -> int:
     md_lines = [
         "# Example Comparison Summary",
         "",
-        "| Case | Ground Truth | NeoDepends | Missing | Extra | Diff% | Status |",
-        "| --- | ---:| ---:| ---:| ---:| ---:| --- |",
+        "| Case | Ground Truth | NeoDepends | Missing | Extra | Diff% | Status | Wall (s) | Max process RSS (MiB) |",
+        "| --- | ---:| ---:| ---:| ---:| ---:| --- | ---:| ---:|",
     ]
     for entry in summary:
         md_lines.append(
-            "| {case} | {gt} | {nd} | {missing} | {extra} | {diff} | {status} |".format(
+            "| {case} | {gt} | {nd} | {missing} | {extra} | {diff} | {status} | {wall} | {rss} |".format(
                 case=entry["case"],
                 gt=entry.get("ground_truth_count", "-"),
                 nd=entry.get("neodepends_count", "-"),
                 missing=entry.get("missing", "-"),
                 extra=entry.get("extra", "-"),
                 diff=fmt_ratio(entry.get("diff_ratio")),
-                status=status_for(entry),
+                status=status_for(entry, args.tolerance),
+                wall=entry.get("wall_sec", "-"),
+                rss=entry.get("max_process_rss_mb") or "-",
             )
         )
+    md_lines.append("")
+    md_lines.append(f"Total wall time: {total_sec:.1f}s with {max(1, jobs)} job(s)")
     md_path = out_base / "example_comparison_summary.md"
     md_path.write_text("\n".join(md_lines))
 
@@ -322,10 +461,15 @@ def main() -> int:
     for entry in summary:
         print(
             f"- {entry['case']}: missing={entry.get('missing')} extra={entry.get('extra')} "
-            f"diff={fmt_ratio(entry.get('diff_ratio'))} status={status_for(entry)}"
+            f"diff={fmt_ratio(entry.get('diff_ratio'))} status={status_for(entry, args.tolerance)} "
+            f"wall={entry.get('wall_sec')}s max_process_rss={entry.get('max_process_rss_mb')}MiB"
         )
+    print(f"Total wall time: {total_sec:.1f}s with {max(1, jobs)} job(s)")
     print(f"\n[OK] Summary JSON: {summary_path}")
     print(f"[OK] Summary Markdown: {md_path}")
+    diffs_md_path = out_base / "example_comparison_diffs.md"
+    if diffs_md_path.exists():
+        print(f"[OK] Diff details: {diffs_md_path}")
 
     if failures:
         print(f"[FAIL] Differences found in: {', '.join(failures)}")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Shared walk of the input tree for the exporter's pre-flight checks.
+
+Before the core binary starts, the exporter looks at the input several times:
+the ``automatic`` preset counts ``.py`` / ``.java`` files, ``warn_no_source_files``
+checks that there is any source at all, and project-root detection looks for a
+file importing the package.  Each used to be its own ``rglob`` (and the last
+one read every file in full), which on network-mounted checkouts adds up to
+tens of seconds.
+
+``source_inventory(root)`` walks the tree once with ``os.scandir``, listing
+directories of one level in a thread pool, and caches the result per root for
+the rest of the run.  Version-control metadata, caches, ``node_modules`` /
+``site-packages`` and virtualenvs (any directory holding ``pyvenv.cfg``) are
+not entered.  ``SourceInventory.first_containing`` then searches file heads
+through ``mmap`` in a thread pool and stops at the first hit; only when no head
+matches are the rest of the longer files searched, so the answer is the same
+as reading every file in full.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Directory names never entered by the walk.
+SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn",
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    ".tox", ".nox", ".eggs",
+    ".venv", "venv",
+    "node_modules", "site-packages",
+})
+
+# A directory holding this file is a virtualenv, whatever its name.
+_VENV_MARKER = "pyvenv.cfg"
+
+# Bytes of each file searched by ``first_containing`` in its first pass:
+# imports usually sit at the top.
+HEAD_BYTES = 64 * 1024
+
+_WALK_THREADS = 8
+
+_cache: Dict[Path, "SourceInventory"] = {}
+_cache_lock = threading.Lock()
+
+
+def _list_dir(path: str) -> Tuple[List[str], List[str]]:
+    """``(files, subdirs)`` of *path*; an unreadable directory is empty."""
+    files: List[str] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return files, dirs
+    if any(e.name == _VENV_MARKER for e in entries):
+        return files, dirs
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    dirs.append(entry.path)
+            elif entry.is_file():
+                files.append(entry.path)
+        except OSError:
+            continue
+    return files, dirs
+
+
+def _head_contains(path: str, needles: Sequence[bytes], head_bytes: Optional[int]) -> Tuple[bool, bool]:
+    """``(found, truncated)`` for the first *head_bytes* of *path* (``None``: the whole file)."""
+    try:
+        with open(path, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0:
+                return False, False
+            length = size if head_bytes is None else min(size, head_bytes)
+            with mmap.mmap(fh.fileno(), length, access=mmap.ACCESS_READ) as head:
+                return any(head.find(n) >= 0 for n in needles), length < size
+    except (OSError, ValueError):
+        return False, False
+
+
+class SourceInventory:
+    """Every file under one root, from a single walk, grouped by suffix."""
+
+    def __init__(self, root: Path, files: Iterable[str]) -> None:
+        self.root = root
+        self.by_suffix: Dict[str, List[Path]] = {}
+        for name in sorted(files):
+            self.by_suffix.setdefault(os.path.splitext(name)[1], []).append(Path(name))
+
+    def files(self, suffix: str) -> List[Path]:
+        """Files ending in *suffix* (e.g. ``".py"``), sorted by path."""
+        return self.by_suffix.get(suffix, [])
+
+    def count(self, suffix: str) -> int:
+        return len(self.by_suffix.get(suffix, ()))
+
+    def first_containing(
+        self,
+        suffix: str,
+        needles: Sequence[str],
+        *,
+        head_bytes: int = HEAD_BYTES,
+        threads: int = _WALK_THREADS,
+    ) -> Optional[Path]:
+        """
+        A *suffix* file containing one of *needles* (UTF-8), or ``None``.
+
+        The first *head_bytes* of every file are searched first; files longer
+        than that are searched in full only if no head matches.  Files are
+        searched in a thread pool; once one matches, the remaining work is
+        cancelled, so which match is returned is unspecified.
+        """
+        paths = self.files(suffix)
+        if not paths or not needles:
+            return None
+        raw = [n.encode("utf-8") for n in needles]
+        truncated: List[Path] = []
+        hit = _first_match(paths, raw, head_bytes, threads, truncated)
+        if hit is None and truncated:
+            hit = _first_match(sorted(truncated), raw, None, threads, [])
+        return hit
+
+
+def _first_match(
+    paths: Sequence[Path],
+    raw: Sequence[bytes],
+    head_bytes: Optional[int],
+    threads: int,
+    truncated: List[Path],
+) -> Optional[Path]:
+    """One of *paths* whose head contains a needle; files cut short are added to *truncated*."""
+    found = threading.Event()
+    hit: List[Path] = []
+
+    def search(batch: Sequence[Path]) -> None:
+        for path in batch:
+            if found.is_set():
+                return
+            matched, cut = _head_contains(str(path), raw, head_bytes)
+            if matched:
+                hit.append(path)
+                found.set()
+                return
+            if cut:
+                truncated.append(path)
+
+    step = max(1, len(paths) // (threads * 4))
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        futures = [pool.submit(search, paths[i : i + step]) for i in range(0, len(paths), step)]
+        for future in futures:
+            if found.is_set():
+                break
+            future.result()
+        for future in futures:
+            future.cancel()
+    return hit[0] if hit else None
+
+
+def _walk(root: Path, threads: int) -> List[str]:
+    files: List[str] = []
+    frontier = [str(root)]
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        while frontier:
+            next_frontier: List[str] = []
+            for dir_files, subdirs in pool.map(_list_dir, frontier):
+                files.extend(dir_files)
+                next_frontier.extend(subdirs)
+            frontier = next_frontier
+    return files
+
+
+def source_inventory(root: Path, *, refresh: bool = False, threads: int = _WALK_THREADS) -> SourceInventory:
+    """The (cached) inventory of the directory *root*."""
+    key = root.resolve()
+    with _cache_lock:
+        inv = None if refresh else _cache.get(key)
+    if inv is None:
+        inv = SourceInventory(root, _walk(root, threads))
+        with _cache_lock:
+            _cache[key] = inv
+    return inv
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Stage-level profiling for the export pipeline and its post-processing tools.
+
+``StageProfiler`` records, for every named stage, wall time, CPU time (this
+process plus any child processes that finished during the stage), memory and
+row counts:
+
+- ``peak_rss_mb`` is the highest RSS of this process sampled while the stage
+  was open (a background thread reads ``/proc/self/statm`` every
+  ``sample_interval`` seconds, plus once at each end of the stage) and
+  ``rss_delta_mb`` the RSS the stage left behind; both are ``None`` where
+  ``/proc`` is not available.  ``max_child_rss_mb`` is the largest RSS any
+  single finished child process reached so far (``getrusage`` keeps the
+  maximum over children, not their sum, so this is not the peak of the process
+  tree).
+- ``rows_read`` / ``rows_written`` are the DB rows the stage streamed and
+  wrote.  The tools report them to this module: ``iter_rows`` / ``fetch_all``
+  (graph_model.py) count rows read, ``EdgeSink`` and the UPDATE / DELETE passes
+  count rows written (``note_rows_read`` / ``note_rows_written``).  A child tool
+  run inside ``child_row_counts()`` hands its totals back when it exits, so
+  subprocess stages are counted the same as ``--in-process`` ones.
+- ``deps_before`` / ``deps_after`` are the size of the ``deps`` table of the
+  stage's input DB when it starts and of its output DB when it ends.
+
+neodepends_python_export.py writes the records to ``run_summary.json``
+(``stage_profile``); enhance_python_deps.py records its STEPs the same way and
+hands them back as the substages of the ``enhance`` stage.
+
+Stages are either opened with the ``stage()`` context manager or laid out
+back-to-back with ``lap()``, which closes the previous lap and opens the next
+one -- convenient inside long functions such as ``enhance_python_dependencies``.
+
+Optional cProfile dumps: when a dump directory is configured (``dump_dir`` or
+the ``NEODEPENDS_PROFILE_DIR`` environment variable, which the exporter also
+forwards to its subprocess stages), each stage is profiled and written to
+``<dir>/<prefix><nn>_<stage>.prof`` for ``python -m pstats`` / snakeviz.
+Nested stages pause the enclosing stage's profiler, so every call is attributed
+to exactly one dump.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+PROFILE_DIR_ENV = "NEODEPENDS_PROFILE_DIR"
+# Set by ``child_row_counts()`` for a child tool: where to leave its row totals on exit.
+ROW_COUNTS_ENV = "NEODEPENDS_ROW_COUNTS_FILE"
+
+# A stage's row counts are taken from a DB path (opened read-only for the count)
+# or from the connection the stage itself is writing through.
+DbRef = Union[Path, str, sqlite3.Connection, None]
+
+# cProfile allows one active profiler per thread; the innermost stage owns it.
+_ACTIVE_PROFILES: List[cProfile.Profile] = []
+
+# Rows read and written by this process (plus finished child tools); stages
+# record the difference between their start and their end.
+_ROWS = [0, 0]
+
+
+@dataclass
+class StageRecord:
+    name: str
+    wall_sec: float = 0.0
+    cpu_sec: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    rss_delta_mb: Optional[float] = None
+    max_child_rss_mb: Optional[float] = None
+    rows_read: int = 0
+    rows_written: int = 0
+    deps_before: Optional[int] = None
+    deps_after: Optional[int] = None
+    profile_path: Optional[str] = None
+    substages: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def count_rows(db: DbRef, table: str = "deps") -> Optional[int]:
+    """Number of rows in *table* (``None`` if there is no DB or no such table)."""
+    if db is None:
+        return None
+    try:
+        if isinstance(db, sqlite3.Connection):
+            return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        path = Path(db)
+        if not path.exists():
+            return None
+        conn = sqlite3.connect(f"file:{path.resolve()}?immutable=1", uri=True)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+def count_deps(db: DbRef) -> Optional[int]:
+    """Number of rows in ``deps`` (``None`` if there is no DB or no such table)."""
+    return count_rows(db, "deps")
+
+
+def note_rows_read(n: int) -> None:
+    _ROWS[0] += n
+
+
+def note_rows_written(n: int) -> None:
+    # cursor.rowcount is -1 for statements that do not modify rows.
+    if n > 0:
+        _ROWS[1] += n
+
+
+def row_counts() -> Tuple[int, int]:
+    """``(rows read, rows written)`` by this process so far."""
+    return _ROWS[0], _ROWS[1]
+
+
+@contextlib.contextmanager
+def child_row_counts() -> Iterator[Dict[str, str]]:
+    """
+    Environment for a child tool process whose row counts belong to the open stages.
+
+    The child's totals are read back and added to this process's counters when
+    the block exits.  Children that never import this module report nothing.
+    """
+    fd, path = tempfile.mkstemp(prefix="neodepends_rows_", suffix=".json")
+    os.close(fd)
+    try:
+        yield dict(os.environ, **{ROW_COUNTS_ENV: path})
+    finally:
+        try:
+            counts = json.loads(Path(path).read_text(encoding="utf-8") or "{}")
+        except (OSError, ValueError):
+            counts = {}
+        note_rows_read(int(counts.get("rows_read", 0)))
+        note_rows_written(int(counts.get("rows_written", 0)))
+        Path(path).unlink(missing_ok=True)
+
+
+def _write_row_counts(path: str) -> None:
+    with contextlib.suppress(OSError):
+        Path(path).write_text(json.dumps({"rows_read": _ROWS[0], "rows_written": _ROWS[1]}), encoding="utf-8")
+
+
+if os.environ.get(ROW_COUNTS_ENV):
+    # Popped so that processes this tool starts in turn do not overwrite the file.
+    atexit.register(_write_row_counts, os.environ.pop(ROW_COUNTS_ENV))
+
+
+def _maxrss_mb(who: int) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current RSS of this process, in MiB (``None`` without ``/proc``)."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def max_child_rss_mb() -> Optional[float]:
+    """High-water RSS of the largest single finished child process, in MiB (``None`` if none finished)."""
+    if resource is None:
+        return None
+    return _maxrss_mb(resource.RUSAGE_CHILDREN) or None
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class _OpenStage:
+    def __init__(self, record: StageRecord, db_out: DbRef, profile: Optional[cProfile.Profile]) -> None:
+        self.record = record
+        self.db_out = db_out
+        self.profile = profile
+        self.rss0 = current_rss_mb()
+        self.peak_rss = self.rss0
+        self.rows0 = row_counts()
+        self.wall0 = time.perf_counter()
+        self.cpu0 = _cpu_seconds()
+
+
+class StageProfiler:
+    """Collects ``StageRecord``s in the order the stages finish."""
+
+    def __init__(self, *, dump_dir: Optional[Path] = None, prefix: str = "", sample_interval: float = 0.05) -> None:
+        if dump_dir is None and os.environ.get(PROFILE_DIR_ENV):
+            dump_dir = Path(os.environ[PROFILE_DIR_ENV])
+        self.dump_dir = Path(dump_dir) if dump_dir is not None else None
+        self.prefix = prefix
+        self.sample_interval = sample_interval
+        self.records: List[StageRecord] = []
+        self._open: List[_OpenStage] = []
+        self._lap: Optional[_OpenStage] = None
+        self._started = 0
+        self._lock = threading.Lock()
+        self._sampler_stop: Optional[threading.Event] = None
+
+    # ------------------------------------------------------------------
+    # RSS sampling
+    # ------------------------------------------------------------------
+
+    def _sample_rss(self) -> None:
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        with self._lock:
+            for stage in self._open:
+                if stage.peak_rss is None or rss > stage.peak_rss:
+                    stage.peak_rss = rss
+
+    def _sampler(self, stop: threading.Event) -> None:
+        while not stop.wait(self.sample_interval):
+            self._sample_rss()
+
+    def _start_sampler(self) -> None:
+        if self._sampler_stop is not None or current_rss_mb() is None:
+            return
+        self._sampler_stop = threading.Event()
+        threading.Thread(target=self._sampler, args=(self._sampler_stop,), name="stage-rss", daemon=True).start()
+
+    def _stop_sampler(self) -> None:
+        if self._sampler_stop is not None:
+            self._sampler_stop.set()
+            self._sampler_stop = None
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def begin(self, name: str, *, db_in: DbRef = None, db_out: DbRef = None) -> StageRecord:
+        """
+        Open stage *name*.
+
+        ``deps_before`` is the ``deps`` row count of *db_in* now; ``deps_after`` is
+        the count of *db_out* when the stage ends. Pass the same DB for stages that
+        modify it in place, only *db_in* for read-only stages.
+        """
+        record = StageRecord(name=name, deps_before=count_deps(db_in))
+        self._started += 1
+        profile: Optional[cProfile.Profile] = None
+        if self.dump_dir is not None:
+            if _ACTIVE_PROFILES:
+                _ACTIVE_PROFILES[-1].disable()
+            profile = cProfile.Profile()
+            _ACTIVE_PROFILES.append(profile)
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+            record.profile_path = str(self.dump_dir / f"{self.prefix}{self._started:02d}_{slug}.prof")
+            profile.enable()
+        with self._lock:
+            self._open.append(_OpenStage(record, db_out, profile))
+        self._start_sampler()
+        return record
+
+    def end(self) -> StageRecord:
+        """Close the innermost open stage and return its record."""
+        self._sample_rss()
+        with self._lock:
+            stage = self._open.pop()
+        if not self._open:
+            self._stop_sampler()
+        record = stage.record
+        if stage.profile is not None:
+            stage.profile.disable()
+            _ACTIVE_PROFILES.remove(stage.profile)
+            if _ACTIVE_PROFILES:
+                _ACTIVE_PROFILES[-1].enable()
+        record.wall_sec = round(time.perf_counter() - stage.wall0, 4)
+        record.cpu_sec = round(_cpu_seconds() - stage.cpu0, 4)
+        rss = current_rss_mb()
+        if stage.peak_rss is not None and stage.rss0 is not None and rss is not None:
+            record.peak_rss_mb = round(stage.peak_rss, 1)
+            record.rss_delta_mb = round(rss - stage.rss0, 1)
+        record.max_child_rss_mb = max_child_rss_mb()
+        rows_read, rows_written = row_counts()
+        record.rows_read = rows_read - stage.rows0[0]
+        record.rows_written = rows_written - stage.rows0[1]
+        record.deps_after = count_deps(stage.db_out)
+        if stage.profile is not None and record.profile_path is not None:
+            Path(record.profile_path).parent.mkdir(parents=True, exist_ok=True)
+            stage.profile.dump_stats(record.profile_path)
+        self.records.append(record)
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name: str, *, db_in: DbRef = None, db_out: DbRef = None) -> Iterator[StageRecord]:
+        record = self.begin(name, db_in=db_in, db_out=db_out)
+        try:
+            yield record
+        finally:
+            self.end()
+
+    def lap(self, name: Optional[str], *, db: DbRef = None) -> None:
+        """Close the current lap (if any) and, unless *name* is ``None``, open the next one on *db*."""
+        if self._lap is not None:
+            while self._open and self._open[-1] is not self._lap:
+                self.end()
+            self.end()
+            self._lap = None
+        if name is not None:
+            self.begin(name, db_in=db, db_out=db)
+            self._lap = self._open[-1]
+
+    def adopt(self, records: List[Dict[str, Any]]) -> None:
+        """Append records measured by another profiler (e.g. ``to_json()`` of a worker process)."""
+        self.records.extend(StageRecord(**record) for record in records)
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return [asdict(r) for r in self.records]
+
+    def write(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+
+
+def read_stage_profile(path: Path) -> List[Dict[str, Any]]:
+    """Records written by ``StageProfiler.write`` (empty if the file is missing or unreadable)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
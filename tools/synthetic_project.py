@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic Python / Java projects for the pipeline benchmarks.
+
+``generate_project(spec, lang)`` lays out ``spec.files`` source files in
+packages of ``PACKAGE_SIZE`` files.  Each file defines
+``classes_per_file`` classes with ``methods_per_class`` methods and
+``field_accesses`` fields.  Files sit in ``inheritance_depth + 1`` rotating
+levels, and every class below the top level extends the class of the same
+index in the previous file, so Extend chains, inherited fields and overrides
+are bounded by the depth.  Top-level Python classes declare ``m0`` with
+``@abstractmethod`` and Java subclasses mark their methods ``@Override``, so
+override detection has work in both languages.  Each file imports
+``imports_per_file`` earlier files and its methods create and call classes
+from them.  Each method also reads ``field_accesses`` fields and calls a
+sibling.
+
+Alongside the sources the project carries the rows the NeoDepends core would
+write for them (``entities``, ``contents`` and raw ``deps`` with source rows),
+including the definition-line noise the StackGraphs false-positive filter
+removes.  ``write_sources`` / ``write_core_db`` put both on disk, so the
+post-processing tools can be timed without the core binary.  The same spec and
+seed always give the same bytes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import sqlite3
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ast_cache import blob_id
+
+PACKAGE_SIZE = 50
+
+LANGS = ("python", "java")
+
+# Columns of the core's entities table, in order.
+ENTITY_COLUMNS = (
+    "id", "parent_id", "name", "kind",
+    "start_byte", "start_row", "start_column", "end_byte", "end_row", "end_column",
+    "comment_start_byte", "comment_start_row", "comment_start_column",
+    "comment_end_byte", "comment_end_row", "comment_end_column",
+    "content_id", "simple_id",
+)
+
+CORE_SCHEMA = """
+CREATE TABLE entities (
+    id BLOB NOT NULL PRIMARY KEY,
+    parent_id BLOB,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    start_byte INT NOT NULL,
+    start_row INT NOT NULL,
+    start_column INT NOT NULL,
+    end_byte INT NOT NULL,
+    end_row INT NOT NULL,
+    end_column INT NOT NULL,
+    comment_start_byte INT,
+    comment_start_row INT,
+    comment_start_column INT,
+    comment_end_byte INT,
+    comment_end_row INT,
+    comment_end_column INT,
+    content_id BLOB NOT NULL,
+    simple_id BLOB NOT NULL
+);
+CREATE TABLE deps (
+    src BLOB NOT NULL,
+    tgt BLOB NOT NULL,
+    kind TEXT NOT NULL,
+    row INT NOT NULL,
+    commit_id BLOB
+);
+CREATE TABLE changes (
+    simple_id BLOB NOT NULL,
+    commit_id BLOB NOT NULL,
+    kind TEXT NOT NULL,
+    dels INT NOT NULL,
+    adds INT NOT NULL,
+    PRIMARY KEY (simple_id, commit_id)
+);
+CREATE TABLE contents (
+    id BLOB NOT NULL PRIMARY KEY,
+    content TEXT NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class ProjectSpec:
+    """Size knobs of a synthetic project; ``scaled(k)`` multiplies the file count only."""
+
+    files: int = 20
+    classes_per_file: int = 2
+    inheritance_depth: int = 3
+    imports_per_file: int = 3
+    methods_per_class: int = 4
+    field_accesses: int = 2
+    seed: int = 0
+
+    def scaled(self, factor: int) -> "ProjectSpec":
+        return replace(self, files=self.files * factor)
+
+    def to_json(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+# (id, parent_id, name, kind, start_row, start_column, end_row, end_column)
+_Span = Tuple[bytes, Optional[bytes], str, str, int, int, int, int]
+Dep = Tuple[bytes, bytes, str, int]
+
+
+@dataclass
+class SyntheticProject:
+    """Sources (relative path -> text) plus the core rows describing them."""
+
+    spec: ProjectSpec
+    lang: str
+    sources: Dict[str, str] = field(default_factory=dict)
+    entities: List[Tuple] = field(default_factory=list)
+    deps: List[Dep] = field(default_factory=list)
+
+    def write_sources(self, root: Path) -> None:
+        for rel, text in self.sources.items():
+            path = root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
+
+    def write_core_db(self, db_path: Path) -> None:
+        """Write a fresh DB with the core's schema (replacing *db_path*)."""
+        if db_path.exists():
+            db_path.unlink()
+        conn = sqlite3.connect(str(db_path))
+        try:
+            conn.executescript(CORE_SCHEMA)
+            conn.executemany(
+                "INSERT INTO contents VALUES (?, ?)", [(blob_id(text), text) for text in self.sources.values()]
+            )
+            conn.executemany(
+                f"INSERT INTO entities VALUES ({', '.join('?' * len(ENTITY_COLUMNS))})", self.entities
+            )
+            conn.executemany("INSERT INTO deps VALUES (?, ?, ?, ?, NULL)", self.deps)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _entity_id(*parts: str) -> bytes:
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).digest()
+
+
+class _Lines:
+    """Source being built line by line, with byte offsets for entity spans."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def add(self, text: str = "") -> int:
+        self.lines.append(text)
+        return len(self.lines) - 1
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    def entity_rows(self, spans: List[_Span], content_id: bytes, rel: str) -> List[Tuple]:
+        offsets = [0]
+        for line in self.lines:
+            offsets.append(offsets[-1] + len(line.encode("utf-8")) + 1)
+        rows: List[Tuple] = []
+        for eid, parent, name, kind, s_row, s_col, e_row, e_col in spans:
+            rows.append((
+                eid, parent, name, kind,
+                offsets[s_row] + s_col, s_row, s_col, offsets[e_row] + e_col, e_row, e_col,
+                None, None, None, None, None, None,
+                content_id, _entity_id("simple", rel, name, kind, str(s_row)),
+            ))
+        return rows
+
+
+def _class_name(file_index: int, class_index: int) -> str:
+    return f"C{file_index:05d}_{class_index}"
+
+
+def _package(file_index: int) -> str:
+    return f"synth.p{file_index // PACKAGE_SIZE:03d}"
+
+
+def _plan(spec: ProjectSpec) -> Tuple[List[Optional[int]], List[List[int]]]:
+    """``(base file per file, imported files per file)``."""
+    rng = random.Random(spec.seed)
+    levels = spec.inheritance_depth + 1
+    bases: List[Optional[int]] = []
+    imports: List[List[int]] = []
+    for i in range(spec.files):
+        base = i - 1 if spec.inheritance_depth > 0 and i % levels else None
+        bases.append(base)
+        pool = [j for j in range(max(0, i - 4 * PACKAGE_SIZE), i) if j != base]
+        picked = rng.sample(pool, min(len(pool), spec.imports_per_file))
+        imports.append(sorted(picked))
+    return bases, imports
+
+
+def generate_project(spec: ProjectSpec, lang: str = "python") -> SyntheticProject:
+    if lang not in LANGS:
+        raise ValueError(f"Unsupported language: {lang} (expected one of {', '.join(LANGS)})")
+    project = SyntheticProject(spec=spec, lang=lang)
+    bases, imports = _plan(spec)
+    file_ids: List[bytes] = []
+    class_ids: Dict[str, bytes] = {}
+    method_ids: Dict[Tuple[str, int], bytes] = {}
+    # Ids of every file are known up front, so deps may point at later files too.
+    for i in range(spec.files):
+        rel = _rel_path(i, lang)
+        file_ids.append(_entity_id(rel))
+        for c in range(spec.classes_per_file):
+            name = _class_name(i, c)
+            class_ids[name] = _entity_id(rel, name)
+            for m in range(spec.methods_per_class):
+                method_ids[(name, m)] = _entity_id(rel, name, f"m{m}")
+    emit = _emit_python if lang == "python" else _emit_java
+    for i in range(spec.files):
+        emit(project, i, bases[i], imports[i], file_ids, class_ids, method_ids)
+    return project
+
+
+def _rel_path(i: int, lang: str) -> str:
+    package_dir = _package(i).replace(".", "/")
+    if lang == "python":
+        return f"{package_dir}/m{i:05d}.py"
+    return f"{package_dir}/{_class_name(i, 0)}.java"
+
+
+def _emit_python(
+    project: SyntheticProject,
+    i: int,
+    base: Optional[int],
+    imported: List[int],
+    file_ids: List[bytes],
+    class_ids: Dict[str, bytes],
+    method_ids: Dict[Tuple[str, int], bytes],
+) -> None:
+    spec = project.spec
+    rel = _rel_path(i, "python")
+    fid = file_ids[i]
+    out = _Lines()
+    spans: List[_Span] = []
+    deps = project.deps
+    out.add(f'"""Synthetic module m{i:05d}."""')
+    out.add()
+    if base is None:
+        out.add("from abc import abstractmethod")
+    for j in sorted(set(imported) | ({base} if base is not None else set())):
+        names = ", ".join(_class_name(j, c) for c in range(spec.classes_per_file))
+        row = out.add(f"from {_package(j)}.m{j:05d} import {names}")
+        deps.append((fid, file_ids[j], "Import", row))
+    for c in range(spec.classes_per_file):
+        name = _class_name(i, c)
+        cid = class_ids[name]
+        base_name = _class_name(base, c) if base is not None else None
+        out.add()
+        out.add()
+        class_row = out.add(f"class {name}({base_name}):" if base_name else f"class {name}:")
+        if base_name:
+            deps.append((cid, class_ids[base_name], "Extend", class_row))
+        init_id = _entity_id(rel, name, "__init__")
+        init_row = out.add("    def __init__(self):")
+        for f in range(max(1, spec.field_accesses)):
+            attr = f"f{f}_{c}"
+            row = out.add(f"        self.{attr} = {f}")
+            # The core parents instance fields by the method assigning them.
+            spans.append((_entity_id(rel, name, attr), init_id, attr, "Field", row, 8, row, 13 + len(attr)))
+        spans.append((init_id, cid, "__init__", "Method", init_row, 4, len(out.lines) - 1, len(out.lines[-1])))
+        for m in range(spec.methods_per_class):
+            mid = method_ids[(name, m)]
+            out.add()
+            if base is None and m == 0:
+                out.add("    @abstractmethod")
+            def_row = out.add(f"    def m{m}(self, arg):")
+            # Definition-line noise the StackGraphs filter drops.
+            deps.append((mid, cid, "Use", def_row))
+            if imported:
+                peer = _class_name(imported[m % len(imported)], m % spec.classes_per_file)
+                row = out.add(f"        peer = {peer}()")
+                deps.append((mid, class_ids[peer], "Create", row))
+                deps.append((mid, class_ids[peer], "Use", row))
+                row = out.add(f"        peer.m{(m + 1) % spec.methods_per_class}(arg)")
+                deps.append((mid, method_ids[(peer, (m + 1) % spec.methods_per_class)], "Call", row))
+            for a in range(spec.field_accesses):
+                out.add(f"        v{a} = self.f{a % max(1, spec.field_accesses)}_{c}")
+            sibling = (m + 1) % spec.methods_per_class
+            if sibling != m:
+                row = out.add(f"        return self.m{sibling}(arg)")
+                deps.append((mid, method_ids[(name, sibling)], "Call", row))
+            else:
+                out.add("        return arg")
+            end_row = len(out.lines) - 1
+            spans.append((mid, cid, f"m{m}", "Method", def_row, 4, end_row, len(out.lines[end_row])))
+        end_row = len(out.lines) - 1
+        spans.append((cid, fid, name, "Class", class_row, 0, end_row, len(out.lines[end_row])))
+    text = out.text()
+    project.sources[rel] = text
+    spans.insert(0, (fid, None, rel, "File", 0, 0, len(out.lines), 0))
+    project.entities.extend(out.entity_rows(spans, blob_id(text), rel))
+
+
+def _emit_java(
+    project: SyntheticProject,
+    i: int,
+    base: Optional[int],
+    imported: List[int],
+    file_ids: List[bytes],
+    class_ids: Dict[str, bytes],
+    method_ids: Dict[Tuple[str, int], bytes],
+) -> None:
+    spec = project.spec
+    rel = _rel_path(i, "java")
+    fid = file_ids[i]
+    out = _Lines()
+    spans: List[_Span] = []
+    deps = project.deps
+    out.add(f"package {_package(i)};")
+    out.add()
+    for j in sorted(set(imported) | ({base} if base is not None else set())):
+        for c in range(spec.classes_per_file):
+            target = _class_name(j, c)
+            row = out.add(f"import {_package(j)}.{target};")
+            deps.append((fid, class_ids[target], "Import", row))
+    n_fields = max(1, spec.field_accesses)
+    for c in range(spec.classes_per_file):
+        name = _class_name(i, c)
+        cid = class_ids[name]
+        base_name = _class_name(base, c) if base is not None else None
+        out.add()
+        header = f"{'public ' if c == 0 else ''}class {name}"
+        class_row = out.add(f"{header} extends {base_name} {{" if base_name else f"{header} {{")
+        if base_name:
+            deps.append((cid, class_ids[base_name], "Extend", class_row))
+        field_ids = []
+        for f in range(n_fields):
+            row = out.add(f"    protected int f{f}_{c} = {f};")
+            field_id = _entity_id(rel, name, f"f{f}_{c}")
+            field_ids.append(field_id)
+            spans.append((field_id, cid, f"f{f}_{c}", "Field", row, 4, row, len(out.lines[row])))
+        for m in range(spec.methods_per_class):
+            mid = method_ids[(name, m)]
+            out.add()
+            def_row = out.add("    @Override") if base_name else len(out.lines)
+            out.add(f"    public int m{m}(int arg) {{")
+            if imported:
+                peer = _class_name(imported[m % len(imported)], m % spec.classes_per_file)
+                row = out.add(f"        {peer} peer = new {peer}();")
+                deps.append((mid, class_ids[peer], "Create", row))
+                deps.append((mid, class_ids[peer], "Use", row))
+                row = out.add(f"        peer.m{(m + 1) % spec.methods_per_class}(arg);")
+                deps.append((mid, method_ids[(peer, (m + 1) % spec.methods_per_class)], "Call", row))
+            for a in range(spec.field_accesses):
+                row = out.add(f"        int v{a} = this.f{a % n_fields}_{c};")
+                deps.append((mid, field_ids[a % n_fields], "Use", row))
+            sibling = (m + 1) % spec.methods_per_class
+            if sibling != m:
+                row = out.add(f"        return this.m{sibling}(arg);")
+                deps.append((mid, method_ids[(name, sibling)], "Call", row))
+            else:
+                out.add("        return arg;")
+            end_row = out.add("    }")
+            spans.append((mid, cid, f"m{m}", "Method", def_row, 4, end_row, len(out.lines[end_row])))
+        end_row = out.add("}")
+        spans.append((cid, fid, name, "Class", class_row, 0, end_row, 1))
+    text = out.text()
+    project.sources[rel] = text
+    spans.insert(0, (fid, None, rel, "File", 0, 0, len(out.lines), 0))
+    project.entities.extend(out.entity_rows(spans, blob_id(text), rel))